@@ -1,18 +1,325 @@
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
 import re
+import json
+import hashlib
 from collections import Counter
+from id_encoding import code_column, MISSING_CODE
+from response_metrics import reply_latency_metrics, summarize_reply_latency
+from kernels import hour_group_matrix, weekday_hour_matrix, matrix_to_frame, timestamp_ns, NS_PER_HOUR, NS_PER_DAY, EPOCH_WEEKDAY
+from intervals import concurrency_analysis, concurrency_timeline
+from staffing import arrival_profile, staffing_plan, DEFAULT_TARGET_LEVEL, DEFAULT_TARGET_SECONDS
+from term_stats import term_counts, merge_term_counts, term_report, message_days
+from sampling import ratio_ci, proportion_ci, WEIGHT_COLUMN
+from figure_cache import cached_chart
+
+# Palavras indicativas de problemas/reclamações
+PROBLEM_KEYWORDS = [
+    'problema', 'erro', 'falha', 'ruim', 'péssimo', 'terrível', 'horrível',
+    'demora', 'lento', 'não funciona', 'quebrado', 'defeito', 'reclamação',
+    'insatisfeito', 'cancelar', 'reembolso', 'devolver'
+]
+
+# Palavras indicativas de satisfação
+POSITIVE_KEYWORDS = [
+    'obrigado', 'obrigada', 'excelente', 'ótimo', 'perfeito', 'maravilhoso',
+    'satisfeito', 'feliz', 'recomendo', 'parabéns', 'adorei', 'amei'
+]
+
+def sentiment_version():
+    """Hash das listas de palavras-chave; muda (e invalida o cache) quando elas mudam"""
+    keywords = json.dumps([PROBLEM_KEYWORDS, POSITIVE_KEYWORDS], ensure_ascii=False)
+    return hashlib.sha256(keywords.encode('utf-8')).hexdigest()[:16]
+
+def detect_sentiment(text):
+    """Classifica um texto (já em minúsculas) pelas palavras-chave"""
+    if pd.isna(text):
+        return 'neutral'
+    
+    problem_count = sum(1 for keyword in PROBLEM_KEYWORDS if keyword in text)
+    positive_count = sum(1 for keyword in POSITIVE_KEYWORDS if keyword in text)
+    
+    if problem_count > positive_count:
+        return 'negative'
+    elif positive_count > problem_count:
+        return 'positive'
+    else:
+        return 'neutral'
+
+def peak_hours_summary(hourly_volume, heatmap_matrix):
+    """Horários de pico e mapa de calor a partir das contagens por hora e dia da semana"""
+    # Identificar horários de pico
+    total_hourly = hourly_volume.sum(axis=1)
+    peak_threshold = total_hourly.quantile(0.8)  # Top 20%
+    peak_hours = total_hourly[total_hourly >= peak_threshold].index.tolist()
+    
+    # Mapa de calor: apenas células com volume
+    weekday_nums, hours = np.nonzero(heatmap_matrix)
+    heatmap_data = pd.DataFrame({
+        'weekday_num': weekday_nums.astype(np.int32),
+        'hour': hours.astype(np.int32),
+        'volume': heatmap_matrix[weekday_nums, hours].astype(np.int64)
+    })
+    
+    return {
+        'hourly_volume': hourly_volume,
+        'peak_hours': peak_hours,
+        'heatmap_data': heatmap_data
+    }
+
+def cohort_retention(contact_codes, timestamps, sample_rate=None):
+    """Coortes de contatos pela semana da primeira sessão e retorno nas semanas seguintes
+
+    contact_codes: códigos inteiros densos dos contatos (negativos = ausente).
+    Semanas começam na segunda-feira e viram índices inteiros; a primeira
+    semana de cada contato sai de um mínimo por código e os pares únicos
+    (contato, semanas desde a primeira) viram uma matriz coorte x semana via
+    bincount, sem groupby sobre IDs ou datas. Células ainda não observáveis
+    (além da última semana dos dados) ficam NaN.
+
+    Em uma amostra (contatos sorteados com fração sample_rate), as
+    contagens viram estimativas e as porcentagens ganham a margem do
+    intervalo de 95% ('retention_margin' e 'returning_pct_margin').
+    """
+    codes = np.asarray(contact_codes).astype(np.int64)
+    ns, valid = timestamp_ns(timestamps)
+    valid &= codes >= 0
+    if not valid.any():
+        return None
+    codes = codes[valid]
+    weeks = (ns[valid] // NS_PER_DAY + EPOCH_WEEKDAY) // 7
+    
+    # Primeira semana de cada contato (índices relativos à primeira semana dos dados)
+    first_week_overall = int(weeks.min())
+    weeks -= first_week_overall
+    n_weeks = int(weeks.max()) + 1
+    first_week = np.full(int(codes.max()) + 1, n_weeks, dtype=np.int64)
+    np.minimum.at(first_week, codes, weeks)
+    
+    # Pares únicos (contato, semanas desde a primeira sessão): ordenação + diferença
+    pairs = np.sort(codes * n_weeks + (weeks - first_week[codes]))
+    pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]]
+    pair_cohorts = first_week[pairs // n_weeks]
+    active = np.bincount(pair_cohorts * n_weeks + pairs % n_weeks, minlength=n_weeks * n_weeks).reshape(n_weeks, n_weeks)
+    
+    cohort_sizes = active[:, 0]
+    observable = np.arange(n_weeks)[:, None] + np.arange(n_weeks)[None, :] < n_weeks
+    with np.errstate(invalid='ignore', divide='ignore'):
+        retention = np.where(observable, active / cohort_sizes[:, None] * 100, np.nan)
+    
+    keep = cohort_sizes > 0
+    index = pd.Index(
+        ((first_week_overall + np.flatnonzero(keep)) * 7 - EPOCH_WEEKDAY).astype('datetime64[D]'), name='cohort_week'
+    )
+    columns = pd.Index(np.arange(n_weeks), name='weeks_since_first')
+    returning = np.bincount(pairs // n_weeks)
+    returning = returning[returning > 0]
+    if sample_rate is None:
+        return {
+            'cohort_sizes': pd.Series(cohort_sizes[keep], index=index, name='contacts'),
+            'active_contacts': pd.DataFrame(np.where(observable, active, 0)[keep], index=index, columns=columns),
+            'retention': pd.DataFrame(retention[keep], index=index, columns=columns).round(2),
+            'returning_pct': float((returning > 1).mean() * 100)
+        }
+    
+    _, cell_margin = proportion_ci(active, cohort_sizes[:, None], sample_rate)
+    returning_pct, returning_margin = proportion_ci((returning > 1).sum(), len(returning), sample_rate)
+    scale = lambda counts: np.round(counts / sample_rate).astype(np.int64)
+    return {
+        'cohort_sizes': pd.Series(scale(cohort_sizes[keep]), index=index, name='contacts'),
+        'active_contacts': pd.DataFrame(scale(np.where(observable, active, 0)[keep]), index=index, columns=columns),
+        'retention': pd.DataFrame(retention[keep], index=index, columns=columns).round(2),
+        'retention_margin': pd.DataFrame(np.where(observable, cell_margin * 100, np.nan)[keep], index=index, columns=columns).round(2),
+        'returning_pct': float(returning_pct * 100),
+        'returning_pct_margin': float(returning_margin * 100)
+    }
+
+# Janelas (em horas) para considerar que o contato voltou após o fechamento
+REOPEN_WINDOWS_HOURS = (24, 72)
+
+def _reopen_rates(table, flags, codes, n_groups, weights, clusters, sample_rate):
+    """Taxas de reabertura (e margens de 95%, na amostra) por grupo de um resultado de session_reopens"""
+    for hours, (observed, reopened) in flags.items():
+        rate, margin = ratio_ci(reopened, observed, codes, n_groups, weights, clusters, sample_rate or 1.0)
+        # Cada taxa (e margem) logo após as contagens da sua janela, quando houver
+        position = table.columns.get_loc(f'reopened_{hours}h') + 1 if f'reopened_{hours}h' in table.columns else len(table.columns)
+        table.insert(position, f'reopen_{hours}h_pct', (rate * 100).round(2))
+        if sample_rate is not None:
+            table.insert(position + 1, f'reopen_{hours}h_margin', (margin * 100).round(2))
+    return table
+
+def _reopen_table(labels, order, closed, flags, weights, clusters, sample_rate):
+    """Sessões fechadas, observáveis e reabertas por rótulo (bincount sobre a fatoração)"""
+    labels = pd.Series(labels)
+    codes, uniques = pd.factorize(labels)
+    codes = codes[order]
+    present = codes >= 0
+    codes = codes[present]
+    weights = weights[present] if weights is not None else None
+    count = lambda mask: np.round(np.bincount(
+        codes, weights=mask[present] if weights is None else mask[present] * weights, minlength=len(uniques)
+    )).astype(np.int64)
+    table = pd.DataFrame({'closed_sessions': count(closed)}, index=pd.Index(uniques, name=labels.name))
+    for hours, (observed, reopened) in flags.items():
+        table[f'observed_{hours}h'] = count(observed)
+        table[f'reopened_{hours}h'] = count(reopened)
+    present_flags = {hours: (observed[present], reopened[present]) for hours, (observed, reopened) in flags.items()}
+    table = _reopen_rates(table, present_flags, codes, len(uniques), weights, clusters[present], sample_rate)
+    return table[table['closed_sessions'] > 0].sort_values('closed_sessions', ascending=False, kind='stable')
+
+def session_reopens(contact_codes, created, closed, motives=None, groups=None, windows_hours=REOPEN_WINDOWS_HOURS,
+                    weights=None, sample_rate=None):
+    """Sessões fechadas seguidas de uma nova sessão do mesmo contato em até N horas
+
+    contact_codes: códigos inteiros dos contatos (negativos = ausente). As
+    sessões são ordenadas uma vez por (contato, createdAt) e cada uma é
+    comparada com a seguinte pelos arrays deslocados em uma posição: há
+    reabertura quando a seguinte é do mesmo contato e começa entre o
+    fechamento e o fim da janela. Só entram na taxa de cada janela as
+    sessões cuja janela inteira está nos dados (fechamento + janela até a
+    última sessão). motives e groups (closeMotive e síndico, alinhados às
+    sessões) geram as quebras 'by_motive' e 'by_group'.
+
+    Em uma amostra (sampling.SessionSample), weights são os pesos das
+    sessões e sample_rate a fração sorteada: contagens viram estimativas e
+    cada taxa ganha a margem do intervalo de 95% (reopen_Nh_margin).
+    """
+    codes = np.asarray(contact_codes).astype(np.int64)
+    created_ns, created_valid = timestamp_ns(created)
+    closed_ns, closed_valid = timestamp_ns(closed)
+    rows = np.flatnonzero(created_valid & (codes >= 0))
+    if rows.size == 0:
+        return None
+    # Duas ordenações estáveis (data, depois contato): mais rápido que lexsort e
+    # quase linear quando o export já vem em ordem de createdAt
+    order = rows[np.argsort(created_ns[rows], kind='stable')]
+    order = order[np.argsort(codes[order], kind='stable')]
+    
+    # Sessão seguinte do mesmo contato: arrays deslocados em uma posição
+    sorted_codes, sorted_created = codes[order], created_ns[order]
+    same_contact = np.r_[sorted_codes[1:] == sorted_codes[:-1], False]
+    closed_at, is_closed = closed_ns[order], closed_valid[order]
+    gap = np.r_[sorted_created[1:], 0] - closed_at
+    follows = is_closed & same_contact & (gap >= 0)
+    horizon = sorted_created.max()
+    weights = np.asarray(weights, dtype=np.float64)[order] if weights is not None else None
+    total = lambda mask: int(mask.sum()) if weights is None else int(round(weights[mask].sum()))
+    
+    flags, summary = {}, {'closed_sessions': total(is_closed)}
+    for hours in windows_hours:
+        window = hours * NS_PER_HOUR
+        observed = is_closed & (closed_at <= horizon - window)
+        reopened = observed & follows & (gap <= window)
+        flags[hours] = (observed, reopened)
+        summary[f'observed_{hours}h'] = total(observed)
+        summary[f'reopened_{hours}h'] = total(reopened)
+    rates = _reopen_rates(pd.DataFrame(index=[0]), flags, None, 1, weights, sorted_codes, sample_rate).iloc[0]
+    for name, value in rates.items():
+        summary[name] = float(value) if pd.notna(value) else None
+    
+    # Tempo até a volta, entre as reaberturas da maior janela
+    longest = flags[max(windows_hours)][1]
+    summary['median_hours_to_reopen'] = float(np.median(gap[longest]) / NS_PER_HOUR) if longest.any() else None
+    
+    result = {'summary': summary}
+    for key, labels in (('by_motive', motives), ('by_group', groups)):
+        if labels is not None:
+            result[key] = _reopen_table(labels, order, is_closed, flags, weights, sorted_codes, sample_rate)
+    return result
 
 class CXAnalytics:
     """Classe para análises avançadas de Customer Experience"""
     
-    def __init__(self, messages_df, sessions_df):
+    # Colunas (do CSV ou derivadas) que cada análise lê, por tabela
+    REQUIRED_COLUMNS = {
+        'operator_performance_analysis': {
+            'sessions': ['operatorFirstname', 'sessionID', '__sessionDuration', '__sessionQueueDuration',
+                         '__sessionManualDuration', 'sessionRatingStars', '__sessionMessagesCount']
+        },
+        'response_time_analysis': {
+            'sessions': ['hour', 'weekday', '__sessionQueueDuration', '__sessionDuration']
+        },
+        'reply_latency_analysis': {
+            'messages': ['sessionID', 'createdAt', 'messageDirection', 'messageKey']
+        },
+        'message_sentiment_analysis': {
+            'messages': ['messageDirection', 'messageValue', 'messageID', 'date']
+        },
+        'peak_hours_analysis': {
+            'messages': ['createdAt', 'messageDirection']
+        },
+        'channel_efficiency_analysis': {
+            'messages': ['messageChannel', 'messageID', 'sessionID', 'contactID']
+        },
+        'resolution_pattern_analysis': {
+            'sessions': ['closeMotive', 'sessionID', '__sessionDuration', '__sessionMessagesCount', 'sessionRatingStars']
+        },
+        'customer_journey_analysis': {
+            'messages': ['contactID', 'sessionID', 'messageID', 'createdAt']
+        },
+        'concurrency_analysis': {
+            'sessions': ['createdAt', 'queuedAt', 'manualAt', 'closedAt', 'operatorFirstname']
+        },
+        'staffing_analysis': {
+            'sessions': ['createdAt', '__sessionManualDuration']
+        },
+        'cohort_retention_analysis': {
+            'sessions': ['contactID', 'createdAt']
+        },
+        'session_reopen_analysis': {
+            'sessions': ['contactID', 'createdAt', 'closedAt', 'closeMotive']
+        },
+        'term_frequency_analysis': {
+            'messages': ['messageDirection', 'messageValue', 'createdAt']
+        }
+    }
+    
+    # Análises compostas e as análises que executam
+    ANALYSIS_DEPENDENCIES = {
+        'generate_insights_report': [
+            'operator_performance_analysis', 'reply_latency_analysis', 'message_sentiment_analysis',
+            'peak_hours_analysis', 'customer_journey_analysis'
+        ]
+    }
+    
+    def __init__(self, messages_df, sessions_df, ids=None, text_store=None, sentiment_cache=None, sample_rate=None):
         self.messages = messages_df
         self.sessions = sessions_df
+        # Fração sorteada quando sessions é uma amostra (pesos em WEIGHT_COLUMN; ver from_sample)
+        self.sample_rate = sample_rate
+        # Dicionário de IDs (DataProcessor.ids) para decodificar resultados
+        self.ids = ids
+        # Textos das mensagens fora da memória (DataProcessor.text_store)
+        self.text_store = text_store
+        # Classificações de sentimento persistidas por messageID (SentimentCache)
+        self.sentiment_cache = sentiment_cache
+    
+    @classmethod
+    def from_sample(cls, messages_df, sample_store, aggregates, **kwargs):
+        """CXAnalytics sobre a amostra persistida das sessões (sampling.SessionSample)
+
+        aggregates: agregados exatos do snapshot, que dão os pesos dos
+        estratos. As análises com suporte a amostra (coortes e reaberturas)
+        retornam estimativas com margens de 95%. None se não houver amostra.
+        """
+        sample = sample_store.load()
+        if sample is None:
+            return None
+        return cls(messages_df, sample_store.weighted(sample, aggregates), sample_rate=sample_store.rate, **kwargs)
+    
+    def _key(self, df, column):
+        """Retorna a coluna codificada (int32) do ID quando disponível"""
+        if self.ids is not None and code_column(column) in df.columns:
+            return code_column(column)
+        return column
+    
+    def _unique_values(self, df, column):
+        """Série de IDs para nunique: códigos válidos ou strings originais"""
+        key = self._key(df, column)
+        if key == column:
+            return df[column]
+        return df[key].where(df[key] != MISSING_CODE)
     
     def operator_performance_analysis(self):
         """Análise detalhada de performance dos operadores"""
@@ -77,61 +384,91 @@ class CXAnalytics:
             'weekly': weekly_response
         }
     
+    def reply_latency_analysis(self):
+        """Tempo de primeira resposta e cadência de respostas a partir das mensagens"""
+        per_session = reply_latency_metrics(self.messages, ids=self.ids)
+        if per_session is None:
+            return None
+        
+        return {
+            'per_session': per_session,
+            'summary': summarize_reply_latency(per_session)
+        }
+    
+    def _has_message_text(self):
+        """Indica se os textos estão no frame ou no armazenamento em disco"""
+        if 'messageValue' in self.messages.columns:
+            return True
+        return self.text_store is not None and 'text_row' in self.messages.columns
+    
+    def _text_notna(self, df):
+        """Máscara de mensagens com texto presente"""
+        if 'messageValue' in df.columns:
+            return df['messageValue'].notna()
+        return pd.Series(~self.text_store.is_null(df['text_row'].to_numpy()), index=df.index)
+    
+    def _iter_message_texts(self, df, batch_size=50000):
+        """Itera sobre os textos das mensagens em lotes alinhados ao índice do frame"""
+        if 'messageValue' in df.columns:
+            yield df['messageValue']
+            return
+        rows = df['text_row'].to_numpy()
+        for start in range(0, len(df), batch_size):
+            batch_index = df.index[start:start + batch_size]
+            yield pd.Series(self.text_store.get_batch(rows[start:start + batch_size]), index=batch_index, dtype=object)
+    
+    def _score_sentiment(self, messages):
+        """Classifica as mensagens, reaproveitando o cache por messageID quando disponível"""
+        use_cache = self.sentiment_cache is not None and 'messageID' in messages.columns
+        if use_cache:
+            version = sentiment_version()
+            sentiment = pd.Series(
+                self.sentiment_cache.lookup(messages['messageID'], version).to_numpy(),
+                index=messages.index, dtype=object
+            )
+        else:
+            sentiment = pd.Series(np.nan, index=messages.index, dtype=object)
+        
+        # Apenas mensagens ainda não classificadas são lidas e processadas
+        pending = messages[sentiment.isna()]
+        if not pending.empty:
+            # Converter para lowercase e classificar em lotes (textos lidos sob demanda)
+            scored = pd.concat([
+                texts.str.lower().apply(detect_sentiment)
+                for texts in self._iter_message_texts(pending)
+            ])
+            sentiment.loc[scored.index] = scored
+            if use_cache:
+                self.sentiment_cache.add(pending['messageID'], scored.loc[pending.index], version)
+        
+        return sentiment.astype(str)
+    
     def message_sentiment_analysis(self):
         """Análise básica de sentimento das mensagens"""
-        if self.messages.empty or 'messageValue' not in self.messages.columns:
+        if self.messages.empty or not self._has_message_text():
             return None
         
-        # Palavras indicativas de problemas/reclamações
-        problem_keywords = [
-            'problema', 'erro', 'falha', 'ruim', 'péssimo', 'terrível', 'horrível',
-            'demora', 'lento', 'não funciona', 'quebrado', 'defeito', 'reclamação',
-            'insatisfeito', 'cancelar', 'reembolso', 'devolver'
-        ]
-        
-        # Palavras indicativas de satisfação
-        positive_keywords = [
-            'obrigado', 'obrigada', 'excelente', 'ótimo', 'perfeito', 'maravilhoso',
-            'satisfeito', 'feliz', 'recomendo', 'parabéns', 'adorei', 'amei'
-        ]
-        
         # Analisar mensagens de entrada (dos clientes)
-        inbound_messages = self.messages[
-            (self.messages['messageDirection'] == 'inbound') & 
-            (self.messages['messageValue'].notna())
-        ].copy()
+        inbound_messages = self.messages[self.messages['messageDirection'] == 'inbound']
+        inbound_messages = inbound_messages[self._text_notna(inbound_messages)].copy()
         
         if inbound_messages.empty:
             return None
         
-        # Converter para lowercase para análise
-        inbound_messages['message_lower'] = inbound_messages['messageValue'].str.lower()
-        
-        # Detectar sentimentos
-        def detect_sentiment(text):
-            if pd.isna(text):
-                return 'neutral'
-            
-            problem_count = sum(1 for keyword in problem_keywords if keyword in text)
-            positive_count = sum(1 for keyword in positive_keywords if keyword in text)
-            
-            if problem_count > positive_count:
-                return 'negative'
-            elif positive_count > problem_count:
-                return 'positive'
-            else:
-                return 'neutral'
-        
-        inbound_messages['sentiment'] = inbound_messages['message_lower'].apply(detect_sentiment)
+        inbound_messages['sentiment'] = self._score_sentiment(inbound_messages)
         
         # Estatísticas de sentimento
         sentiment_stats = inbound_messages['sentiment'].value_counts()
         sentiment_by_date = inbound_messages.groupby(['date', 'sentiment']).size().unstack(fill_value=0)
         
+        # Exemplos negativos: apenas esses textos são materializados
+        negative_messages = inbound_messages[inbound_messages['sentiment'] == 'negative'].head(10)
+        sample_negative = pd.concat(list(self._iter_message_texts(negative_messages))).tolist() if not negative_messages.empty else []
+        
         return {
             'overall': sentiment_stats,
             'by_date': sentiment_by_date,
-            'sample_negative': inbound_messages[inbound_messages['sentiment'] == 'negative']['messageValue'].head(10).tolist()
+            'sample_negative': sample_negative
         }
     
     def peak_hours_analysis(self):
@@ -139,30 +476,33 @@ class CXAnalytics:
         if self.messages.empty:
             return None
         
-        # Análise por hora
-        hourly_volume = self.messages.groupby(['hour', 'messageDirection']).size().unstack(fill_value=0)
-        
-        # Identificar horários de pico
-        total_hourly = hourly_volume.sum(axis=1)
-        peak_threshold = total_hourly.quantile(0.8)  # Top 20%
-        peak_hours = total_hourly[total_hourly >= peak_threshold].index.tolist()
+        # Análise por hora (contagem densa hora x direção via bincount)
+        direction_codes, directions = pd.factorize(self.messages['messageDirection'], sort=True)
+        hourly_volume = matrix_to_frame(
+            hour_group_matrix(self.messages['createdAt'], direction_codes, len(directions)),
+            index=np.arange(24, dtype=np.int32),
+            columns=directions,
+            index_name='hour',
+            columns_name='messageDirection'
+        )
         
-        # Análise por dia da semana e hora
-        heatmap_data = self.messages.groupby(['weekday_num', 'hour']).size().reset_index(name='volume')
+        # Análise por dia da semana e hora (matriz 7 x 24)
+        heatmap_matrix = weekday_hour_matrix(self.messages['createdAt'])
         
-        return {
-            'hourly_volume': hourly_volume,
-            'peak_hours': peak_hours,
-            'heatmap_data': heatmap_data
-        }
+        return peak_hours_summary(hourly_volume, heatmap_matrix)
     
     def channel_efficiency_analysis(self):
         """Análise de eficiência por canal"""
         if self.messages.empty or 'messageChannel' not in self.messages.columns:
             return None
         
-        # Métricas por canal
-        channel_stats = self.messages.groupby('messageChannel').agg({
+        # Métricas por canal (IDs agrupados pelos códigos inteiros)
+        channel_stats = pd.DataFrame({
+            'messageID': self.messages['messageID'],
+            'sessionID': self._unique_values(self.messages, 'sessionID'),
+            'contactID': self._unique_values(self.messages, 'contactID'),
+            'messageChannel': self.messages['messageChannel']
+        }).groupby('messageChannel').agg({
             'messageID': 'count',
             'sessionID': 'nunique',
             'contactID': 'nunique'
@@ -225,8 +565,18 @@ class CXAnalytics:
         if self.messages.empty:
             return None
         
-        # Análise por contato
-        contact_journey = self.messages.groupby('contactID').agg({
+        # Análise por contato (agrupada pelo código do contato)
+        contact_key = self._key(self.messages, 'contactID')
+        messages = self.messages
+        if contact_key != 'contactID':
+            messages = messages[messages[contact_key] != MISSING_CODE]
+        
+        contact_journey = pd.DataFrame({
+            'contact': messages[contact_key],
+            'sessionID': self._unique_values(messages, 'sessionID'),
+            'messageID': messages['messageID'],
+            'createdAt': messages['createdAt']
+        }).groupby('contact').agg({
             'sessionID': 'nunique',  # Número de sessões
             'messageID': 'count',  # Total de mensagens
             'createdAt': ['min', 'max']  # Primeira e última interação
@@ -236,6 +586,16 @@ class CXAnalytics:
             'total_sessions', 'total_messages', 'first_contact', 'last_contact'
         ]
         
+        # Decodificar os contatos apenas no resultado final
+        if contact_key != 'contactID':
+            contact_journey.index = pd.Index(
+                self.ids.decode('contactID', contact_journey.index.to_numpy()),
+                name='contactID'
+            )
+            contact_journey = contact_journey.sort_index()
+        else:
+            contact_journey.index.name = 'contactID'
+        
         # Calcular duração do relacionamento
         contact_journey['relationship_days'] = (
             contact_journey['last_contact'] - contact_journey['first_contact']
@@ -267,43 +627,175 @@ class CXAnalytics:
             'type_distribution': contact_journey['customer_type'].value_counts()
         }
     
+    def concurrency_analysis(self):
+        """Sessões em atendimento simultâneo e fila de espera por minuto e por operador"""
+        if self.sessions.empty:
+            return None
+        return concurrency_analysis(self.sessions, group_column='operatorFirstname')
+    
+    def staffing_analysis(self, target_level=DEFAULT_TARGET_LEVEL, target_seconds=DEFAULT_TARGET_SECONDS):
+        """Atendentes necessários por dia da semana e hora (Erlang C) para a meta de nível de serviço"""
+        profile = arrival_profile(self.sessions)
+        if profile is None:
+            return None
+        
+        plan = staffing_plan(profile, target_level, target_seconds)
+        return {
+            'plan': plan,
+            'agents': plan.pivot(index='weekday', columns='hour', values='agents'),
+            'peak_agents': int(plan['agents'].max()),
+            'agent_hours_per_week': int(plan['agents'].sum())
+        }
+    
+    def cohort_retention_analysis(self):
+        """Retenção semanal dos contatos por coorte (semana da primeira sessão)"""
+        if self.sessions.empty or 'contactID' not in self.sessions.columns:
+            return None
+        
+        # Códigos densos do dicionário de IDs ou, sem ele, fatoração dos contactID
+        contact_key = self._key(self.sessions, 'contactID')
+        if contact_key != 'contactID':
+            codes = self.sessions[contact_key].to_numpy()
+        else:
+            codes = pd.factorize(self.sessions['contactID'])[0]
+        return cohort_retention(codes, self.sessions['createdAt'], sample_rate=self.sample_rate)
+    
+    def session_reopen_analysis(self, group_column='pluginConnectionLabel', windows_hours=REOPEN_WINDOWS_HOURS):
+        """Contatos que abrem nova sessão em até 24h/72h após o fechamento, por motivo e síndico"""
+        required = ['contactID', 'createdAt', 'closedAt']
+        if self.sessions.empty or any(col not in self.sessions.columns for col in required):
+            return None
+        
+        contact_key = self._key(self.sessions, 'contactID')
+        if contact_key != 'contactID':
+            codes = self.sessions[contact_key].to_numpy()
+        else:
+            codes = pd.factorize(self.sessions['contactID'])[0]
+        return session_reopens(
+            codes, self.sessions['createdAt'], self.sessions['closedAt'],
+            motives=self.sessions.get('closeMotive'),
+            groups=self.sessions.get(group_column),
+            windows_hours=windows_hours,
+            weights=self.sessions.get(WEIGHT_COLUMN) if self.sample_rate is not None else None,
+            sample_rate=self.sample_rate
+        )
+    
+    def term_frequency_analysis(self, top_n=20, window_days=7):
+        """Termos e bigramas mais frequentes nas mensagens recebidas e os que mais cresceram
+
+        Os textos são tokenizados em lotes (lidos sob demanda do
+        armazenamento em disco) e contados por dia; em alta compara os
+        últimos window_days dias com os window_days anteriores.
+        """
+        if self.messages.empty or not self._has_message_text():
+            return None
+        
+        inbound_messages = self.messages[self.messages['messageDirection'] == 'inbound']
+        inbound_messages = inbound_messages[self._text_notna(inbound_messages)]
+        days = pd.Series(message_days(inbound_messages['createdAt']), index=inbound_messages.index)
+        inbound_messages = inbound_messages[days >= 0]
+        if inbound_messages.empty:
+            return None
+        
+        table = merge_term_counts([
+            term_counts(texts, days.loc[texts.index])
+            for texts in self._iter_message_texts(inbound_messages)
+        ])
+        overall = term_report(table, top_n=top_n)
+        last_day = int(table['totals'].index.max())
+        recent = term_report(table, last_day - window_days + 1, last_day, top_n=top_n)
+        
+        daily = table['totals'].copy()
+        daily.index = pd.to_datetime(daily.index.to_numpy() * NS_PER_DAY).rename('date')
+        return {
+            'top_unigrams': overall['top_unigrams'],
+            'top_bigrams': overall['top_bigrams'],
+            'rising_unigrams': recent['rising_unigrams'],
+            'rising_bigrams': recent['rising_bigrams'],
+            'window_days': window_days,
+            'daily': daily
+        }
+    
     def generate_insights_report(self):
         """Gera relatório com insights principais"""
-        insights = []
+        results = {
+            analysis: getattr(self, analysis)()
+            for analysis in CXAnalytics.ANALYSIS_DEPENDENCIES['generate_insights_report']
+        }
+        return build_insights(results)
+
+def build_insights(results):
+    """Insights principais a partir dos resultados das análises
+
+    results: {nome da análise: resultado} com as análises de
+    CXAnalytics.ANALYSIS_DEPENDENCIES['generate_insights_report'].
+    """
+    insights = []
+    
+    # Performance dos operadores
+    operator_perf = results.get('operator_performance_analysis')
+    if operator_perf is not None:
+        best_operator = operator_perf.loc[operator_perf['avg_rating'].idxmax()]
+        most_efficient = operator_perf.loc[operator_perf['efficiency_sessions_per_hour'].idxmax()]
         
-        # Performance dos operadores
-        operator_perf = self.operator_performance_analysis()
-        if operator_perf is not None:
-            best_operator = operator_perf.loc[operator_perf['avg_rating'].idxmax()]
-            most_efficient = operator_perf.loc[operator_perf['efficiency_sessions_per_hour'].idxmax()]
-            
-            insights.append(f"🏆 Melhor avaliado: {best_operator.name} ({best_operator['avg_rating']:.1f}⭐)")
-            insights.append(f"⚡ Mais eficiente: {most_efficient.name} ({most_efficient['efficiency_sessions_per_hour']:.1f} sessões/hora)")
-        
-        # Análise de sentimento
-        sentiment = self.message_sentiment_analysis()
-        if sentiment is not None:
-            negative_pct = (sentiment['overall'].get('negative', 0) / sentiment['overall'].sum() * 100)
-            insights.append(f"😟 {negative_pct:.1f}% das mensagens têm sentimento negativo")
-        
-        # Horários de pico
-        peak_analysis = self.peak_hours_analysis()
-        if peak_analysis is not None:
-            peak_hours = peak_analysis['peak_hours']
-            insights.append(f"📈 Horários de pico: {', '.join(map(str, peak_hours))}h")
-        
-        # Jornada do cliente
-        journey = self.customer_journey_analysis()
-        if journey is not None:
-            frequent_customers = (journey['type_distribution'].get('Frequente', 0) / 
-                                journey['type_distribution'].sum() * 100)
-            insights.append(f"👥 {frequent_customers:.1f}% são clientes frequentes")
-        
-        return insights
+        insights.append(f"🏆 Melhor avaliado: {best_operator.name} ({best_operator['avg_rating']:.1f}⭐)")
+        insights.append(f"⚡ Mais eficiente: {most_efficient.name} ({most_efficient['efficiency_sessions_per_hour']:.1f} sessões/hora)")
+    
+    # Tempo de primeira resposta
+    latency = results.get('reply_latency_analysis')
+    if latency is not None and latency['summary']['median_first_response_seconds'] is not None:
+        summary = latency['summary']
+        insights.append(f"⏱️ Primeira resposta mediana: {summary['median_first_response_seconds'] / 60:.1f} min")
+        insights.append(f"📭 {summary['sessions_with_unanswered_pct']:.1f}% das sessões têm mensagens sem resposta")
+    
+    # Análise de sentimento
+    sentiment = results.get('message_sentiment_analysis')
+    if sentiment is not None:
+        negative_pct = (sentiment['overall'].get('negative', 0) / sentiment['overall'].sum() * 100)
+        insights.append(f"😟 {negative_pct:.1f}% das mensagens têm sentimento negativo")
+    
+    # Horários de pico
+    peak_analysis = results.get('peak_hours_analysis')
+    if peak_analysis is not None:
+        peak_hours = peak_analysis['peak_hours']
+        insights.append(f"📈 Horários de pico: {', '.join(map(str, peak_hours))}h")
+    
+    # Jornada do cliente
+    journey = results.get('customer_journey_analysis')
+    if journey is not None:
+        frequent_customers = (journey['type_distribution'].get('Frequente', 0) / 
+                            journey['type_distribution'].sum() * 100)
+        insights.append(f"👥 {frequent_customers:.1f}% são clientes frequentes")
+    
+    return insights
+
+def required_columns(analyses=None):
+    """União das colunas necessárias por tabela para um conjunto de análises
+
+    Sem argumentos, considera todas as análises de CXAnalytics.
+    """
+    if analyses is None:
+        analyses = list(CXAnalytics.REQUIRED_COLUMNS.keys())
+    
+    columns = {}
+    pending = list(analyses)
+    while pending:
+        analysis = pending.pop()
+        if analysis in CXAnalytics.ANALYSIS_DEPENDENCIES:
+            pending.extend(CXAnalytics.ANALYSIS_DEPENDENCIES[analysis])
+            continue
+        for table, table_columns in CXAnalytics.REQUIRED_COLUMNS[analysis].items():
+            columns.setdefault(table, set()).update(table_columns)
+    
+    return columns
 
 # Função para criar gráficos avançados
-def create_advanced_charts(analytics):
-    """Cria gráficos avançados para análise"""
+def create_advanced_charts(analytics, cache=None):
+    """Cria gráficos avançados para análise
+
+    As figuras vêm do cache de figuras (figure_cache.FIGURE_CACHE, ou
+    cache): com os mesmos dados e parâmetros, não são reconstruídas.
+    """
     charts = {}
     
     # Heatmap de atividade
@@ -312,23 +804,53 @@ def create_advanced_charts(analytics):
         heatmap_data = peak_data['heatmap_data']
         pivot_data = heatmap_data.pivot(index='weekday_num', columns='hour', values='volume')
         
-        charts['activity_heatmap'] = px.imshow(
+        charts['activity_heatmap'] = cached_chart(
+            'imshow',
             pivot_data,
             title="Mapa de Calor: Atividade por Hora e Dia da Semana",
             labels={'x': 'Hora', 'y': 'Dia da Semana', 'color': 'Volume'},
-            color_continuous_scale='Viridis'
+            color_continuous_scale='Viridis',
+            cache=cache
         )
     
     # Gráfico de performance dos operadores
     operator_perf = analytics.operator_performance_analysis()
     if operator_perf is not None:
-        charts['operator_scatter'] = px.scatter(
+        charts['operator_scatter'] = cached_chart(
+            'scatter',
             x=operator_perf['avg_rating'],
             y=operator_perf['efficiency_sessions_per_hour'],
             size=operator_perf['total_sessions'],
             hover_name=operator_perf.index,
             title="Performance dos Operadores: Avaliação vs Eficiência",
-            labels={'x': 'Avaliação Média', 'y': 'Eficiência (sessões/hora)'}
+            labels={'x': 'Avaliação Média', 'y': 'Eficiência (sessões/hora)'},
+            cache=cache
+        )
+    
+    # Sessões simultâneas e fila de espera (pico por hora)
+    concurrency = analytics.concurrency_analysis()
+    if concurrency is not None:
+        timeline = concurrency_timeline(concurrency, freq='1h')
+        charts['concurrency_timeline'] = cached_chart(
+            'line',
+            timeline.rename(columns={'concurrent': 'Em atendimento', 'backlog': 'Na fila'}),
+            title="Sessões Simultâneas e Fila de Espera (pico por hora)",
+            labels={'minute': 'Hora', 'value': 'Sessões', 'variable': 'Situação'},
+            cache=cache
+        )
+    
+    # Termos mais citados nas mensagens recebidas
+    terms = analytics.term_frequency_analysis()
+    if terms is not None and not terms['top_unigrams'].empty:
+        charts['top_terms'] = cached_chart(
+            'bar',
+            terms['top_unigrams'].iloc[::-1],
+            x='count',
+            y='term',
+            orientation='h',
+            title="Termos Mais Citados nas Mensagens Recebidas",
+            labels={'count': 'Ocorrências', 'term': 'Termo'},
+            cache=cache
         )
     
     return charts
\ No newline at end of file
@@ -1,11 +1,29 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import numpy as np
 from datetime import datetime, timedelta
 import os
+import time
+from data_processor import DataProcessor, DATA_FILES
+from analytics import CXAnalytics, cohort_retention, session_reopens
+from table_view import paginated_table, format_duration_series
+from kernels import matrix_to_frame
+from id_encoding import code_column
+from response_metrics import reply_latency_metrics, summarize_reply_latency
+from session_index import SessionIndex, CONVERSATION_TEXT_DIR
+from text_index import TextIndex, TEXT_INDEX_DIR
+from term_stats import TermStats, TERM_STATS_DIR
+from sampling import SessionSample, SAMPLE_DIR, WEIGHT_COLUMN
+from file_lock import directory_lock
+from intervals import concurrency_analysis, concurrency_timeline
+from staffing import arrival_profile, staffing_plan, DEFAULT_TARGET_LEVEL
+from dashboard_data import (
+    SINDICOMPANY_FILE, dashboard_columns, read_sessions, build_aggregates,
+    load_snapshot_data, load_snapshot_aggregates, filter_sessions, filter_aggregates, session_metrics,
+    daily_sessions, hourly_sessions, operator_summary, weekday_sessions, data_version, WEEKDAY_NAMES
+)
+from memory_telemetry import MemoryTelemetry, process_rss, format_bytes
+from figure_cache import FIGURE_CACHE, cached_chart
 
 # Configuração da página
 st.set_page_config(
@@ -15,45 +33,26 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Intervalo (segundos) para verificar se há uma nova versão dos dados
+VERSION_POLL_SECONDS = 10
+
 # Função para carregar dados com otimizações para deploy
 @st.cache_data(ttl=3600)  # Cache por 1 hora
-def load_data():
-    """Carrega e processa os dados do arquivo CSV Sindicompany"""
+def load_data(columns=None, version=None):
+    """Carrega as sessões Sindicompany do snapshot processado ou do CSV
+
+    columns: colunas necessárias (ver SECTION_COLUMNS); None lê o CSV inteiro.
+    version: versão do arquivo de origem, para invalidar o cache quando ele muda.
+    """
     try:
-        # Carregar dados Sindicompany - arquivo principal V3
-        sindicompany_file = "data/[ Talqui ] Sindicompany - Data_V3_Julho_20_26.csv"
-        if os.path.exists(sindicompany_file):
-            data = pd.read_csv(sindicompany_file, low_memory=False)
-            
-            # Converter datas - formato "2025-06-01 1:09:48"
-            date_columns = ['queuedAt', 'manualAt', 'closedAt', 'createdAt', 'updatedAt', 'sessionRatingAt']
-            for col in date_columns:
-                if col in data.columns:
-                    data[col] = pd.to_datetime(data[col], errors='coerce')
-            
-            # Adicionar colunas derivadas baseadas em createdAt
-            if 'createdAt' in data.columns and not data['createdAt'].isna().all():
-                data['date'] = data['createdAt'].dt.date
-                data['hour'] = data['createdAt'].dt.hour
-                data['weekday'] = data['createdAt'].dt.day_name()
-            
-            # Processar durações (converter de segundos para minutos)
-            duration_columns = ['__sessionDuration', '__sessionQueueDuration', '__sessionManualDuration']
-            for col in duration_columns:
-                if col in data.columns:
-                    data[f'{col}_minutes'] = pd.to_numeric(data[col], errors='coerce') / 60
-            
-            # Processar ratings
-            if 'sessionRatingStars' in data.columns:
-                data['sessionRatingStars'] = pd.to_numeric(data['sessionRatingStars'], errors='coerce')
-            
-            # Processar contadores de mensagens
-            if '__sessionMessagesCount' in data.columns:
-                data['__sessionMessagesCount'] = pd.to_numeric(data['__sessionMessagesCount'], errors='coerce')
-            
-            return data
+        if os.path.exists(SINDICOMPANY_FILE):
+            # Snapshot gerado por "python run.py --prewarm" (sem parsing do CSV)
+            data = load_snapshot_data(columns)
+            if data is not None:
+                return data
+            return read_sessions(SINDICOMPANY_FILE, columns)
         else:
-            st.error(f"Arquivo não encontrado: {sindicompany_file}")
+            st.error(f"Arquivo não encontrado: {SINDICOMPANY_FILE}")
             return pd.DataFrame()
     
     except Exception as e:
@@ -61,12 +60,956 @@ def load_data():
         st.info("💡 **Arquivo necessário**: `data/[ Talqui ] Sindicompany - Data_V3_Julho_20_26.csv`")
         return pd.DataFrame()
 
+@st.cache_data(ttl=3600)  # Cache por 1 hora
+def load_aggregates(columns=None, version=None):
+    """Agregados por data, hora e síndico (do snapshot ou calculados a partir das sessões)"""
+    aggregates = load_snapshot_aggregates(columns)
+    if aggregates is not None:
+        return aggregates
+    return build_aggregates(load_data(columns, version))
+
+# Com pelo menos tantas sessões o dashboard abre no modo amostra
+SAMPLE_MODE_MIN_SESSIONS = 200_000
+
+@st.cache_data(ttl=3600)  # Cache por 1 hora
+def load_sample(columns=None, version=None):
+    """Amostra estratificada das sessões com o peso de cada uma (refeita se não for da versão atual dos dados)"""
+    store = SessionSample(SAMPLE_DIR)
+    aggregates = load_aggregates(columns, version)
+    # Sem o daemon de ingestão (que a mantém em dia), a amostra é sorteada aqui
+    store.ensure(str(version), lambda: load_data(columns, version), aggregates)
+    return store.weighted(store.load(), aggregates)
+
+@st.cache_data(ttl=3600)  # Cache por 1 hora
+def load_reply_latency():
+    """Calcula as métricas de resposta por sessão a partir do arquivo de mensagens"""
+    processor = DataProcessor()
+    messages = processor.load_messages(columns=CXAnalytics.REQUIRED_COLUMNS['reply_latency_analysis']['messages'])
+    if messages.empty:
+        return None
+    return remember('load_reply_latency', reply_latency_metrics(messages, ids=processor.ids))
+
+# Colunas das mensagens exibidas no drill-down de conversas
+CONVERSATION_COLUMNS = ['sessionID', 'createdAt', 'messageDirection', 'messageKey', 'messageValue']
+
+def messages_version():
+    """Versão do arquivo de mensagens (mtime e tamanho), para invalidar o índice de conversas"""
+    file_path = os.path.join("data", DATA_FILES['messages'])
+    if not os.path.exists(file_path):
+        return None
+    stat = os.stat(file_path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+@st.cache_resource(ttl=3600)
+def load_session_index(version=None):
+    """Mensagens agrupadas por sessão (layout CSR), compartilhadas sem cópia entre acessos
+
+    Os textos vão para o armazenamento em disco (só a coluna text_row fica no
+    índice) e são lidos apenas para a conversa aberta.
+    """
+    processor = DataProcessor(text_store_dir=CONVERSATION_TEXT_DIR)
+    with directory_lock(CONVERSATION_TEXT_DIR):
+        messages = processor.load_messages(columns=CONVERSATION_COLUMNS)
+        if messages.empty or processor.text_store is None:
+            return None
+        # Mapeia os arquivos ainda sob a trava: uma reconstrução posterior não os troca sob o índice
+        len(processor.text_store)
+    return remember('load_session_index', SessionIndex(messages, processor.ids, processor.text_store), version)
+
+@st.cache_resource(ttl=3600)
+def load_text_index(version=None):
+    """Índice invertido dos textos das mensagens, atualizado de forma incremental quando o export muda"""
+    index = TextIndex(TEXT_INDEX_DIR)
+    index.sync(os.path.join("data", DATA_FILES['messages']))
+    if len(index) == 0:
+        return None
+    return remember('load_text_index', index, version)
+
+@st.cache_resource(ttl=3600)
+def load_term_stats(version=None):
+    """Contagens diárias de termos das mensagens recebidas, atualizadas de forma incremental"""
+    store = TermStats(TERM_STATS_DIR)
+    store.sync(os.path.join("data", DATA_FILES['messages']))
+    if not store.days():
+        return None
+    return remember('load_term_stats', store, version)
+
+def format_estimate(value, margin=None, spec=".1f", suffix=""):
+    """Valor formatado; estimativas da amostra ganham a margem do intervalo de 95% (ex.: 1,234 ± 56)"""
+    if value is None or pd.isna(value):
+        return "N/A"
+    if margin is None:
+        return f"{value:{spec}}{suffix}"
+    if pd.isna(margin):
+        return f"≈{value:{spec}}{suffix}"
+    return f"{value:{spec}}{suffix} ± {margin:{spec}}"
+
+def format_seconds(seconds):
+    """Formata segundos como HH:MM:SS"""
+    if seconds is None or pd.isna(seconds):
+        return "N/A"
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+
+# Fragmentos: cada seção é reexecutada sozinha quando um controle dela muda
+# (busca, ordenação e paginação das tabelas). Sem st.fragment (Streamlit
+# antigo) as seções viram funções comuns e a página inteira é reexecutada.
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda func: func)
+
+if hasattr(st, 'fragment'):
+    @st.fragment(run_every=VERSION_POLL_SECONDS)
+    def watch_data_version():
+        """Reexecuta a página quando o daemon de ingestão publica uma nova versão"""
+        version = data_version()
+        if st.session_state.setdefault('data_version', version) != version:
+            st.session_state['data_version'] = version
+            st.rerun()
+else:
+    def watch_data_version():
+        """Sem fragmentos com run_every, a nova versão é usada na próxima interação"""
+
+def filter_fingerprint(start_date, end_date, operator, sample_rate=None):
+    """Impressão digital das entradas das seções: versão dos dados + filtros ativos + modo amostra"""
+    return (data_version(), dashboard_columns(), start_date, end_date, operator, sample_rate)
+
+# Validade (segundos) e quantidade de resultados guardados por cache de seção
+SECTION_CACHE_TTL = 3600
+SECTION_CACHE_ENTRIES = 64
+
+# Agregados por seção, cacheados pela impressão digital dos filtros.
+# Os DataFrames filtrados (_data, _aggregates) não entram no hash: eles são
+# determinados pela impressão digital, então só os resultados pequenos são guardados.
+@st.cache_data(ttl=SECTION_CACHE_TTL, max_entries=SECTION_CACHE_ENTRIES)
+def metrics_aggregate(_data, _aggregates, fingerprint, sample_rate=None):
+    """Valores dos cartões de métricas principais (_data é a amostra com sample_rate)"""
+    return remember('metrics_aggregate', session_metrics(_data, _aggregates, sample_rate), (fingerprint, sample_rate))
+
+@st.cache_data(ttl=SECTION_CACHE_TTL, max_entries=SECTION_CACHE_ENTRIES)
+def daily_hourly_aggregate(_aggregates, fingerprint):
+    """Sessões por dia e por hora do dia"""
+    return remember('daily_hourly_aggregate', (daily_sessions(_aggregates), hourly_sessions(_aggregates)), fingerprint)
+
+@st.cache_data(ttl=SECTION_CACHE_TTL, max_entries=SECTION_CACHE_ENTRIES)
+def operator_aggregate(_aggregates, fingerprint):
+    """Sessões, durações e mensagens médias por síndico"""
+    return remember('operator_aggregate', operator_summary(_aggregates), fingerprint)
+
+@st.cache_data(ttl=SECTION_CACHE_TTL, max_entries=SECTION_CACHE_ENTRIES)
+def day_operator_aggregate(_aggregates, fingerprint, operator_labels):
+    """Tabela dia do mês x síndico a partir dos agregados"""
+    labels = pd.Index(operator_labels)
+    codes = pd.Categorical(_aggregates['pluginConnectionLabel'], categories=labels).codes
+    days = pd.to_datetime(_aggregates['date']).dt.day.to_numpy()
+    keep = codes >= 0
+
+    matrix = np.zeros((31, len(labels)), dtype=np.int64)
+    np.add.at(matrix, (days[keep] - 1, codes[keep]), _aggregates['sessions'].to_numpy()[keep])
+    return remember('day_operator_aggregate', matrix_to_frame(
+        matrix,
+        index=np.arange(1, 32),
+        columns=labels,
+        index_name='day',
+        columns_name='pluginConnectionLabel'
+    ), (fingerprint, operator_labels))
+
+@st.cache_data(ttl=SECTION_CACHE_TTL, max_entries=SECTION_CACHE_ENTRIES)
+def weekday_aggregate(_aggregates, fingerprint):
+    """Sessões por dia da semana (segunda a domingo)"""
+    return remember('weekday_aggregate', weekday_sessions(_aggregates), fingerprint)
+
+@st.cache_data(ttl=SECTION_CACHE_TTL, max_entries=SECTION_CACHE_ENTRIES)
+def reply_latency_aggregate(_data, fingerprint):
+    """Resumo do tempo de resposta e primeira resposta mediana por síndico"""
+    reply_latency = load_reply_latency()
+    if reply_latency is None or 'sessionID' not in _data.columns:
+        return None, None
+
+    session_latency = reply_latency.reindex(_data['sessionID'].dropna().unique()).dropna(how='all')
+    latency_summary = summarize_reply_latency(session_latency)
+
+    latency_by_operator = None
+    if latency_summary is not None and 'pluginConnectionLabel' in _data.columns:
+        latency_by_operator = _data[['sessionID', 'pluginConnectionLabel']].join(
+            session_latency, on='sessionID', how='inner'
+        ).groupby('pluginConnectionLabel')['first_response_seconds'].median().dropna()
+    return remember('reply_latency_aggregate', (latency_summary, latency_by_operator), fingerprint)
+
+@st.cache_data(ttl=SECTION_CACHE_TTL, max_entries=SECTION_CACHE_ENTRIES)
+def concurrency_aggregate(_data, fingerprint):
+    """Sessões simultâneas e fila por minuto (varredura dos intervalos das sessões filtradas)"""
+    return remember('concurrency_aggregate', concurrency_analysis(_data), fingerprint)
+
+@st.cache_data(ttl=SECTION_CACHE_TTL, max_entries=SECTION_CACHE_ENTRIES)
+def staffing_profile_aggregate(_data, fingerprint):
+    """Chegadas e tempo médio de atendimento por dia da semana x hora (total e por síndico)"""
+    return remember('staffing_profile_aggregate', (
+        arrival_profile(_data),
+        arrival_profile(_data, group_column='pluginConnectionLabel')
+    ), fingerprint)
+
+@st.cache_data(ttl=SECTION_CACHE_TTL, max_entries=SECTION_CACHE_ENTRIES)
+def cohort_aggregate(_data, fingerprint, sample_rate=None):
+    """Retenção semanal dos contatos por coorte, a partir dos códigos de contato"""
+    if code_column('contactID') not in _data.columns:
+        return None
+    return remember('cohort_aggregate', cohort_retention(
+        _data[code_column('contactID')].to_numpy(), _data['createdAt'], sample_rate=sample_rate
+    ), (fingerprint, sample_rate))
+
+@st.cache_data(ttl=SECTION_CACHE_TTL, max_entries=SECTION_CACHE_ENTRIES)
+def reopen_aggregate(_data, fingerprint, sample_rate=None):
+    """Sessões seguidas de nova sessão do mesmo contato em até 24h/72h, por motivo e síndico"""
+    if code_column('contactID') not in _data.columns:
+        return None
+    return remember('reopen_aggregate', session_reopens(
+        _data[code_column('contactID')].to_numpy(), _data['createdAt'], _data['closedAt'],
+        motives=_data.get('closeMotive'), groups=_data.get('pluginConnectionLabel'),
+        weights=_data.get(WEIGHT_COLUMN) if sample_rate is not None else None, sample_rate=sample_rate
+    ), (fingerprint, sample_rate))
+
+@st.cache_data(ttl=SECTION_CACHE_TTL, max_entries=SECTION_CACHE_ENTRIES)
+def term_aggregate(start_date, end_date, version=None):
+    """Termos mais citados e em alta no período, somando as contagens diárias persistidas"""
+    store = load_term_stats(version)
+    if store is None:
+        return None
+    return remember('term_aggregate', store.report(start_date, end_date, top_n=TERM_TOP_N), (start_date, end_date, version))
+
+# Telemetria de memória dos caches. Com CX_MEMORY_BUDGET_MB definido, caches são
+# liberados quando o RSS passa do orçamento: primeiro os agregados das seções,
+# depois as latências, os agregados e, por último, as sessões (que voltam do
+# snapshot em disco na próxima leitura).
+SECTION_CACHES = (
+    'metrics_aggregate', 'daily_hourly_aggregate', 'operator_aggregate',
+    'day_operator_aggregate', 'weekday_aggregate', 'reply_latency_aggregate',
+    'concurrency_aggregate', 'staffing_profile_aggregate', 'cohort_aggregate', 'reopen_aggregate', 'term_aggregate'
+)
+
+def release_sessions():
+    """Libera as sessões do cache; a próxima leitura as recarrega do snapshot (ou do CSV)
+
+    Reconstruir o snapshot fica com o daemon de ingestão e com "run.py --prewarm":
+    refazê-lo aqui, só a partir do arquivo principal, descartaria as sessões
+    dos demais exports já ingeridos.
+    """
+    load_data.clear()
+
+@st.cache_resource
+def get_telemetry():
+    """Telemetria compartilhada entre sessões e reexecuções do app"""
+    telemetry = MemoryTelemetry()
+    for name in SECTION_CACHES:
+        telemetry.register(name, evict=globals()[name].clear, priority=0,
+                           max_items=SECTION_CACHE_ENTRIES, ttl=SECTION_CACHE_TTL)
+    telemetry.register('load_reply_latency', evict=load_reply_latency.clear, priority=1)
+    telemetry.register('load_session_index', evict=load_session_index.clear, priority=1, ttl=3600)
+    telemetry.register('load_text_index', evict=load_text_index.clear, priority=1, ttl=3600)
+    telemetry.register('load_term_stats', evict=load_term_stats.clear, priority=1, ttl=3600)
+    telemetry.register('load_aggregates', evict=load_aggregates.clear, priority=2)
+    telemetry.register('load_sample', evict=load_sample.clear, priority=2)
+    telemetry.register('figure_cache', evict=FIGURE_CACHE.clear, priority=0)
+    telemetry.register('load_data', evict=release_sessions, priority=3)
+    return telemetry
+
+def remember(name, result, key=None):
+    """Registra a memória de um resultado cacheado (o corpo só roda em cache miss)
+
+    key: argumentos que identificam o resultado no cache (impressão digital,
+    versão); um resultado recalculado para a mesma chave substitui o anterior.
+    """
+    return get_telemetry().track(name, result, key=key)
+
+def memory_sidebar(telemetry, evicted):
+    """Painel de depuração com RSS, memória por cache e por coluna das sessões e acertos do cache de figuras"""
+    with st.sidebar.expander("🧠 Memória (debug)", expanded=False):
+        rss = process_rss()
+        budget = telemetry.budget
+        st.metric(
+            "RSS do processo",
+            format_bytes(rss),
+            delta=f"orçamento {format_bytes(budget)}" if budget is not None else None,
+            delta_color="off"
+        )
+        if evicted:
+            st.warning(f"⚠️ Acima do orçamento: caches liberados ({', '.join(evicted)})")
+
+        report = telemetry.report()
+        report = report[report['bytes'] > 0]
+        st.dataframe(
+            pd.DataFrame({
+                'Cache': report['cache'],
+                'Memória': report['bytes'].map(format_bytes),
+                'Objetos': report['objects'],
+                'RSS ao carregar': report['rss_delta'].map(lambda v: format_bytes(v) if pd.notna(v) else "N/A")
+            }),
+            hide_index=True,
+            use_container_width=True
+        )
+
+        figures = FIGURE_CACHE.stats()
+        if figures['hit_rate'] is not None:
+            st.caption(
+                f"Cache de figuras: {figures['hit_rate']:.0f}% de acertos "
+                f"({figures['hits']:,} de {figures['hits'] + figures['misses']:,}), {figures['entries']:,} figuras "
+                f"({format_bytes(figures['bytes'])}), {figures['evictions']:,} descartadas"
+            )
+
+        columns = telemetry.columns('load_data')
+        if columns is not None:
+            st.caption("Sessões por coluna")
+            st.dataframe(
+                columns.map(format_bytes).rename('Memória').rename_axis('Coluna').reset_index(),
+                hide_index=True,
+                use_container_width=True
+            )
+
+@fragment
+def metrics_section(data_filtered, aggregates_filtered, fingerprint, sample_rate=None):
+    """Métricas principais Sindicompany"""
+    metrics = metrics_aggregate(data_filtered, aggregates_filtered, fingerprint, sample_rate)
+    col1, col2, col3, col4, col5 = st.columns(5)
+    
+    with col1:
+        st.metric("Total de Sessões", f"{metrics['total_sessions']:,}")
+    
+    with col2:
+        if metrics['unique_contacts'] is not None:
+            st.metric("Contatos Únicos", format_estimate(metrics['unique_contacts'], metrics.get('unique_contacts_margin'), ","))
+        else:
+            st.metric("Contatos Únicos", "N/A")
+    
+    with col3:
+        st.metric("Duração Média", format_seconds(metrics['avg_duration']))
+    
+    with col4:
+        # Tempo de espera usando __sessionQueueDuration
+        avg_queue_duration = metrics['avg_queue_duration']
+        if avg_queue_duration is not None and pd.notna(avg_queue_duration) and avg_queue_duration > 0:
+            st.metric("Tempo de Espera Médio", format_seconds(avg_queue_duration))
+        else:
+            st.metric("Tempo de Espera Médio", "N/A")
+    
+    with col5:
+        # Indicador de Inatividade
+        if metrics['inactivity_count'] is not None:
+            st.metric(
+                "Inatividade", 
+                f"{metrics['inactivity_count']:,}", 
+                delta=f"{metrics['inactivity_percentage']:.1f}%"
+            )
+        else:
+            st.metric("Inatividade", "N/A")
+
+@fragment
+def daily_hourly_section(aggregates_filtered, fingerprint):
+    """Gráficos de sessões por dia e por hora"""
+    daily_sessions, hourly_sessions = daily_hourly_aggregate(aggregates_filtered, fingerprint)
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        if daily_sessions is not None:
+            fig_daily_sindi = cached_chart(
+                'bar',
+                daily_sessions, 
+                x='date', 
+                y='count',
+                title="Sessões por Dia",
+                labels={'count': 'Número de Sessões', 'date': 'Data'},
+                layout={'height': 400}
+            )
+            st.plotly_chart(fig_daily_sindi, use_container_width=True)
+        else:
+            st.info("Dados de data não disponíveis")
+    
+    with col2:
+        if hourly_sessions is not None:
+            fig_hourly_sindi = cached_chart(
+                'bar',
+                hourly_sessions,
+                x='hour',
+                y='count',
+                title="Sessões por Hora do Dia",
+                labels={'count': 'Número de Sessões', 'hour': 'Hora'},
+                layout={'height': 400}
+            )
+            st.plotly_chart(fig_hourly_sindi, use_container_width=True)
+        else:
+            st.info("Dados de hora não disponíveis")
+
+@fragment
+def operators_section(aggregates_filtered, fingerprint):
+    """Distribuição e detalhes dos síndicos"""
+    st.subheader("👥 Síndicos Sindicompany")
+    operator_sessions = operator_aggregate(aggregates_filtered, fingerprint)
+    
+    # Gráfico de pizza dos síndicos
+    if len(operator_sessions) > 0:
+        fig_operators = cached_chart(
+            'pie',
+            values=operator_sessions['Total de Sessões'],
+            names=operator_sessions.index,
+            title="Distribuição de Sessões por Síndico",
+            layout={'height': 400}
+        )
+        st.plotly_chart(fig_operators, use_container_width=True)
+    
+    # Tabela de síndicos em linha separada
+    st.markdown("**Detalhes dos Síndicos:**")
+    
+    # Tabela paginada no servidor (busca e ordenação sobre os valores numéricos)
+    paginated_table(
+        operator_sessions,
+        key="operator_details",
+        default_sort='Total de Sessões',
+        default_descending=True,
+        formatters={
+            'Duração Média': format_duration_series,
+            'Tempo de Espera Médio': format_duration_series
+        },
+        column_config={
+            'Mensagens Média': st.column_config.NumberColumn(format="%.2f")
+        }
+    )
+
+@fragment
+def conversation_section(data_filtered):
+    """Drill-down do síndico para as sessões e a conversa de uma sessão"""
+    index = load_session_index(messages_version())
+    if index is None or 'sessionID' not in data_filtered.columns:
+        return
+
+    st.markdown("**💬 Conversas por Síndico:**")
+    operators = sorted(data_filtered['pluginConnectionLabel'].dropna().unique())
+    operator = st.selectbox("Síndico:", operators, key="conversation_operator")
+    session_ids = data_filtered.loc[data_filtered['pluginConnectionLabel'] == operator, 'sessionID'].dropna()
+
+    # Resumo por sessão via offsets do índice (sem filtrar as mensagens)
+    summary = index.summary(index.codes(session_ids.to_numpy()))
+    if summary.empty:
+        st.info("Nenhuma mensagem encontrada para as sessões deste síndico")
+        return
+    summary = summary.sort_values('first_message_at', ascending=False)
+
+    labels = (
+        summary['first_message_at'].dt.strftime('%d/%m/%Y %H:%M').fillna("sem data") + " · "
+        + summary['message_count'].astype(str) + " mensagens · " + summary.index.astype(str)
+    )
+    session_ids = dict(zip(labels, summary.index))
+    session_id = session_ids[st.selectbox(
+        f"Sessão ({len(summary):,} com mensagens):",
+        list(session_ids),
+        key=f"conversation_session_{operator}"
+    )]
+    session = summary.loc[session_id]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Mensagens", f"{session['message_count']:,}")
+    col2.metric("Recebidas / Enviadas", f"{session.get('inbound', 0):,} / {session.get('outbound', 0):,}")
+    col3.metric("Duração da conversa", format_seconds((session['last_message_at'] - session['first_message_at']).total_seconds()))
+
+    # A conversa é uma fatia contígua das mensagens ordenadas
+    conversation = index.conversation(session_id)
+    st.dataframe(
+        conversation[[col for col in CONVERSATION_COLUMNS if col != 'sessionID' and col in conversation.columns]].rename(columns={
+            'createdAt': 'Data', 'messageDirection': 'Direção', 'messageKey': 'Tipo', 'messageValue': 'Mensagem'
+        }),
+        hide_index=True,
+        use_container_width=True
+    )
+
+@fragment
+def message_search_section(data_filtered, start_date, end_date):
+    """Busca textual nas mensagens das sessões do recorte, com abertura da conversa"""
+    index = load_text_index(messages_version())
+    if index is None or 'sessionID' not in data_filtered.columns:
+        return
+
+    st.markdown("**🔎 Busca nas Mensagens:**")
+    query = st.text_input(
+        "Termos (todos devem aparecer; OU para alternativas, \"frase exata\", prefixo*):",
+        key="message_search",
+        placeholder='boleto OU "vazamento de gás"'
+    )
+    if not query.strip():
+        return
+
+    # Período e síndico do recorte: datas das mensagens e sessões filtradas
+    start = time.perf_counter()
+    matches = index.search_sessions(query, start_date, end_date, session_ids=data_filtered['sessionID'].dropna().unique())
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Sessões encontradas", f"{len(matches):,}")
+    col2.metric("Mensagens encontradas", f"{int(matches['matches'].sum()):,}")
+    col3.metric("Tempo da busca", f"{elapsed_ms:,.0f} ms")
+    if matches.empty:
+        st.info("Nenhuma mensagem encontrada para a busca no período selecionado")
+        return
+
+    operators = data_filtered.drop_duplicates('sessionID').set_index('sessionID')['pluginConnectionLabel']
+    results = matches.assign(pluginConnectionLabel=operators.reindex(matches.index).to_numpy())
+    paginated_table(
+        results[['pluginConnectionLabel', 'matches', 'first_match_at', 'last_match_at']].rename(columns={
+            'pluginConnectionLabel': 'Síndico', 'matches': 'Mensagens Encontradas',
+            'first_match_at': 'Primeira Ocorrência', 'last_match_at': 'Última Ocorrência'
+        }).rename_axis('Sessão'),
+        key="message_search_results",
+        default_sort='Última Ocorrência',
+        default_descending=True
+    )
+
+    # Conversa completa de uma sessão encontrada (índice CSR de sessões)
+    session_index = load_session_index(messages_version())
+    if session_index is None:
+        return
+    session_id = st.selectbox("Abrir conversa:", list(matches.index), key="message_search_session")
+    conversation = session_index.conversation(session_id)
+    st.dataframe(
+        conversation[[col for col in CONVERSATION_COLUMNS if col != 'sessionID' and col in conversation.columns]].rename(columns={
+            'createdAt': 'Data', 'messageDirection': 'Direção', 'messageKey': 'Tipo', 'messageValue': 'Mensagem'
+        }),
+        hide_index=True,
+        use_container_width=True
+    )
+
+@fragment
+def day_operator_section(aggregates_filtered, fingerprint, operator_labels):
+    """Sessões por dia do mês por síndico, com totais"""
+    st.subheader("📅 Sessões por Dia do Mês por Síndico")
+    pivot_table = day_operator_aggregate(aggregates_filtered, fingerprint, operator_labels)
+    
+    # Mostrar a tabela principal (janela de linhas e colunas enviada ao navegador)
+    paginated_table(
+        pivot_table,
+        key="day_operator",
+        page_size=31,
+        max_columns=12,
+        search_target='columns'
+    )
+    
+    # Mostrar totais em uma linha separada
+    st.subheader("📊 Total de Sessões por Síndico")
+    totals_df = pd.DataFrame([pivot_table.sum()], index=['Total'])
+    st.dataframe(
+        totals_df,
+        use_container_width=True
+    )
+    
+    # Informações adicionais
+    st.caption(f"📊 Tabela mostra o número de sessões por dia do mês para cada síndico.")
+
+@fragment
+def weekday_section(aggregates_filtered, fingerprint):
+    """Sessões por dia da semana"""
+    st.subheader("📅 Sessões por Dia da Semana")
+    weekday_sessions_sindi = weekday_aggregate(aggregates_filtered, fingerprint)
+    
+    fig_weekday_sindi = cached_chart(
+        'bar',
+        weekday_sessions_sindi,
+        x='weekday_pt',
+        y='count',
+        title="Distribuição de Sessões por Dia da Semana",
+        labels={'count': 'Número de Sessões', 'weekday_pt': 'Dia da Semana'},
+        layout={'height': 400}
+    )
+    st.plotly_chart(fig_weekday_sindi, use_container_width=True)
+
+# Semanas de retorno exibidas no mapa de retenção
+COHORT_MAX_WEEKS = 12
+
+@fragment
+def cohort_section(data_filtered, fingerprint, sample_rate=None):
+    """Retenção semanal dos contatos por semana da primeira sessão"""
+    cohorts = cohort_aggregate(data_filtered, fingerprint, sample_rate)
+    if cohorts is None:
+        return
+    
+    st.subheader("🔁 Retenção de Contatos por Coorte Semanal")
+    retention = cohorts['retention'].iloc[:, 1:COHORT_MAX_WEEKS + 1]
+    sizes = cohorts['cohort_sizes']
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Contatos nas Coortes", format_estimate(sizes.sum(), np.nan if sample_rate is not None else None, ","))
+    with col2:
+        st.metric("Contatos que Retornam", format_estimate(cohorts['returning_pct'], cohorts.get('returning_pct_margin'), suffix="%"))
+    with col3:
+        # Apenas coortes cuja semana seguinte já está nos dados
+        observed = cohorts['retention'][1].notna() if 1 in cohorts['retention'].columns else pd.Series(dtype=bool)
+        if observed.any():
+            week_one = cohorts['active_contacts'].loc[observed, 1].sum() / sizes[observed].sum() * 100
+            st.metric("Retorno na Semana Seguinte", format_estimate(week_one, np.nan if sample_rate is not None else None, suffix="%"))
+        else:
+            st.metric("Retorno na Semana Seguinte", "N/A")
+    
+    if retention.shape[1] > 0:
+        labels = [f"{week:%d/%m} ({size:,})" for week, size in zip(retention.index, sizes)]
+        traces = None
+        if 'retention_margin' in cohorts:
+            # Na amostra, cada célula mostra a estimativa e a margem do intervalo de 95%
+            margins = cohorts['retention_margin'].iloc[:, 1:COHORT_MAX_WEEKS + 1].to_numpy()
+            text = np.where(np.isnan(retention.to_numpy()), "", [
+                [f"{value:.0f}±{margin:.0f}" for value, margin in zip(row, margin_row)]
+                for row, margin_row in zip(retention.to_numpy(), margins)
+            ])
+            traces = {'text': text, 'texttemplate': "%{text}"}
+        fig_cohorts = cached_chart(
+            'imshow',
+            retention.set_axis(labels),
+            text_auto='.0f',
+            aspect='auto',
+            color_continuous_scale='Greens',
+            title="% dos Contatos da Coorte que Voltam N Semanas Depois",
+            labels={'x': 'Semanas desde a primeira sessão', 'y': 'Coorte (contatos)', 'color': '% retorno'},
+            traces=traces,
+            layout={'height': 400}
+        )
+        st.plotly_chart(fig_cohorts, use_container_width=True)
+    st.caption("📊 Coorte = semana (a partir de segunda) da primeira sessão do contato no período filtrado.")
+
+@fragment
+def reopen_section(data_filtered, fingerprint, sample_rate=None):
+    """Contatos que voltam com nova sessão logo após o fechamento da anterior"""
+    reopens = reopen_aggregate(data_filtered, fingerprint, sample_rate)
+    if reopens is None or reopens['summary']['closed_sessions'] == 0:
+        return
+    
+    st.subheader("🔄 Reabertura de Sessões")
+    summary, by_motive, by_group = reopens['summary'], reopens.get('by_motive'), reopens.get('by_group')
+    format_pct = lambda value, margin=None: format_estimate(value, margin, suffix="%")
+    counted = "≈" if sample_rate is not None else ""
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Reabertas em 24h", format_pct(summary['reopen_24h_pct'], summary.get('reopen_24h_margin')),
+                  help=f"{counted}{summary['reopened_24h']:,} de {counted}{summary['observed_24h']:,} sessões fechadas")
+    with col2:
+        st.metric("Reabertas em 72h", format_pct(summary['reopen_72h_pct'], summary.get('reopen_72h_margin')),
+                  help=f"{counted}{summary['reopened_72h']:,} de {counted}{summary['observed_72h']:,} sessões fechadas")
+    with col3:
+        inactivity = by_motive.loc['INACTIVITY'] if by_motive is not None and 'INACTIVITY' in by_motive.index else {}
+        st.metric("Após Inatividade (24h)", format_pct(inactivity.get('reopen_24h_pct'), inactivity.get('reopen_24h_margin')))
+    with col4:
+        median_hours = summary['median_hours_to_reopen']
+        st.metric("Tempo Mediano até Voltar", format_seconds(median_hours * 3600) if median_hours is not None else "N/A")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if by_motive is not None and not by_motive.empty:
+            motive_rates = by_motive[['reopen_24h_pct', 'reopen_72h_pct']].rename(
+                columns={'reopen_24h_pct': '24h', 'reopen_72h_pct': '72h'}
+            ).rename_axis('closeMotive').reset_index().melt(id_vars='closeMotive', var_name='Janela', value_name='pct')
+            if sample_rate is not None:
+                # Barras de erro com a margem de 95% de cada taxa estimada
+                motive_rates['margin'] = by_motive[['reopen_24h_margin', 'reopen_72h_margin']].to_numpy().T.ravel()
+            fig_motive = cached_chart(
+                'bar',
+                motive_rates,
+                x='closeMotive',
+                y='pct',
+                color='Janela',
+                barmode='group',
+                error_y='margin' if sample_rate is not None else None,
+                title="% de Reabertura por Motivo de Fechamento",
+                labels={'closeMotive': 'Motivo de fechamento', 'pct': '% reabertas', 'margin': '± 95%'},
+                layout={'height': 400}
+            )
+            st.plotly_chart(fig_motive, use_container_width=True)
+    with col2:
+        if by_group is not None and not by_group.empty:
+            columns = ['closed_sessions', 'reopened_24h', 'reopen_24h_pct', 'reopened_72h', 'reopen_72h_pct']
+            if sample_rate is not None:
+                columns = columns[:3] + ['reopen_24h_margin'] + columns[3:] + ['reopen_72h_margin']
+            paginated_table(
+                by_group[columns].rename(columns={
+                    'closed_sessions': 'Sessões Fechadas',
+                    'reopened_24h': 'Reabertas 24h',
+                    'reopen_24h_pct': '% 24h',
+                    'reopen_24h_margin': '± 24h',
+                    'reopened_72h': 'Reabertas 72h',
+                    'reopen_72h_pct': '% 72h',
+                    'reopen_72h_margin': '± 72h'
+                }).rename_axis('Síndico'),
+                key="reopen_by_operator",
+                page_size=10,
+                default_sort='% 24h',
+                default_descending=True,
+                column_config={
+                    '% 24h': st.column_config.NumberColumn(format="%.1f%%"),
+                    '± 24h': st.column_config.NumberColumn(format="%.1f"),
+                    '% 72h': st.column_config.NumberColumn(format="%.1f%%"),
+                    '± 72h': st.column_config.NumberColumn(format="%.1f")
+                }
+            )
+    st.caption(
+        "📊 Reabertura = o mesmo contato abre nova sessão até 24h/72h após o fechamento da anterior, no período e "
+        "síndico filtrados. Sessões fechadas a menos de 24h/72h do fim dos dados não entram na taxa."
+    )
+
+# Termos exibidos nos gráficos de termos mais citados e em alta
+TERM_TOP_N = 15
+
+@fragment
+def term_section(start_date, end_date):
+    """Termos e bigramas mais citados nas mensagens recebidas e os que mais cresceram"""
+    report = term_aggregate(start_date, end_date, messages_version())
+    if report is None:
+        return
+    
+    st.subheader("🔤 Termos Mais Citados pelos Clientes")
+    kinds = {"Palavras": 'unigrams', "Pares de palavras": 'bigrams'}
+    kind = kinds[st.radio("Mostrar:", list(kinds), horizontal=True, key="term_ngram")]
+    top, rising = report[f'top_{kind}'], report[f'rising_{kind}']
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Mensagens Recebidas", f"{report['messages']:,}")
+    with col2:
+        st.metric("Mais Citado", top['term'].iloc[0] if not top.empty else "N/A")
+    with col3:
+        st.metric("Maior Alta", f"{rising['term'].iloc[0]} ({rising['growth'].iloc[0]:.1f}x)" if not rising.empty else "N/A")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if not top.empty:
+            fig_top = cached_chart(
+                'bar',
+                top.iloc[::-1],
+                x='count',
+                y='term',
+                orientation='h',
+                title="Mais Citados no Período",
+                labels={'count': 'Ocorrências', 'term': ''},
+                hover_data={'per_thousand': ':.1f'},
+                layout={'height': 450}
+            )
+            st.plotly_chart(fig_top, use_container_width=True)
+    with col2:
+        if not rising.empty:
+            fig_rising = cached_chart(
+                'bar',
+                rising.iloc[::-1],
+                x='growth',
+                y='term',
+                orientation='h',
+                title="Em Alta (vs. período anterior de mesmo tamanho)",
+                labels={'growth': 'Crescimento da frequência (x)', 'term': ''},
+                hover_data={'count': True, 'previous_count': True},
+                layout={'height': 450}
+            )
+            st.plotly_chart(fig_rising, use_container_width=True)
+        else:
+            st.info("Sem termos em alta em relação ao período anterior de mesmo tamanho")
+    st.caption(
+        f"📊 Mensagens recebidas de {report['start']:%d/%m/%Y} a {report['end']:%d/%m/%Y}, de todos os síndicos "
+        "(contagens diárias sem acentos e sem palavras comuns como \"de\" e \"para\")."
+    )
+
+@fragment
+def reply_latency_section(data_filtered, fingerprint):
+    """Tempo de resposta real calculado a partir das mensagens"""
+    latency_summary, latency_by_operator = reply_latency_aggregate(data_filtered, fingerprint)
+    if latency_summary is None:
+        return
+    
+    st.subheader("⏱️ Tempo de Resposta (Mensagens)")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Primeira Resposta (mediana)", format_seconds(latency_summary['median_first_response_seconds']))
+    with col2:
+        st.metric("Intervalo Médio entre Respostas", format_seconds(latency_summary['mean_reply_gap_seconds']))
+    with col3:
+        st.metric("Maior Intervalo", format_seconds(latency_summary['max_reply_gap_seconds']))
+    with col4:
+        st.metric(
+            "Mensagens sem Resposta",
+            f"{latency_summary['unanswered_messages']:,}",
+            delta=f"{latency_summary['sessions_with_unanswered_pct']:.1f}% das sessões"
+        )
+    
+    # Primeira resposta mediana por síndico
+    if latency_by_operator is not None and not latency_by_operator.empty:
+        fig_latency = cached_chart(
+            'bar',
+            x=latency_by_operator.index,
+            y=latency_by_operator.values / 60,
+            title="Primeira Resposta Mediana por Síndico (minutos)",
+            labels={'x': 'Síndico', 'y': 'Minutos'},
+            layout={'height': 400}
+        )
+        st.plotly_chart(fig_latency, use_container_width=True)
+
+# Resolução do gráfico de simultaneidade -> período do resample
+CONCURRENCY_RESOLUTIONS = {"15 minutos": '15min', "Hora": '1h', "Dia": '1D'}
+
+@fragment
+def concurrency_section(data_filtered, fingerprint):
+    """Sessões em atendimento simultâneo e fila de espera, por minuto e por síndico"""
+    concurrency = concurrency_aggregate(data_filtered, fingerprint)
+    if concurrency is None:
+        return
+    
+    st.subheader("🔀 Sessões Simultâneas e Fila de Espera")
+    peaks = concurrency['peaks']
+    total = concurrency['total']
+    active = total['concurrent'][total['concurrent'] > 0]
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric(
+            "Pico de Sessões Simultâneas",
+            f"{peaks['peak_concurrent']:,}",
+            delta=f"em {peaks['peak_concurrent_at']:%d/%m %H:%M}" if pd.notna(peaks['peak_concurrent_at']) else None,
+            delta_color="off"
+        )
+    with col2:
+        st.metric("Simultâneas (média)", f"{active.mean():.2f}" if not active.empty else "N/A")
+    with col3:
+        st.metric(
+            "Pico da Fila",
+            f"{peaks['peak_backlog']:,}",
+            delta=f"em {peaks['peak_backlog_at']:%d/%m %H:%M}" if pd.notna(peaks['peak_backlog_at']) else None,
+            delta_color="off"
+        )
+    with col4:
+        with_backlog = int((total['backlog'] > 0).sum())
+        st.metric(
+            "Minutos com Fila",
+            f"{with_backlog:,}",
+            delta=f"{with_backlog / len(total) * 100:.1f}% do período" if len(total) else None,
+            delta_color="off"
+        )
+    
+    # Pico de cada período a partir das séries por minuto
+    resolution = st.radio(
+        "Resolução:", list(CONCURRENCY_RESOLUTIONS), index=1, horizontal=True, key="concurrency_resolution"
+    )
+    timeline = concurrency_timeline(concurrency, CONCURRENCY_RESOLUTIONS[resolution])
+    fig_concurrency = cached_chart(
+        'line',
+        timeline.rename(columns={'concurrent': 'Em atendimento', 'backlog': 'Na fila'}),
+        title=f"Pico de Sessões Simultâneas e na Fila (por {resolution.lower()})",
+        labels={'minute': 'Data', 'value': 'Sessões', 'variable': 'Situação'},
+        layout={'height': 400}
+    )
+    st.plotly_chart(fig_concurrency, use_container_width=True)
+    
+    # Picos e médias por síndico
+    summary = concurrency['summary']
+    st.dataframe(
+        pd.DataFrame({
+            'Pico Simultâneas': summary['peak_concurrent'],
+            'Quando': summary['peak_concurrent_at'],
+            'Média Simultâneas': summary['mean_concurrent'],
+            'Pico da Fila': summary['peak_backlog'],
+            'Quando (fila)': summary['peak_backlog_at'],
+            'Minutos com Fila': summary['minutes_with_backlog']
+        }).rename_axis('Síndico'),
+        column_config={
+            'Quando': st.column_config.DatetimeColumn(format="DD/MM/YYYY HH:mm"),
+            'Quando (fila)': st.column_config.DatetimeColumn(format="DD/MM/YYYY HH:mm")
+        },
+        use_container_width=True
+    )
+    st.caption(
+        "📊 Atendimento: de manualAt até closedAt. Fila: de queuedAt (ou createdAt) até manualAt "
+        "(ou closedAt, se a sessão nunca foi assumida). Médias consideram apenas minutos com atendimento."
+    )
+
+# Tempo de atendimento da meta de nível de serviço (rótulo -> segundos)
+STAFFING_TARGET_SECONDS = {
+    "20 s": 20, "30 s": 30, "1 min": 60, "2 min": 120, "5 min": 300, "10 min": 600, "30 min": 1800
+}
+
+@fragment
+def staffing_section(data_filtered, fingerprint):
+    """Atendentes necessários por dia da semana e hora para a meta de nível de serviço"""
+    profile, profile_by_operator = staffing_profile_aggregate(data_filtered, fingerprint)
+    if profile is None or profile['sessions'].sum() == 0:
+        return
+    
+    st.subheader("🧮 Dimensionamento de Atendentes (Erlang C)")
+    col1, col2 = st.columns(2)
+    with col1:
+        target_level = st.slider(
+            "Meta de nível de serviço (%):", min_value=50, max_value=99,
+            value=int(DEFAULT_TARGET_LEVEL * 100), step=1, key="staffing_level"
+        ) / 100
+    with col2:
+        target_label = st.select_slider(
+            "Atendidas em até:", options=list(STAFFING_TARGET_SECONDS), value="1 min", key="staffing_seconds"
+        )
+    target_seconds = STAFFING_TARGET_SECONDS[target_label]
+    
+    # Só o plano é recalculado quando a meta muda (168 faixas x candidatos, vetorizado)
+    plan = staffing_plan(profile, target_level, target_seconds)
+    arrivals = plan['arrival_rate'].to_numpy()
+    traffic = plan['traffic'].to_numpy()
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Pico de Atendentes", f"{plan['agents'].max():,}")
+    with col2:
+        st.metric("Atendentes-hora por Semana", f"{plan['agents'].sum():,}")
+    with col3:
+        st.metric("Nível de Serviço Previsto", f"{np.average(plan['service_level'], weights=arrivals) * 100:.1f}%")
+    with col4:
+        staffed = plan['agents'] > 0
+        occupancy = traffic[staffed].sum() / plan.loc[staffed, 'agents'].sum() if staffed.any() else 0
+        st.metric("Ocupação Média", f"{occupancy * 100:.1f}%")
+    
+    agents = plan.pivot(index='weekday', columns='hour', values='agents')
+    agents.index = [WEEKDAY_NAMES[day] for day in agents.index]
+    fig_staffing = cached_chart(
+        'imshow',
+        agents,
+        text_auto=True,
+        aspect='auto',
+        color_continuous_scale='Blues',
+        title=f"Atendentes Necessários: {target_level * 100:.0f}% em até {target_label}",
+        labels={'x': 'Hora', 'y': 'Dia da Semana', 'color': 'Atendentes'},
+        layout={'height': 400}
+    )
+    st.plotly_chart(fig_staffing, use_container_width=True)
+    
+    # Por síndico: cada síndico atendido por uma equipe própria
+    if profile_by_operator is not None:
+        plan_by_operator = staffing_plan(profile_by_operator, target_level, target_seconds)
+        by_operator = plan_by_operator.groupby('pluginConnectionLabel').agg(
+            peak=('agents', 'max'), hours=('agents', 'sum'), traffic=('traffic', 'sum')
+        ).sort_values('hours', ascending=False)
+        st.dataframe(
+            pd.DataFrame({
+                'Pico de Atendentes': by_operator['peak'],
+                'Atendentes-hora por Semana': by_operator['hours'],
+                'Carga (Erlang-hora por Semana)': by_operator['traffic'].round(1)
+            }).rename_axis('Síndico'),
+            use_container_width=True
+        )
+    st.caption(
+        "📊 Chegadas: sessões com tempo de atendimento manual, por dia da semana e hora, divididas pelo número "
+        "de dias daquele dia da semana no período. Equipes separadas por síndico somam mais atendentes que a equipe única."
+    )
+
 def main():
     st.title("📊 Dashboard CX - Talqui")
     
     # Carregar dados
+    telemetry = get_telemetry()
     with st.spinner("Carregando dados..."):
-        data = load_data()
+        version = data_version()
+        st.session_state['data_version'] = version
+        rss_before = process_rss()
+        data = telemetry.track('load_data', load_data(dashboard_columns(), version), rss_before=rss_before)
+        rss_before = process_rss()
+        aggregates = telemetry.track('load_aggregates', load_aggregates(dashboard_columns(), version), rss_before=rss_before)
+    evicted = telemetry.enforce()
+    
+    # Troca para a nova versão assim que o daemon de ingestão publicar uma
+    watch_data_version()
     
     if data.empty:
         st.error("Não foi possível carregar os dados. Verifique se o arquivo CSV está no diretório 'data/'")
@@ -74,6 +1017,8 @@ def main():
     
     # Sidebar com filtros de data
     st.sidebar.header("📅 Filtros")
+    start_date = end_date = None
+    selected_operator = "Todos"
     
     # Filtro de data baseado nos dados
     if not data.empty and 'createdAt' in data.columns:
@@ -195,209 +1140,75 @@ def main():
                 ]
                 st.sidebar.info(f"👤 **Operador ativo:** {selected_operator}")
     
+    # Modo amostra: seções por sessão calculadas sobre a amostra estratificada, com intervalos de 95%
+    st.sidebar.header("🎲 Amostra")
+    use_sample = st.sidebar.toggle(
+        "Usar amostra estratificada",
+        value=len(data) >= SAMPLE_MODE_MIN_SESSIONS,
+        key="sample_mode",
+        help="Contatos, coortes e reaberturas estimados sobre uma amostra dos contatos por dia e síndico. "
+             "Desligue para calcular exatamente sobre todas as sessões."
+    )
+    sample_rate = None
+    rows_filtered = data_filtered
+    if use_sample and 'date' in data.columns:
+        sample = telemetry.track('load_sample', load_sample(dashboard_columns(), version))
+        sample_rate = SessionSample().rate
+        rows_filtered = filter_sessions(sample, start_date, end_date, selected_operator)
+        st.sidebar.caption(
+            f"Amostra de {sample_rate:.0%} dos contatos ({len(sample):,} sessões). Valores com ± são estimativas "
+            "com intervalo de 95%; os demais cartões e gráficos continuam exatos."
+        )
+    
     # Análise Sindicompany como conteúdo principal
     st.header("🏢 Análise Sindicompany")
     
     if not data_filtered.empty:
-        # Métricas principais Sindicompany
-        col1, col2, col3, col4, col5 = st.columns(5)
+        # Cada seção recebe explicitamente os dados filtrados e a impressão digital dos filtros
+        fingerprint = filter_fingerprint(start_date, end_date, selected_operator)
+        # Seções por sessão (amostra ou todas as sessões) têm cache próprio para cada modo
+        rows_fingerprint = filter_fingerprint(start_date, end_date, selected_operator, sample_rate)
+        aggregates_filtered = filter_aggregates(aggregates, start_date, end_date, selected_operator)
         
-        with col1:
-            total_sessions_sindi = len(data_filtered)
-            st.metric("Total de Sessões", f"{total_sessions_sindi:,}")
+        metrics_section(rows_filtered, aggregates_filtered, rows_fingerprint, sample_rate)
+        daily_hourly_section(aggregates_filtered, fingerprint)
         
-        with col2:
-            if 'contactID' in data_filtered.columns:
-                unique_contacts_sindi = data_filtered['contactID'].nunique()
-                st.metric("Contatos Únicos", f"{unique_contacts_sindi:,}")
-            else:
-                st.metric("Contatos Únicos", "N/A")
-        
-        with col3:
-            if '__sessionDuration' in data_filtered.columns:
-                avg_duration_seconds = data_filtered['__sessionDuration'].mean()
-                hours = int(avg_duration_seconds // 3600)
-                minutes = int((avg_duration_seconds % 3600) // 60)
-                seconds = int(avg_duration_seconds % 60)
-                st.metric("Duração Média", f"{hours:02d}:{minutes:02d}:{seconds:02d}")
-            else:
-                st.metric("Duração Média", "N/A")
-        
-        with col4:
-            # Calcular tempo de espera usando __sessionQueueDuration
-            if '__sessionQueueDuration' in data_filtered.columns:
-                avg_queue_duration = data_filtered['__sessionQueueDuration'].mean()
-                if pd.notna(avg_queue_duration) and avg_queue_duration > 0:
-                    hours = int(avg_queue_duration // 3600)
-                    minutes = int((avg_queue_duration % 3600) // 60)
-                    seconds = int(avg_queue_duration % 60)
-                    st.metric("Tempo de Espera Médio", f"{hours:02d}:{minutes:02d}:{seconds:02d}")
-                else:
-                    st.metric("Tempo de Espera Médio", "N/A")
-            else:
-                st.metric("Tempo de Espera Médio", "N/A")
+        if 'pluginConnectionLabel' in data_filtered.columns:
+            operators_section(aggregates_filtered, fingerprint)
+            conversation_section(data_filtered)
+            message_search_section(data_filtered, start_date, end_date)
         
-        with col5:
-            # Calcular indicador de Inatividade
-            if 'closeMotive' in data_filtered.columns:
-                inactivity_count = len(data_filtered[data_filtered['closeMotive'] == 'INACTIVITY'])
-                total_sessions = len(data_filtered)
-                inactivity_percentage = (inactivity_count / total_sessions * 100) if total_sessions > 0 else 0
-                st.metric(
-                    "Inatividade", 
-                    f"{inactivity_count:,}", 
-                    delta=f"{inactivity_percentage:.1f}%"
-                )
-            else:
-                st.metric("Inatividade", "N/A")
+        if 'createdAt' in data_filtered.columns and 'pluginConnectionLabel' in data_filtered.columns:
+            # Colunas fixas (todos os síndicos), alinhadas aos códigos de pluginConnectionLabel
+            operator_labels = tuple(sorted(data['pluginConnectionLabel'].dropna().unique()))
+            day_operator_section(aggregates_filtered, fingerprint, operator_labels)
         
-        # Gráficos Sindicompany
-        col1, col2 = st.columns(2)
+        if 'createdAt' in data_filtered.columns:
+            weekday_section(aggregates_filtered, fingerprint)
         
-        with col1:
-            # Sessões por dia
-            if 'date' in data_filtered.columns:
-                daily_sessions_sindi = data_filtered.groupby('date').size().reset_index(name='count')
-                fig_daily_sindi = px.bar(
-                    daily_sessions_sindi, 
-                    x='date', 
-                    y='count',
-                    title="Sessões por Dia",
-                    labels={'count': 'Número de Sessões', 'date': 'Data'}
-                )
-                fig_daily_sindi.update_layout(height=400)
-                st.plotly_chart(fig_daily_sindi, use_container_width=True)
-            else:
-                st.info("Dados de data não disponíveis")
+        if 'contactID' in data_filtered.columns and 'createdAt' in data_filtered.columns:
+            cohort_section(rows_filtered, rows_fingerprint, sample_rate)
         
-        with col2:
-            # Sessões por hora do dia
-            if 'hour' in data_filtered.columns:
-                hourly_sessions_sindi = data_filtered.groupby('hour').size().reset_index(name='count')
-                fig_hourly_sindi = px.bar(
-                    hourly_sessions_sindi,
-                    x='hour',
-                    y='count',
-                    title="Sessões por Hora do Dia",
-                    labels={'count': 'Número de Sessões', 'hour': 'Hora'}
-                )
-                fig_hourly_sindi.update_layout(height=400)
-                st.plotly_chart(fig_hourly_sindi, use_container_width=True)
-            else:
-                st.info("Dados de hora não disponíveis")
+        if 'contactID' in data_filtered.columns and 'closedAt' in data_filtered.columns:
+            reopen_section(rows_filtered, rows_fingerprint, sample_rate)
         
-        # Análise de síndicos
-        if 'pluginConnectionLabel' in data_filtered.columns:
-            st.subheader("👥 Síndicos Sindicompany")
-            
-            # Contar sessões por síndico incluindo tempo de espera
-            operator_sessions = data_filtered.groupby('pluginConnectionLabel').agg({
-                'sessionID': 'count',
-                '__sessionDuration': 'mean',
-                '__sessionQueueDuration': 'mean',
-                '__sessionMessagesCount': 'mean'
-            }).round(2)
-            
-            # Formatação da duração média em HH:MM:SS
-            def format_duration(seconds):
-                if pd.isna(seconds) or seconds <= 0:
-                    return "N/A"
-                hours = int(seconds // 3600)
-                minutes = int((seconds % 3600) // 60)
-                secs = int(seconds % 60)
-                return f"{hours:02d}:{minutes:02d}:{secs:02d}"
-            
-            operator_sessions['Duração Média'] = operator_sessions['__sessionDuration'].apply(format_duration)
-            operator_sessions['Tempo de Espera Médio'] = operator_sessions['__sessionQueueDuration'].apply(format_duration)
-            operator_sessions = operator_sessions[['sessionID', 'Duração Média', 'Tempo de Espera Médio', '__sessionMessagesCount']]
-            operator_sessions.columns = ['Total de Sessões', 'Duração Média', 'Tempo de Espera Médio', 'Mensagens Média']
-            operator_sessions = operator_sessions.sort_values('Total de Sessões', ascending=False)
-            
-            # Gráfico de pizza dos síndicos
-            if len(operator_sessions) > 0:
-                fig_operators = px.pie(
-                    values=operator_sessions['Total de Sessões'],
-                    names=operator_sessions.index,
-                    title="Distribuição de Sessões por Síndico"
-                )
-                fig_operators.update_layout(height=400)
-                st.plotly_chart(fig_operators, use_container_width=True)
-            
-            # Tabela de síndicos em linha separada
-            st.markdown("**Detalhes dos Síndicos:**")
-            
-            # Configurar formatação da tabela com alinhamento à direita para colunas numéricas
-            styled_table = operator_sessions.style.set_properties(**{
-                'text-align': 'right'
-            }, subset=['Duração Média', 'Tempo de Espera Médio']).set_properties(**{
-                'text-align': 'center'
-            }, subset=['Total de Sessões', 'Mensagens Média']).format({
-                'Mensagens Média': '{:.2f}'
-            })
-            
-            st.dataframe(
-                styled_table,
-                use_container_width=True
-            )
+        term_section(start_date, end_date)
+        reply_latency_section(data_filtered, fingerprint)
         
-        # Nova tabela: Sessões por dia do mês por síndico
-        if 'date' in data_filtered.columns and 'pluginConnectionLabel' in data_filtered.columns:
-            st.subheader("📅 Sessões por Dia do Mês por Síndico")
-            
-            # Criar cópia dos dados para evitar warnings
-            temp_data = data_filtered.copy()
-            temp_data['day'] = temp_data['date'].apply(lambda x: x.day)
-            
-            daily_operator_sessions = temp_data.groupby(['day', 'pluginConnectionLabel']).size().reset_index(name='sessions')
-            
-            # Criar pivot table
-            pivot_table = daily_operator_sessions.pivot(index='day', columns='pluginConnectionLabel', values='sessions').fillna(0).astype(int)
-            
-            # Criar tabela de totais separadamente
-            totals = pivot_table.sum()
-            
-            # Mostrar a tabela principal
-            st.dataframe(
-                pivot_table,
-                use_container_width=True
-            )
-            
-            # Mostrar totais em uma linha separada
-            st.subheader("📊 Total de Sessões por Síndico")
-            totals_df = pd.DataFrame([totals], index=['Total'])
-            st.dataframe(
-                totals_df,
-                use_container_width=True
-            )
-            
-            # Informações adicionais
-            st.caption(f"📊 Tabela mostra o número de sessões por dia do mês para cada síndico.")
+        if 'manualAt' in data_filtered.columns and 'pluginConnectionLabel' in data_filtered.columns:
+            concurrency_section(data_filtered, fingerprint)
         
-        # Análise por dia da semana
-        if 'weekday' in data_filtered.columns:
-            st.subheader("📅 Sessões por Dia da Semana")
-            
-            weekday_sessions_sindi = data_filtered.groupby('weekday').size().reindex([
-                'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'
-            ]).reset_index(name='count')
-            weekday_sessions_sindi['weekday_pt'] = weekday_sessions_sindi['weekday'].map({
-                'Monday': 'Segunda', 'Tuesday': 'Terça', 'Wednesday': 'Quarta',
-                'Thursday': 'Quinta', 'Friday': 'Sexta', 'Saturday': 'Sábado', 'Sunday': 'Domingo'
-            })
-            
-            fig_weekday_sindi = px.bar(
-                weekday_sessions_sindi,
-                x='weekday_pt',
-                y='count',
-                title="Distribuição de Sessões por Dia da Semana",
-                labels={'count': 'Número de Sessões', 'weekday_pt': 'Dia da Semana'}
-            )
-            fig_weekday_sindi.update_layout(height=400)
-            st.plotly_chart(fig_weekday_sindi, use_container_width=True)
+        if '__sessionManualDuration' in data_filtered.columns:
+            staffing_section(data_filtered, fingerprint)
     
     else:
         st.info("📋 Dados Sindicompany não disponíveis")
-    
+
+    # Orçamento verificado de novo após os agregados e as figuras das seções
+    telemetry.track('figure_cache', FIGURE_CACHE)
+    evicted += telemetry.enforce()
+    memory_sidebar(telemetry, evicted)
+
     # Footer
     st.markdown("---")
     st.markdown("📊 Dashboard CX - Talqui | Dados atualizados em tempo real")
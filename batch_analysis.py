@@ -4,38 +4,75 @@ Análise em batch dos dados de CX - gera relatórios estáticos
 """
 
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from data_processor import DataProcessor
-from analytics import CXAnalytics
+import numpy as np
+from data_processor import DataProcessor, DATA_FILES
+from analytics import CXAnalytics, required_columns, build_insights
+from sentiment_cache import SentimentCache
+from kernels import hour_histogram
+from pipeline import Pipeline
+from memory_telemetry import MemoryTelemetry
+import argparse
 import os
+from functools import partial
 from datetime import datetime
 
-def create_static_reports():
-    """Cria relatórios estáticos em HTML e imagens"""
-    
-    print("📊 Iniciando análise em batch...")
-    
-    # Carregar dados
-    processor = DataProcessor()
-    processor.load_all_data()
-    
-    if processor.messages is None or processor.messages.empty:
-        print("❌ Não foi possível carregar os dados")
-        return
-    
-    # Criar diretório de relatórios
-    reports_dir = "reports"
-    if not os.path.exists(reports_dir):
-        os.makedirs(reports_dir)
-    
-    # Criar analytics
-    analytics = CXAnalytics(processor.messages, processor.sessions)
-    
-    # Gerar insights
-    insights = analytics.generate_insights_report()
+# Seções do relatório: análises executadas e colunas lidas diretamente
+REPORT_SECTIONS = {
+    'summary': {
+        'analyses': [],
+        'columns': {
+            'messages': ['createdAt', 'messageDirection', 'contactID', 'sessionID'],
+            'sessions': ['__sessionDuration', '__sessionQueueDuration', 'sessionRatingStars', 'operatorFirstname']
+        }
+    },
+    'insights': {
+        'analyses': ['generate_insights_report'],
+        'columns': {}
+    },
+    'operators': {
+        'analyses': ['operator_performance_analysis'],
+        'columns': {}
+    },
+    'sentiment': {
+        'analyses': ['message_sentiment_analysis'],
+        'columns': {}
+    },
+    'terms': {
+        'analyses': ['term_frequency_analysis'],
+        'columns': {}
+    },
+    'charts': {
+        'analyses': ['operator_performance_analysis', 'peak_hours_analysis'],
+        'columns': {
+            'messages': ['date', 'createdAt'],
+            'sessions': ['__sessionQueueDuration']
+        }
+    }
+}
+
+def report_columns(sections):
+    """União das colunas necessárias para as seções do relatório"""
+    analyses = [analysis for section in sections for analysis in REPORT_SECTIONS[section]['analyses']]
+    columns = required_columns(analyses) if analyses else {}
+    for section in sections:
+        for table, table_columns in REPORT_SECTIONS[section]['columns'].items():
+            columns.setdefault(table, set()).update(table_columns)
+    return columns
+
+def report_analyses(sections):
+    """Análises executadas para as seções (análises compostas são expandidas)"""
+    analyses = []
+    for section in sections:
+        for analysis in REPORT_SECTIONS[section]['analyses']:
+            expanded = CXAnalytics.ANALYSIS_DEPENDENCIES.get(analysis, [analysis])
+            analyses.extend(a for a in expanded if a not in analyses)
+    return analyses
+
+def build_html_report(stats=None, insights=None, operator_perf=None, sentiment=None, terms=None):
+    """Monta o relatório HTML a partir dos resultados das seções"""
+    stats = stats or {}
+    insights = insights or []
     
-    # Criar relatório HTML
     html_report = f"""
     <!DOCTYPE html>
     <html>
@@ -60,9 +97,8 @@ def create_static_reports():
     """
     
     # Estatísticas gerais
-    stats = processor.get_summary_stats()
-    
-    html_report += "<h2>📈 Estatísticas Gerais</h2>"
+    if stats:
+        html_report += "<h2>📈 Estatísticas Gerais</h2>"
     
     if 'messages' in stats:
         msg_stats = stats['messages']
@@ -96,18 +132,17 @@ def create_static_reports():
         """
     
     # Insights principais
-    html_report += "<h2>🎯 Insights Principais</h2>"
+    if insights:
+        html_report += "<h2>🎯 Insights Principais</h2>"
     for insight in insights:
         html_report += f'<div class="insight">{insight}</div>'
     
     # Performance dos operadores
-    operator_perf = analytics.operator_performance_analysis()
     if operator_perf is not None:
         html_report += "<h2>👥 Performance dos Operadores</h2>"
         html_report += operator_perf.to_html(classes="table")
     
     # Análise de sentimento
-    sentiment = analytics.message_sentiment_analysis()
     if sentiment is not None:
         html_report += "<h2>😊 Análise de Sentimento</h2>"
         html_report += f"""
@@ -127,6 +162,17 @@ def create_static_reports():
                 html_report += f"<li>{msg[:100]}...</li>"
             html_report += "</ul>"
     
+    # Termos mais citados
+    if terms is not None:
+        html_report += "<h2>🔤 Termos Mais Citados pelos Clientes</h2>"
+        for key, title in (('top_unigrams', 'Palavras'), ('top_bigrams', 'Pares de Palavras')):
+            html_report += f"<h3>{title}</h3>"
+            html_report += terms[key].to_html(classes="table", index=False)
+        for key, title in (('rising_unigrams', 'Palavras em Alta'), ('rising_bigrams', 'Pares em Alta')):
+            if not terms[key].empty:
+                html_report += f"<h3>{title} (últimos {terms['window_days']} dias)</h3>"
+                html_report += terms[key].to_html(classes="table", index=False)
+    
     # Fechar HTML
     html_report += """
         <div style="margin-top: 50px; text-align: center; color: #666;">
@@ -136,119 +182,293 @@ def create_static_reports():
     </html>
     """
     
-    # Salvar relatório HTML
-    html_file = os.path.join(reports_dir, f"relatorio_cx_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html")
+    return html_report
+
+def write_html_report(html_file, **results):
+    """Grava o relatório HTML e retorna o caminho do arquivo"""
     with open(html_file, 'w', encoding='utf-8') as f:
-        f.write(html_report)
-    
+        f.write(build_html_report(**results))
     print(f"📄 Relatório HTML salvo: {html_file}")
+    return html_file
+
+def create_analytics(processor, sentiment_cache):
+    """CXAnalytics sobre as tabelas já carregadas do processor"""
+    if processor.messages.empty and processor.sessions.empty:
+        raise ValueError("Não foi possível carregar os dados")
+    
+    # Sentimento já calculado em execuções anteriores é reaproveitado
+    return CXAnalytics(
+        processor.messages, processor.sessions, ids=processor.ids,
+        text_store=processor.text_store, sentiment_cache=sentiment_cache
+    )
+
+def build_report_pipeline(processor, sections, reports_dir, html_file, max_workers=None):
+    """Monta o DAG de tarefas do relatório
+
+    Cada tabela, análise e gráfico é uma tarefa com entradas declaradas; as
+    independentes (cargas de mensagens e sessões, análises, gráficos) rodam em
+    paralelo. Gráficos mais novos que os CSVs e que este módulo são pulados.
+    """
+    pipeline = Pipeline(max_workers=max_workers)
+    columns = report_columns(sections)
+    
+    # Carga das tabelas (tabelas não usadas ficam vazias)
+    loads = []
+    for table in ('messages', 'sessions'):
+        if columns.get(table):
+            loads.append(pipeline.add(
+                f"load_{table}",
+                lambda table=table: processor.load_table(table, columns=columns[table])
+            ))
+        else:
+            setattr(processor, table, pd.DataFrame())
+    
+    sentiment_cache = SentimentCache(os.path.join("processed_data", "sentiment_cache"))
+    pipeline.add('analytics', lambda *tables: create_analytics(processor, sentiment_cache), inputs=loads)
+    
+    # Uma tarefa por análise, todas dependentes apenas do CXAnalytics
+    for analysis in report_analyses(sections):
+        pipeline.add(analysis, lambda analytics, analysis=analysis: getattr(analytics, analysis)(), inputs=['analytics'])
+    
+    # Seções do HTML
+    html_inputs = {}
+    if 'summary' in sections:
+        html_inputs['stats'] = pipeline.add('summary', lambda *tables: processor.get_summary_stats(), inputs=loads)
+    if 'insights' in sections:
+        insight_analyses = CXAnalytics.ANALYSIS_DEPENDENCIES['generate_insights_report']
+        html_inputs['insights'] = pipeline.add(
+            'insights', lambda *results: build_insights(dict(zip(insight_analyses, results))), inputs=insight_analyses
+        )
+    if 'operators' in sections:
+        html_inputs['operator_perf'] = 'operator_performance_analysis'
+    if 'sentiment' in sections:
+        html_inputs['sentiment'] = 'message_sentiment_analysis'
+    if 'terms' in sections:
+        html_inputs['terms'] = 'term_frequency_analysis'
+    
+    html_names = list(html_inputs)
+    pipeline.add(
+        'html_report',
+        lambda analytics, *results: write_html_report(html_file, **dict(zip(html_names, results))),
+        inputs=['analytics'] + list(html_inputs.values())
+    )
+    
+    # Gráficos estáticos: dados reduzidos nas threads, renderização em processos
+    if 'charts' in sections:
+        sources = [os.path.join(processor.data_dir, DATA_FILES[table]) for table in ('messages', 'sessions')]
+        sources.append(os.path.abspath(__file__))
+        for file_name, (chart_input, prepare, render) in STATIC_CHARTS.items():
+            chart = os.path.splitext(file_name)[0]
+            output_file = os.path.join(reports_dir, file_name)
+            pipeline.add(f"data_{chart}", prepare, inputs=[chart_input])
+            pipeline.add(
+                f"chart_{chart}", partial(render, output_file=output_file), inputs=[f"data_{chart}"],
+                sources=sources, outputs=[output_file], process=True
+            )
+    
+    return pipeline
+
+def create_static_reports(sections=None, max_workers=None, force=False):
+    """Cria relatórios estáticos em HTML e imagens
+
+    sections: seções de REPORT_SECTIONS a gerar (None gera todas). Apenas as
+    colunas usadas por essas seções são lidas dos CSVs. As etapas rodam como
+    um DAG de tarefas em paralelo (ver build_report_pipeline); force refaz
+    também os gráficos já atualizados.
+    """
+    sections = list(REPORT_SECTIONS.keys()) if sections is None else sections
+    
+    print("📊 Iniciando análise em batch...")
+    
+    # Criar diretório de relatórios
+    reports_dir = "reports"
+    if not os.path.exists(reports_dir):
+        os.makedirs(reports_dir)
+    
+    # Textos das mensagens ficam em disco, mapeados em memória
+    processor = DataProcessor(text_store_dir=os.path.join("processed_data", "message_text"))
+    html_file = os.path.join(reports_dir, f"relatorio_cx_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html")
+    
+    pipeline = build_report_pipeline(processor, sections, reports_dir, html_file, max_workers)
+    # Memória por tabela/resultado; acima de CX_MEMORY_BUDGET_MB, resultados consumidos são liberados
+    telemetry = MemoryTelemetry()
+    pipeline.run(force=force, telemetry=telemetry)
+    pipeline.print_summary()
+    telemetry.log("Memória do relatório")
     
-    # Criar gráficos estáticos
-    create_static_charts(processor, analytics, reports_dir)
+    if pipeline.errors:
+        print("❌ Análise em batch concluída com erros")
+        return
     
     print("✅ Análise em batch concluída!")
     print(f"📁 Arquivos salvos em: {reports_dir}/")
 
+def set_chart_style():
+    """Importa as bibliotecas de gráficos e aplica o estilo"""
+    # Bibliotecas de gráficos só são importadas quando a seção 'charts' é gerada
+    import matplotlib.style
+    
+    matplotlib.style.use('seaborn-v0_8')
+
+def _new_figure(figsize):
+    """Figura isolada (API orientada a objetos, sem estado global do pyplot)"""
+    set_chart_style()
+    from matplotlib.figure import Figure
+    return Figure(figsize=figsize)
+
+def _save_figure(fig, output_file):
+    fig.tight_layout()
+    fig.savefig(output_file, dpi=300, bbox_inches='tight')
+
+# Dados de cada gráfico (calculados nas threads, a partir dos DataFrames)
+
+def daily_volume_data(messages):
+    return None if messages.empty else messages.groupby('date').size()
+
+def hourly_volume_data(messages):
+    return None if messages.empty else hour_histogram(messages['createdAt'])
+
+def activity_heatmap_data(peak_data):
+    if not peak_data or 'heatmap_data' not in peak_data:
+        return None
+    heatmap_data = peak_data['heatmap_data']
+    pivot_data = heatmap_data.pivot(index='weekday_num', columns='hour', values='volume')
+    
+    # Mapear números para nomes dos dias
+    day_names = {0: 'Segunda', 1: 'Terça', 2: 'Quarta', 3: 'Quinta', 
+                4: 'Sexta', 5: 'Sábado', 6: 'Domingo'}
+    pivot_data.index = [day_names.get(i, i) for i in pivot_data.index]
+    return pivot_data
+
+def queue_time_data(sessions):
+    if sessions.empty or '__sessionQueueDuration' not in sessions.columns:
+        return None
+    return sessions['__sessionQueueDuration'].dropna() / 60  # minutos
+
+# Renderização de cada gráfico (processos; recebe apenas os dados já reduzidos)
+
+def daily_volume_chart(daily_volume, output_file):
+    """1. Volume de mensagens por dia"""
+    if daily_volume is None:
+        return
+    fig = _new_figure((12, 6))
+    ax = fig.subplots()
+    ax.plot(daily_volume.index, daily_volume.values, marker='o')
+    ax.set_title('Volume de Mensagens por Dia')
+    ax.set_xlabel('Data')
+    ax.set_ylabel('Número de Mensagens')
+    ax.tick_params(axis='x', labelrotation=45)
+    _save_figure(fig, output_file)
+
+def hourly_volume_chart(hourly_volume, output_file):
+    """2. Mensagens por hora"""
+    if hourly_volume is None:
+        return
+    fig = _new_figure((12, 6))
+    ax = fig.subplots()
+    ax.bar(np.arange(24), hourly_volume)
+    ax.set_title('Distribuição de Mensagens por Hora')
+    ax.set_xlabel('Hora do Dia')
+    ax.set_ylabel('Número de Mensagens')
+    _save_figure(fig, output_file)
+
+def operator_performance_chart(operator_perf, output_file):
+    """3. Performance dos operadores"""
+    if operator_perf is None:
+        return
+    fig = _new_figure((15, 10))
+    ((ax1, ax2), (ax3, ax4)) = fig.subplots(2, 2)
+    operators = operator_perf.index.astype(str)
+    
+    # Sessões por operador
+    ax1.bar(operators, operator_perf['total_sessions'])
+    ax1.set_title('Total de Sessões por Operador')
+    ax1.set_ylabel('Número de Sessões')
+    
+    # Avaliação média
+    ax2.bar(operators, operator_perf['avg_rating'], color='green')
+    ax2.set_title('Avaliação Média por Operador')
+    ax2.set_ylabel('Avaliação (1-5)')
+    
+    # Tempo médio de sessão
+    ax3.bar(operators, operator_perf['avg_duration'] / 60, color='orange')
+    ax3.set_title('Duração Média das Sessões (minutos)')
+    ax3.set_ylabel('Minutos')
+    
+    # Taxa de satisfação
+    ax4.bar(operators, operator_perf['satisfaction_rate'], color='blue')
+    ax4.set_title('Taxa de Satisfação (%)')
+    ax4.set_ylabel('Porcentagem')
+    
+    for ax in (ax1, ax2, ax3, ax4):
+        ax.tick_params(axis='x', labelrotation=90)
+    _save_figure(fig, output_file)
+
+def activity_heatmap_chart(pivot_data, output_file):
+    """4. Heatmap de atividade"""
+    if pivot_data is None:
+        return
+    import seaborn as sns
+    
+    fig = _new_figure((15, 8))
+    ax = fig.subplots()
+    sns.heatmap(pivot_data, annot=False, cmap='YlOrRd', cbar_kws={'label': 'Volume de Mensagens'}, ax=ax)
+    ax.set_title('Mapa de Calor: Atividade por Hora e Dia da Semana')
+    ax.set_xlabel('Hora do Dia')
+    ax.set_ylabel('Dia da Semana')
+    _save_figure(fig, output_file)
+
+def queue_time_chart(queue_times, output_file):
+    """5. Distribuição de tempos de resposta"""
+    if queue_times is None:
+        return
+    fig = _new_figure((12, 6))
+    ax1, ax2 = fig.subplots(1, 2)
+    
+    ax1.hist(queue_times, bins=30, alpha=0.7, color='skyblue', edgecolor='black')
+    ax1.set_title('Distribuição do Tempo de Fila')
+    ax1.set_xlabel('Tempo (minutos)')
+    ax1.set_ylabel('Frequência')
+    
+    ax2.boxplot(queue_times)
+    ax2.set_title('Box Plot - Tempo de Fila')
+    ax2.set_ylabel('Tempo (minutos)')
+    
+    _save_figure(fig, output_file)
+
+def _identity(value):
+    return value
+
+# Gráficos estáticos: arquivo -> (tarefa que fornece os dados, preparação, renderização)
+STATIC_CHARTS = {
+    'volume_diario.png': ('load_messages', daily_volume_data, daily_volume_chart),
+    'volume_por_hora.png': ('load_messages', hourly_volume_data, hourly_volume_chart),
+    'performance_operadores.png': ('operator_performance_analysis', _identity, operator_performance_chart),
+    'heatmap_atividade.png': ('peak_hours_analysis', activity_heatmap_data, activity_heatmap_chart),
+    'tempos_resposta.png': ('load_sessions', queue_time_data, queue_time_chart)
+}
+
 def create_static_charts(processor, analytics, output_dir):
-    """Cria gráficos estáticos usando matplotlib/seaborn"""
-    
-    plt.style.use('seaborn-v0_8')
-    
-    # 1. Volume de mensagens por dia
-    if not processor.messages.empty:
-        plt.figure(figsize=(12, 6))
-        daily_volume = processor.messages.groupby('date').size()
-        plt.plot(daily_volume.index, daily_volume.values, marker='o')
-        plt.title('Volume de Mensagens por Dia')
-        plt.xlabel('Data')
-        plt.ylabel('Número de Mensagens')
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, 'volume_diario.png'), dpi=300, bbox_inches='tight')
-        plt.close()
-    
-    # 2. Mensagens por hora
-    if not processor.messages.empty:
-        plt.figure(figsize=(12, 6))
-        hourly_volume = processor.messages.groupby('hour').size()
-        plt.bar(hourly_volume.index, hourly_volume.values)
-        plt.title('Distribuição de Mensagens por Hora')
-        plt.xlabel('Hora do Dia')
-        plt.ylabel('Número de Mensagens')
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, 'volume_por_hora.png'), dpi=300, bbox_inches='tight')
-        plt.close()
-    
-    # 3. Performance dos operadores
-    operator_perf = analytics.operator_performance_analysis()
-    if operator_perf is not None:
-        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 10))
-        
-        # Sessões por operador
-        operator_perf['total_sessions'].plot(kind='bar', ax=ax1)
-        ax1.set_title('Total de Sessões por Operador')
-        ax1.set_ylabel('Número de Sessões')
-        
-        # Avaliação média
-        operator_perf['avg_rating'].plot(kind='bar', ax=ax2, color='green')
-        ax2.set_title('Avaliação Média por Operador')
-        ax2.set_ylabel('Avaliação (1-5)')
-        
-        # Tempo médio de sessão
-        (operator_perf['avg_duration'] / 60).plot(kind='bar', ax=ax3, color='orange')
-        ax3.set_title('Duração Média das Sessões (minutos)')
-        ax3.set_ylabel('Minutos')
-        
-        # Taxa de satisfação
-        operator_perf['satisfaction_rate'].plot(kind='bar', ax=ax4, color='blue')
-        ax4.set_title('Taxa de Satisfação (%)')
-        ax4.set_ylabel('Porcentagem')
-        
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, 'performance_operadores.png'), dpi=300, bbox_inches='tight')
-        plt.close()
-    
-    # 4. Heatmap de atividade
-    peak_data = analytics.peak_hours_analysis()
-    if peak_data and 'heatmap_data' in peak_data:
-        plt.figure(figsize=(15, 8))
-        heatmap_data = peak_data['heatmap_data']
-        pivot_data = heatmap_data.pivot(index='weekday_num', columns='hour', values='volume')
-        
-        # Mapear números para nomes dos dias
-        day_names = {0: 'Segunda', 1: 'Terça', 2: 'Quarta', 3: 'Quinta', 
-                    4: 'Sexta', 5: 'Sábado', 6: 'Domingo'}
-        pivot_data.index = [day_names.get(i, i) for i in pivot_data.index]
-        
-        sns.heatmap(pivot_data, annot=False, cmap='YlOrRd', cbar_kws={'label': 'Volume de Mensagens'})
-        plt.title('Mapa de Calor: Atividade por Hora e Dia da Semana')
-        plt.xlabel('Hora do Dia')
-        plt.ylabel('Dia da Semana')
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, 'heatmap_atividade.png'), dpi=300, bbox_inches='tight')
-        plt.close()
-    
-    # 5. Distribuição de tempos de resposta
-    if not processor.sessions.empty and '__sessionQueueDuration' in processor.sessions.columns:
-        plt.figure(figsize=(12, 6))
-        queue_times = processor.sessions['__sessionQueueDuration'].dropna() / 60  # minutos
-        
-        plt.subplot(1, 2, 1)
-        plt.hist(queue_times, bins=30, alpha=0.7, color='skyblue', edgecolor='black')
-        plt.title('Distribuição do Tempo de Fila')
-        plt.xlabel('Tempo (minutos)')
-        plt.ylabel('Frequência')
-        
-        plt.subplot(1, 2, 2)
-        plt.boxplot(queue_times)
-        plt.title('Box Plot - Tempo de Fila')
-        plt.ylabel('Tempo (minutos)')
-        
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, 'tempos_resposta.png'), dpi=300, bbox_inches='tight')
-        plt.close()
+    """Cria todos os gráficos estáticos em sequência (sem o pipeline)"""
+    inputs = {
+        'load_messages': processor.messages,
+        'load_sessions': processor.sessions,
+        'operator_performance_analysis': analytics.operator_performance_analysis(),
+        'peak_hours_analysis': analytics.peak_hours_analysis()
+    }
+    for file_name, (chart_input, prepare, render) in STATIC_CHARTS.items():
+        render(prepare(inputs[chart_input]), os.path.join(output_dir, file_name))
     
     print("📊 Gráficos estáticos criados com sucesso!")
 
 if __name__ == "__main__":
-    create_static_reports()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Gera relatórios estáticos de CX")
+    parser.add_argument(
+        "--sections",
+        help=f"Seções separadas por vírgula ({', '.join(REPORT_SECTIONS)}); padrão: todas"
+    )
+    parser.add_argument("--workers", type=int, help="Threads do pipeline (padrão: automático)")
+    parser.add_argument("--force", action="store_true", help="Refazer também os gráficos já atualizados")
+    args = parser.parse_args()
+    
+    create_static_reports(args.sections.split(",") if args.sections else None, args.workers, args.force)
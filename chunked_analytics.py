@@ -0,0 +1,283 @@
+import numpy as np
+import pandas as pd
+from id_encoding import code_column, MISSING_CODE
+from kernels import hour_group_matrix, weekday_hour_matrix, matrix_to_frame
+from analytics import CXAnalytics, peak_hours_summary
+
+# Faixas de duração usadas em resolution_pattern_analysis
+DURATION_BINS = [0, 5, 15, 30, 60, float('inf')]
+DURATION_LABELS = ['Muito Rápida (0-5min)', 'Rápida (5-15min)', 'Média (15-30min)',
+                   'Longa (30-60min)', 'Muito Longa (60min+)']
+
+
+def _sum_by_index(left, right):
+    """Combina agregados parciais somando pelas chaves do índice"""
+    return pd.concat([left, right]).groupby(level=list(range(left.index.nlevels))).sum()
+
+
+def _median_from_counts(values, counts):
+    """Mediana exata a partir de valores ordenados e suas contagens"""
+    total = counts.sum()
+    if total == 0:
+        return np.nan
+    positions = np.cumsum(counts)
+    lower = values[np.searchsorted(positions, (total - 1) // 2, side='right')]
+    upper = values[np.searchsorted(positions, total // 2, side='right')]
+    return (lower + upper) / 2
+
+
+class ChunkedCXAnalytics:
+    """Execução em blocos (map-reduce) das análises decomponíveis de CXAnalytics
+
+    Cada análise é expressa como um agregado parcial por bloco, uma etapa de
+    combinação e uma finalização que produz a mesma saída do modo em memória.
+    Médias usam somas e contagens; medianas usam a distribuição de valores
+    (contagem por valor distinto), de modo que também são exatas. A memória
+    usada depende do número de chaves e valores distintos, não de linhas.
+    """
+
+    # Tabela lida por cada análise
+    ANALYSIS_TABLES = {
+        'peak_hours_analysis': 'messages',
+        'channel_efficiency_analysis': 'messages',
+        'response_time_analysis': 'sessions',
+        'resolution_pattern_analysis': 'sessions'
+    }
+
+    def __init__(self, processor, chunk_size=100000):
+        # DataProcessor fornece os blocos já processados (iter_table)
+        self.processor = processor
+        self.chunk_size = chunk_size
+
+    def _chunks(self, analysis):
+        table = self.ANALYSIS_TABLES[analysis]
+        columns = CXAnalytics.REQUIRED_COLUMNS[analysis][table]
+        for chunk in self.processor.iter_table(table, columns=columns, chunk_size=self.chunk_size):
+            if not chunk.empty:
+                yield chunk
+
+    def _reduce(self, analysis, partial, merge):
+        """Aplica partial a cada bloco e combina os resultados com merge"""
+        result = None
+        for chunk in self._chunks(analysis):
+            part = partial(chunk)
+            result = part if result is None else merge(result, part)
+        return result
+
+    # Horários de pico: contagens hora x direção e dia da semana x hora
+
+    @staticmethod
+    def _peak_hours_partial(chunk):
+        direction_codes, directions = pd.factorize(chunk['messageDirection'], sort=True)
+        hourly = hour_group_matrix(chunk['createdAt'], direction_codes, len(directions))
+        return {
+            'hourly': {direction: hourly[:, i] for i, direction in enumerate(directions)},
+            'heatmap': weekday_hour_matrix(chunk['createdAt'])
+        }
+
+    @staticmethod
+    def _peak_hours_merge(left, right):
+        hourly = dict(left['hourly'])
+        for direction, counts in right['hourly'].items():
+            hourly[direction] = hourly[direction] + counts if direction in hourly else counts
+        return {'hourly': hourly, 'heatmap': left['heatmap'] + right['heatmap']}
+
+    def peak_hours_analysis(self):
+        """Análise dos horários de pico (em blocos)"""
+        partial = self._reduce('peak_hours_analysis', self._peak_hours_partial, self._peak_hours_merge)
+        if partial is None:
+            return None
+
+        directions = sorted(partial['hourly'])
+        matrix = np.column_stack([partial['hourly'][d] for d in directions]) if directions else np.zeros((24, 0), dtype=np.int64)
+        hourly_volume = matrix_to_frame(
+            matrix,
+            index=np.arange(24, dtype=np.int32),
+            columns=pd.Index(directions),
+            index_name='hour',
+            columns_name='messageDirection'
+        )
+        return peak_hours_summary(hourly_volume, partial['heatmap'])
+
+    # Eficiência por canal: contagens e pares (canal, código) distintos
+
+    @staticmethod
+    def _channel_partial(chunk):
+        channels = chunk['messageChannel']
+        pairs = {}
+        for column in ('sessionID', 'contactID'):
+            codes = chunk[code_column(column)]
+            valid = channels.notna() & (codes != MISSING_CODE)
+            pairs[column] = pd.DataFrame({
+                'messageChannel': channels[valid],
+                'code': codes[valid]
+            }).drop_duplicates()
+        return {
+            'messages': chunk.groupby('messageChannel')['messageID'].count(),
+            'pairs': pairs
+        }
+
+    @staticmethod
+    def _channel_merge(left, right):
+        return {
+            'messages': _sum_by_index(left['messages'], right['messages']),
+            'pairs': {
+                column: pd.concat([left['pairs'][column], right['pairs'][column]]).drop_duplicates()
+                for column in left['pairs']
+            }
+        }
+
+    def channel_efficiency_analysis(self):
+        """Análise de eficiência por canal (em blocos)"""
+        partial = self._reduce('channel_efficiency_analysis', self._channel_partial, self._channel_merge)
+        if partial is None:
+            return None
+
+        total_messages = partial['messages']
+        channel_stats = pd.DataFrame({
+            'total_messages': total_messages,
+            'unique_sessions': partial['pairs']['sessionID'].groupby('messageChannel').size()
+                .reindex(total_messages.index, fill_value=0),
+            'unique_contacts': partial['pairs']['contactID'].groupby('messageChannel').size()
+                .reindex(total_messages.index, fill_value=0)
+        })
+
+        # Calcular mensagens por sessão por canal
+        channel_stats['messages_per_session'] = (
+            channel_stats['total_messages'] / channel_stats['unique_sessions']
+        ).round(2)
+
+        return channel_stats.sort_values('total_messages', ascending=False)
+
+    # Tempos de resposta: distribuição de valores por hora e dia da semana
+
+    RESPONSE_MEASURES = {
+        '__sessionQueueDuration': ['mean', 'median', 'count'],
+        '__sessionDuration': ['mean', 'median']
+    }
+
+    @classmethod
+    def _response_partial(cls, chunk):
+        partial = {}
+        for key in ('hour', 'weekday'):
+            partial[key] = {
+                'keys': pd.Series(chunk[key].dropna().unique()),
+                'values': {
+                    measure: chunk.groupby([key, measure]).size()
+                    for measure in cls.RESPONSE_MEASURES
+                }
+            }
+        return partial
+
+    @staticmethod
+    def _response_merge(left, right):
+        merged = {}
+        for key in left:
+            merged[key] = {
+                'keys': pd.concat([left[key]['keys'], right[key]['keys']], ignore_index=True).drop_duplicates(),
+                'values': {
+                    measure: _sum_by_index(left[key]['values'][measure], right[key]['values'][measure])
+                    for measure in left[key]['values']
+                }
+            }
+        return merged
+
+    @classmethod
+    def _response_table(cls, partial):
+        """Média, mediana e contagem por grupo a partir das contagens por valor"""
+        index = pd.Index(partial['keys']).sort_values()
+        columns = {}
+        for measure, stats in cls.RESPONSE_MEASURES.items():
+            value_counts = partial['values'][measure]
+            results = {'mean': {}, 'median': {}, 'count': {}}
+            for group, counts in value_counts.groupby(level=0):
+                values = counts.index.get_level_values(1).to_numpy(dtype=np.float64)
+                weights = counts.to_numpy()
+                order = np.argsort(values, kind='stable')
+                values, weights = values[order], weights[order]
+                results['count'][group] = int(weights.sum())
+                results['mean'][group] = (values * weights).sum() / weights.sum()
+                results['median'][group] = _median_from_counts(values, weights)
+            for stat in stats:
+                series = pd.Series(results[stat], dtype=np.int64 if stat == 'count' else np.float64)
+                fill = 0 if stat == 'count' else np.nan
+                columns[(measure, stat)] = series.reindex(index, fill_value=fill)
+
+        table = pd.DataFrame(columns, index=index)
+        table.columns = pd.MultiIndex.from_tuples(table.columns)
+        return table.round(2)
+
+    def response_time_analysis(self):
+        """Análise de tempos de resposta por período (em blocos)"""
+        partial = self._reduce('response_time_analysis', self._response_partial, self._response_merge)
+        if partial is None:
+            return None
+
+        return {
+            'hourly': self._response_table(partial['hour']).rename_axis('hour'),
+            'weekly': self._response_table(partial['weekday']).rename_axis('weekday')
+        }
+
+    # Padrões de resolução: somas e contagens por motivo e por faixa de duração
+
+    @staticmethod
+    def _resolution_partial(chunk):
+        partial = {'close_motives': None, 'duration_analysis': None}
+        if 'closeMotive' in chunk.columns:
+            grouped = chunk.groupby('closeMotive')
+            partial['close_motives'] = pd.DataFrame({
+                'total_sessions': grouped['sessionID'].count(),
+                'duration_sum': grouped['__sessionDuration'].sum(),
+                'duration_count': grouped['__sessionDuration'].count(),
+                'messages_sum': grouped['__sessionMessagesCount'].sum(),
+                'messages_count': grouped['__sessionMessagesCount'].count(),
+                'rating_sum': grouped['sessionRatingStars'].sum(),
+                'rating_count': grouped['sessionRatingStars'].count()
+            })
+        if '__sessionDuration' in chunk.columns:
+            categories = pd.cut(chunk['__sessionDuration'] / 60, bins=DURATION_BINS, labels=DURATION_LABELS)
+            grouped = pd.DataFrame({
+                'category': categories,
+                'rating': chunk['sessionRatingStars']
+            }).groupby('category')['rating']
+            partial['duration_analysis'] = pd.DataFrame({'count': grouped.count(), 'sum': grouped.sum()})
+        return partial
+
+    @staticmethod
+    def _resolution_merge(left, right):
+        return {
+            key: None if left[key] is None else _sum_by_index(left[key], right[key])
+            for key in left
+        }
+
+    def resolution_pattern_analysis(self):
+        """Análise de padrões de resolução (em blocos)"""
+        partial = self._reduce('resolution_pattern_analysis', self._resolution_partial, self._resolution_merge)
+        if partial is None:
+            return None
+
+        def mean(sums, counts):
+            return sums / counts.where(counts > 0)
+
+        close_motive_stats = None
+        motives = partial['close_motives']
+        if motives is not None:
+            close_motive_stats = pd.DataFrame({
+                'total_sessions': motives['total_sessions'],
+                'avg_duration': mean(motives['duration_sum'], motives['duration_count']),
+                'avg_messages': mean(motives['messages_sum'], motives['messages_count']),
+                'avg_rating': mean(motives['rating_sum'], motives['rating_count'])
+            }).round(2)
+
+        duration_analysis = None
+        durations = partial['duration_analysis']
+        if durations is not None:
+            duration_analysis = pd.DataFrame({
+                'count': durations['count'],
+                'mean': mean(durations['sum'], durations['count'])
+            }).round(2)
+
+        return {
+            'close_motives': close_motive_stats,
+            'duration_analysis': duration_analysis
+        }
@@ -0,0 +1,140 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+
+# Engine de leitura: parâmetro explícito > variável de ambiente > padrão
+ENGINE_ENV_VAR = "CX_CSV_ENGINE"
+DEFAULT_ENGINE = "arrow"
+ENGINES = ("arrow", "pandas")
+
+# Esquema dos exports CX: colunas de data/hora e colunas de texto.
+# Colunas numéricas e booleanas ficam com o tipo inferido pelo leitor.
+TIMESTAMP_COLUMNS = [
+    'queuedAt', 'manualAt', 'closedAt', 'createdAt', 'updatedAt', 'sessionRatingAt'
+]
+STRING_COLUMNS = [
+    'organizationID', 'tenantID', 'contactID', 'sessionID', 'operatorID', 'messageID',
+    'pluginConnectionID', 'sessionLastMessageID', '__sessionMostActiveOperatorID',
+    'sessionChannel', 'sessionTags', 'sessionLastTag', 'sessionKind', 'sessionInitiator',
+    'sessionType', 'closeMotive', 'pluginConnectionLabel', 'operatorFirstname',
+    'messageDirection', 'messageKey', 'messageChannel', 'messageValue'
+]
+
+# Formatos aceitos para datas: ISO8601 e "2025-06-01 1:09:48"
+TIMESTAMP_FORMATS = ['%Y-%m-%d %H:%M:%S']
+
+# Datas com fuso explícito ("...+00:00" ou "...Z") são lidas em UTC
+_UTC_OFFSET = re.compile(r'(Z|[+-]\d{2}:?\d{2})$')
+SAMPLE_ROWS = 100
+
+
+def get_engine(engine=None):
+    """Resolve o engine de leitura, caindo para pandas se o pyarrow não existir"""
+    engine = (engine or os.environ.get(ENGINE_ENV_VAR) or DEFAULT_ENGINE).lower()
+    if engine not in ENGINES:
+        raise ValueError(f"Engine de CSV inválido: {engine} (opções: {', '.join(ENGINES)})")
+
+    if engine == "arrow":
+        try:
+            import pyarrow.csv  # noqa: F401
+        except ImportError:
+            return "pandas"
+    return engine
+
+
+def read_csv(file_path, usecols=None, engine=None, chunksize=None):
+    """Lê um CSV dos exports CX com o engine configurado
+
+    usecols segue a convenção do pandas (lista ou função). chunksize só é
+    usado pelo engine pandas. Se a leitura com Arrow falhar (ex.: data em
+    formato inesperado), a leitura é refeita com pandas.
+    """
+    if get_engine(engine) == "arrow":
+        try:
+            return _read_csv_arrow(file_path, usecols)
+        except Exception as e:
+            print(f"Leitura com Arrow falhou ({str(e)}); usando pandas")
+
+    return _read_csv_pandas(file_path, usecols, chunksize)
+
+
+def iter_csv(file_path, usecols=None, chunksize=100000):
+    """Itera sobre um CSV dos exports CX em blocos de chunksize linhas
+
+    Usa o parser do pandas: os tipos são inferidos por bloco, e as colunas de
+    data ficam como texto até o processamento de cada tabela.
+    """
+    for chunk in pd.read_csv(file_path, chunksize=chunksize, low_memory=False, usecols=usecols):
+        yield chunk
+
+
+def _read_csv_pandas(file_path, usecols=None, chunksize=None):
+    """Leitor de referência: parser C do pandas (single-thread)"""
+    if chunksize is None:
+        return pd.read_csv(file_path, low_memory=False, usecols=usecols)
+
+    chunks = []
+    for chunk in pd.read_csv(file_path, chunksize=chunksize, low_memory=False, usecols=usecols):
+        chunks.append(chunk)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _timestamp_unit():
+    """Resolução de datas usada pelo pandas instalado (ns no pandas 2, us no 3)"""
+    parsed = pd.to_datetime(pd.Series(['2025-01-01 00:00:00']))
+    return np.datetime_data(parsed.dtype)[0]
+
+
+def _string_dtype():
+    """Dtype padrão de texto do pandas (object no pandas 2, str no 3)"""
+    return pd.Series(['text']).dtype
+
+
+def _read_csv_arrow(file_path, usecols=None):
+    """Leitor multithread do Arrow com tipos explícitos e datas convertidas na leitura"""
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    sample = pd.read_csv(file_path, nrows=SAMPLE_ROWS, dtype=str)
+    header = sample.columns
+    if usecols is None:
+        include = list(header)
+    elif callable(usecols):
+        include = [col for col in header if usecols(col)]
+    else:
+        include = [col for col in header if col in set(usecols)]
+
+    unit = _timestamp_unit()
+    column_types = {}
+    for col in include:
+        if col in TIMESTAMP_COLUMNS:
+            values = sample[col].dropna()
+            has_offset = not values.empty and bool(_UTC_OFFSET.search(values.iloc[0]))
+            column_types[col] = pa.timestamp(unit, tz='UTC' if has_offset else None)
+    column_types.update({col: pa.string() for col in include if col in STRING_COLUMNS})
+
+    table = pa_csv.read_csv(
+        file_path,
+        read_options=pa_csv.ReadOptions(use_threads=True),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=column_types,
+            include_columns=include,
+            timestamp_parsers=[pa_csv.ISO8601] + TIMESTAMP_FORMATS,
+            strings_can_be_null=True
+        )
+    )
+
+    string_dtype = _string_dtype()
+    types_mapper = None
+    if isinstance(string_dtype, pd.api.extensions.ExtensionDtype):
+        types_mapper = lambda arrow_type: string_dtype if pa.types.is_string(arrow_type) else None
+    df = table.to_pandas(types_mapper=types_mapper)
+
+    # Colunas totalmente vazias: o pandas as lê como float NaN
+    for col in include:
+        column = table.column(col)
+        if column.null_count == len(column):
+            df[col] = np.nan
+
+    return df
@@ -0,0 +1,403 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from id_encoding import IDDictionary, code_column, count_unique
+from data_processor import resolve_columns
+from csv_engine import read_csv
+from sampling import distinct_ci
+
+# Arquivo principal V3 Sindicompany
+SINDICOMPANY_FILE = "data/[ Talqui ] Sindicompany - Data_V3_Julho_20_26.csv"
+
+# Snapshot processado: sessões já convertidas e agregados prontos para o dashboard
+SNAPSHOT_DIR = "processed_data/dashboard"
+MANIFEST_FILE = "manifest.json"
+DATA_FILE = "sessions.pkl"
+AGGREGATES_FILE = "aggregates.pkl"
+IDS_FILE = "id_dictionary.csv"
+# Versão atual do snapshot; dashboards em execução a observam para trocar de versão
+VERSION_FILE = "VERSION"
+
+# Colunas usadas por cada seção do dashboard (do CSV ou derivadas)
+SECTION_COLUMNS = {
+    'filters': ['createdAt', 'date', 'pluginConnectionLabel'],
+    'metrics': ['contactID', '__sessionDuration', '__sessionQueueDuration', 'closeMotive'],
+    'daily_hourly': ['date', 'createdAt'],
+    'operators': ['pluginConnectionLabel', 'sessionID', '__sessionDuration', '__sessionQueueDuration', '__sessionMessagesCount'],
+    'day_by_operator': ['createdAt', 'pluginConnectionLabel'],
+    'weekday': ['createdAt'],
+    'reply_latency': ['sessionID', 'pluginConnectionLabel'],
+    'concurrency': ['createdAt', 'queuedAt', 'manualAt', 'closedAt', 'pluginConnectionLabel'],
+    'staffing': ['createdAt', '__sessionManualDuration', 'pluginConnectionLabel'],
+    'cohorts': ['contactID', 'createdAt'],
+    'reopens': ['contactID', 'createdAt', 'closedAt', 'closeMotive', 'pluginConnectionLabel']
+}
+
+# Agregados aditivos por (data, hora, síndico): somas e contagens de valores
+# não nulos, de modo que médias de qualquer recorte são exatas
+AGGREGATE_KEYS = ['date', 'hour', 'pluginConnectionLabel']
+AGGREGATE_MEASURES = {
+    'duration': '__sessionDuration',
+    'queue': '__sessionQueueDuration',
+    'messages': '__sessionMessagesCount'
+}
+
+def dashboard_columns():
+    """União das colunas declaradas pelas seções do dashboard"""
+    return tuple(sorted({col for columns in SECTION_COLUMNS.values() for col in columns}))
+
+def prepare_sessions(data, derived=None, ids=None):
+    """Converte tipos, cria colunas derivadas e codifica IDs das sessões Sindicompany
+
+    derived: colunas derivadas desejadas (ver resolve_columns); None cria todas.
+    ids: IDDictionary compartilhado (mantém os códigos estáveis entre arquivos).
+    """
+    def wants(col):
+        return derived is None or col in derived
+
+    # Converter datas - formato "2025-06-01 1:09:48"
+    date_columns = ['queuedAt', 'manualAt', 'closedAt', 'createdAt', 'updatedAt', 'sessionRatingAt']
+    for col in date_columns:
+        if col in data.columns:
+            data[col] = pd.to_datetime(data[col], errors='coerce')
+
+    # Adicionar colunas derivadas baseadas em createdAt
+    if 'createdAt' in data.columns and not data['createdAt'].isna().all():
+        if wants('date'):
+            data['date'] = data['createdAt'].dt.date
+        if wants('hour'):
+            data['hour'] = data['createdAt'].dt.hour
+        if wants('weekday'):
+            data['weekday'] = data['createdAt'].dt.day_name()
+
+    # Processar durações (converter de segundos para minutos)
+    duration_columns = ['__sessionDuration', '__sessionQueueDuration', '__sessionManualDuration']
+    for col in duration_columns:
+        if col in data.columns and wants(f'{col}_minutes'):
+            data[f'{col}_minutes'] = pd.to_numeric(data[col], errors='coerce') / 60
+
+    # Processar ratings
+    if 'sessionRatingStars' in data.columns:
+        data['sessionRatingStars'] = pd.to_numeric(data['sessionRatingStars'], errors='coerce')
+
+    # Processar contadores de mensagens
+    if '__sessionMessagesCount' in data.columns:
+        data['__sessionMessagesCount'] = pd.to_numeric(data['__sessionMessagesCount'], errors='coerce')
+
+    # Codificar IDs como inteiros densos (contagens sem hashing de strings)
+    data = (ids if ids is not None else IDDictionary()).encode_frame(data)
+
+    # Códigos de síndico na ordem alfabética dos rótulos
+    if 'pluginConnectionLabel' in data.columns:
+        data[code_column('pluginConnectionLabel')] = pd.factorize(
+            data['pluginConnectionLabel'], sort=True
+        )[0].astype(np.int32)
+
+    return data
+
+def read_sessions(file_path=SINDICOMPANY_FILE, columns=None, ids=None):
+    """Lê o CSV Sindicompany apenas com as colunas necessárias e o processa"""
+    source, derived = resolve_columns('sessions', columns)
+    usecols = (lambda col: col in source) if source is not None else None
+    return prepare_sessions(read_csv(file_path, usecols=usecols), derived, ids)
+
+def build_aggregates(data):
+    """Agrega as sessões por data, hora e síndico (sessões, inatividade, somas e contagens)"""
+    if data.empty or 'createdAt' not in data.columns:
+        measures = [f'{name}_{part}' for name in AGGREGATE_MEASURES for part in ('sum', 'count')]
+        return pd.DataFrame(columns=AGGREGATE_KEYS + ['sessions', 'inactivity'] + measures)
+
+    valid = data['createdAt'].notna()
+    created = data.loc[valid, 'createdAt']
+    frame = pd.DataFrame({
+        'date': created.dt.date,
+        'hour': created.dt.hour.astype(np.int64),
+        'pluginConnectionLabel': data.loc[valid, 'pluginConnectionLabel'] if 'pluginConnectionLabel' in data.columns else np.nan,
+        'sessions': 1,
+        'inactivity': (data.loc[valid, 'closeMotive'] == 'INACTIVITY').astype(np.int64) if 'closeMotive' in data.columns else 0
+    })
+    for name, col in AGGREGATE_MEASURES.items():
+        values = pd.to_numeric(data.loc[valid, col], errors='coerce') if col in data.columns else pd.Series(np.nan, index=frame.index)
+        frame[f'{name}_sum'] = values.fillna(0).astype(np.float64)
+        frame[f'{name}_count'] = values.notna().astype(np.int64)
+
+    return frame.groupby(AGGREGATE_KEYS, dropna=False, sort=True).sum().reset_index()
+
+def merge_aggregates(base, delta, sign=1):
+    """Soma (sign=1) ou subtrai (sign=-1) agregados, sem reprocessar as sessões"""
+    if delta.empty:
+        return base
+    delta = delta.copy()
+    measures = [col for col in delta.columns if col not in AGGREGATE_KEYS]
+    delta[measures] = delta[measures] * sign
+    frames = [frame for frame in (base, delta) if not frame.empty]
+
+    merged = pd.concat(frames, ignore_index=True).groupby(AGGREGATE_KEYS, dropna=False, sort=True).sum().reset_index()
+    return merged[merged['sessions'] > 0].reset_index(drop=True)
+
+def upsert_sessions(data, aggregates, new_rows):
+    """Incorpora sessões novas ou atualizadas (por sessionID) e ajusta os agregados
+
+    Sessões já existentes são substituídas: sua contribuição é subtraída dos
+    agregados antes de somar a das novas linhas. Retorna (dados, agregados,
+    número de sessões substituídas).
+    """
+    new_rows = new_rows[~new_rows['sessionID'].duplicated(keep='last') | new_rows['sessionID'].isna()]
+    replaced = data['sessionID'].isin(new_rows['sessionID'].dropna())
+
+    aggregates = merge_aggregates(aggregates, build_aggregates(data[replaced]), sign=-1)
+    aggregates = merge_aggregates(aggregates, build_aggregates(new_rows))
+
+    data = pd.concat([data[~replaced], new_rows], ignore_index=True)
+
+    # Códigos de síndico continuam na ordem alfabética dos rótulos
+    if 'pluginConnectionLabel' in data.columns:
+        data[code_column('pluginConnectionLabel')] = pd.factorize(
+            data['pluginConnectionLabel'], sort=True
+        )[0].astype(np.int32)
+
+    return data, aggregates, int(replaced.sum())
+
+def source_fingerprint(file_path=SINDICOMPANY_FILE):
+    """Identificação do arquivo de origem (caminho, mtime e tamanho)"""
+    stat = os.stat(file_path)
+    return {'path': file_path, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+def read_manifest(snapshot_dir=SNAPSHOT_DIR):
+    """Manifesto do snapshot (None se não existir ou estiver corrompido)"""
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def snapshot_is_valid(columns=None, snapshot_dir=SNAPSHOT_DIR, file_path=SINDICOMPANY_FILE):
+    """O snapshot corresponde ao arquivo de origem atual e contém as colunas pedidas"""
+    manifest = read_manifest(snapshot_dir)
+    if manifest is None or not os.path.exists(file_path):
+        return False
+    if manifest.get('source') != source_fingerprint(file_path):
+        return False
+    if manifest.get('columns') is not None:
+        if columns is None or not set(columns) <= set(manifest['columns']):
+            return False
+    return all(
+        os.path.exists(os.path.join(snapshot_dir, name))
+        for name in (DATA_FILE, AGGREGATES_FILE)
+    )
+
+def snapshot_version(columns=None, snapshot_dir=SNAPSHOT_DIR, file_path=SINDICOMPANY_FILE):
+    """Versão do snapshot válido (None se ausente ou desatualizado)"""
+    if not snapshot_is_valid(columns, snapshot_dir, file_path):
+        return None
+    return read_manifest(snapshot_dir).get('version')
+
+def _replace_file(file_path, write):
+    """Grava em um arquivo temporário e o troca atomicamente (leitores nunca veem arquivos parciais)"""
+    tmp_path = file_path + '.tmp'
+    write(tmp_path)
+    os.replace(tmp_path, file_path)
+
+def _write_json(obj):
+    def write(path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, indent=2)
+    return write
+
+def save_snapshot(data, aggregates, columns=None, snapshot_dir=SNAPSHOT_DIR, file_path=SINDICOMPANY_FILE,
+                  ids=None, sources=None, watched=None):
+    """Grava sessões, agregados e manifesto; manifesto e VERSION são gravados por último
+
+    sources: arquivos incorporados ({caminho: fingerprint}); padrão é só file_path.
+    watched: arquivos já vistos pelo daemon de ingestão (ver ingest_daemon.py).
+    """
+    if not os.path.exists(snapshot_dir):
+        os.makedirs(snapshot_dir)
+
+    _replace_file(os.path.join(snapshot_dir, DATA_FILE), data.to_pickle)
+    _replace_file(os.path.join(snapshot_dir, AGGREGATES_FILE), aggregates.to_pickle)
+    if ids is not None:
+        _replace_file(os.path.join(snapshot_dir, IDS_FILE), ids.save)
+
+    source = source_fingerprint(file_path)
+    manifest = {
+        'source': source,
+        'sources': sources if sources is not None else {file_path: source},
+        'watched': watched,
+        'columns': sorted(columns) if columns is not None else None,
+        'rows': len(data),
+        'version': datetime.now().strftime('%Y%m%d%H%M%S%f'),
+        'built_at': datetime.now().isoformat(timespec='seconds')
+    }
+    _replace_file(os.path.join(snapshot_dir, MANIFEST_FILE), _write_json(manifest))
+
+    def write_version(path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(manifest['version'])
+    _replace_file(os.path.join(snapshot_dir, VERSION_FILE), write_version)
+    return manifest
+
+def load_snapshot_data(columns=None, snapshot_dir=SNAPSHOT_DIR, file_path=SINDICOMPANY_FILE):
+    """Sessões processadas do snapshot (None se ausente ou desatualizado)"""
+    if not snapshot_is_valid(columns, snapshot_dir, file_path):
+        return None
+    data = pd.read_pickle(os.path.join(snapshot_dir, DATA_FILE))
+    if columns is None:
+        return data
+    # Manter apenas as colunas pedidas (e seus códigos)
+    keep = [col for col in data.columns if col in columns or col.removesuffix('_code') in columns]
+    return data[keep]
+
+def load_snapshot_aggregates(columns=None, snapshot_dir=SNAPSHOT_DIR, file_path=SINDICOMPANY_FILE):
+    """Agregados do snapshot (None se ausente ou desatualizado)"""
+    if not snapshot_is_valid(columns, snapshot_dir, file_path):
+        return None
+    return pd.read_pickle(os.path.join(snapshot_dir, AGGREGATES_FILE))
+
+def read_snapshot(snapshot_dir=SNAPSHOT_DIR):
+    """Lê sessões e agregados do snapshot sem validar o arquivo de origem (uso da ingestão)"""
+    data = pd.read_pickle(os.path.join(snapshot_dir, DATA_FILE))
+    aggregates = pd.read_pickle(os.path.join(snapshot_dir, AGGREGATES_FILE))
+    return data, aggregates
+
+def load_snapshot_ids(snapshot_dir=SNAPSHOT_DIR):
+    """Dicionário de IDs usado nos códigos do snapshot"""
+    return IDDictionary.load(os.path.join(snapshot_dir, IDS_FILE))
+
+def prewarm(columns=None, snapshot_dir=SNAPSHOT_DIR, file_path=SINDICOMPANY_FILE):
+    """Valida o snapshot do dashboard e o reconstrói se estiver ausente ou desatualizado"""
+    columns = dashboard_columns() if columns is None else columns
+
+    if not os.path.exists(file_path):
+        print(f"❌ Arquivo não encontrado: {file_path}")
+        return None
+
+    if snapshot_is_valid(columns, snapshot_dir, file_path):
+        manifest = read_manifest(snapshot_dir)
+        print(f"✅ Snapshot válido ({manifest['rows']:,} sessões, versão {manifest['version']})")
+        return manifest
+
+    print("🔄 Construindo snapshot do dashboard...")
+    ids = IDDictionary()
+    data = read_sessions(file_path, columns, ids)
+    aggregates = build_aggregates(data)
+    manifest = save_snapshot(data, aggregates, columns, snapshot_dir, file_path, ids=ids)
+    print(f"✅ Snapshot criado: {manifest['rows']:,} sessões, {len(aggregates):,} agregados em {snapshot_dir}/")
+    return manifest
+
+# Métricas do dashboard a partir das sessões e dos agregados (usadas pelo
+# app Streamlit e pela API local de métricas)
+
+WEEKDAY_NAMES = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
+
+def data_version(columns=None, snapshot_dir=SNAPSHOT_DIR, file_path=SINDICOMPANY_FILE):
+    """Versão dos dados usada nas chaves de cache
+
+    Com snapshot válido (run.py --prewarm / ingest_daemon.py) é a versão do
+    snapshot; caso contrário, o mtime e o tamanho do arquivo de origem.
+    """
+    columns = dashboard_columns() if columns is None else columns
+    version = snapshot_version(columns, snapshot_dir, file_path)
+    if version is not None:
+        return version
+    if not os.path.exists(file_path):
+        return None
+    stat = os.stat(file_path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def filter_sessions(data, start_date, end_date, operator):
+    """Recorte das sessões pelo período e síndico selecionados"""
+    mask = pd.Series(True, index=data.index)
+    if start_date is not None:
+        mask &= (data['date'] >= start_date) & (data['date'] <= end_date)
+    if operator != "Todos":
+        mask &= data['pluginConnectionLabel'] == operator
+    return data[mask]
+
+def filter_aggregates(aggregates, start_date, end_date, operator):
+    """Recorte dos agregados pelo período e síndico selecionados"""
+    mask = pd.Series(True, index=aggregates.index)
+    if start_date is not None:
+        mask &= (aggregates['date'] >= start_date) & (aggregates['date'] <= end_date)
+    if operator != "Todos":
+        mask &= aggregates['pluginConnectionLabel'] == operator
+    return aggregates[mask]
+
+def mean_from_sums(aggregates, measure):
+    """Média exata de uma medida a partir das somas e contagens agregadas"""
+    count = aggregates[f'{measure}_count'].sum()
+    return aggregates[f'{measure}_sum'].sum() / count if count > 0 else np.nan
+
+def session_metrics(data, aggregates, sample_rate=None):
+    """Valores dos cartões de métricas principais
+
+    Com sample_rate, data é o recorte da amostra de sessões (ver
+    sampling.py): totais e médias continuam exatos (agregados) e os
+    contatos únicos viram uma estimativa com margem de 95%
+    ('unique_contacts_margin').
+    """
+    total_sessions = len(data) if sample_rate is None else int(aggregates['sessions'].sum())
+    metrics = {
+        'total_sessions': total_sessions,
+        'unique_contacts': None,
+        'avg_duration': mean_from_sums(aggregates, 'duration'),
+        'avg_queue_duration': mean_from_sums(aggregates, 'queue'),
+        'inactivity_count': None,
+        'inactivity_percentage': None
+    }
+    if 'contactID' in data.columns:
+        unique_contacts = count_unique(data[code_column('contactID')])
+        if sample_rate is None:
+            metrics['unique_contacts'] = unique_contacts
+        else:
+            estimate, margin = distinct_ci(unique_contacts, sample_rate)
+            metrics['unique_contacts'] = int(round(estimate))
+            metrics['unique_contacts_margin'] = int(round(margin))
+    if 'closeMotive' in data.columns:
+        inactivity_count = int(aggregates['inactivity'].sum())
+        metrics['inactivity_count'] = inactivity_count
+        metrics['inactivity_percentage'] = (inactivity_count / total_sessions * 100) if total_sessions > 0 else 0
+    return metrics
+
+def daily_sessions(aggregates):
+    """Sessões por dia"""
+    return aggregates.groupby('date')['sessions'].sum().reset_index(name='count')
+
+def hourly_sessions(aggregates):
+    """Sessões por hora do dia (apenas horas com sessões)"""
+    hourly_counts = np.bincount(
+        aggregates['hour'].to_numpy(dtype=np.int64),
+        weights=aggregates['sessions'].to_numpy(),
+        minlength=24
+    ).astype(np.int64)
+    hours_with_sessions = np.flatnonzero(hourly_counts)
+    return pd.DataFrame({
+        'hour': hours_with_sessions,
+        'count': hourly_counts[hours_with_sessions]
+    })
+
+def operator_summary(aggregates):
+    """Sessões, durações e mensagens médias por síndico"""
+    grouped = aggregates.groupby('pluginConnectionLabel').sum(numeric_only=True)
+    operator_sessions = pd.DataFrame({
+        'Total de Sessões': grouped['sessions'],
+        'Duração Média': grouped['duration_sum'] / grouped['duration_count'].replace(0, np.nan),
+        'Tempo de Espera Médio': grouped['queue_sum'] / grouped['queue_count'].replace(0, np.nan),
+        'Mensagens Média': grouped['messages_sum'] / grouped['messages_count'].replace(0, np.nan)
+    }).round(2)
+
+    # Durações ficam em segundos; a formatação HH:MM:SS é feita só na exibição
+    return operator_sessions.sort_values('Total de Sessões', ascending=False)
+
+def weekday_sessions(aggregates):
+    """Sessões por dia da semana (segunda a domingo)"""
+    weekdays = pd.to_datetime(aggregates['date']).dt.weekday.to_numpy()
+    return pd.DataFrame({
+        'weekday_pt': WEEKDAY_NAMES,
+        'count': np.bincount(weekdays, weights=aggregates['sessions'].to_numpy(), minlength=7).astype(np.int64)
+    })
@@ -2,43 +2,142 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import os
+from id_encoding import IDDictionary, count_unique, code_column
+from text_store import MessageTextStore
+from csv_engine import read_csv, iter_csv
+
+# Arquivos de cada tabela dentro do diretório de dados
+DATA_FILES = {
+    'messages': "2025-07-20T11_47_45+00_00_wa7m.csv",
+    'sessions': "2025-07-20T11_48_09+00_00_ssrb.csv",
+    'sessions_plugins': "2025-07-20T11_48_28+00_00_ry7w.csv"
+}
+
+# Colunas derivadas de cada tabela e as colunas do CSV das quais dependem
+DERIVED_COLUMNS = {
+    'messages': {
+        'date': ['createdAt'],
+        'hour': ['createdAt'],
+        'minute': ['createdAt'],
+        'weekday': ['createdAt'],
+        'weekday_num': ['createdAt'],
+        'month': ['createdAt'],
+        'day': ['createdAt'],
+        'message_length': ['messageValue'],
+        'has_content': ['messageValue'],
+        'message_category': ['messageKey']
+    },
+    'sessions': {
+        'date': ['createdAt'],
+        'hour': ['createdAt'],
+        'weekday': ['createdAt'],
+        'response_time_minutes': ['queuedAt', 'manualAt'],
+        'total_session_time_minutes': ['createdAt', 'closedAt'],
+        '__sessionDuration_minutes': ['__sessionDuration'],
+        '__sessionQueueDuration_minutes': ['__sessionQueueDuration'],
+        '__sessionManualDuration_minutes': ['__sessionManualDuration'],
+        'rating_category': ['sessionRatingStars']
+    },
+    'sessions_plugins': {
+        'date': ['createdAt'],
+        'hour': ['createdAt'],
+        'weekday': ['createdAt']
+    }
+}
+
+def resolve_columns(table, columns):
+    """Separa as colunas pedidas em (colunas a ler do CSV, colunas derivadas)
+
+    Retorna (None, None) quando todas as colunas devem ser lidas e calculadas.
+    """
+    if columns is None:
+        return None, None
+    
+    derived_map = DERIVED_COLUMNS[table]
+    derived = {col for col in columns if col in derived_map}
+    source = {col for col in columns if col not in derived_map}
+    for col in derived:
+        source.update(derived_map[col])
+    return source, derived
+
+def _wants(derived, column):
+    """Indica se uma coluna derivada deve ser calculada"""
+    return derived is None or column in derived
 
 class DataProcessor:
     """Classe para processamento e limpeza dos dados de CX"""
     
-    def __init__(self, data_dir="data"):
+    def __init__(self, data_dir="data", text_store_dir=None, csv_engine=None):
         self.data_dir = data_dir
+        # Engine de leitura dos CSVs ('arrow' ou 'pandas'; padrão via CX_CSV_ENGINE)
+        self.csv_engine = csv_engine
+        # Se definido, os textos das mensagens vão para um armazenamento em disco
+        self.text_store_dir = text_store_dir
+        self.text_store = None
         self.messages = None
         self.sessions = None
         self.sessions_plugins = None
+        # Dicionário de IDs compartilhado entre as três tabelas
+        self.ids = IDDictionary()
     
-    def load_all_data(self):
-        """Carrega todos os arquivos de dados"""
-        self.messages = self.load_messages()
-        self.sessions = self.load_sessions()
-        self.sessions_plugins = self.load_sessions_plugins()
+    def load_all_data(self, columns=None):
+        """Carrega todos os arquivos de dados
+
+        columns: dicionário {tabela: colunas} (ver analytics.required_columns).
+        Tabelas ausentes do dicionário não são lidas; None lê tudo.
+        """
+        if columns is None:
+            self.messages = self.load_messages()
+            self.sessions = self.load_sessions()
+            self.sessions_plugins = self.load_sessions_plugins()
+            return self
+        
+        for table in DATA_FILES:
+            table_columns = columns.get(table)
+            if table_columns:
+                self.load_table(table, columns=table_columns)
+            else:
+                setattr(self, table, pd.DataFrame())
         return self
     
-    def load_messages(self):
+    def load_table(self, table, columns=None):
+        """Carrega uma única tabela ('messages', 'sessions' ou 'sessions_plugins')
+
+        O resultado também fica no atributo de mesmo nome. As tabelas podem ser
+        carregadas em paralelo: o dicionário de IDs é compartilhado com lock.
+        """
+        loaders = {
+            'messages': self.load_messages,
+            'sessions': self.load_sessions,
+            'sessions_plugins': self.load_sessions_plugins
+        }
+        df = loaders[table](columns=columns)
+        setattr(self, table, df)
+        return df
+    
+    def _read_columns(self, table, columns):
+        """Argumentos de leitura (usecols) e colunas derivadas para a projeção"""
+        source, derived = resolve_columns(table, columns)
+        usecols = (lambda col: col in source) if source is not None else None
+        return usecols, derived
+    
+    def load_messages(self, columns=None):
         """Carrega e processa dados de mensagens"""
-        file_path = os.path.join(self.data_dir, "2025-07-20T11_47_45+00_00_wa7m.csv")
+        file_path = os.path.join(self.data_dir, DATA_FILES['messages'])
         
         if not os.path.exists(file_path):
             print(f"Arquivo não encontrado: {file_path}")
             return pd.DataFrame()
         
         try:
-            # Carregar com chunks para arquivos grandes
-            chunks = []
+            # Carregar com chunks para arquivos grandes (engine pandas)
             chunk_size = 10000
             
-            for chunk in pd.read_csv(file_path, chunksize=chunk_size, low_memory=False):
-                chunks.append(chunk)
-            
-            df = pd.concat(chunks, ignore_index=True)
+            usecols, derived = self._read_columns('messages', columns)
+            df = read_csv(file_path, usecols=usecols, engine=self.csv_engine, chunksize=chunk_size)
             
             # Processamento dos dados
-            df = self._process_messages(df)
+            df = self._process_messages(df, derived)
             
             print(f"Mensagens carregadas: {len(df):,} registros")
             return df
@@ -47,17 +146,18 @@ class DataProcessor:
             print(f"Erro ao carregar mensagens: {str(e)}")
             return pd.DataFrame()
     
-    def load_sessions(self):
+    def load_sessions(self, columns=None):
         """Carrega e processa dados de sessões"""
-        file_path = os.path.join(self.data_dir, "2025-07-20T11_48_09+00_00_ssrb.csv")
+        file_path = os.path.join(self.data_dir, DATA_FILES['sessions'])
         
         if not os.path.exists(file_path):
             print(f"Arquivo não encontrado: {file_path}")
             return pd.DataFrame()
         
         try:
-            df = pd.read_csv(file_path, low_memory=False)
-            df = self._process_sessions(df)
+            usecols, derived = self._read_columns('sessions', columns)
+            df = read_csv(file_path, usecols=usecols, engine=self.csv_engine)
+            df = self._process_sessions(df, derived)
             
             print(f"Sessões carregadas: {len(df):,} registros")
             return df
@@ -66,17 +166,18 @@ class DataProcessor:
             print(f"Erro ao carregar sessões: {str(e)}")
             return pd.DataFrame()
     
-    def load_sessions_plugins(self):
+    def load_sessions_plugins(self, columns=None):
         """Carrega dados de sessões com plugins"""
-        file_path = os.path.join(self.data_dir, "2025-07-20T11_48_28+00_00_ry7w.csv")
+        file_path = os.path.join(self.data_dir, DATA_FILES['sessions_plugins'])
         
         if not os.path.exists(file_path):
             print(f"Arquivo não encontrado: {file_path}")
             return pd.DataFrame()
         
         try:
-            df = pd.read_csv(file_path, low_memory=False)
-            df = self._process_sessions_plugins(df)
+            usecols, derived = self._read_columns('sessions_plugins', columns)
+            df = read_csv(file_path, usecols=usecols, engine=self.csv_engine)
+            df = self._process_sessions_plugins(df, derived)
             
             print(f"Sessões com plugins carregadas: {len(df):,} registros")
             return df
@@ -85,8 +186,28 @@ class DataProcessor:
             print(f"Erro ao carregar sessões com plugins: {str(e)}")
             return pd.DataFrame()
     
-    def _process_messages(self, df):
-        """Processa dados de mensagens"""
+    def iter_table(self, table, columns=None, chunk_size=100000):
+        """Lê e processa uma tabela em blocos, sem manter o arquivo inteiro em memória
+
+        Os códigos de ID usam o dicionário compartilhado (self.ids), então são
+        consistentes entre os blocos. Os textos das mensagens ficam no bloco.
+        """
+        file_path = os.path.join(self.data_dir, DATA_FILES[table])
+        if not os.path.exists(file_path):
+            print(f"Arquivo não encontrado: {file_path}")
+            return
+
+        usecols, derived = self._read_columns(table, columns)
+        process = {
+            'messages': lambda df: self._process_messages(df, derived, store_text=False),
+            'sessions': lambda df: self._process_sessions(df, derived),
+            'sessions_plugins': lambda df: self._process_sessions_plugins(df, derived)
+        }[table]
+        for chunk in iter_csv(file_path, usecols=usecols, chunksize=chunk_size):
+            yield process(chunk)
+    
+    def _process_messages(self, df, derived=None, store_text=True):
+        """Processa dados de mensagens (derived limita as colunas derivadas)"""
         # Converter datas com formato ISO8601
         date_columns = ['createdAt', 'updatedAt']
         for col in date_columns:
@@ -95,21 +216,34 @@ class DataProcessor:
         
         # Adicionar colunas derivadas
         if 'createdAt' in df.columns:
-            df['date'] = df['createdAt'].dt.date
-            df['hour'] = df['createdAt'].dt.hour
-            df['minute'] = df['createdAt'].dt.minute
-            df['weekday'] = df['createdAt'].dt.day_name()
-            df['weekday_num'] = df['createdAt'].dt.weekday
-            df['month'] = df['createdAt'].dt.month
-            df['day'] = df['createdAt'].dt.day
+            calendar = {
+                'date': lambda created: created.dt.date,
+                'hour': lambda created: created.dt.hour,
+                'minute': lambda created: created.dt.minute,
+                'weekday': lambda created: created.dt.day_name(),
+                'weekday_num': lambda created: created.dt.weekday,
+                'month': lambda created: created.dt.month,
+                'day': lambda created: created.dt.day
+            }
+            for col, compute in calendar.items():
+                if _wants(derived, col):
+                    df[col] = compute(df['createdAt'])
         
         # Limpar dados de mensagem
         if 'messageValue' in df.columns:
-            df['message_length'] = df['messageValue'].str.len()
-            df['has_content'] = df['messageValue'].notna() & (df['messageValue'] != '')
+            if _wants(derived, 'message_length'):
+                df['message_length'] = df['messageValue'].str.len()
+            if _wants(derived, 'has_content'):
+                df['has_content'] = df['messageValue'].notna() & (df['messageValue'] != '')
+            
+            # Mover os textos para o armazenamento mapeado em memória
+            if self.text_store_dir and store_text:
+                self.text_store = MessageTextStore.build(df['messageValue'], self.text_store_dir)
+                df['text_row'] = np.arange(len(df), dtype=np.int32)
+                df = df.drop(columns=['messageValue'])
         
         # Categorizar tipos de mensagem
-        if 'messageKey' in df.columns:
+        if 'messageKey' in df.columns and _wants(derived, 'message_category'):
             df['message_category'] = df['messageKey'].map({
                 'text': 'Texto',
                 'file': 'Arquivo',
@@ -119,10 +253,13 @@ class DataProcessor:
                 'video': 'Vídeo'
             }).fillna('Outro')
         
+        # Codificar IDs como inteiros densos
+        df = self.ids.encode_frame(df)
+        
         return df
     
-    def _process_sessions(self, df):
-        """Processa dados de sessões"""
+    def _process_sessions(self, df, derived=None):
+        """Processa dados de sessões (derived limita as colunas derivadas)"""
         # Converter datas com formato ISO8601
         date_columns = ['queuedAt', 'manualAt', 'closedAt', 'createdAt', 'updatedAt', 'sessionRatingAt']
         for col in date_columns:
@@ -130,26 +267,23 @@ class DataProcessor:
                 df[col] = pd.to_datetime(df[col], format='ISO8601', errors='coerce')
         
         # Adicionar colunas derivadas
-        if 'createdAt' in df.columns:
-            df['date'] = df['createdAt'].dt.date
-            df['hour'] = df['createdAt'].dt.hour
-            df['weekday'] = df['createdAt'].dt.day_name()
+        df = self._add_calendar_columns(df, derived)
         
         # Calcular tempos
-        if 'queuedAt' in df.columns and 'manualAt' in df.columns:
+        if 'queuedAt' in df.columns and 'manualAt' in df.columns and _wants(derived, 'response_time_minutes'):
             df['response_time_minutes'] = (df['manualAt'] - df['queuedAt']).dt.total_seconds() / 60
         
-        if 'createdAt' in df.columns and 'closedAt' in df.columns:
+        if 'createdAt' in df.columns and 'closedAt' in df.columns and _wants(derived, 'total_session_time_minutes'):
             df['total_session_time_minutes'] = (df['closedAt'] - df['createdAt']).dt.total_seconds() / 60
         
         # Converter durações de segundos para minutos
         duration_columns = ['__sessionDuration', '__sessionQueueDuration', '__sessionManualDuration']
         for col in duration_columns:
-            if col in df.columns:
+            if col in df.columns and _wants(derived, f"{col}_minutes"):
                 df[f"{col}_minutes"] = df[col] / 60
         
         # Categorizar avaliações
-        if 'sessionRatingStars' in df.columns:
+        if 'sessionRatingStars' in df.columns and _wants(derived, 'rating_category'):
             df['rating_category'] = pd.cut(
                 df['sessionRatingStars'], 
                 bins=[0, 2, 3, 4, 5], 
@@ -157,10 +291,13 @@ class DataProcessor:
                 include_lowest=True
             )
         
+        # Codificar IDs como inteiros densos
+        df = self.ids.encode_frame(df)
+        
         return df
     
-    def _process_sessions_plugins(self, df):
-        """Processa dados de sessões com plugins"""
+    def _process_sessions_plugins(self, df, derived=None):
+        """Processa dados de sessões com plugins (derived limita as colunas derivadas)"""
         # Converter datas com formato ISO8601
         date_columns = ['queuedAt', 'manualAt', 'closedAt', 'createdAt', 'updatedAt']
         for col in date_columns:
@@ -168,13 +305,24 @@ class DataProcessor:
                 df[col] = pd.to_datetime(df[col], format='ISO8601', errors='coerce')
         
         # Adicionar colunas derivadas
-        if 'createdAt' in df.columns:
-            df['date'] = df['createdAt'].dt.date
-            df['hour'] = df['createdAt'].dt.hour
-            df['weekday'] = df['createdAt'].dt.day_name()
+        df = self._add_calendar_columns(df, derived)
+        
+        # Codificar IDs como inteiros densos
+        df = self.ids.encode_frame(df)
         
         return df
     
+    def _add_calendar_columns(self, df, derived=None):
+        """Adiciona date, hour e weekday de sessões a partir de createdAt"""
+        if 'createdAt' in df.columns:
+            if _wants(derived, 'date'):
+                df['date'] = df['createdAt'].dt.date
+            if _wants(derived, 'hour'):
+                df['hour'] = df['createdAt'].dt.hour
+            if _wants(derived, 'weekday'):
+                df['weekday'] = df['createdAt'].dt.day_name()
+        return df
+    
     def get_summary_stats(self):
         """Retorna estatísticas resumidas dos dados"""
         stats = {}
@@ -188,8 +336,8 @@ class DataProcessor:
                 ),
                 'inbound': len(self.messages[self.messages['messageDirection'] == 'inbound']),
                 'outbound': len(self.messages[self.messages['messageDirection'] == 'outbound']),
-                'unique_contacts': self.messages['contactID'].nunique(),
-                'unique_sessions': self.messages['sessionID'].nunique()
+                'unique_contacts': count_unique(self.messages[code_column('contactID')]),
+                'unique_sessions': count_unique(self.messages[code_column('sessionID')])
             }
         
         if self.sessions is not None and not self.sessions.empty:
@@ -219,6 +367,15 @@ class DataProcessor:
         if self.sessions_plugins is not None and not self.sessions_plugins.empty:
             self.sessions_plugins.to_csv(os.path.join(output_dir, "sessions_plugins_processed.csv"), index=False)
             print(f"Sessões com plugins exportadas para {output_dir}/sessions_plugins_processed.csv")
+        
+        # Dicionário de IDs acompanha os dados exportados
+        self.ids.save(os.path.join(output_dir, "id_dictionary.csv"))
+        print(f"Dicionário de IDs exportado para {output_dir}/id_dictionary.csv")
+    
+    def load_id_dictionary(self, input_dir="processed_data"):
+        """Carrega o dicionário de IDs exportado junto com os dados processados"""
+        self.ids = IDDictionary.load(os.path.join(input_dir, "id_dictionary.csv"))
+        return self.ids
 
 # Exemplo de uso
 if __name__ == "__main__":
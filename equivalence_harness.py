@@ -0,0 +1,999 @@
+#!/usr/bin/env python3
+"""
+Harness de equivalência entre os caminhos de referência (pandas) e os otimizados
+
+Cada verificação executa o mesmo passo pelos dois caminhos — leitura e
+processamento do DataProcessor, métodos do CXAnalytics, kernels numéricos e
+agregados do app — sobre os exports reais e sobre dados sintéticos
+aleatórios, compara os resultados com tolerâncias cientes de dtype e NaN e
+reporta o ganho de tempo de cada caminho ao lado de qualquer divergência.
+
+Uso:
+    python equivalence_harness.py                 # exports reais (se existirem) + 3 sementes sintéticas
+    python equivalence_harness.py --seeds 5 --sessions 20000
+    python equivalence_harness.py --no-real --group app
+"""
+
+import os
+import io
+import re
+import sys
+import time
+import argparse
+import tempfile
+import contextlib
+from collections import Counter
+import unicodedata
+import numpy as np
+import pandas as pd
+from data_processor import DataProcessor, DATA_FILES
+from analytics import CXAnalytics, required_columns, cohort_retention, session_reopens, REOPEN_WINDOWS_HOURS
+from chunked_analytics import ChunkedCXAnalytics
+from sentiment_cache import SentimentCache
+from session_index import SessionIndex
+from intervals import session_intervals, sweep, NS_PER_MINUTE
+from staffing import arrival_profile, required_agents, DEFAULT_TARGET_LEVEL, DEFAULT_TARGET_SECONDS
+from text_index import TextIndex, parse_query, MAX_TERM_LENGTH
+from term_stats import term_counts, message_days, STOPWORDS
+from id_encoding import code_column
+from kernels import hour_histogram, weekday_histogram, weekday_hour_matrix, hour_group_matrix, day_group_matrix
+from dashboard_data import (
+    SINDICOMPANY_FILE, WEEKDAY_NAMES, dashboard_columns, read_sessions, build_aggregates,
+    save_snapshot, load_snapshot_data, filter_sessions, filter_aggregates, session_metrics,
+    daily_sessions, hourly_sessions, operator_summary, weekday_sessions
+)
+
+# Tolerâncias padrão para valores numéricos (somas em ordem diferente)
+RTOL = 1e-9
+ATOL = 1e-9
+
+# Consultas da busca nas mensagens (termos dos exports reais e sintéticos)
+SEARCH_QUERIES = [
+    'boleto', 'nao funciona', '"funciona o boleto"', 'problema OU obrigado',
+    'solucao atendimento', '"sem solução"', 'resol*', 'pessimo | ok'
+]
+
+STATUS_OK = "ok"
+STATUS_DIVERGENT = "divergente"
+STATUS_ERROR = "erro"
+
+
+def dtype_family(dtype):
+    """Família do dtype usada na comparação (numérico, bool, data, duração ou objeto)"""
+    if isinstance(dtype, pd.CategoricalDtype):
+        return dtype_family(dtype.categories.dtype)
+    if pd.api.types.is_bool_dtype(dtype):
+        return "bool"
+    if pd.api.types.is_numeric_dtype(dtype):
+        return "numeric"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "datetime"
+    if pd.api.types.is_timedelta64_dtype(dtype):
+        return "timedelta"
+    return "object"
+
+
+def _values(values):
+    """Valores de uma Series/Index/array prontos para comparar (categorias viram valores)"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = pd.Series(values).astype(object)
+    return pd.Series(values).reset_index(drop=True)
+
+
+def _first_mismatch(mismatch, reference, candidate, path):
+    position = int(np.flatnonzero(mismatch)[0])
+    return (
+        f"{path}: {int(mismatch.sum())} de {len(mismatch)} valores diferentes "
+        f"(posição {position}: {reference.iloc[position]!r} vs {candidate.iloc[position]!r})"
+    )
+
+
+def compare_values(reference, candidate, rtol=RTOL, atol=ATOL, path="valores"):
+    """Compara duas colunas/arrays posição a posição; retorna None ou a divergência"""
+    reference, candidate = _values(reference), _values(candidate)
+    if len(reference) != len(candidate):
+        return f"{path}: {len(reference)} valores vs {len(candidate)}"
+
+    family = dtype_family(reference.dtype)
+    if family != dtype_family(candidate.dtype):
+        return f"{path}: tipo {reference.dtype} vs {candidate.dtype}"
+
+    missing = reference.isna().to_numpy()
+    mismatch = missing != candidate.isna().to_numpy()
+    present = ~missing & ~mismatch
+
+    if family in ("numeric", "bool"):
+        ref = reference.to_numpy(dtype=np.float64, na_value=np.nan)
+        cand = candidate.to_numpy(dtype=np.float64, na_value=np.nan)
+        mismatch[present] = ~np.isclose(ref[present], cand[present], rtol=rtol, atol=atol)
+    elif family == "datetime":
+        ref_tz, cand_tz = getattr(reference.dtype, 'tz', None), getattr(candidate.dtype, 'tz', None)
+        if str(ref_tz) != str(cand_tz):
+            return f"{path}: fuso {ref_tz} vs {cand_tz}"
+        if ref_tz is not None:
+            reference, candidate = reference.dt.tz_convert(None), candidate.dt.tz_convert(None)
+        ref = reference.to_numpy(dtype='datetime64[ns]')
+        cand = candidate.to_numpy(dtype='datetime64[ns]')
+        mismatch[present] = ref[present] != cand[present]
+    elif family == "timedelta":
+        ref = reference.to_numpy(dtype='timedelta64[ns]')
+        cand = candidate.to_numpy(dtype='timedelta64[ns]')
+        mismatch[present] = ref[present] != cand[present]
+    else:
+        ref = reference.to_numpy(dtype=object)
+        cand = candidate.to_numpy(dtype=object)
+        mismatch[present] = ref[present] != cand[present]
+
+    if mismatch.any():
+        return _first_mismatch(mismatch, reference, candidate, path)
+    return None
+
+
+def compare(reference, candidate, rtol=RTOL, atol=ATOL, path="resultado"):
+    """Compara resultados aninhados (DataFrames, Series, arrays, dicts, listas e escalares)
+
+    Números são comparados com tolerância relativa/absoluta, NaN/None/NaT
+    em posições iguais são equivalentes e dtypes precisam ser da mesma
+    família (int64 e float64 são ambos numéricos; texto e número não).
+    Retorna None quando equivalentes ou a descrição da primeira divergência.
+    """
+    if isinstance(reference, pd.DataFrame) or isinstance(candidate, pd.DataFrame):
+        if not (isinstance(reference, pd.DataFrame) and isinstance(candidate, pd.DataFrame)):
+            return f"{path}: {type(reference).__name__} vs {type(candidate).__name__}"
+        if list(reference.columns) != list(candidate.columns):
+            return f"{path}: colunas {list(reference.columns)} vs {list(candidate.columns)}"
+        divergence = compare(reference.index, candidate.index, rtol, atol, f"{path}.index")
+        for column in reference.columns:
+            if divergence is not None:
+                break
+            divergence = compare_values(reference[column], candidate[column], rtol, atol, f"{path}[{column!r}]")
+        return divergence
+
+    if isinstance(reference, (pd.Series, pd.Index)) or isinstance(candidate, (pd.Series, pd.Index)):
+        if type(reference) is not type(candidate) and not (
+            isinstance(reference, pd.Index) and isinstance(candidate, pd.Index)
+        ):
+            return f"{path}: {type(reference).__name__} vs {type(candidate).__name__}"
+        if reference.name != candidate.name and not (pd.isna(reference.name) and pd.isna(candidate.name)):
+            return f"{path}: nome {reference.name!r} vs {candidate.name!r}"
+        if isinstance(reference, pd.Series):
+            divergence = compare(reference.index, candidate.index, rtol, atol, f"{path}.index")
+            if divergence is not None:
+                return divergence
+        if isinstance(reference, pd.MultiIndex) or isinstance(candidate, pd.MultiIndex):
+            return None if reference.equals(candidate) else f"{path}: MultiIndex diferente"
+        return compare_values(reference, candidate, rtol, atol, path)
+
+    if isinstance(reference, np.ndarray) or isinstance(candidate, np.ndarray):
+        reference, candidate = np.asarray(reference), np.asarray(candidate)
+        if reference.shape != candidate.shape:
+            return f"{path}: formato {reference.shape} vs {candidate.shape}"
+        return compare_values(reference.ravel(), candidate.ravel(), rtol, atol, path)
+
+    if isinstance(reference, dict) or isinstance(candidate, dict):
+        if not (isinstance(reference, dict) and isinstance(candidate, dict)):
+            return f"{path}: {type(reference).__name__} vs {type(candidate).__name__}"
+        if set(reference) != set(candidate):
+            return f"{path}: chaves {sorted(map(str, reference))} vs {sorted(map(str, candidate))}"
+        for key in reference:
+            divergence = compare(reference[key], candidate[key], rtol, atol, f"{path}[{key!r}]")
+            if divergence is not None:
+                return divergence
+        return None
+
+    if isinstance(reference, (list, tuple)) or isinstance(candidate, (list, tuple)):
+        if not (isinstance(reference, (list, tuple)) and isinstance(candidate, (list, tuple))):
+            return f"{path}: {type(reference).__name__} vs {type(candidate).__name__}"
+        if len(reference) != len(candidate):
+            return f"{path}: {len(reference)} itens vs {len(candidate)}"
+        for i, (ref, cand) in enumerate(zip(reference, candidate)):
+            divergence = compare(ref, cand, rtol, atol, f"{path}[{i}]")
+            if divergence is not None:
+                return divergence
+        return None
+
+    # Escalares
+    ref_missing = reference is None or (np.ndim(reference) == 0 and pd.isna(reference))
+    cand_missing = candidate is None or (np.ndim(candidate) == 0 and pd.isna(candidate))
+    if ref_missing or cand_missing:
+        return None if ref_missing and cand_missing else f"{path}: {reference!r} vs {candidate!r}"
+    numbers = (int, float, np.number, np.bool_)
+    if isinstance(reference, numbers) and isinstance(candidate, numbers):
+        if np.isclose(float(reference), float(candidate), rtol=rtol, atol=atol):
+            return None
+    elif reference == candidate:
+        return None
+    return f"{path}: {reference!r} vs {candidate!r}"
+
+
+class Dataset:
+    """Exports de uma rodada: diretório dos CSVs CX e CSV Sindicompany
+
+    Entradas compartilhadas entre verificações (processadores carregados,
+    agregados, snapshot) são construídas uma vez, fora da medição de tempo.
+    """
+
+    def __init__(self, name, data_dir, sessions_file, work_dir, chunk_size=5000):
+        self.name = name
+        self.data_dir = data_dir
+        self.sessions_file = sessions_file
+        self.work_dir = work_dir
+        self.chunk_size = chunk_size
+        self._inputs = {}
+
+    def get(self, key, build):
+        if key not in self._inputs:
+            with contextlib.redirect_stdout(io.StringIO()):
+                self._inputs[key] = build()
+        return self._inputs[key]
+
+    def prepare(self):
+        """Constrói as entradas compartilhadas antes das medições"""
+        self.reference_analytics()
+        self.optimized_analytics()
+        self.snapshot_dir()
+        self.filters()
+        self.text_index()
+
+    def reference_processor(self):
+        """Engine pandas, todas as colunas, textos em memória"""
+        return self.get('reference_processor', lambda: DataProcessor(
+            self.data_dir, csv_engine='pandas'
+        ).load_all_data())
+
+    def optimized_processor(self):
+        """Engine Arrow, projeção das colunas usadas e textos em disco"""
+        return self.get('optimized_processor', lambda: DataProcessor(
+            self.data_dir, text_store_dir=os.path.join(self.work_dir, 'message_text'), csv_engine='arrow'
+        ).load_all_data(required_columns()))
+
+    def reference_analytics(self):
+        processor = self.reference_processor()
+        return self.get('reference_analytics', lambda: CXAnalytics(
+            processor.messages, processor.sessions, ids=processor.ids
+        ))
+
+    def optimized_analytics(self):
+        processor = self.optimized_processor()
+        return self.get('optimized_analytics', lambda: CXAnalytics(
+            processor.messages, processor.sessions, ids=processor.ids, text_store=processor.text_store,
+            sentiment_cache=SentimentCache(os.path.join(self.work_dir, 'sentiment_cache'))
+        ))
+
+    def text_index(self):
+        """Índice de busca construído a partir do export de mensagens do dataset"""
+        index_dir = os.path.join(self.work_dir, 'text_index')
+        def build():
+            index = TextIndex(index_dir)
+            index.sync(os.path.join(self.data_dir, DATA_FILES['messages']))
+            return index
+        return self.get('text_index', build)
+
+    def dashboard_data(self):
+        """Sessões Sindicompany com as colunas do dashboard"""
+        return self.get('dashboard_data', lambda: read_sessions(self.sessions_file, dashboard_columns()))
+
+    def dashboard_aggregates(self):
+        data = self.dashboard_data()
+        return self.get('dashboard_aggregates', lambda: build_aggregates(data))
+
+    def snapshot_dir(self):
+        """Snapshot do dashboard gravado a partir das sessões do dataset"""
+        data, aggregates = self.dashboard_data(), self.dashboard_aggregates()
+        snapshot_dir = os.path.join(self.work_dir, 'snapshot')
+        return self.get('snapshot_dir', lambda: save_snapshot(
+            data, aggregates, dashboard_columns(), snapshot_dir, self.sessions_file
+        ) and snapshot_dir)
+
+    def filters(self):
+        """Recortes do app: todo o período, uma janela de datas e o síndico mais frequente"""
+        def build():
+            data = self.dashboard_data()
+            dates = data['date'].dropna()
+            if dates.empty:
+                return {'todos': (None, None, "Todos")}
+            start, end = dates.min(), dates.max()
+            window = sorted(dates.unique())
+            middle = window[len(window) // 4], window[(3 * len(window)) // 4]
+            operator = data['pluginConnectionLabel'].value_counts().index[0]
+            return {
+                'todos': (start, end, "Todos"),
+                'janela': (middle[0], middle[1], "Todos"),
+                'síndico': (start, end, operator)
+            }
+        return self.get('filters', build)
+
+
+class Check:
+    """Um passo executado pelo caminho de referência e pelo otimizado
+
+    reference e optimized recebem o Dataset. Com projection=True o
+    resultado de referência (DataFrame com todas as colunas) é reduzido às
+    colunas produzidas pelo caminho otimizado antes da comparação.
+    """
+
+    def __init__(self, group, name, reference, optimized, projection=False, rtol=RTOL, atol=ATOL):
+        self.group = group
+        self.name = name
+        self.reference = reference
+        self.optimized = optimized
+        self.projection = projection
+        self.rtol = rtol
+        self.atol = atol
+
+
+def _best_time(func, dataset, repeat):
+    """(resultado, menor tempo em segundos) de repeat execuções silenciosas"""
+    best = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func(dataset)
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+class EquivalenceHarness:
+    """Executa as verificações sobre os datasets e monta o relatório"""
+
+    def __init__(self, checks=None, repeat=3):
+        self.checks = default_checks() if checks is None else checks
+        self.repeat = repeat
+        self.results = []
+
+    def run_check(self, check, dataset):
+        row = {
+            'group': check.group, 'check': check.name, 'dataset': dataset.name,
+            'status': STATUS_OK, 'detail': "", 'reference_s': np.nan, 'optimized_s': np.nan, 'speedup': np.nan
+        }
+        try:
+            reference, row['reference_s'] = _best_time(check.reference, dataset, self.repeat)
+            candidate, row['optimized_s'] = _best_time(check.optimized, dataset, self.repeat)
+            if check.projection and isinstance(reference, pd.DataFrame) and isinstance(candidate, pd.DataFrame):
+                reference = reference[[col for col in candidate.columns if col in reference.columns]]
+            divergence = compare(reference, candidate, check.rtol, check.atol)
+            if divergence is not None:
+                row['status'], row['detail'] = STATUS_DIVERGENT, divergence
+        except Exception as e:
+            row['status'], row['detail'] = STATUS_ERROR, f"{type(e).__name__}: {e}"
+        if row['optimized_s'] > 0:
+            row['speedup'] = row['reference_s'] / row['optimized_s']
+        self.results.append(row)
+        return row
+
+    def run(self, datasets, groups=None):
+        """Executa todas as verificações (ou só as dos grupos pedidos) em cada dataset"""
+        for dataset in datasets:
+            print(f"🔍 Dataset {dataset.name}")
+            if dataset.data_dir is not None:
+                dataset.prepare()
+            for check in self.checks:
+                if groups and check.group not in groups:
+                    continue
+                row = self.run_check(check, dataset)
+                icon = {STATUS_OK: "✅", STATUS_DIVERGENT: "❌", STATUS_ERROR: "⚠️"}[row['status']]
+                speedup = f"{row['speedup']:.1f}x" if pd.notna(row['speedup']) else "-"
+                print(f"   {icon} {check.group}/{check.name}: {speedup}" + (f" — {row['detail']}" if row['detail'] else ""))
+        return self.report()
+
+    def report(self):
+        return pd.DataFrame(self.results, columns=[
+            'group', 'check', 'dataset', 'status', 'detail', 'reference_s', 'optimized_s', 'speedup'
+        ])
+
+    def failures(self):
+        report = self.report()
+        return report[report['status'] != STATUS_OK]
+
+    def print_summary(self):
+        """Ganho mediano por verificação e lista de divergências"""
+        report = self.report()
+        if report.empty:
+            print("Nenhuma verificação executada")
+            return
+        print("\n⏱️ Ganho de tempo (mediana entre datasets):")
+        summary = report.groupby(['group', 'check'], sort=False).agg(
+            speedup=('speedup', 'median'), ok=('status', lambda status: (status == STATUS_OK).sum()), runs=('status', 'size')
+        )
+        for (group, check), row in summary.iterrows():
+            speedup = f"{row['speedup']:6.1f}x" if pd.notna(row['speedup']) else "     -"
+            print(f"   {group + '/' + check:<48} {speedup}  {int(row['ok'])}/{int(row['runs'])} equivalentes")
+
+        failures = self.failures()
+        if failures.empty:
+            print("✅ Todos os caminhos otimizados são equivalentes à referência")
+        else:
+            print(f"❌ {len(failures)} divergência(s):")
+            for row in failures.itertuples():
+                speedup = f"{row.speedup:.1f}x" if pd.notna(row.speedup) else "-"
+                print(f"   {row.group}/{row.check} [{row.dataset}] ({speedup}): {row.detail}")
+
+
+# Referências em pandas puro para os kernels numéricos
+
+def _hour_histogram_reference(timestamps):
+    return timestamps.dt.hour.value_counts().reindex(range(24), fill_value=0).to_numpy()
+
+
+def _weekday_histogram_reference(timestamps):
+    return timestamps.dt.weekday.value_counts().reindex(range(7), fill_value=0).to_numpy()
+
+
+def _crosstab_reference(rows, cols, n_rows, n_cols):
+    return pd.crosstab(rows, cols).reindex(index=range(n_rows), columns=range(n_cols), fill_value=0).to_numpy()
+
+
+def _direction_codes(messages):
+    return pd.factorize(messages['messageDirection'], sort=True)[0]
+
+
+def _operator_codes(data):
+    return data[code_column('pluginConnectionLabel')].to_numpy()
+
+
+def _session_summary_reference(messages):
+    grouped = messages.groupby('sessionID')
+    return pd.DataFrame({
+        'message_count': grouped.size(),
+        'inbound': grouped['messageDirection'].agg(lambda direction: (direction == 'inbound').sum()),
+        'outbound': grouped['messageDirection'].agg(lambda direction: (direction == 'outbound').sum()),
+        'first_message_at': grouped['createdAt'].min(),
+        'last_message_at': grouped['createdAt'].max()
+    })
+
+
+def _session_summary_optimized(processor):
+    summary = SessionIndex(processor.messages, processor.ids).summary()
+    summary.index = summary.index.astype(processor.messages['sessionID'].dtype)
+    return summary.sort_index()
+
+
+def _sweep_inputs(sessions):
+    """Intervalos de atendimento e fila, códigos de síndico e grade de minutos comuns às duas versões"""
+    intervals = session_intervals(sessions)
+    groups, labels = pd.factorize(sessions['pluginConnectionLabel'], sort=True)
+    bounds = np.concatenate([values[values >= 0] for pair in intervals.values() for values in pair])
+    origin = int(bounds.min()) // NS_PER_MINUTE * NS_PER_MINUTE
+    n_bins = -((origin - int(bounds.max())) // NS_PER_MINUTE)
+    return intervals, groups, len(labels), origin, n_bins
+
+
+def _sweep_reference(sessions):
+    """Nível por evento com sort_values + cumsum por grupo; minuto = max(nível no início, níveis dentro)"""
+    intervals, groups, n_groups, origin, n_bins = _sweep_inputs(sessions)
+    results = {}
+    for kind, (starts, ends) in intervals.items():
+        keep = (starts >= 0) & (groups >= 0)
+        events = pd.DataFrame({
+            'time': np.concatenate([starts[keep], ends[keep]]),
+            'group': np.concatenate([groups[keep], groups[keep]]),
+            'step': np.concatenate([np.ones(keep.sum(), dtype=np.int64), np.full(keep.sum(), -1, dtype=np.int64)])
+        }).sort_values(['group', 'time', 'step'], kind='stable')
+        events['level'] = events.groupby('group')['step'].cumsum()
+
+        # Último nível antes de cada minuto (merge_asof por grupo) e maior nível após inícios no minuto
+        grid = pd.MultiIndex.from_product(
+            [origin + np.arange(n_bins, dtype=np.int64) * NS_PER_MINUTE, range(n_groups)], names=['time', 'group']
+        ).to_frame(index=False)
+        at_start = pd.merge_asof(
+            grid.sort_values('time', kind='stable'), events[['time', 'group', 'level']].sort_values('time', kind='stable'),
+            on='time', by='group', allow_exact_matches=True
+        )
+        matrix = np.zeros((n_bins, n_groups), dtype=np.int64)
+        np.maximum.at(matrix, ((at_start['time'].to_numpy() - origin) // NS_PER_MINUTE, at_start['group'].to_numpy()),
+                      at_start['level'].fillna(0).to_numpy(dtype=np.int64))
+        inside = events[events['step'] > 0]
+        in_minute = inside.groupby([(inside['time'] - origin) // NS_PER_MINUTE, 'group'])['level'].max()
+        np.maximum.at(matrix, (in_minute.index.get_level_values(0).to_numpy(), in_minute.index.get_level_values(1).to_numpy()),
+                      in_minute.to_numpy())
+        results[kind] = (matrix, events.groupby('group')['level'].max().reindex(range(n_groups), fill_value=0).to_numpy())
+    return results
+
+
+def _sweep_optimized(sessions):
+    intervals, groups, n_groups, origin, n_bins = _sweep_inputs(sessions)
+    results = {}
+    for kind, (starts, ends) in intervals.items():
+        matrix, peaks, _ = sweep(starts, ends, groups, n_groups, origin, n_bins)
+        results[kind] = (matrix, peaks)
+    return results
+
+
+def _required_agents_reference(profile):
+    """Atendentes por faixa incrementando N com a recursão de Erlang B (um laço por faixa)"""
+    traffic = np.nan_to_num(profile['arrival_rate'].to_numpy() * profile['handle_seconds'].to_numpy() / 3600)
+    agents = []
+    for load, handle in zip(traffic, profile['handle_seconds'].fillna(1.0)):
+        if load <= 0:
+            agents.append(0)
+            continue
+        n, blocking = 0, 1.0
+        while True:
+            n += 1
+            blocking = load * blocking / (n + load * blocking)
+            if n > load:
+                wait = n * blocking / (n - load * (1 - blocking))
+                if 1 - wait * np.exp(-(n - load) * DEFAULT_TARGET_SECONDS / handle) >= DEFAULT_TARGET_LEVEL:
+                    break
+        agents.append(n)
+    return np.array(agents, dtype=np.int64)
+
+
+def _required_agents_optimized(profile):
+    traffic = profile['arrival_rate'].to_numpy() * profile['handle_seconds'].to_numpy() / 3600
+    return required_agents(traffic, profile['handle_seconds'].to_numpy(), DEFAULT_TARGET_LEVEL, DEFAULT_TARGET_SECONDS)
+
+
+def _cohort_reference(sessions):
+    """Contatos ativos por coorte e semana com groupby sobre contactID e datas"""
+    data = sessions.dropna(subset=['contactID', 'createdAt'])
+    week = data['createdAt'].dt.to_period('W-SUN').dt.start_time.rename('cohort_week')
+    first = week.groupby(data['contactID']).transform('min')
+    offset = ((week - first).dt.days // 7).rename('weeks_since_first')
+    active = data['contactID'].groupby([first.rename('cohort_week'), offset]).nunique().unstack(fill_value=0)
+    n_weeks = (week.max() - week.min()).days // 7 + 1
+    return active.reindex(columns=range(n_weeks), fill_value=0).to_numpy()
+
+
+def _cohort_optimized(sessions):
+    return cohort_retention(sessions[code_column('contactID')].to_numpy(), sessions['createdAt'])['active_contacts'].to_numpy()
+
+
+def _reference_tokens(text):
+    """Tokens de um texto com unicodedata + re (sem acentos, minúsculas, palavras longas em pedaços)"""
+    if not isinstance(text, str):
+        return []
+    folded = ''.join(ch for ch in unicodedata.normalize('NFKD', text) if not unicodedata.combining(ch))
+    return [token for word in re.findall(r'[^\W_]+', folded.lower())
+            for token in (word[i:i + MAX_TERM_LENGTH] for i in range(0, len(word), MAX_TERM_LENGTH))]
+
+
+def _reopen_reference(sessions):
+    """Sessão seguinte de cada contato com groupby + shift sobre contactID"""
+    # Datas no horário local, sem fuso (as colunas podem vir com e sem fuso)
+    local = lambda col: col.dt.tz_localize(None) if isinstance(col.dtype, pd.DatetimeTZDtype) else col
+    data = sessions.assign(createdAt=local(sessions['createdAt']), closedAt=local(sessions['closedAt']))
+    data = data.dropna(subset=['contactID', 'createdAt']).sort_values(['contactID', 'createdAt'], kind='stable')
+    gap = data.groupby('contactID')['createdAt'].shift(-1) - data['closedAt']
+    horizon = data['createdAt'].max()
+    flags = pd.DataFrame({'closed_sessions': data['closedAt'].notna()})
+    for hours in REOPEN_WINDOWS_HOURS:
+        window = pd.Timedelta(hours=hours)
+        flags[f'observed_{hours}h'] = data['closedAt'].notna() & (data['closedAt'] <= horizon - window)
+        flags[f'reopened_{hours}h'] = flags[f'observed_{hours}h'] & (gap >= pd.Timedelta(0)) & (gap <= window)
+
+    def with_rates(table):
+        columns = ['closed_sessions']
+        for hours in REOPEN_WINDOWS_HOURS:
+            table[f'reopen_{hours}h_pct'] = (table[f'reopened_{hours}h'] / table[f'observed_{hours}h'] * 100).round(2)
+            columns += [f'observed_{hours}h', f'reopened_{hours}h', f'reopen_{hours}h_pct']
+        return table[columns]
+
+    totals = flags.sum().astype(np.int64)
+    longest = flags[f'reopened_{max(REOPEN_WINDOWS_HOURS)}h']
+    summary = {'closed_sessions': int(totals['closed_sessions'])}
+    for hours in REOPEN_WINDOWS_HOURS:
+        observed, reopened = int(totals[f'observed_{hours}h']), int(totals[f'reopened_{hours}h'])
+        summary.update({f'observed_{hours}h': observed, f'reopened_{hours}h': reopened,
+                        f'reopen_{hours}h_pct': round(reopened / observed * 100, 2) if observed else None})
+    summary['median_hours_to_reopen'] = gap[longest].median() / pd.Timedelta(hours=1) if longest.any() else None
+
+    result = {'summary': summary}
+    for key, column in (('by_motive', 'closeMotive'), ('by_group', 'pluginConnectionLabel')):
+        table = flags.groupby(data[column].astype(object), observed=True).sum().astype(np.int64)
+        result[key] = with_rates(table[table['closed_sessions'] > 0].rename_axis(column)).sort_index()
+    return result
+
+
+def _reopen_optimized(sessions):
+    result = session_reopens(
+        sessions[code_column('contactID')].to_numpy(), sessions['createdAt'], sessions['closedAt'],
+        motives=sessions['closeMotive'], groups=sessions['pluginConnectionLabel']
+    )
+    for key in ('by_motive', 'by_group'):
+        table = result[key]
+        table.index = table.index.astype(object)
+        result[key] = table.sort_index()
+    return result
+
+
+def _search_reference(messages, queries):
+    """Varredura de todas as mensagens a cada consulta (unicodedata + re por texto)"""
+    def contains(terms, item):
+        kind, value = item
+        if kind == 'term':
+            return value in terms
+        if kind == 'prefix':
+            return any(term.startswith(value) for term in terms)
+        return any(tuple(terms[i:i + len(value)]) == value for i in range(len(terms) - len(value) + 1))
+
+    created = messages['createdAt']
+    if isinstance(created.dtype, pd.DatetimeTZDtype):
+        created = created.dt.tz_localize(None)
+    results = {}
+    for query in queries:
+        clauses = parse_query(query)
+        found = [
+            any(all(contains(terms, item) for item in clause) for clause in clauses)
+            for terms in map(_reference_tokens, messages['messageValue'])
+        ]
+        hits = pd.DataFrame({'sessionID': messages['sessionID'], 'createdAt': created})[found].dropna(subset=['sessionID'])
+        grouped = hits.groupby('sessionID')['createdAt']
+        results[query] = pd.DataFrame({
+            'matches': grouped.size(), 'first_match_at': grouped.min(), 'last_match_at': grouped.max()
+        })
+    return results
+
+
+def _search_optimized(index, queries):
+    return {query: index.search_sessions(query).sort_index() for query in queries}
+
+
+def _term_inputs(messages):
+    """Textos das mensagens recebidas e o dia de cada uma"""
+    inbound = messages[(messages['messageDirection'] == 'inbound') & messages['messageValue'].notna()]
+    days = message_days(inbound['createdAt'])
+    return inbound['messageValue'][days >= 0], days[days >= 0]
+
+
+def _term_counts_reference(texts, days):
+    """Counter de (dia, termo) e (dia, bigrama) mensagem a mensagem"""
+    counter = Counter()
+    for text, day in zip(texts, days):
+        terms = _reference_tokens(text)
+        valid = [len(term) > 1 and not term.isdigit() and term not in STOPWORDS for term in terms]
+        counter.update((int(day), 1, term) for term, ok in zip(terms, valid) if ok)
+        counter.update(
+            (int(day), 2, f"{terms[i]} {terms[i + 1]}") for i in range(len(terms) - 1) if valid[i] and valid[i + 1]
+        )
+    table = pd.DataFrame([(*key, count) for key, count in counter.items()], columns=['day', 'ngram', 'term', 'count'])
+    return table.sort_values(['day', 'ngram', 'term'], ignore_index=True)
+
+
+def _term_counts_optimized(texts, days):
+    result = term_counts(texts, days)
+    counts = result['counts']
+    table = pd.DataFrame({
+        'day': counts['day'].to_numpy(), 'ngram': counts['ngram'].to_numpy().astype(np.int64),
+        'term': result['vocabulary'].reindex(counts['hash']).to_numpy(), 'count': counts['count'].to_numpy()
+    })
+    return table.sort_values(['day', 'ngram', 'term'], ignore_index=True)
+
+
+# Referências em pandas puro dos agregados do app (a partir das sessões filtradas)
+
+def _metrics_reference(data):
+    inactivity_count = int((data['closeMotive'] == 'INACTIVITY').sum())
+    return {
+        'total_sessions': len(data),
+        'unique_contacts': data['contactID'].nunique(),
+        'avg_duration': data['__sessionDuration'].mean(),
+        'avg_queue_duration': data['__sessionQueueDuration'].mean(),
+        'inactivity_count': inactivity_count,
+        'inactivity_percentage': (inactivity_count / len(data) * 100) if len(data) > 0 else 0
+    }
+
+
+def _daily_reference(data):
+    return data.groupby('date').size().reset_index(name='count')
+
+
+def _hourly_reference(data):
+    return data.groupby(data['createdAt'].dt.hour.rename('hour')).size().reset_index(name='count')
+
+
+def _operators_reference(data):
+    operator_sessions = data.groupby('pluginConnectionLabel').agg({
+        'sessionID': 'count',
+        '__sessionDuration': 'mean',
+        '__sessionQueueDuration': 'mean',
+        '__sessionMessagesCount': 'mean'
+    }).round(2)
+    operator_sessions.columns = ['Total de Sessões', 'Duração Média', 'Tempo de Espera Médio', 'Mensagens Média']
+    return operator_sessions.sort_values('Total de Sessões', ascending=False)
+
+
+def _day_operator_reference(data):
+    table = pd.crosstab(data['createdAt'].dt.day.rename('day'), data['pluginConnectionLabel'])
+    return table.loc[table.sum(axis=1) > 0, table.sum(axis=0) > 0].astype(np.int64)
+
+
+def _day_operator_optimized(aggregates):
+    # Mesma conta de app.day_operator_aggregate (dia x síndico a partir dos agregados)
+    labels = pd.Index(sorted(aggregates['pluginConnectionLabel'].dropna().unique()), name='pluginConnectionLabel')
+    codes = pd.Categorical(aggregates['pluginConnectionLabel'], categories=labels).codes
+    days = pd.to_datetime(aggregates['date']).dt.day.to_numpy()
+    keep = codes >= 0
+    matrix = np.zeros((31, len(labels)), dtype=np.int64)
+    np.add.at(matrix, (days[keep] - 1, codes[keep]), aggregates['sessions'].to_numpy()[keep])
+    rows = matrix.sum(axis=1) > 0
+    return pd.DataFrame(
+        matrix[rows], index=pd.Index(np.arange(1, 32)[rows], name='day'), columns=labels
+    ).loc[:, matrix.sum(axis=0) > 0]
+
+
+def _weekday_reference(data):
+    counts = data['createdAt'].dt.weekday.value_counts().reindex(range(7), fill_value=0)
+    return pd.DataFrame({'weekday_pt': WEEKDAY_NAMES, 'count': counts.to_numpy()})
+
+
+# Agregado: (referência sobre as sessões, caminho otimizado sobre os agregados,
+# se o caminho otimizado também precisa das sessões filtradas)
+APP_AGGREGATES = {
+    'metrics': (_metrics_reference, session_metrics, True),
+    'daily': (_daily_reference, daily_sessions, False),
+    'hourly': (_hourly_reference, hourly_sessions, False),
+    'operators': (_operators_reference, operator_summary, False),
+    'day_operator': (_day_operator_reference, _day_operator_optimized, False),
+    'weekday': (_weekday_reference, weekday_sessions, False)
+}
+
+
+def _app_check(name, reference, optimized, needs_sessions):
+    """Agregado do app em cada recorte: pandas sobre as sessões vs agregados pré-calculados"""
+    def run_reference(dataset):
+        data = dataset.dashboard_data()
+        return {label: reference(filter_sessions(data, *bounds)) for label, bounds in dataset.filters().items()}
+
+    def run_optimized(dataset):
+        data, aggregates = dataset.dashboard_data(), dataset.dashboard_aggregates()
+        results = {}
+        for label, bounds in dataset.filters().items():
+            args = [filter_sessions(data, *bounds)] if needs_sessions else []
+            results[label] = optimized(*args, filter_aggregates(aggregates, *bounds))
+        return results
+
+    return Check('app', name, run_reference, run_optimized)
+
+
+def default_checks():
+    """Verificações de todos os caminhos otimizados do projeto"""
+    checks = []
+    columns = required_columns()
+
+    # DataProcessor: engine pandas com todas as colunas vs Arrow com projeção; leitura em blocos
+    for table in DATA_FILES:
+        checks.append(Check(
+            'DataProcessor', f'load_{table}',
+            lambda dataset, table=table: DataProcessor(dataset.data_dir, csv_engine='pandas').load_table(table),
+            lambda dataset, table=table: DataProcessor(dataset.data_dir, csv_engine='arrow').load_table(
+                table, columns=sorted(columns[table]) if table in columns else None
+            ),
+            projection=True
+        ))
+    for table in ('messages', 'sessions'):
+        checks.append(Check(
+            'DataProcessor', f'iter_table_{table}',
+            lambda dataset, table=table: DataProcessor(dataset.data_dir, csv_engine='pandas').load_table(table),
+            lambda dataset, table=table: pd.concat(
+                list(DataProcessor(dataset.data_dir).iter_table(table, chunk_size=dataset.chunk_size)), ignore_index=True
+            )
+        ))
+
+    # CXAnalytics: dados completos em memória vs projeção, textos em disco e cache de sentimento
+    for analysis in CXAnalytics.REQUIRED_COLUMNS:
+        checks.append(Check(
+            'CXAnalytics', analysis,
+            lambda dataset, analysis=analysis: getattr(dataset.reference_analytics(), analysis)(),
+            lambda dataset, analysis=analysis: getattr(dataset.optimized_analytics(), analysis)()
+        ))
+    for analysis in ChunkedCXAnalytics.ANALYSIS_TABLES:
+        checks.append(Check(
+            'CXAnalytics', f'{analysis} (blocos)',
+            lambda dataset, analysis=analysis: getattr(dataset.reference_analytics(), analysis)(),
+            lambda dataset, analysis=analysis: getattr(
+                ChunkedCXAnalytics(DataProcessor(dataset.data_dir), chunk_size=dataset.chunk_size), analysis
+            )()
+        ))
+
+    # Kernels numéricos vs value_counts/crosstab
+    messages = lambda dataset: dataset.reference_processor().messages
+    sessions = lambda dataset: dataset.dashboard_data()
+    checks += [
+        Check('kernels', 'hour_histogram',
+              lambda d: _hour_histogram_reference(messages(d)['createdAt']),
+              lambda d: hour_histogram(messages(d)['createdAt'])),
+        Check('kernels', 'weekday_histogram',
+              lambda d: _weekday_histogram_reference(messages(d)['createdAt']),
+              lambda d: weekday_histogram(messages(d)['createdAt'])),
+        Check('kernels', 'weekday_hour_matrix',
+              lambda d: _crosstab_reference(messages(d)['createdAt'].dt.weekday, messages(d)['createdAt'].dt.hour, 7, 24),
+              lambda d: weekday_hour_matrix(messages(d)['createdAt'])),
+        Check('kernels', 'hour_group_matrix',
+              lambda d: _crosstab_reference(
+                  messages(d)['createdAt'].dt.hour, pd.Series(_direction_codes(messages(d)), index=messages(d).index).where(lambda c: c >= 0),
+                  24, len(messages(d)['messageDirection'].dropna().unique())),
+              lambda d: hour_group_matrix(
+                  messages(d)['createdAt'], _direction_codes(messages(d)), len(messages(d)['messageDirection'].dropna().unique()))),
+        Check('kernels', 'day_group_matrix',
+              lambda d: _crosstab_reference(
+                  sessions(d)['createdAt'].dt.day - 1, pd.Series(_operator_codes(sessions(d)), index=sessions(d).index).where(lambda c: c >= 0),
+                  31, sessions(d)['pluginConnectionLabel'].nunique()),
+              lambda d: day_group_matrix(
+                  sessions(d)['createdAt'], _operator_codes(sessions(d)), sessions(d)['pluginConnectionLabel'].nunique()))
+    ]
+
+    # Índice CSR por sessão (construção + reduções por segmento) vs groupby
+    checks.append(Check(
+        'kernels', 'session_index',
+        lambda d: _session_summary_reference(messages(d)),
+        lambda d: _session_summary_optimized(d.reference_processor())
+    ))
+
+    # Varredura de intervalos (simultaneidade e fila por minuto) vs eventos em pandas
+    checks.append(Check(
+        'kernels', 'interval_sweep',
+        lambda d: _sweep_reference(sessions(d)),
+        lambda d: _sweep_optimized(sessions(d))
+    ))
+
+    # Erlang C vetorizado (faixas x candidatos, em log) vs recursão de Erlang B por faixa
+    staffing_profile = lambda d: arrival_profile(sessions(d), group_column='pluginConnectionLabel')
+    checks.append(Check(
+        'kernels', 'required_agents',
+        lambda d: _required_agents_reference(staffing_profile(d)),
+        lambda d: _required_agents_optimized(staffing_profile(d))
+    ))
+
+    # Coortes de contatos (códigos + semanas inteiras + bincount) vs groupby
+    checks.append(Check(
+        'kernels', 'cohort_retention',
+        lambda d: _cohort_reference(sessions(d)),
+        lambda d: _cohort_optimized(sessions(d))
+    ))
+
+    # Reabertura de sessões: duas ordenações + arrays deslocados vs groupby/shift por contato
+    checks.append(Check(
+        'kernels', 'session_reopens',
+        lambda d: _reopen_reference(sessions(d)),
+        lambda d: _reopen_optimized(sessions(d))
+    ))
+
+    # Busca nas mensagens: índice invertido (delta + posições) vs varredura dos textos
+    checks.append(Check(
+        'kernels', 'text_search',
+        lambda d: _search_reference(messages(d), SEARCH_QUERIES),
+        lambda d: _search_optimized(d.text_index(), SEARCH_QUERIES)
+    ))
+
+    # Termos por dia: hashes + ordenação das chaves (dia, hash) vs Counter por mensagem
+    term_inputs = lambda d: d.get('term_inputs', lambda: _term_inputs(messages(d)))
+    checks.append(Check(
+        'kernels', 'term_counts',
+        lambda d: _term_counts_reference(*term_inputs(d)),
+        lambda d: _term_counts_optimized(*term_inputs(d))
+    ))
+
+    # App: leitura do CSV vs snapshot; agregados por recorte
+    checks.append(Check(
+        'app', 'load_data',
+        lambda dataset: read_sessions(dataset.sessions_file, dashboard_columns()),
+        lambda dataset: load_snapshot_data(dashboard_columns(), dataset.snapshot_dir(), dataset.sessions_file)
+    ))
+    for name, (reference, optimized, needs_sessions) in APP_AGGREGATES.items():
+        checks.append(_app_check(name, reference, optimized, needs_sessions))
+
+    return checks
+
+
+def write_synthetic_exports(data_dir, seed=0, n_sessions=2000, n_messages=10000):
+    """Gera exports CX e o CSV Sindicompany aleatórios (com nulos, textos vazios e acentos)
+
+    Retorna o caminho do CSV Sindicompany.
+    """
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2025-06-01').value
+    span = 45 * 24 * 3600 * 10**9
+
+    def timestamps(n, missing=0.0, iso=True):
+        values = pd.Series(pd.to_datetime(rng.integers(start, start + span, n)))
+        text = values.dt.strftime('%Y-%m-%dT%H:%M:%S.000Z' if iso else '%Y-%m-%d %-H:%M:%S')
+        return text.mask(rng.random(n) < missing)
+
+    def numbers(low, high, n, missing=0.0):
+        values = rng.integers(low, high, n).astype(float)
+        values[rng.random(n) < missing] = np.nan
+        return values
+
+    session_ids = np.array([f'sess-{seed}-{i}' for i in range(n_sessions)])
+    contact_ids = np.array([f'cont-{seed}-{i}' for i in range(max(1, n_sessions // 3))])
+    operators = ['Ana', 'Bruno', 'Cátia', 'Diego', 'Édson']
+    texts = ['Olá, bom dia', 'obrigado, resolvido!', 'péssimo atendimento, problema sem solução', '', 'ok', 'Não funciona']
+
+    created = timestamps(n_sessions, missing=0.01)
+    queued = pd.to_datetime(created, format='ISO8601') + pd.to_timedelta(rng.integers(0, 900, n_sessions), unit='s')
+    manual = queued + pd.to_timedelta(rng.integers(0, 3600, n_sessions), unit='s')
+    closed = manual + pd.to_timedelta(rng.integers(60, 7200, n_sessions), unit='s')
+    iso = lambda values: values.dt.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    sessions = pd.DataFrame({
+        'sessionID': session_ids,
+        'contactID': rng.choice(contact_ids, n_sessions),
+        'operatorFirstname': pd.Series(rng.choice(operators, n_sessions)).mask(rng.random(n_sessions) < 0.05),
+        'sessionRatingStars': numbers(1, 6, n_sessions, missing=0.6),
+        'queuedAt': iso(queued), 'manualAt': iso(manual).mask(rng.random(n_sessions) < 0.1), 'closedAt': iso(closed),
+        'closeMotive': rng.choice(['RESOLVED', 'INACTIVITY', 'TRANSFER'], n_sessions),
+        'createdAt': created,
+        '__sessionMessagesCount': numbers(1, 60, n_sessions),
+        '__sessionDuration': numbers(0, 20000, n_sessions, missing=0.05),
+        '__sessionQueueDuration': numbers(0, 900, n_sessions, missing=0.05),
+        '__sessionManualDuration': numbers(0, 9000, n_sessions, missing=0.05)
+    })
+    sessions.to_csv(os.path.join(data_dir, DATA_FILES['sessions']), index=False)
+    sessions.assign(pluginConnectionLabel=rng.choice(['Condomínio A', 'Condomínio B'], n_sessions)).to_csv(
+        os.path.join(data_dir, DATA_FILES['sessions_plugins']), index=False
+    )
+
+    pd.DataFrame({
+        'messageID': [f'msg-{seed}-{i}' for i in range(n_messages)],
+        'sessionID': rng.choice(session_ids, n_messages),
+        'contactID': pd.Series(rng.choice(contact_ids, n_messages)).mask(rng.random(n_messages) < 0.02),
+        'operatorID': rng.choice(['op1', 'op2', None], n_messages),
+        'messageDirection': rng.choice(['inbound', 'outbound'], n_messages),
+        'messageKey': rng.choice(['text', 'text', 'text', 'file', 'event'], n_messages),
+        'messageChannel': rng.choice(['whatsapp', 'web', 'email'], n_messages, p=[0.6, 0.3, 0.1]),
+        'messageValue': pd.Series(rng.choice(texts, n_messages)).mask(rng.random(n_messages) < 0.05),
+        'createdAt': timestamps(n_messages)
+    }).to_csv(os.path.join(data_dir, DATA_FILES['messages']), index=False)
+
+    sindicompany_file = os.path.join(data_dir, os.path.basename(SINDICOMPANY_FILE))
+    pd.DataFrame({
+        'sessionID': session_ids,
+        'contactID': sessions['contactID'],
+        'createdAt': timestamps(n_sessions, iso=False),
+        'pluginConnectionLabel': pd.Series(rng.choice([f'{name} - {i:04d}' for i, name in enumerate(operators)], n_sessions)),
+        'queuedAt': sessions['queuedAt'].mask(rng.random(n_sessions) < 0.5),
+        'manualAt': sessions['manualAt'],
+        'closedAt': sessions['closedAt'].mask(rng.random(n_sessions) < 0.02),
+        'closeMotive': sessions['closeMotive'],
+        '__sessionDuration': sessions['__sessionDuration'],
+        '__sessionQueueDuration': sessions['__sessionQueueDuration'],
+        '__sessionMessagesCount': sessions['__sessionMessagesCount'],
+        '__sessionManualDuration': sessions['__sessionManualDuration']
+    }).to_csv(sindicompany_file, index=False)
+    return sindicompany_file
+
+
+def real_dataset(work_dir, data_dir="data", sessions_file=SINDICOMPANY_FILE):
+    """Dataset com os exports reais (None se algum arquivo estiver ausente)"""
+    files = [os.path.join(data_dir, file_name) for file_name in DATA_FILES.values()] + [sessions_file]
+    missing = [file_path for file_path in files if not os.path.exists(file_path)]
+    if missing:
+        print(f"⚠️ Exports reais incompletos, ignorados: {', '.join(missing)}")
+        return None
+    return Dataset('real', data_dir, sessions_file, os.path.join(work_dir, 'real'), chunk_size=50000)
+
+
+def synthetic_datasets(work_dir, seeds, n_sessions=2000, n_messages=10000):
+    """Datasets sintéticos, um por semente"""
+    datasets = []
+    for seed in seeds:
+        data_dir = os.path.join(work_dir, f'synthetic_{seed}')
+        os.makedirs(data_dir, exist_ok=True)
+        sessions_file = write_synthetic_exports(data_dir, seed, n_sessions, n_messages)
+        datasets.append(Dataset(f'sintético-{seed}', data_dir, sessions_file, data_dir, chunk_size=max(100, n_messages // 7)))
+    return datasets
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Equivalência entre caminhos de referência e otimizados')
+    parser.add_argument('--seeds', type=int, default=3, help='Número de datasets sintéticos (padrão: 3)')
+    parser.add_argument('--sessions', type=int, default=2000, help='Sessões por dataset sintético')
+    parser.add_argument('--messages', type=int, default=10000, help='Mensagens por dataset sintético')
+    parser.add_argument('--repeat', type=int, default=3, help='Execuções por caminho (vale o menor tempo)')
+    parser.add_argument('--group', action='append', help='Apenas estes grupos (DataProcessor, CXAnalytics, kernels, app)')
+    parser.add_argument('--no-real', action='store_true', help='Não usar os exports reais de data/')
+    args = parser.parse_args()
+
+    harness = EquivalenceHarness(repeat=args.repeat)
+    with tempfile.TemporaryDirectory() as work_dir:
+        datasets = [] if args.no_real else [real_dataset(work_dir)]
+        datasets = [dataset for dataset in datasets if dataset is not None]
+        datasets += synthetic_datasets(work_dir, range(args.seeds), args.sessions, args.messages)
+        harness.run(datasets, args.group)
+    harness.print_summary()
+    return 1 if not harness.failures().empty else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
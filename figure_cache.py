@@ -0,0 +1,165 @@
+import json
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Limites do cache de figuras: quantidade e bytes do JSON guardado
+DEFAULT_MAX_ENTRIES = 128
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+def _feed(digest, obj):
+    """Acrescenta obj ao hash: tabelas e arrays pelo conteúdo, contêineres item a item"""
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        header = (type(obj).__name__, obj.shape, getattr(obj, 'name', None),
+                  list(obj.columns) if isinstance(obj, pd.DataFrame) else None,
+                  [str(dtype) for dtype in (obj.dtypes if isinstance(obj, pd.DataFrame) else [obj.dtype])],
+                  list(obj.index.names) if not isinstance(obj, pd.Index) else list(obj.names))
+        digest.update(repr(header).encode('utf-8'))
+        try:
+            hashes = pd.util.hash_pandas_object(obj, index=not isinstance(obj, pd.Index))
+        except TypeError:
+            # Células não hasheáveis (listas, dicts): conteúdo serializado
+            digest.update(pickle.dumps(obj))
+        else:
+            digest.update(hashes.to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        digest.update(repr(('ndarray', obj.shape, str(obj.dtype))).encode('utf-8'))
+        if obj.dtype == object:
+            digest.update(pd.util.hash_array(obj.ravel()).tobytes())
+        else:
+            digest.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        digest.update(b'{')
+        for key in sorted(obj, key=repr):
+            digest.update(repr(key).encode('utf-8'))
+            _feed(digest, obj[key])
+        digest.update(b'}')
+    elif isinstance(obj, (list, tuple)):
+        digest.update(b'[')
+        for item in obj:
+            _feed(digest, item)
+        digest.update(b']')
+    else:
+        digest.update(repr(obj).encode('utf-8'))
+
+
+def figure_key(data, spec):
+    """Chave de uma figura: hash do agregado de entrada e da especificação do gráfico"""
+    digest = hashlib.blake2b(digest_size=16)
+    _feed(digest, data)
+    _feed(digest, spec)
+    return digest.hexdigest()
+
+
+class FigureCache:
+    """Figuras do plotly serializadas em JSON, por hash dos dados e da especificação
+
+    Construir uma figura do plotly express leva dezenas de milissegundos;
+    reconstruí-la do JSON guardado, cerca de um. O cache é limitado em
+    quantidade e em bytes, descarta a figura usada há mais tempo (LRU) e
+    conta acertos, faltas e descartes. Cada leitura devolve uma figura nova,
+    que pode ser alterada sem afetar o cache.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Figura guardada em key (None se ausente; conta acerto ou falta)"""
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        import plotly.graph_objects as go
+        # JSON gerado pelo próprio plotly: a validação (a parte cara) é dispensada
+        return go.Figure(json.loads(payload), _validate=False)
+
+    def put(self, key, figure):
+        """Guarda a figura serializada e descarta as usadas há mais tempo acima dos limites"""
+        import plotly.io as pio
+        payload = pio.to_json(figure, validate=False)
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = payload
+            self._bytes += len(payload)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def figure(self, data, spec, build):
+        """Figura de build() para os dados e a especificação, do cache quando já construída
+
+        spec deve conter tudo o que build usa além de data (tipo de gráfico,
+        parâmetros, layout), senão figuras diferentes dividiriam a chave.
+        """
+        key = figure_key(data, spec)
+        figure = self.get(key)
+        if figure is None:
+            figure = build()
+            self.put(key, figure)
+        return figure
+
+    def clear(self):
+        """Esvazia o cache (os contadores são mantidos)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Figuras e bytes guardados, acertos, faltas, descartes e taxa de acerto (%)"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups * 100 if lookups else None
+            }
+
+
+# Cache compartilhado pelo dashboard e por create_advanced_charts
+FIGURE_CACHE = FigureCache()
+
+
+def cached_chart(kind, data=None, layout=None, traces=None, cache=None, **kwargs):
+    """px.<kind>(data, **kwargs) com update_traces(**traces) e update_layout(**layout), via cache
+
+    O plotly só é importado quando a figura precisa ser construída.
+    """
+    cache = FIGURE_CACHE if cache is None else cache
+    spec = {'kind': kind, 'kwargs': kwargs, 'layout': layout, 'traces': traces}
+
+    def build():
+        import plotly.express as px
+        figure = getattr(px, kind)(data, **kwargs) if data is not None else getattr(px, kind)(**kwargs)
+        if traces:
+            figure.update_traces(**traces)
+        if layout:
+            figure.update_layout(**layout)
+        return figure
+
+    return cache.figure(data, spec, build)
@@ -0,0 +1,54 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: travas do msvcrt
+    fcntl = None
+
+# Arquivo de trava criado dentro de cada diretório de dados processados
+LOCK_FILE = ".lock"
+
+
+@contextmanager
+def directory_lock(directory):
+    """Trava exclusiva, entre processos e threads, sobre um diretório de dados processados
+
+    O dashboard e o daemon de ingestão atualizam os mesmos diretórios
+    (índice de busca, contagens de termos, amostra): quem escreve segura a
+    trava do início da leitura do estado atual até a gravação do manifesto.
+    Não é reentrante: não chame de novo dentro do mesmo bloco.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def replace_file(path, write):
+    """Grava em um temporário de nome único (write recebe o arquivo aberto) e o troca atomicamente"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
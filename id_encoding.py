@@ -0,0 +1,113 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+# Colunas de ID (UUIDs) compartilhadas entre mensagens, sessões e plugins
+ID_COLUMNS = ['sessionID', 'contactID', 'operatorID']
+
+# Código usado para IDs ausentes (NaN)
+MISSING_CODE = -1
+
+
+def code_column(column):
+    """Nome da coluna codificada correspondente a uma coluna de ID"""
+    return f"{column}_code"
+
+
+def count_unique(codes):
+    """Conta códigos distintos (equivalente a nunique) via bincount"""
+    codes = np.asarray(codes)
+    codes = codes[codes != MISSING_CODE]
+    if codes.size == 0:
+        return 0
+    return int(np.count_nonzero(np.bincount(codes)))
+
+
+class IDDictionary:
+    """Dicionário global que mapeia cada UUID para um código int32 denso
+
+    Cada tipo de ID (sessionID, contactID, operatorID) tem seu próprio espaço
+    de códigos, compartilhado por todas as tabelas: a mesma sessão recebe o
+    mesmo código em mensagens, sessões e sessões com plugins. A codificação é
+    protegida por um lock, pois as tabelas podem ser carregadas em paralelo.
+    """
+
+    def __init__(self, kinds=None):
+        self._values = {}
+        self._index = {}
+        self._lock = threading.Lock()
+        for kind in (kinds or ID_COLUMNS):
+            self._set_values(kind, np.array([], dtype=object))
+
+    def _set_values(self, kind, values):
+        self._values[kind] = values
+        self._index[kind] = pd.Index(values, dtype=object)
+
+    @property
+    def kinds(self):
+        return list(self._values.keys())
+
+    def size(self, kind):
+        """Quantidade de IDs distintos conhecidos para o tipo"""
+        return len(self._values[kind])
+
+    def encode(self, kind, values):
+        """Converte IDs em códigos int32, registrando IDs novos no dicionário"""
+        values = np.asarray(values, dtype=object)
+        with self._lock:
+            if kind not in self._values:
+                self._set_values(kind, np.array([], dtype=object))
+
+            codes = self._index[kind].get_indexer(values)
+
+            # Registrar apenas IDs ainda não vistos (novos códigos vão para o final)
+            new_mask = (codes == -1) & pd.notna(values)
+            if new_mask.any():
+                new_values = pd.unique(values[new_mask])
+                self._set_values(kind, np.concatenate([self._values[kind], new_values]))
+                codes = self._index[kind].get_indexer(values)
+
+        return codes.astype(np.int32)
+
+    def lookup(self, kind, values):
+        """Códigos de IDs já conhecidos, sem registrar novos (desconhecidos = MISSING_CODE)"""
+        values = np.asarray(values, dtype=object)
+        if kind not in self._index:
+            return np.full(len(values), MISSING_CODE, dtype=np.int32)
+        return self._index[kind].get_indexer(values).astype(np.int32)
+
+    def decode(self, kind, codes):
+        """Converte códigos de volta para os IDs originais (NaN para ausentes)"""
+        codes = np.asarray(codes)
+        decoded = np.full(len(codes), np.nan, dtype=object)
+        valid = codes != MISSING_CODE
+        decoded[valid] = self._values[kind].take(codes[valid])
+        return decoded
+
+    def encode_frame(self, df):
+        """Adiciona colunas <id>_code para todas as colunas de ID presentes"""
+        for column in ID_COLUMNS:
+            if column in df.columns:
+                df[code_column(column)] = self.encode(column, df[column].to_numpy())
+        return df
+
+    def save(self, file_path):
+        """Persiste o dicionário em CSV (a ordem das linhas define o código)"""
+        frames = [
+            pd.DataFrame({'kind': kind, 'value': values})
+            for kind, values in self._values.items()
+        ]
+        pd.concat(frames, ignore_index=True).to_csv(file_path, index=False)
+
+    @classmethod
+    def load(cls, file_path):
+        """Carrega um dicionário salvo com save()"""
+        ids = cls()
+        if not os.path.exists(file_path):
+            return ids
+
+        df = pd.read_csv(file_path, dtype=str, keep_default_na=False)
+        for kind, group in df.groupby('kind', sort=False):
+            ids._set_values(kind, group['value'].to_numpy(dtype=object))
+        return ids
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Daemon de ingestão contínua dos exports de sessões
+
+Observa o diretório de dados (polling de mtime/tamanho), lê apenas os
+arquivos novos ou alterados, incorpora as sessões ao snapshot do dashboard
+por sessionID e atualiza os agregados de forma incremental. Cada ingestão
+grava uma nova VERSION no snapshot, que os dashboards em execução observam.
+As sessões novas também são sorteadas para a amostra estratificada do
+dashboard (sampling.py), sem reler as antigas.
+As mensagens novas do export de mensagens também entram no índice de busca
+(text_index.py) e nas contagens diárias de termos (term_stats.py).
+
+Uso:
+    python ingest_daemon.py                 # observa data/ a cada 5 segundos
+    python ingest_daemon.py --once          # processa pendências e sai
+    python ingest_daemon.py --backfill      # inclui exports já existentes
+    python ingest_daemon.py --no-text-index # não atualiza o índice de busca nas mensagens
+    python ingest_daemon.py --no-term-stats # não atualiza as contagens de termos
+    python ingest_daemon.py --no-sample     # não atualiza a amostra de sessões
+"""
+
+import os
+import glob
+import time
+import argparse
+import pandas as pd
+from data_processor import DATA_FILES
+from text_index import TextIndex, TEXT_INDEX_DIR
+from term_stats import TermStats, TERM_STATS_DIR
+from sampling import SessionSample, SAMPLE_DIR
+from dashboard_data import (
+    SINDICOMPANY_FILE, SNAPSHOT_DIR, dashboard_columns, read_sessions, upsert_sessions,
+    source_fingerprint, read_manifest, save_snapshot, prewarm, read_snapshot, load_snapshot_ids
+)
+
+# Exports de sessões Sindicompany observados no diretório de dados
+SESSIONS_PATTERN = glob.escape("[ Talqui ] Sindicompany - ") + "*.csv"
+REQUIRED_HEADER = ['sessionID', 'createdAt']
+POLL_INTERVAL = 5
+
+class IngestionDaemon:
+    """Incorpora novos exports de sessões ao snapshot do dashboard"""
+
+    def __init__(self, data_dir="data", snapshot_dir=SNAPSHOT_DIR, pattern=SESSIONS_PATTERN,
+                 columns=None, file_path=SINDICOMPANY_FILE, backfill=False, text_index_dir=None,
+                 term_stats_dir=None, sample_dir=None):
+        self.data_dir = data_dir
+        self.snapshot_dir = snapshot_dir
+        self.pattern = pattern
+        self.columns = dashboard_columns() if columns is None else columns
+        self.file_path = file_path
+        self.backfill = backfill
+        # Índice de busca nas mensagens (None desativa)
+        self.text_index = TextIndex(text_index_dir) if text_index_dir else None
+        # Contagens diárias de termos das mensagens recebidas (None desativa)
+        self.term_stats = TermStats(term_stats_dir) if term_stats_dir else None
+        # Amostra estratificada das sessões do dashboard (None desativa)
+        self.sample = SessionSample(sample_dir) if sample_dir else None
+        self.messages_path = os.path.join(data_dir, DATA_FILES['messages'])
+
+    def scan(self):
+        """Arquivos observados e suas impressões digitais atuais"""
+        files = {}
+        for file_path in glob.glob(os.path.join(self.data_dir, self.pattern)):
+            try:
+                files[file_path] = source_fingerprint(file_path)
+            except OSError:
+                # Arquivo removido entre o glob e o stat
+                continue
+        return files
+
+    def _base_manifest(self):
+        """Manifesto do snapshot atual, construindo o snapshot base se necessário"""
+        manifest = read_manifest(self.snapshot_dir)
+        if manifest is None or not set(self.columns) <= set(manifest.get('columns') or []):
+            manifest = prewarm(self.columns, self.snapshot_dir, self.file_path)
+        return manifest
+
+    def _baseline(self, manifest):
+        """Arquivos considerados já vistos na primeira execução
+
+        Sem --backfill, os exports presentes ao iniciar não são incorporados;
+        apenas os que chegarem (ou mudarem) depois disso.
+        """
+        watched = dict(manifest.get('sources') or {})
+        if not self.backfill:
+            watched.update(self.scan())
+        return watched
+
+    def pending(self, manifest):
+        """Arquivos novos ou alterados desde a última ingestão, do mais antigo ao mais novo"""
+        watched = manifest.get('watched') or {}
+        changed = [
+            (fingerprint['mtime_ns'], file_path)
+            for file_path, fingerprint in self.scan().items()
+            if watched.get(file_path) != fingerprint
+        ]
+        return [file_path for _, file_path in sorted(changed)]
+
+    def _has_sessions_header(self, file_path):
+        """Verifica se o CSV tem as colunas mínimas de um export de sessões"""
+        try:
+            header = pd.read_csv(file_path, nrows=0).columns
+        except Exception:
+            return False
+        return all(col in header for col in REQUIRED_HEADER)
+
+    def ingest(self, paths, manifest):
+        """Lê os arquivos indicados e os incorpora ao snapshot"""
+        data, aggregates = read_snapshot(self.snapshot_dir)
+        ids = load_snapshot_ids(self.snapshot_dir)
+        sources = dict(manifest.get('sources') or {})
+        watched = dict(manifest.get('watched') or {})
+        ingested = []
+
+        for file_path in paths:
+            fingerprint = source_fingerprint(file_path)
+            watched[file_path] = fingerprint
+            if not self._has_sessions_header(file_path):
+                print(f"⚠️ Ignorado (não é um export de sessões): {file_path}")
+                continue
+
+            start = time.time()
+            new_rows = read_sessions(file_path, self.columns, ids)
+            data, aggregates, replaced = upsert_sessions(data, aggregates, new_rows)
+            ingested.append(new_rows)
+            sources[file_path] = fingerprint
+            print(f"📥 {os.path.basename(file_path)}: {len(new_rows):,} sessões "
+                  f"({replaced:,} atualizadas) em {time.time() - start:.2f}s")
+
+        saved = save_snapshot(
+            data, aggregates, self.columns, self.snapshot_dir, self.file_path,
+            ids=ids, sources=sources, watched=watched
+        )
+        self.update_sample(data, aggregates, ingested, manifest.get('version'), saved['version'])
+        return saved
+
+    def update_sample(self, data, aggregates, ingested, previous_version, version):
+        """Sorteia as sessões novas para a amostra (refeita do snapshot se não estiver na versão anterior)"""
+        if self.sample is None:
+            return
+        start = time.time()
+        manifest = None
+        if self.sample.snapshot_version() == previous_version:
+            new_rows = pd.concat(ingested, ignore_index=True) if ingested else data.iloc[0:0]
+            manifest = self.sample.update(new_rows, aggregates, version, base_version=previous_version)
+        if manifest is None:
+            manifest = self.sample.rebuild(data, aggregates, version)
+        print(f"🎲 Amostra: {manifest['rows']:,} de {manifest['population']:,} sessões em {time.time() - start:.2f}s")
+
+    def update_message_stores(self):
+        """Incorpora as mensagens novas do export de mensagens ao índice de busca e às contagens de termos"""
+        stores = [
+            ("🔎 Índice de busca", self.text_index),
+            ("🔤 Contagens de termos", self.term_stats)
+        ]
+        for label, store in stores:
+            if store is None:
+                continue
+            start = time.time()
+            added = store.sync(self.messages_path)
+            if added:
+                print(f"{label}: {added:,} mensagens novas em {time.time() - start:.2f}s")
+
+    def run_once(self):
+        """Processa os arquivos pendentes; retorna o número de arquivos lidos"""
+        self.update_message_stores()
+        manifest = self._base_manifest()
+        if manifest is None:
+            return 0
+
+        first_run = manifest.get('watched') is None
+        if first_run:
+            manifest['watched'] = self._baseline(manifest)
+
+        paths = self.pending(manifest)
+        if not paths and not first_run:
+            return 0
+
+        manifest = self.ingest(paths, manifest)
+        if paths:
+            print(f"✅ Snapshot versão {manifest['version']}: {manifest['rows']:,} sessões")
+        return len(paths)
+
+    def run(self, interval=POLL_INTERVAL):
+        """Observa o diretório até ser interrompido"""
+        print(f"👀 Observando {self.data_dir}/ ({self.pattern}) a cada {interval}s")
+        try:
+            while True:
+                try:
+                    self.run_once()
+                except Exception as e:
+                    print(f"❌ Erro na ingestão: {str(e)}")
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("\n👋 Ingestão encerrada")
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestão contínua dos exports de sessões")
+    parser.add_argument("--data-dir", default="data", help="Diretório observado")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR, help="Diretório do snapshot do dashboard")
+    parser.add_argument("--pattern", default=SESSIONS_PATTERN, help="Padrão glob dos exports observados")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="Intervalo de verificação em segundos")
+    parser.add_argument("--backfill", action="store_true", help="Incorporar também os exports já existentes")
+    parser.add_argument("--once", action="store_true", help="Processar pendências uma vez e sair")
+    parser.add_argument("--no-text-index", action="store_true", help="Não atualizar o índice de busca nas mensagens")
+    parser.add_argument("--no-term-stats", action="store_true", help="Não atualizar as contagens de termos")
+    parser.add_argument("--no-sample", action="store_true", help="Não atualizar a amostra de sessões do dashboard")
+    args = parser.parse_args()
+
+    daemon = IngestionDaemon(
+        args.data_dir, args.snapshot_dir, args.pattern, backfill=args.backfill,
+        text_index_dir=None if args.no_text_index else TEXT_INDEX_DIR,
+        term_stats_dir=None if args.no_term_stats else TERM_STATS_DIR,
+        sample_dir=None if args.no_sample else SAMPLE_DIR
+    )
+    if args.once:
+        daemon.run_once()
+    else:
+        daemon.run(args.interval)
+
+if __name__ == "__main__":
+    main()
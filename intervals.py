@@ -0,0 +1,180 @@
+import numpy as np
+import pandas as pd
+from kernels import timestamp_ns
+
+NS_PER_MINUTE = 60 * 1_000_000_000
+
+# Colunas de data das sessões usadas para montar os intervalos
+INTERVAL_COLUMNS = ['createdAt', 'queuedAt', 'manualAt', 'closedAt']
+
+
+def _coalesce(*arrays):
+    """Primeiro valor válido entre pares (valores ns, máscara de válidos)"""
+    values, valid = arrays[0]
+    values, valid = values.copy(), valid.copy()
+    for other_values, other_valid in arrays[1:]:
+        fill = ~valid & other_valid
+        values[fill] = other_values[fill]
+        valid |= other_valid
+    return values, valid
+
+
+def session_intervals(sessions, horizon=None):
+    """Intervalos de atendimento e de fila de cada sessão (ns, horário local)
+
+    Atendimento: de manualAt (sessão assumida por uma pessoa) até closedAt.
+    Fila: de queuedAt (ou createdAt) até manualAt; sessões nunca assumidas
+    esperam até closedAt. Sessões ainda abertas terminam em horizon (padrão:
+    a maior data dos dados). Retorna {'handling': (inícios, fins),
+    'queue': (inícios, fins)} com -1 nas sessões sem intervalo.
+    """
+    columns = {col: timestamp_ns(sessions[col]) if col in sessions.columns else None for col in INTERVAL_COLUMNS}
+    present = [pair for pair in columns.values() if pair is not None]
+    if horizon is None:
+        valid_values = [values[valid] for values, valid in present if valid.any()]
+        horizon = max(int(values.max()) for values in valid_values) if valid_values else 0
+    none = (np.zeros(len(sessions), dtype=np.int64), np.zeros(len(sessions), dtype=bool))
+    created, queued, manual, closed = (columns[col] or none for col in INTERVAL_COLUMNS)
+    open_end = (np.full(len(sessions), horizon, dtype=np.int64), np.ones(len(sessions), dtype=bool))
+
+    def interval(start, end):
+        (starts, start_valid), (ends, _) = start, end
+        keep = start_valid & (ends > starts)
+        return np.where(keep, starts, -1), np.where(keep, ends, -1)
+
+    return {
+        'handling': interval(manual, _coalesce(closed, open_end)),
+        'queue': interval(_coalesce(queued, created), _coalesce(manual, closed, open_end))
+    }
+
+
+def sweep(starts, ends, groups, n_groups, origin, n_bins, bin_ns=NS_PER_MINUTE):
+    """Varredura dos intervalos: máximo simultâneo por faixa de bin_ns e pico exato por grupo
+
+    Cada intervalo [início, fim) vira um evento +1 no início e -1 no fim. Os
+    eventos são ordenados uma única vez por (grupo, instante), com fins antes
+    de inícios no mesmo instante (intervalos semiabertos); como cada grupo
+    termina com saldo zero, uma única soma acumulada dá o nível de todos os
+    grupos. O nível no início de cada faixa vem da soma acumulada das
+    contagens de eventos por faixa (bincount) e o máximo dentro da faixa, dos
+    níveis após os inícios que caem nela. Tudo em O(n log n + n_bins x
+    n_groups). Intervalos com início -1 ou grupo < 0 são ignorados.
+
+    Retorna (matriz int32 n_bins x n_groups, picos int64 por grupo,
+    instantes ns dos picos; -1 em grupos sem intervalos).
+    """
+    starts, ends, groups = np.asarray(starts), np.asarray(ends), np.asarray(groups)
+    keep = (starts >= 0) & (ends > starts) & (groups >= 0)
+    starts, ends, groups = starts[keep], ends[keep], groups[keep]
+    peaks = np.zeros(n_groups, dtype=np.int64)
+    peak_at = np.full(n_groups, -1, dtype=np.int64)
+    matrix = np.zeros((n_bins, n_groups), dtype=np.int32)
+    if starts.size == 0:
+        return matrix, peaks, peak_at
+
+    # Nível no início de cada faixa: intervalos com início <= t < fim
+    size = (n_bins + 1) * n_groups
+    first = np.clip(-((origin - starts) // bin_ns), 0, n_bins)
+    stop = np.clip(-((origin - ends) // bin_ns), 0, n_bins)
+    delta = (np.bincount(first * n_groups + groups, minlength=size)
+             - np.bincount(stop * n_groups + groups, minlength=size))
+    matrix[:] = np.cumsum(delta.reshape(n_bins + 1, n_groups), axis=0)[:-1]
+
+    # Eventos ordenados uma vez; nível após cada evento
+    n = len(starts)
+    times = np.concatenate([starts, ends])
+    steps = np.concatenate([np.ones(n, dtype=np.int64), np.full(n, -1, dtype=np.int64)])
+    event_groups = np.concatenate([groups, groups])
+    order = np.lexsort((steps, times, event_groups))
+    times, steps, event_groups = times[order], steps[order], event_groups[order]
+    level = np.cumsum(steps)
+
+    # Máximo dentro da faixa: níveis logo após os inícios
+    is_start = steps > 0
+    start_bins = np.clip((times[is_start] - origin) // bin_ns, 0, n_bins - 1)
+    np.maximum.at(matrix, (start_bins, event_groups[is_start]), level[is_start].astype(np.int32))
+
+    # Pico por grupo (máximo por segmento) e o primeiro instante em que ocorre
+    boundaries = np.flatnonzero(np.r_[True, event_groups[1:] != event_groups[:-1]])
+    segment_peaks = np.maximum.reduceat(level, boundaries)
+    segment_groups = event_groups[boundaries]
+    at_peak = np.flatnonzero(level == np.repeat(segment_peaks, np.diff(np.r_[boundaries, len(level)])))
+    first_peak = at_peak[np.r_[True, event_groups[at_peak][1:] != event_groups[at_peak][:-1]]]
+
+    peaks[segment_groups] = segment_peaks
+    peak_at[segment_groups] = times[first_peak]
+    return matrix, peaks, peak_at
+
+
+def _to_timestamps(values):
+    """Instantes ns (-1 = ausente) para datetime64"""
+    values = np.asarray(values)
+    return pd.to_datetime(np.where(values >= 0, values, np.iinfo(np.int64).min).view('datetime64[ns]'))
+
+
+def concurrency_analysis(sessions, group_column='pluginConnectionLabel', bin_ns=NS_PER_MINUTE):
+    """Sessões em atendimento simultâneo e fila de espera por minuto e por grupo
+
+    Retorna {'concurrency': DataFrame minuto x grupo, 'backlog': DataFrame
+    minuto x grupo, 'total': DataFrame minuto x ('concurrent', 'backlog')
+    somando todos os grupos, 'summary': picos e médias por grupo, 'peaks':
+    picos exatos de todos os grupos juntos}. Cada minuto traz o máximo de
+    sessões simultâneas dentro dele. A média de atendimento considera apenas
+    os minutos com alguma sessão em atendimento. Retorna None sem sessões,
+    sem as colunas de data ou sem nenhum intervalo válido.
+    """
+    if sessions is None or sessions.empty or 'manualAt' not in sessions.columns or group_column not in sessions.columns:
+        return None
+
+    intervals = session_intervals(sessions)
+    bounds = [values[values >= 0] for pair in intervals.values() for values in pair]
+    bounds = [values for values in bounds if values.size]
+    if not bounds:
+        return None
+
+    groups, labels = pd.factorize(sessions[group_column], sort=True)
+    labels = pd.Index(labels, name=group_column)
+    n_groups = len(labels)
+    origin = min(int(values.min()) for values in bounds) // bin_ns * bin_ns
+    n_bins = -((origin - max(int(values.max()) for values in bounds)) // bin_ns)
+    index = pd.DatetimeIndex(origin + np.arange(n_bins, dtype=np.int64) * bin_ns, name='minute')
+
+    series = {}
+    total = pd.DataFrame(index=index)
+    summary = pd.DataFrame(index=labels)
+    peaks = {}
+    for kind, name in (('handling', 'concurrent'), ('queue', 'backlog')):
+        starts, ends = intervals[kind]
+        matrix, group_peaks, group_peak_at = sweep(starts, ends, groups, n_groups, origin, n_bins, bin_ns)
+        series[kind] = pd.DataFrame(matrix, index=index, columns=labels)
+        summary[f'{kind}_sessions'] = np.bincount(groups[(starts >= 0) & (groups >= 0)], minlength=n_groups)
+        summary[f'peak_{name}'] = group_peaks
+        summary[f'peak_{name}_at'] = _to_timestamps(group_peak_at)
+
+        # Todos os grupos como um só (sessões sem grupo ficam de fora)
+        matrix, total_peak, total_peak_at = sweep(starts, ends, np.where(groups >= 0, 0, -1), 1, origin, n_bins, bin_ns)
+        total[name] = matrix[:, 0]
+        peaks[f'peak_{name}'] = int(total_peak[0])
+        peaks[f'peak_{name}_at'] = _to_timestamps(total_peak_at)[0]
+
+    active = series['handling'].to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        summary['mean_concurrent'] = (active.sum(axis=0) / (active > 0).sum(axis=0)).round(2)
+    summary['minutes_with_backlog'] = (series['queue'].to_numpy() > 0).sum(axis=0)
+
+    return {
+        'concurrency': series['handling'],
+        'backlog': series['queue'],
+        'total': total,
+        'summary': summary.sort_values('peak_concurrent', ascending=False),
+        'peaks': peaks
+    }
+
+
+def concurrency_timeline(analysis, freq='1h'):
+    """Máximo por período (freq) das séries por minuto de todos os grupos
+
+    Retorna DataFrame com as colunas 'concurrent' e 'backlog', uma linha por
+    período.
+    """
+    return analysis['total'].resample(freq).max()
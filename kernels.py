@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+NS_PER_HOUR = 3600 * 1_000_000_000
+NS_PER_DAY = 24 * NS_PER_HOUR
+
+# 1970-01-01 foi uma quinta-feira (weekday 3, com segunda = 0)
+EPOCH_WEEKDAY = 3
+
+
+def timestamp_ns(timestamps):
+    """Converte datas (Series ou array) para inteiros em ns no horário local
+
+    Retorna (valores int64, máscara de datas válidas).
+    """
+    series = pd.Series(timestamps)
+    if not isinstance(series.dtype, pd.DatetimeTZDtype) and not pd.api.types.is_datetime64_dtype(series.dtype):
+        series = pd.to_datetime(series, errors='coerce')
+    if isinstance(series.dtype, pd.DatetimeTZDtype):
+        series = series.dt.tz_localize(None)
+
+    values = series.to_numpy(dtype='datetime64[ns]')
+    valid = ~np.isnat(values)
+    return values.view(np.int64), valid
+
+
+def calendar_fields(timestamps):
+    """Campos de calendário inteiros (dia do mês, dia da semana, hora) das datas"""
+    ns, valid = timestamp_ns(timestamps)
+    ns = ns[valid]
+    days = ns // NS_PER_DAY
+
+    day_values = days.astype('datetime64[D]')
+    day_of_month = (day_values - day_values.astype('datetime64[M]')).astype(np.int64) + 1
+
+    return {
+        'day': day_of_month,
+        'weekday': (days + EPOCH_WEEKDAY) % 7,
+        'hour': (ns // NS_PER_HOUR) % 24,
+        'valid': valid
+    }
+
+
+def _counts_matrix(rows, cols, n_rows, n_cols):
+    """Contagem densa rows x cols via bincount de um índice linear"""
+    counts = np.bincount(rows * n_cols + cols, minlength=n_rows * n_cols)
+    return counts.reshape(n_rows, n_cols)
+
+
+def hour_histogram(timestamps):
+    """Número de eventos por hora do dia (24 posições)"""
+    fields = calendar_fields(timestamps)
+    return np.bincount(fields['hour'], minlength=24)
+
+
+def weekday_histogram(timestamps):
+    """Número de eventos por dia da semana (7 posições, segunda = 0)"""
+    fields = calendar_fields(timestamps)
+    return np.bincount(fields['weekday'], minlength=7)
+
+
+def weekday_hour_matrix(timestamps):
+    """Matriz 7 x 24 de eventos por dia da semana e hora"""
+    fields = calendar_fields(timestamps)
+    return _counts_matrix(fields['weekday'], fields['hour'], 7, 24)
+
+
+def hour_group_matrix(timestamps, group_codes, n_groups):
+    """Matriz 24 x n_groups de eventos por hora e grupo (códigos < 0 ignorados)"""
+    fields = calendar_fields(timestamps)
+    groups = np.asarray(group_codes)[fields['valid']]
+    keep = groups >= 0
+    return _counts_matrix(fields['hour'][keep], groups[keep], 24, n_groups)
+
+
+def day_group_matrix(timestamps, group_codes, n_groups):
+    """Matriz 31 x n_groups de eventos por dia do mês e grupo (linha 0 = dia 1)"""
+    fields = calendar_fields(timestamps)
+    groups = np.asarray(group_codes)[fields['valid']]
+    keep = groups >= 0
+    return _counts_matrix(fields['day'][keep] - 1, groups[keep], 31, n_groups)
+
+
+def matrix_to_frame(matrix, index, columns, index_name=None, columns_name=None, drop_empty=True):
+    """Converte uma matriz de contagens em DataFrame, removendo linhas/colunas vazias"""
+    index = pd.Index(index, name=index_name)
+    columns = pd.Index(columns, name=columns_name)
+    if drop_empty:
+        rows = matrix.sum(axis=1) > 0
+        cols = matrix.sum(axis=0) > 0
+        matrix, index, columns = matrix[rows][:, cols], index[rows], columns[cols]
+
+    return pd.DataFrame(matrix.astype(np.int64), index=index, columns=columns)
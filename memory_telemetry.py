@@ -0,0 +1,275 @@
+import os
+import gc
+import sys
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Orçamento de memória do processo em MB (sem valor: apenas telemetria)
+BUDGET_ENV_VAR = "CX_MEMORY_BUDGET_MB"
+
+# Tabelas a partir deste tamanho têm as maiores colunas listadas nos logs
+LOG_COLUMNS_MIN_BYTES = 1024 * 1024
+
+
+def memory_budget(budget_mb=None):
+    """Orçamento em bytes: parâmetro explícito > variável de ambiente > sem limite"""
+    value = budget_mb if budget_mb is not None else os.environ.get(BUDGET_ENV_VAR)
+    if value in (None, ""):
+        return None
+    budget = float(value)
+    if budget <= 0:
+        raise ValueError(f"Orçamento de memória inválido: {value} MB")
+    return int(budget * 1024 * 1024)
+
+
+def process_rss():
+    """RSS atual do processo em bytes (None se indisponível)
+
+    Usa /proc/self/statm (Linux); em outros sistemas, o pico de RSS do
+    módulo resource, que é apenas uma aproximação por cima.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def deep_memory(obj, _seen=None):
+    """Memória profunda de um objeto (DataFrames, arrays, contêineres e atributos de objetos)"""
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True, index=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        if obj.dtype == object:
+            return int(pd.Series(obj.ravel()).memory_usage(deep=True, index=False))
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(
+            deep_memory(key, seen) + deep_memory(value, seen) for key, value in obj.items()
+        )
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(deep_memory(item, seen) for item in obj)
+    if hasattr(obj, '__dict__') and not isinstance(obj, type):
+        # Objetos do projeto (ex.: SessionIndex): soma dos atributos
+        return sys.getsizeof(obj) + deep_memory(vars(obj), seen)
+    return sys.getsizeof(obj)
+
+
+def column_memory(df):
+    """Memória profunda por coluna, da maior para a menor"""
+    return df.memory_usage(deep=True, index=False).sort_values(ascending=False)
+
+
+def format_bytes(n_bytes):
+    """Formata bytes em KB/MB/GB"""
+    if n_bytes is None:
+        return "N/A"
+    value = float(n_bytes)
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(value) < 1024 or unit == "GB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+
+
+class MemoryTelemetry:
+    """Contabilidade de memória por objeto em cache, com orçamento e despejo
+
+    Cada entrada guarda a memória profunda do objeto (somada quando o mesmo
+    cache guarda vários resultados: um por chave, descartados pelos mesmos
+    limites de quantidade e de idade do cache), a memória por coluna de DataFrames e o
+    maior aumento de RSS observado ao produzi-lo; peak guarda o maior valor
+    registrado, mesmo após a liberação. Entradas com evict podem ser
+    liberadas quando o RSS passa do orçamento: as de menor prioridade primeiro
+    (agregados antes dos dados carregados).
+    """
+
+    def __init__(self, budget_mb=None):
+        self.budget = memory_budget(budget_mb)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # RSS depois de um despejo que não o reduziu: não se insiste até ele crescer
+        self._ineffective_rss = None
+
+    def _entry(self, name):
+        return self._entries.setdefault(name, {
+            'bytes': 0, 'peak': 0, 'objects': 0, 'rss_delta': None, 'columns': None, 'evict': None, 'priority': 0,
+            'items': None, 'max_items': None, 'ttl': None
+        })
+
+    def register(self, name, evict=None, priority=0, max_items=None, ttl=None):
+        """Declara como liberar um cache (evict), a ordem de despejo (priority) e seus limites
+
+        max_items e ttl (segundos): os mesmos max_entries e ttl do cache, para
+        que resultados já descartados por ele deixem de ser contados.
+        """
+        with self._lock:
+            entry = self._entry(name)
+            entry['evict'] = evict
+            entry['priority'] = priority
+            entry['max_items'] = max_items
+            entry['ttl'] = ttl
+
+    def _prune(self, entry, now=None):
+        """Descarta resultados por chave vencidos (ttl) ou além de max_items e recalcula o total"""
+        items = entry['items']
+        if items is None:
+            return
+        now = time.monotonic() if now is None else now
+        # Ordem de inserção = ordem de registro: os mais antigos vêm primeiro
+        while items and (
+            (entry['ttl'] is not None and now - next(iter(items.values()))[1] > entry['ttl'])
+            or (entry['max_items'] is not None and len(items) > entry['max_items'])
+        ):
+            items.popitem(last=False)
+        entry['bytes'] = sum(size for size, _ in items.values())
+        entry['objects'] = len(items)
+
+    def track(self, name, obj, rss_before=None, accumulate=False, key=None):
+        """Registra a memória de obj no cache name e retorna obj
+
+        key: chave do resultado em caches com várias entradas (ex.: a
+        impressão digital dos filtros); um resultado recalculado com a mesma
+        chave substitui o anterior. accumulate soma ao que já foi registrado
+        sem chave. rss_before: RSS medido antes de produzir obj, para estimar
+        o RSS atribuível.
+        """
+        size = deep_memory(obj)
+        rss_after = process_rss() if rss_before is not None else None
+        with self._lock:
+            entry = self._entry(name)
+            if key is not None:
+                if entry['items'] is None:
+                    entry['items'] = OrderedDict()
+                entry['items'].pop(key, None)
+                entry['items'][key] = (size, time.monotonic())
+                self._prune(entry)
+            else:
+                entry['bytes'] = entry['bytes'] + size if accumulate else size
+                entry['objects'] = entry['objects'] + 1 if accumulate else 1
+            entry['peak'] = max(entry['peak'], entry['bytes'])
+            if isinstance(obj, pd.DataFrame):
+                entry['columns'] = column_memory(obj)
+            if rss_after is not None and rss_before is not None:
+                delta = max(rss_after - rss_before, 0)
+                entry['rss_delta'] = max(delta, entry['rss_delta'] or 0)
+        return obj
+
+    def _refresh(self):
+        """Descarta os resultados vencidos de todas as entradas (chamado com a trava)"""
+        now = time.monotonic()
+        for entry in self._entries.values():
+            self._prune(entry, now)
+
+    def total(self):
+        with self._lock:
+            self._refresh()
+            return sum(entry['bytes'] for entry in self._entries.values())
+
+    def columns(self, name):
+        """Memória por coluna do DataFrame registrado em name (None se não houver)"""
+        with self._lock:
+            entry = self._entries.get(name)
+            return None if entry is None else entry['columns']
+
+    def report(self):
+        """Tabela por cache: memória profunda (atual e pico), objetos, RSS atribuível e despejável"""
+        with self._lock:
+            self._refresh()
+            rows = [
+                {
+                    'cache': name,
+                    'bytes': entry['bytes'],
+                    'peak': entry['peak'],
+                    'objects': entry['objects'],
+                    'rss_delta': entry['rss_delta'],
+                    'evictable': entry['evict'] is not None
+                }
+                for name, entry in self._entries.items()
+            ]
+        report = pd.DataFrame(rows, columns=['cache', 'bytes', 'peak', 'objects', 'rss_delta', 'evictable'])
+        return report.sort_values(['bytes', 'peak'], ascending=False).reset_index(drop=True)
+
+    def over_budget(self, rss=None):
+        if self.budget is None:
+            return False
+        rss = process_rss() if rss is None else rss
+        return rss is not None and rss > self.budget
+
+    def enforce(self):
+        """Libera um nível de prioridade por chamada se o RSS passar do orçamento; retorna os nomes liberados
+
+        O RSS é verificado de novo na chamada seguinte (a próxima execução),
+        quando os objetos liberados já não estão mais referenciados. Se o
+        despejo não reduzir o RSS (objetos ainda em uso pelo chamador ou
+        memória não devolvida ao sistema), nada mais é liberado até o RSS
+        crescer além do valor medido, em vez de esvaziar todos os caches a
+        cada chamada.
+        """
+        rss = process_rss()
+        if not self.over_budget(rss):
+            self._ineffective_rss = None
+            return []
+        if self._ineffective_rss is not None and rss <= self._ineffective_rss:
+            return []
+
+        with self._lock:
+            self._refresh()
+            candidates = [
+                (entry['priority'], -entry['bytes'], name)
+                for name, entry in self._entries.items()
+                if entry['evict'] is not None and entry['bytes'] > 0
+            ]
+        if not candidates:
+            return []
+
+        # Todos os caches do nível de menor prioridade, do maior para o menor
+        tier = min(candidates)[0]
+        evicted = []
+        for priority, _, name in sorted(candidates):
+            if priority != tier:
+                break
+            with self._lock:
+                entry = self._entries[name]
+                evict = entry['evict']
+                entry.update({'bytes': 0, 'objects': 0, 'items': None})
+            evict()
+            evicted.append(name)
+        gc.collect()
+
+        after = process_rss()
+        self._ineffective_rss = after if after is not None and after >= rss else None
+        return evicted
+
+    def log(self, title="Memória"):
+        """Resumo para os logs (uma linha por cache e as maiores colunas)"""
+        rss = process_rss()
+        budget = f" / orçamento {format_bytes(self.budget)}" if self.budget is not None else ""
+        print(f"🧠 {title}: RSS {format_bytes(rss)}{budget}, rastreado {format_bytes(self.total())}")
+        report = self.report()
+        for row in report[report['peak'] > 0].itertuples():
+            rss_delta = f", RSS +{format_bytes(row.rss_delta)}" if pd.notna(row.rss_delta) else ""
+            released = f" (liberado; pico {format_bytes(row.peak)})" if row.bytes == 0 else ""
+            print(f"   {row.cache}: {format_bytes(row.bytes)}{released}{rss_delta}")
+            columns = self.columns(row.cache)
+            if columns is not None and len(columns) and row.peak >= LOG_COLUMNS_MIN_BYTES:
+                top = ", ".join(f"{col} {format_bytes(size)}" for col, size in columns.head(5).items())
+                print(f"      maiores colunas: {top}")
+        if self.over_budget(rss):
+            print("⚠️ RSS acima do orçamento de memória")
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+API HTTP local com as métricas do dashboard
+
+Serve os mesmos números do dashboard (a partir do snapshot pré-agregado ou do
+CSV Sindicompany) e os insights de CXAnalytics, sem Streamlit e sem acesso à
+rede externa. Cada resposta leva um ETag derivado da versão dos dados e dos
+parâmetros: clientes que repetem a consulta com If-None-Match recebem 304
+sem nenhum recálculo enquanto os dados não mudarem.
+
+Uso:
+    python metrics_api.py                   # http://127.0.0.1:8765
+    python metrics_api.py --port 9000
+
+Endpoints (GET):
+    /health             versão atual dos dados
+    /kpis               métricas principais
+    /operators          tabela por síndico
+    /series/daily       sessões por dia
+    /series/hourly      sessões por hora do dia
+    /series/weekday     sessões por dia da semana
+    /insights           insights de CXAnalytics (mensagens e sessões)
+
+Parâmetros: start e end (AAAA-MM-DD), operator (síndico; em /insights, o
+operatorFirstname das sessões) e format=json|arrow.
+"""
+
+import os
+import io
+import json
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+import pandas as pd
+from analytics import CXAnalytics, required_columns
+from data_processor import DataProcessor, DATA_FILES
+from sentiment_cache import SentimentCache
+from dashboard_data import (
+    SINDICOMPANY_FILE, SNAPSHOT_DIR, dashboard_columns, read_sessions, build_aggregates,
+    load_snapshot_data, load_snapshot_aggregates, source_fingerprint, data_version,
+    filter_sessions, filter_aggregates, session_metrics, daily_sessions, hourly_sessions,
+    operator_summary, weekday_sessions
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Respostas já serializadas mantidas em memória (por ETag)
+RESPONSE_CACHE_SIZE = 256
+
+CONTENT_TYPES = {
+    'json': 'application/json; charset=utf-8',
+    'arrow': 'application/vnd.apache.arrow.stream'
+}
+
+
+class RequestError(Exception):
+    """Erro de parâmetros da requisição (status HTTP e mensagem)"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_params(query):
+    """Normaliza start, end, operator e format da query string"""
+    values = {key: items[-1] for key, items in parse_qs(query).items()}
+    params = {'start': None, 'end': None, 'operator': values.get('operator') or "Todos"}
+    for key in ('start', 'end'):
+        if values.get(key):
+            try:
+                params[key] = date.fromisoformat(values[key])
+            except ValueError:
+                raise RequestError(400, f"Data inválida em {key}: {values[key]} (use AAAA-MM-DD)")
+
+    # Período aberto em uma das pontas
+    if params['start'] is not None or params['end'] is not None:
+        params['start'] = params['start'] or date.min
+        params['end'] = params['end'] or date.max
+
+    fmt = values.get('format', 'json')
+    if fmt not in CONTENT_TYPES:
+        raise RequestError(400, f"Formato inválido: {fmt} (opções: {', '.join(CONTENT_TYPES)})")
+    params['format'] = fmt
+    return params
+
+
+def _json_value(value):
+    """Converte escalares numpy/pandas para JSON (NaN vira null)"""
+    if isinstance(value, (np.integer,)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, (date, pd.Timestamp)):
+        return value.isoformat()
+    return value
+
+
+def to_frame(result):
+    """Resultado como DataFrame (tabelas ficam como estão; dicionários viram uma linha)"""
+    if isinstance(result, pd.DataFrame):
+        return result
+    if isinstance(result, list):
+        return pd.DataFrame({'insight': result})
+    return pd.DataFrame([{key: _json_value(value) for key, value in result.items()}])
+
+
+def _dates_as_text(frame):
+    """Colunas de datas (objetos date) como texto AAAA-MM-DD"""
+    frame = frame.copy()
+    for col in frame.columns:
+        if frame[col].dtype == object and len(frame) and isinstance(frame[col].iloc[0], date):
+            frame[col] = frame[col].map(_json_value)
+    return frame
+
+
+def encode_json(result):
+    """JSON compacto: tabelas em {"columns": [...], "data": [[...]]}"""
+    if isinstance(result, pd.DataFrame):
+        return _dates_as_text(result).to_json(orient='split', index=False, date_format='iso', force_ascii=False).encode('utf-8')
+    if isinstance(result, dict):
+        result = {key: _json_value(value) for key, value in result.items()}
+    return json.dumps(result, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def encode_arrow(result):
+    """Arrow IPC (stream) da tabela do resultado"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise RequestError(406, "Formato arrow requer o pacote pyarrow")
+
+    table = pa.Table.from_pandas(to_frame(result), preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+class MetricsStore:
+    """Dados do dashboard e resultados serializados, recarregados a cada nova versão"""
+
+    def __init__(self, snapshot_dir=SNAPSHOT_DIR, file_path=SINDICOMPANY_FILE, data_dir="data"):
+        self.snapshot_dir = snapshot_dir
+        self.file_path = file_path
+        self.data_dir = data_dir
+        self.columns = dashboard_columns()
+        self._lock = threading.Lock()
+        self._version = None
+        self._data = None
+        self._aggregates = None
+        self._insights_version = None
+        self._analytics_tables = None
+        self._insights_lock = threading.Lock()
+        self._responses = OrderedDict()
+        self._responses_lock = threading.Lock()
+
+    def version(self):
+        """Versão atual das sessões Sindicompany (snapshot ou arquivo de origem)"""
+        return data_version(self.columns, self.snapshot_dir, self.file_path)
+
+    def insights_version(self):
+        """Versão dos arquivos de mensagens e sessões usados por CXAnalytics"""
+        fingerprints = []
+        for table in ('messages', 'sessions'):
+            file_path = os.path.join(self.data_dir, DATA_FILES[table])
+            fingerprints.append(source_fingerprint(file_path) if os.path.exists(file_path) else None)
+        return fingerprints
+
+    def sessions(self, version):
+        """Sessões e agregados da versão pedida (lidos uma vez por versão)"""
+        with self._lock:
+            if self._version != version or self._data is None:
+                data = load_snapshot_data(self.columns, self.snapshot_dir, self.file_path)
+                aggregates = load_snapshot_aggregates(self.columns, self.snapshot_dir, self.file_path)
+                if data is None or aggregates is None:
+                    if not os.path.exists(self.file_path):
+                        raise RequestError(503, f"Arquivo não encontrado: {self.file_path}")
+                    data = read_sessions(self.file_path, self.columns)
+                    aggregates = build_aggregates(data)
+                self._data, self._aggregates, self._version = data, aggregates, version
+            return self._data, self._aggregates
+
+    def analytics_tables(self, version):
+        """Mensagens e sessões para os insights (lidas uma vez por versão)"""
+        with self._lock:
+            if self._insights_version != version or self._analytics_tables is None:
+                columns = required_columns(['generate_insights_report'])
+                for table_columns in columns.values():
+                    table_columns.add('date')
+                processor = DataProcessor(self.data_dir)
+                processor.load_all_data(columns={table: sorted(cols) for table, cols in columns.items()})
+                self._analytics_tables = (processor.messages, processor.sessions, processor.ids)
+                self._insights_version = version
+            return self._analytics_tables
+
+    def etag(self, path, params, version):
+        """ETag da resposta: versão dos dados + endpoint + parâmetros normalizados"""
+        key = repr((version, path, params['start'], params['end'], params['operator'], params['format']))
+        return '"' + hashlib.sha1(key.encode('utf-8')).hexdigest()[:20] + '"'
+
+    def cached_response(self, etag):
+        with self._responses_lock:
+            body = self._responses.get(etag)
+            if body is not None:
+                self._responses.move_to_end(etag)
+            return body
+
+    def store_response(self, etag, body):
+        with self._responses_lock:
+            self._responses[etag] = body
+            while len(self._responses) > RESPONSE_CACHE_SIZE:
+                self._responses.popitem(last=False)
+
+    # Endpoints
+
+    def _filtered(self, version, params):
+        data, aggregates = self.sessions(version)
+        return (
+            filter_sessions(data, params['start'], params['end'], params['operator']),
+            filter_aggregates(aggregates, params['start'], params['end'], params['operator'])
+        )
+
+    def kpis(self, version, params):
+        return session_metrics(*self._filtered(version, params))
+
+    def operators(self, version, params):
+        _, aggregates = self._filtered(version, params)
+        return operator_summary(aggregates).rename_axis('pluginConnectionLabel').reset_index()
+
+    def daily(self, version, params):
+        return daily_sessions(self._filtered(version, params)[1])
+
+    def hourly(self, version, params):
+        return hourly_sessions(self._filtered(version, params)[1])
+
+    def weekday(self, version, params):
+        return weekday_sessions(self._filtered(version, params)[1])
+
+    def insights(self, version, params):
+        messages, sessions, ids = self.analytics_tables(version)
+        if params['start'] is not None:
+            messages = messages[(messages['date'] >= params['start']) & (messages['date'] <= params['end'])]
+            sessions = sessions[(sessions['date'] >= params['start']) & (sessions['date'] <= params['end'])]
+        if params['operator'] != "Todos":
+            sessions = sessions[sessions['operatorFirstname'] == params['operator']]
+
+        # Um cálculo por vez: o cache de sentimento é gravado em arquivo
+        with self._insights_lock:
+            sentiment_cache = SentimentCache(os.path.join("processed_data", "sentiment_cache"))
+            return CXAnalytics(messages, sessions, ids=ids, sentiment_cache=sentiment_cache).generate_insights_report()
+
+    ENDPOINTS = {
+        '/kpis': ('version', 'kpis'),
+        '/operators': ('version', 'operators'),
+        '/series/daily': ('version', 'daily'),
+        '/series/hourly': ('version', 'hourly'),
+        '/series/weekday': ('version', 'weekday'),
+        '/insights': ('insights_version', 'insights')
+    }
+
+    def respond(self, path, query, if_none_match=None):
+        """Resolve uma requisição: (status, cabeçalhos, corpo)"""
+        if path == '/health':
+            body = encode_json({'status': 'ok', 'version': str(self.version())})
+            return 200, {'Content-Type': CONTENT_TYPES['json']}, body
+
+        if path not in self.ENDPOINTS:
+            raise RequestError(404, f"Endpoint desconhecido: {path}")
+
+        params = parse_params(query)
+        version_method, compute = self.ENDPOINTS[path]
+        version = getattr(self, version_method)()
+        etag = self.etag(path, params, version)
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Content-Type': CONTENT_TYPES[params['format']]}
+
+        # Mesma versão e parâmetros: nada a recalcular nem a enviar
+        if if_none_match is not None and etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return 304, headers, b''
+
+        body = self.cached_response(etag)
+        if body is None:
+            result = getattr(self, compute)(version, params)
+            body = encode_arrow(result) if params['format'] == 'arrow' else encode_json(result)
+            self.store_response(etag, body)
+        return 200, headers, body
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Handler HTTP (GET) sobre o MetricsStore do servidor"""
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+    def _handle(self, send_body):
+        url = urlparse(self.path)
+        try:
+            status, headers, body = self.server.store.respond(
+                url.path.rstrip('/') or '/', url.query, self.headers.get('If-None-Match')
+            )
+        except RequestError as e:
+            status, headers, body = e.status, {'Content-Type': CONTENT_TYPES['json']}, encode_json({'error': str(e)})
+        except Exception as e:
+            status, headers, body = 500, {'Content-Type': CONTENT_TYPES['json']}, encode_json({'error': str(e)})
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def create_server(host=DEFAULT_HOST, port=DEFAULT_PORT, store=None, quiet=False):
+    """Servidor HTTP com um MetricsStore (port=0 escolhe uma porta livre)"""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    server.store = store or MetricsStore()
+    server.quiet = quiet
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API HTTP local com as métricas do dashboard")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Endereço de escuta (padrão: apenas local)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Porta HTTP")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR, help="Diretório do snapshot do dashboard")
+    parser.add_argument("--quiet", action="store_true", help="Não registrar cada requisição")
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, MetricsStore(args.snapshot_dir), args.quiet)
+    print(f"🌐 API de métricas em http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 API encerrada")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
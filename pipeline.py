@@ -0,0 +1,221 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+# Estados possíveis de uma tarefa após a execução
+STATUS_DONE = "executada"
+STATUS_SKIPPED = "atualizada"
+STATUS_FAILED = "falhou"
+STATUS_CANCELLED = "cancelada"
+
+
+def _timed_call(func, args):
+    """Executa func(*args) e retorna (resultado, início, duração) em tempo de relógio"""
+    start = time.time()
+    result = func(*args)
+    return result, start, time.time() - start
+
+
+class Task:
+    """Tarefa nomeada do pipeline
+
+    func recebe os resultados das tarefas de inputs, na ordem declarada.
+    sources e outputs são caminhos de arquivos: uma tarefa com outputs é
+    considerada atualizada quando todos existem e são mais novos que todas as
+    sources (como no make), e então não é executada. Com process=True a
+    tarefa roda no pool de processos (func e argumentos precisam ser
+    serializáveis com pickle).
+    """
+
+    def __init__(self, name, func, inputs=(), sources=(), outputs=(), process=False):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.sources = list(sources)
+        self.outputs = list(outputs)
+        self.process = process
+
+    def is_up_to_date(self):
+        """Verifica se os arquivos de saída são mais novos que os de entrada"""
+        if not self.outputs:
+            return False
+        try:
+            oldest_output = min(os.stat(path).st_mtime_ns for path in self.outputs)
+        except OSError:
+            return False
+        newest_source = max(
+            (os.stat(path).st_mtime_ns for path in self.sources if os.path.exists(path)),
+            default=0
+        )
+        return oldest_output >= newest_source
+
+
+class Pipeline:
+    """DAG de tarefas executado em pools de threads e de processos
+
+    Cada tarefa é submetida assim que todas as suas entradas terminam, então o
+    tempo total tende ao do caminho mais longo do grafo. Tarefas comuns rodam
+    em threads e compartilham os DataFrames sem cópia (pandas e numpy liberam
+    o GIL na maior parte das operações pesadas); tarefas presas ao GIL, como a
+    renderização de gráficos, podem rodar em processos.
+    """
+
+    def __init__(self, max_workers=None, max_processes=None):
+        self.max_workers = max_workers or min(8, (os.cpu_count() or 1) + 4)
+        self.max_processes = max_processes or os.cpu_count() or 1
+        self.tasks = {}
+        self.timings = {}
+        self.errors = {}
+        self.wall_time = 0.0
+
+    def add(self, name, func, inputs=(), sources=(), outputs=(), process=False):
+        """Registra uma tarefa; as entradas precisam ter sido registradas antes"""
+        if name in self.tasks:
+            raise ValueError(f"Tarefa duplicada: {name}")
+        missing = [dep for dep in inputs if dep not in self.tasks]
+        if missing:
+            raise ValueError(f"Tarefa {name} depende de tarefas desconhecidas: {', '.join(missing)}")
+        self.tasks[name] = Task(name, func, inputs, sources, outputs, process)
+        return name
+
+    def _needed(self, force):
+        """Tarefas a executar
+
+        Tarefas com outputs rodam quando desatualizadas; tarefas finais (das
+        quais nenhuma outra depende) sem outputs rodam sempre; as demais rodam
+        apenas se alguma tarefa que as consome for executada.
+        """
+        consumed = {dep for task in self.tasks.values() for dep in task.inputs}
+        needed = set()
+        # Ordem de registro é topológica (entradas são registradas antes)
+        for name in reversed(list(self.tasks)):
+            task = self.tasks[name]
+            if task.outputs:
+                run = force or not task.is_up_to_date()
+            else:
+                run = name not in consumed
+            if run or name in needed:
+                needed.add(name)
+                needed.update(task.inputs)
+        return needed
+
+    def _set_timing(self, name, status, start=None, duration=0.0):
+        self.timings[name] = {'status': status, 'start': start, 'duration': duration}
+
+    def _release_consumed(self, task, results, consumers, telemetry):
+        """Torna despejáveis as entradas de task cujos consumidores já terminaram"""
+        for dep in task.inputs:
+            if all(self.timings.get(name, {}).get('status') in (STATUS_DONE, STATUS_FAILED, STATUS_CANCELLED)
+                   for name in consumers[dep]):
+                telemetry.register(dep, evict=lambda dep=dep: results.pop(dep, None))
+
+    def run(self, force=False, telemetry=None):
+        """Executa o grafo e retorna {tarefa: resultado} das tarefas executadas
+
+        Falhas não interrompem as tarefas independentes; as dependentes de uma
+        tarefa que falhou são canceladas. As exceções ficam em self.errors.
+        Com telemetry (MemoryTelemetry), a memória de cada resultado é
+        registrada e, acima do orçamento, resultados já consumidos por todas as
+        tarefas que dependem deles são liberados (e não aparecem no retorno).
+        """
+        needed = self._needed(force)
+        consumers = {name: [other for other in needed if name in self.tasks[other].inputs] for name in needed}
+        self.timings = {}
+        self.errors = {}
+        for name in self.tasks:
+            if name not in needed:
+                self._set_timing(name, STATUS_SKIPPED)
+
+        results = {}
+        pending = [name for name in self.tasks if name in needed]
+        running = {}
+        start = time.time()
+
+        threads = ThreadPoolExecutor(max_workers=self.max_workers)
+        processes = None
+        if any(self.tasks[name].process for name in pending):
+            # forkserver evita fork de um processo com threads em execução
+            processes = ProcessPoolExecutor(
+                max_workers=self.max_processes,
+                mp_context=multiprocessing.get_context('forkserver')
+            )
+
+        try:
+            while pending or running:
+                # Submeter tudo o que já tem as entradas prontas
+                for name in list(pending):
+                    task = self.tasks[name]
+                    if any(self.timings.get(dep, {}).get('status') in (STATUS_FAILED, STATUS_CANCELLED)
+                           for dep in task.inputs):
+                        self._set_timing(name, STATUS_CANCELLED)
+                        pending.remove(name)
+                    elif all(dep in results for dep in task.inputs):
+                        executor = processes if task.process else threads
+                        args = [results[dep] for dep in task.inputs]
+                        running[executor.submit(_timed_call, task.func, args)] = (name, time.time())
+                        pending.remove(name)
+
+                if not running:
+                    # Entradas em ordem topológica: nada mais pode ficar pronto
+                    for name in pending:
+                        self._set_timing(name, STATUS_CANCELLED)
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, submitted = running.pop(future)
+                    try:
+                        results[name], task_start, duration = future.result()
+                        self._set_timing(name, STATUS_DONE, task_start - start, duration)
+                    except Exception as e:
+                        self.errors[name] = e
+                        self._set_timing(name, STATUS_FAILED, submitted - start, time.time() - submitted)
+                        print(f"❌ Erro na tarefa {name}: {str(e)}")
+                    if telemetry is not None:
+                        if name in results:
+                            telemetry.track(name, results[name])
+                        self._release_consumed(self.tasks[name], results, consumers, telemetry)
+                        for released in telemetry.enforce():
+                            print(f"🧠 Memória acima do orçamento: resultado de {released} liberado")
+        finally:
+            threads.shutdown()
+            if processes is not None:
+                processes.shutdown()
+
+        self.wall_time = time.time() - start
+        return results
+
+    def critical_path(self):
+        """Caminho mais longo (em duração) entre as tarefas executadas"""
+        finish = {}
+        previous = {}
+        for name, task in self.tasks.items():
+            duration = self.timings.get(name, {}).get('duration', 0.0)
+            best = max(task.inputs, key=lambda dep: finish[dep], default=None)
+            finish[name] = duration + (finish[best] if best is not None else 0.0)
+            previous[name] = best
+
+        if not finish:
+            return [], 0.0
+        name = max(finish, key=finish.get)
+        total = finish[name]
+        path = []
+        while name is not None:
+            path.append(name)
+            name = previous[name]
+        return path[::-1], total
+
+    def print_summary(self):
+        """Resumo de tempo por tarefa, caminho crítico e tempo total"""
+        print(f"⏱️ Resumo do pipeline ({self.max_workers} threads, {self.max_processes} processos):")
+        width = max((len(name) for name in self.tasks), default=0)
+        for name in self.tasks:
+            timing = self.timings.get(name, {'status': STATUS_CANCELLED, 'start': None, 'duration': 0.0})
+            started = f"+{timing['start']:.2f}s" if timing['start'] is not None else "-"
+            print(f"   {name:<{width}}  {timing['duration']:7.2f}s  {started:>8}  {timing['status']}")
+
+        path, total = self.critical_path()
+        if path:
+            print(f"   Caminho crítico: {' → '.join(path)} ({total:.2f}s)")
+        print(f"   Tempo total: {self.wall_time:.2f}s")
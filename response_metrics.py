@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+from id_encoding import code_column, MISSING_CODE
+
+NS_PER_SECOND = 1_000_000_000
+
+
+def _session_keys(messages, ids=None):
+    """Retorna (chaves inteiras por mensagem, função de decodificação)"""
+    code_col = code_column('sessionID')
+    if ids is not None and code_col in messages.columns:
+        keys = messages[code_col].to_numpy()
+        return keys, lambda codes: ids.decode('sessionID', codes)
+
+    keys, uniques = pd.factorize(messages['sessionID'])
+    uniques = np.asarray(uniques, dtype=object)
+    return keys.astype(np.int32), lambda codes: uniques.take(codes)
+
+
+def reply_latency_metrics(messages, ids=None, exclude_events=True):
+    """Calcula a cadência de respostas (entrada -> saída) por sessão
+
+    As mensagens são ordenadas uma única vez por (sessão, createdAt). Cada
+    sequência de mensagens do cliente (inbound) é um "turno"; o tempo até a
+    próxima mensagem de saída (outbound) da mesma sessão é o intervalo de
+    resposta do turno. Tudo é calculado com deslocamentos e reduções por
+    segmento (bincount), sem laços em Python.
+    """
+    required = ['sessionID', 'createdAt', 'messageDirection']
+    if messages is None or messages.empty or any(c not in messages.columns for c in required):
+        return None
+
+    keys, decode = _session_keys(messages, ids)
+    direction = messages['messageDirection'].to_numpy()
+    times = messages['createdAt'].to_numpy(dtype='datetime64[ns]')
+
+    valid = (keys != MISSING_CODE) & ~np.isnat(times) & np.isin(direction, ['inbound', 'outbound'])
+    if exclude_events and 'messageKey' in messages.columns:
+        valid &= messages['messageKey'].to_numpy() != 'event'
+    if not valid.any():
+        return None
+
+    keys = keys[valid]
+    times = times[valid].view(np.int64)
+    inbound = direction[valid] == 'inbound'
+
+    # Ordenação única por (sessão, createdAt)
+    order = np.lexsort((times, keys))
+    keys, times, inbound = keys[order], times[order], inbound[order]
+    n = len(keys)
+
+    # Segmentos contíguos por sessão
+    new_segment = np.empty(n, dtype=bool)
+    new_segment[0] = True
+    new_segment[1:] = keys[1:] != keys[:-1]
+    segment = np.cumsum(new_segment) - 1
+    n_segments = int(segment[-1]) + 1
+    segment_keys = keys[new_segment]
+
+    # Índice da próxima mensagem de saída (inclusive) para cada posição
+    positions = np.where(~inbound, np.arange(n), n)
+    next_out = np.minimum.accumulate(positions[::-1])[::-1]
+    segment_ext = np.append(segment, -1)
+    times_ext = np.append(times, 0)
+    answered = inbound & (segment_ext[next_out] == segment)
+
+    # Turnos do cliente: mensagem inbound no início da sessão ou após uma outbound
+    previous_inbound = np.empty(n, dtype=bool)
+    previous_inbound[0] = False
+    previous_inbound[1:] = inbound[:-1]
+    turn_start = inbound & (new_segment | ~previous_inbound)
+
+    replied = turn_start & answered
+    gaps = (times_ext[next_out[replied]] - times[replied]) / NS_PER_SECOND
+    replied_segment = segment[replied]
+
+    # Reduções por segmento
+    inbound_count = np.bincount(segment, weights=inbound, minlength=n_segments)
+    outbound_count = np.bincount(segment, weights=~inbound, minlength=n_segments)
+    turns = np.bincount(segment[turn_start], minlength=n_segments)
+    replies = np.bincount(replied_segment, minlength=n_segments)
+    unanswered = np.bincount(segment[inbound & ~answered], minlength=n_segments)
+    gap_sum = np.bincount(replied_segment, weights=gaps, minlength=n_segments)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_gap = np.where(replies > 0, gap_sum / np.maximum(replies, 1), np.nan)
+
+    max_gap = np.full(n_segments, -np.inf)
+    np.maximum.at(max_gap, replied_segment, gaps)
+    max_gap[replies == 0] = np.nan
+
+    # Primeira resposta: intervalo do primeiro turno da sessão
+    first_response = np.full(n_segments, np.nan)
+    turn_segment = segment[turn_start]
+    is_first_turn = np.empty(len(turn_segment), dtype=bool)
+    if len(turn_segment):
+        is_first_turn[0] = True
+        is_first_turn[1:] = turn_segment[1:] != turn_segment[:-1]
+    first_turn_positions = np.flatnonzero(turn_start)[is_first_turn]
+    first_answered = answered[first_turn_positions]
+    first_turn_positions = first_turn_positions[first_answered]
+    first_response[segment[first_turn_positions]] = (
+        times_ext[next_out[first_turn_positions]] - times[first_turn_positions]
+    ) / NS_PER_SECOND
+
+    result = pd.DataFrame({
+        'first_response_seconds': first_response,
+        'mean_reply_gap_seconds': mean_gap,
+        'max_reply_gap_seconds': max_gap,
+        'customer_turns': turns,
+        'answered_turns': replies,
+        'unanswered_messages': unanswered,
+        'inbound_messages': inbound_count.astype(np.int64),
+        'outbound_messages': outbound_count.astype(np.int64)
+    }, index=pd.Index(decode(segment_keys), name='sessionID'))
+
+    return result
+
+
+def summarize_reply_latency(per_session):
+    """Resumo agregado das métricas de resposta por sessão"""
+    if per_session is None or per_session.empty:
+        return None
+
+    first_response = per_session['first_response_seconds'].dropna()
+    gaps = per_session['mean_reply_gap_seconds'].dropna()
+    with_customer = per_session[per_session['inbound_messages'] > 0]
+
+    return {
+        'sessions': len(per_session),
+        'sessions_with_reply': int(first_response.count()),
+        'median_first_response_seconds': first_response.median() if not first_response.empty else None,
+        'mean_first_response_seconds': first_response.mean() if not first_response.empty else None,
+        'mean_reply_gap_seconds': gaps.mean() if not gaps.empty else None,
+        'max_reply_gap_seconds': per_session['max_reply_gap_seconds'].max(),
+        'unanswered_messages': int(per_session['unanswered_messages'].sum()),
+        'sessions_with_unanswered_pct': (
+            (with_customer['unanswered_messages'] > 0).mean() * 100 if not with_customer.empty else 0
+        )
+    }
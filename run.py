@@ -7,6 +7,15 @@ Uso:
     
 ou para instalar dependências automaticamente:
     python run.py --install
+
+ou para preparar o snapshot processado antes de iniciar o servidor:
+    python run.py --prewarm
+
+ou para incorporar novos exports de data/ enquanto o dashboard roda:
+    python run.py --watch
+
+ou para servir também a API local de métricas (http://127.0.0.1:8765):
+    python run.py --api
 """
 
 import subprocess
@@ -49,8 +58,28 @@ def check_data_files():
     print("✅ Todos os arquivos de dados encontrados!")
     return True
 
-def run_streamlit():
-    """Executa a aplicação Streamlit"""
+def prewarm_snapshot():
+    """Constrói ou valida o snapshot processado e os agregados do dashboard"""
+    print("🔥 Preparando snapshot do dashboard...")
+    try:
+        from dashboard_data import prewarm
+        return prewarm() is not None
+    except Exception as e:
+        print(f"❌ Erro ao preparar snapshot: {e}")
+        return False
+
+def start_ingestion():
+    """Inicia o daemon de ingestão em segundo plano"""
+    print("👀 Iniciando ingestão contínua de data/...")
+    return subprocess.Popen([sys.executable, "ingest_daemon.py"])
+
+def start_metrics_api():
+    """Inicia a API local de métricas em segundo plano"""
+    print("🌐 Iniciando API de métricas em http://127.0.0.1:8765...")
+    return subprocess.Popen([sys.executable, "metrics_api.py", "--quiet"])
+
+def run_streamlit(background=()):
+    """Executa a aplicação Streamlit (processos em background são encerrados ao final)"""
     print("🚀 Iniciando Dashboard CX...")
     try:
         subprocess.run([sys.executable, "-m", "streamlit", "run", "app.py", "--server.port=8501"])
@@ -58,6 +87,9 @@ def run_streamlit():
         print("\n👋 Dashboard encerrado pelo usuário")
     except Exception as e:
         print(f"❌ Erro ao executar dashboard: {e}")
+    finally:
+        for process in background:
+            process.terminate()
 
 def main():
     """Função principal"""
@@ -82,15 +114,29 @@ def main():
     if not check_data_files():
         sys.exit(1)
     
+    # Pré-processar dados antes de aceitar acessos
+    if "--prewarm" in sys.argv or "--watch" in sys.argv:
+        if not prewarm_snapshot():
+            sys.exit(1)
+    
+    # Ingestão contínua de novos exports e API de métricas
+    background = []
+    if "--watch" in sys.argv:
+        background.append(start_ingestion())
+    if "--api" in sys.argv:
+        background.append(start_metrics_api())
+    
     # Mostrar informações
     print("\n📋 Informações do Dashboard:")
     print("   - URL: http://localhost:8501")
+    if "--api" in sys.argv:
+        print("   - API de métricas: http://127.0.0.1:8765")
     print("   - Para parar: Ctrl+C")
     print("   - Logs: aparecerão abaixo")
     print("\n" + "=" * 50)
     
     # Executar dashboard
-    run_streamlit()
+    run_streamlit(background)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,237 @@
+import os
+import json
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from file_lock import directory_lock, replace_file
+
+# Diretório padrão da amostra persistida das sessões do dashboard
+SAMPLE_DIR = "processed_data/sample"
+
+# Fração dos contatos sorteados
+DEFAULT_SAMPLE_RATE = 0.1
+
+# Estratos da amostra: os mesmos recortes dos filtros do dashboard
+STRATUM_KEYS = ['date', 'pluginConnectionLabel']
+
+# Coluna com o peso de cada sessão da amostra (ver SessionSample.weighted)
+WEIGHT_COLUMN = '__sampleWeight'
+
+# Quantil da normal para intervalos de 95%
+Z_95 = 1.959963984540054
+
+# Rótulo dos estratos sem síndico (NaN não casa em reindex de MultiIndex)
+_NO_LABEL = ''
+
+
+def sampling_units(data):
+    """Posição (0 a 1) de cada sessão no sorteio, pelo hash do contato (ou da sessão, sem contato)
+
+    Todas as sessões de um contato têm a mesma posição, de modo que a amostra
+    preserva as sequências de sessões de cada contato sorteado (coortes e
+    reaberturas). O hash é determinístico: sessões novas são sorteadas sem
+    olhar para as antigas.
+    """
+    keys = data['sessionID'].astype(object)
+    if 'contactID' in data.columns:
+        keys = data['contactID'].astype(object).where(data['contactID'].notna(), keys)
+    hashes = pd.util.hash_array(keys.fillna(_NO_LABEL).to_numpy(dtype=object))
+    return hashes / np.float64(2 ** 64)
+
+
+def _stratum_index(frame):
+    """MultiIndex (dia, síndico) de cada linha, com síndico ausente como rótulo vazio"""
+    labels = frame['pluginConnectionLabel'] if 'pluginConnectionLabel' in frame.columns else pd.Series(np.nan, index=frame.index)
+    return pd.MultiIndex.from_arrays(
+        [frame['date'].to_numpy(), labels.astype(object).where(labels.notna(), _NO_LABEL).to_numpy()],
+        names=STRATUM_KEYS
+    )
+
+
+def stratum_sizes(aggregates):
+    """Sessões da população por estrato (dia x síndico), a partir dos agregados exatos"""
+    return aggregates['sessions'].groupby(_stratum_index(aggregates)).sum()
+
+
+def select_sample(data, rate=DEFAULT_SAMPLE_RATE):
+    """Máscara das sessões na amostra: sessões dos contatos sorteados, em todos os estratos
+
+    Cada estrato recebe a mesma fração dos contatos (alocação
+    proporcional); estratos pequenos não são tomados inteiros, pois
+    sessões avulsas de contatos não sorteados quebrariam as sequências de
+    sessões; eles ficam com intervalos mais largos.
+    """
+    return sampling_units(data) < rate
+
+
+def sample_weights(sample, sizes):
+    """Peso de cada sessão da amostra: sessões do estrato na população / na amostra
+
+    Os filtros do dashboard (período e síndico) selecionam estratos inteiros,
+    então os pesos valem para qualquer recorte.
+    """
+    strata = _stratum_index(sample)
+    sampled = pd.Series(1, index=strata).groupby(level=STRATUM_KEYS).sum()
+    population = sizes.reindex(strata, fill_value=0).to_numpy(dtype=np.float64)
+    return population / sampled.reindex(strata).to_numpy(dtype=np.float64)
+
+
+def ratio_ci(numerator, denominator, groups=None, n_groups=1, weights=None, clusters=None, rate=1.0, z=Z_95):
+    """Razões ponderadas Σw·y / Σw·x por grupo e a margem do intervalo de confiança
+
+    Variância por linearização de Taylor com os contatos como conglomerados
+    (as sessões de um contato entram juntas na amostra) e correção de
+    população finita (1 - rate); com rate = 1 (dados completos) a margem é
+    zero. Retorna (estimativas, margens), arrays com um valor por grupo.
+    """
+    y = np.asarray(numerator, dtype=np.float64)
+    x = np.asarray(denominator, dtype=np.float64)
+    groups = np.zeros(len(y), dtype=np.int64) if groups is None else np.asarray(groups, dtype=np.int64)
+    weights = np.ones(len(y)) if weights is None else np.asarray(weights, dtype=np.float64)
+    y_total = np.bincount(groups, weights=weights * y, minlength=n_groups)
+    x_total = np.bincount(groups, weights=weights * x, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        estimate = y_total / x_total
+    if rate >= 1 or len(y) == 0:
+        return estimate, np.where(np.isnan(estimate), np.nan, 0.0)
+
+    # Resíduos linearizados somados por (grupo, contato): ordenação + reduceat
+    residuals = weights * (y - np.nan_to_num(estimate)[groups] * x)
+    clusters = np.arange(len(y)) if clusters is None else np.asarray(clusters, dtype=np.int64)
+    keys = groups * (int(clusters.max()) + 1) + clusters
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    cluster_sums = np.add.reduceat(residuals[order], starts)
+    cluster_groups = groups[order][starts]
+    n_clusters = np.bincount(cluster_groups, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variance = (1 - rate) * n_clusters / (n_clusters - 1) * np.bincount(
+            cluster_groups, weights=cluster_sums ** 2, minlength=n_groups
+        ) / x_total ** 2
+    margin = z * np.sqrt(np.where(n_clusters > 1, variance, np.nan))
+    return estimate, margin
+
+
+def distinct_ci(count, rate=1.0, z=Z_95):
+    """Total de contatos distintos estimado a partir dos sorteados e a margem (sorteio de Bernoulli)"""
+    if rate >= 1:
+        return float(count), 0.0
+    return count / rate, z * np.sqrt(count * (1 - rate)) / rate
+
+
+def proportion_ci(successes, trials, rate=1.0, z=Z_95):
+    """Proporção entre contatos sorteados e a margem (aproximação normal com correção de população finita)"""
+    successes = np.asarray(successes, dtype=np.float64)
+    trials = np.asarray(trials, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        estimate = successes / trials
+        margin = z * np.sqrt(estimate * (1 - estimate) / trials * max(1 - rate, 0.0))
+    return estimate, margin
+
+
+class SessionSample:
+    """Amostra estratificada (dia x síndico) das sessões do snapshot, mantida de forma incremental
+
+    As sessões são sorteadas pelo hash do contato (ver sampling_units) e
+    cada uma pesa sessões do estrato / sessões do estrato na amostra, com
+    as contagens exatas dos agregados do snapshot (pós-estratificação).
+    Novos exports só sorteiam as próprias sessões, sem reler o histórico;
+    a amostra grava a versão do snapshot que representa.
+    """
+
+    DATA_FILE = "sample.pkl"
+    MANIFEST_FILE = "manifest.json"
+
+    def __init__(self, sample_dir=SAMPLE_DIR, rate=DEFAULT_SAMPLE_RATE):
+        self.sample_dir = sample_dir
+        self.rate = rate
+
+    def read_manifest(self):
+        """Manifesto da amostra (None se ausente, corrompido ou de outra fração)"""
+        manifest_path = os.path.join(self.sample_dir, self.MANIFEST_FILE)
+        if not os.path.exists(manifest_path) or not os.path.exists(os.path.join(self.sample_dir, self.DATA_FILE)):
+            return None
+        try:
+            with open(manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return manifest if manifest.get('rate') == self.rate else None
+
+    def snapshot_version(self):
+        """Versão do snapshot que a amostra representa (None se não houver amostra válida)"""
+        manifest = self.read_manifest()
+        return manifest.get('snapshot_version') if manifest is not None else None
+
+    def _save(self, name, write):
+        replace_file(os.path.join(self.sample_dir, name), write)
+
+    def _store(self, sample, population, snapshot_version):
+        self._save(self.DATA_FILE, sample.to_pickle)
+        manifest = {
+            'rate': self.rate,
+            'rows': len(sample),
+            'population': population,
+            'snapshot_version': snapshot_version,
+            'built_at': datetime.now().isoformat(timespec='seconds')
+        }
+        self._save(self.MANIFEST_FILE, lambda f: f.write(json.dumps(manifest, indent=2).encode('utf-8')))
+        return manifest
+
+    def load(self):
+        """Sessões da amostra (None se não houver amostra válida)"""
+        if self.read_manifest() is None:
+            return None
+        return pd.read_pickle(os.path.join(self.sample_dir, self.DATA_FILE))
+
+    def rebuild(self, data, aggregates, snapshot_version=None):
+        """Sorteia a amostra a partir de todas as sessões"""
+        with directory_lock(self.sample_dir):
+            return self._rebuild(data, aggregates, snapshot_version)
+
+    def _rebuild(self, data, aggregates, snapshot_version):
+        sample = data[select_sample(data, self.rate)].reset_index(drop=True)
+        return self._store(sample, int(aggregates['sessions'].sum()), snapshot_version)
+
+    def ensure(self, snapshot_version, load_data, aggregates):
+        """Refaz a amostra com load_data() se ela não for da versão do snapshot
+
+        A versão é conferida de novo sob a trava: se o daemon de ingestão (ou
+        outro processo) acabou de gravá-la, os dados nem são carregados.
+        Retorna o manifesto.
+        """
+        with directory_lock(self.sample_dir):
+            manifest = self.read_manifest()
+            if manifest is not None and manifest.get('snapshot_version') == snapshot_version:
+                return manifest
+            return self._rebuild(load_data(), aggregates, snapshot_version)
+
+    def update(self, new_rows, aggregates, snapshot_version=None, base_version=None):
+        """Incorpora sessões novas ou atualizadas (por sessionID) sem reler as antigas
+
+        aggregates: agregados do snapshot já com as novas sessões (só o
+        total de sessões é registrado; os pesos são calculados na leitura).
+        base_version: versão do snapshot sobre a qual new_rows foi lido;
+        quando dada, uma amostra de outra versão não é atualizada.
+        Retorna o manifesto (None se não houver amostra para atualizar: use
+        rebuild).
+        """
+        with directory_lock(self.sample_dir):
+            sample = self.load()
+            if sample is None:
+                return None
+            if base_version is not None and self.snapshot_version() != base_version:
+                return None
+            new_rows = new_rows[~new_rows['sessionID'].duplicated(keep='last') | new_rows['sessionID'].isna()]
+            # Versões antigas das sessões atualizadas saem mesmo que o contato tenha mudado
+            kept = sample[~sample['sessionID'].isin(new_rows['sessionID'].dropna())]
+            sample = pd.concat([kept, new_rows[select_sample(new_rows, self.rate)]], ignore_index=True)
+            return self._store(sample, int(aggregates['sessions'].sum()), snapshot_version)
+
+    def weighted(self, sample, aggregates):
+        """Sessões da amostra com o peso de cada uma em WEIGHT_COLUMN
+
+        aggregates: agregados exatos de todo o snapshot (não filtrados).
+        """
+        return sample.assign(**{WEIGHT_COLUMN: sample_weights(sample, stratum_sizes(aggregates))})
@@ -0,0 +1,76 @@
+import os
+import shutil
+import pandas as pd
+
+
+class SentimentCache:
+    """Cache persistente das classificações de sentimento por messageID
+
+    Mensagens não mudam depois de criadas, então cada classificação é
+    calculada uma única vez. As classificações ficam em um subdiretório por
+    versão das regras (hash das listas de palavras-chave): ao mudar as
+    listas, a versão muda, o cache anterior deixa de ser usado e é removido
+    na próxima gravação.
+    """
+
+    SCORES_FILE = "scores.csv"
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self._version = None
+        self._scores = None
+
+    def _path(self, version):
+        return os.path.join(self.cache_dir, version, self.SCORES_FILE)
+
+    def _load(self, version):
+        """Carrega as classificações da versão pedida (uma vez por instância)"""
+        if self._version == version:
+            return self._scores
+
+        path = self._path(version)
+        if os.path.exists(path):
+            scores = pd.read_csv(path, dtype=str)
+            scores = scores.drop_duplicates('messageID', keep='last').set_index('messageID')['sentiment']
+        else:
+            scores = pd.Series(dtype=object)
+
+        self._version = version
+        self._scores = scores
+        return scores
+
+    def __len__(self):
+        return 0 if self._scores is None else len(self._scores)
+
+    def lookup(self, message_ids, version):
+        """Classificações em cache alinhadas a message_ids (NaN se ainda não classificadas)"""
+        message_ids = pd.Series(message_ids)
+        scores = self._load(version)
+        return message_ids.map(scores).astype(object)
+
+    def add(self, message_ids, sentiments, version):
+        """Acrescenta novas classificações ao cache da versão (somente anexando ao arquivo)"""
+        new_scores = pd.DataFrame({
+            'messageID': pd.Series(message_ids).to_numpy(),
+            'sentiment': pd.Series(sentiments).to_numpy()
+        }).dropna(subset=['messageID'])
+        if new_scores.empty:
+            return
+
+        self._discard_other_versions(version)
+        path = self._path(version)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        new_scores.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+
+        scores = self._load(version)
+        self._scores = pd.concat([scores, new_scores.set_index('messageID')['sentiment']])
+        self._scores = self._scores[~self._scores.index.duplicated(keep='last')]
+
+    def _discard_other_versions(self, version):
+        """Remove caches gerados com outras listas de palavras-chave"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name != version and os.path.isdir(path):
+                shutil.rmtree(path)
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+from id_encoding import MISSING_CODE, code_column
+from kernels import timestamp_ns
+
+# Textos das mensagens do índice de conversas do dashboard (MessageTextStore)
+CONVERSATION_TEXT_DIR = "processed_data/conversation_text"
+
+
+class SessionIndex:
+    """Mensagens ordenadas por (sessão, createdAt) com offsets CSR por código de sessão
+
+    As mensagens da sessão de código c ocupam as linhas
+    offsets[c]:offsets[c + 1] de self.messages, então abrir uma conversa é
+    uma fatia contígua (O(1)) e reduções por sessão viram operações por
+    segmento (ufunc.reduceat), sem filtros nem groupby sobre sessionID.
+    Mensagens sem sessão ficam no final, depois de offsets[-1]; dentro de
+    cada sessão, mensagens sem createdAt vêm por último.
+
+    ids: IDDictionary do DataProcessor (usa a coluna sessionID_code); sem
+    ele, os códigos são criados aqui a partir de sessionID.
+    text_store: MessageTextStore dos textos (DataProcessor.text_store); com
+    ele, as mensagens guardam só a coluna text_row e conversation() lê do
+    disco apenas os textos da sessão aberta.
+    """
+
+    def __init__(self, messages, ids=None, text_store=None):
+        if ids is not None and code_column('sessionID') in messages.columns:
+            codes = messages[code_column('sessionID')].to_numpy()
+            self.session_ids = None
+            n_sessions = ids.size('sessionID')
+        else:
+            codes, uniques = pd.factorize(messages['sessionID'])
+            self.session_ids = pd.Index(uniques, dtype=object)
+            n_sessions = len(uniques)
+        self.ids = ids
+        self.text_store = text_store
+
+        times, valid = timestamp_ns(messages['createdAt'])
+        times = np.where(valid, times, np.iinfo(np.int64).max)
+        keys = np.where(codes != MISSING_CODE, codes, n_sessions).astype(np.int64)
+
+        order = np.lexsort((times, keys))
+        self.messages = messages.take(order).reset_index(drop=True)
+
+        counts = np.bincount(keys, minlength=n_sessions + 1)[:n_sessions]
+        self.offsets = np.zeros(n_sessions + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.offsets[1:])
+
+    def __len__(self):
+        """Número de códigos de sessão (inclusive sessões sem mensagens)"""
+        return len(self.offsets) - 1
+
+    def codes(self, session_ids):
+        """Códigos de sessão de IDs (MISSING_CODE para IDs desconhecidos)"""
+        if self.session_ids is None:
+            return self.ids.lookup('sessionID', session_ids)
+        return self.session_ids.get_indexer(np.asarray(session_ids, dtype=object)).astype(np.int32)
+
+    def decode(self, codes):
+        """IDs de sessão dos códigos"""
+        codes = np.asarray(codes)
+        if self.session_ids is None:
+            return self.ids.decode('sessionID', codes)
+        return self.session_ids.take(codes).to_numpy()
+
+    def session(self, code):
+        """Mensagens de uma sessão em ordem cronológica (fatia contígua)"""
+        if code == MISSING_CODE or code >= len(self):
+            return self.messages.iloc[0:0]
+        return self.messages.iloc[self.offsets[code]:self.offsets[code + 1]]
+
+    def conversation(self, session_id):
+        """Mensagens de uma sessão pelo sessionID, com os textos (messageValue) da fatia"""
+        messages = self.session(int(self.codes([session_id])[0]))
+        if self.text_store is None or 'text_row' not in messages.columns:
+            return messages
+        texts = self.text_store.get_batch(messages['text_row'].to_numpy()) if len(messages) else []
+        return messages.assign(messageValue=pd.Series(texts, index=messages.index, dtype=object))
+
+    def counts(self):
+        """Mensagens por código de sessão"""
+        return np.diff(self.offsets)
+
+    def reduce(self, values, ufunc=np.add, empty=0):
+        """Redução por sessão de valores na ordem de self.messages (empty para sessões sem mensagens)"""
+        values = np.asarray(values)[:self.offsets[-1]]
+        counts = self.counts()
+        nonempty = counts > 0
+        reduced = ufunc.reduceat(values, self.offsets[:-1][nonempty]) if values.size else values
+        result = np.full(len(self), empty, dtype=np.result_type(reduced, np.min_scalar_type(empty)))
+        result[nonempty] = reduced
+        return result
+
+    def first(self, column):
+        """Valor da primeira mensagem de cada sessão com mensagens (índice = código)"""
+        nonempty = np.flatnonzero(self.counts() > 0)
+        return self.messages[column].take(self.offsets[nonempty]).set_axis(nonempty)
+
+    def last(self, column):
+        """Valor da última mensagem de cada sessão com mensagens (índice = código)"""
+        nonempty = np.flatnonzero(self.counts() > 0)
+        return self.messages[column].take(self.offsets[nonempty + 1] - 1).set_axis(nonempty)
+
+    def summary(self, codes=None):
+        """Mensagens, entrada/saída e primeira/última mensagem por sessão
+
+        codes limita o resumo às sessões pedidas (sessões sem mensagens ficam
+        de fora). O índice é o sessionID.
+        """
+        counts = self.counts()
+        selected = np.flatnonzero(counts > 0)
+        if codes is not None:
+            codes = np.unique(np.asarray(codes))
+            codes = codes[(codes != MISSING_CODE) & (codes < len(self))]
+            selected = codes[counts[codes] > 0]
+
+        summary = pd.DataFrame({'message_count': counts[selected]}, index=pd.Index(self.decode(selected), name='sessionID'))
+        if 'messageDirection' in self.messages.columns:
+            direction = self.messages['messageDirection'].to_numpy()
+            summary['inbound'] = self.reduce((direction == 'inbound').astype(np.int64))[selected]
+            summary['outbound'] = self.reduce((direction == 'outbound').astype(np.int64))[selected]
+        # Mensagens sem createdAt ficam no fim da sessão: a última data é a da última válida
+        created = self.messages['createdAt']
+        valid_counts = self.reduce(created.notna().to_numpy().astype(np.int64))[selected]
+        starts = self.offsets[selected]
+        stops = starts + np.maximum(valid_counts - 1, 0)
+        summary['first_message_at'] = created.take(starts).to_numpy()
+        summary['last_message_at'] = created.take(stops).to_numpy()
+        return summary
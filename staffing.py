@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+from kernels import timestamp_ns, NS_PER_DAY, NS_PER_HOUR, EPOCH_WEEKDAY
+
+# Faixas de dia da semana x hora (segunda = 0)
+N_BUCKETS = 7 * 24
+
+# Metas padrão: 80% das sessões atendidas em até 60 segundos
+DEFAULT_TARGET_LEVEL = 0.8
+DEFAULT_TARGET_SECONDS = 60
+
+
+def arrival_profile(sessions, handle_column='__sessionManualDuration', group_column=None):
+    """Taxa de chegada (sessões/hora) e tempo médio de atendimento por dia da semana x hora
+
+    Contam como chegadas as sessões com tempo de atendimento (handle_column,
+    em segundos) positivo, isto é, que ocuparam um atendente. A taxa de cada
+    faixa é o total de chegadas dividido pelo número de vezes que aquele dia
+    da semana aparece no período observado. group_column calcula um perfil
+    por grupo (ex.: síndico); sessões sem grupo ficam de fora.
+
+    Retorna DataFrame com weekday, hour, [grupo], sessions, days,
+    arrival_rate e handle_seconds (NaN nas faixas sem chegadas), uma linha
+    por faixa (168 por grupo).
+    """
+    if sessions is None or sessions.empty or 'createdAt' not in sessions.columns or handle_column not in sessions.columns:
+        return None
+
+    ns, valid = timestamp_ns(sessions['createdAt'])
+    handle = pd.to_numeric(sessions[handle_column], errors='coerce').to_numpy(dtype=np.float64)
+    if group_column is not None:
+        groups, labels = pd.factorize(sessions[group_column], sort=True)
+    else:
+        groups, labels = np.zeros(len(sessions), dtype=np.int64), None
+    n_groups = len(labels) if labels is not None else 1
+
+    # Dias de cada dia da semana no período observado (inclusive dias sem sessões)
+    if not valid.any():
+        return None
+    days = ns[valid] // NS_PER_DAY
+    span = np.arange(days.min(), days.max() + 1)
+    days_per_weekday = np.bincount((span + EPOCH_WEEKDAY) % 7, minlength=7)
+
+    keep = valid & (handle > 0) & (groups >= 0)
+    buckets = ((ns[keep] // NS_PER_DAY + EPOCH_WEEKDAY) % 7) * 24 + (ns[keep] // NS_PER_HOUR) % 24
+    index = groups[keep] * N_BUCKETS + buckets
+    counts = np.bincount(index, minlength=n_groups * N_BUCKETS)
+    handle_sum = np.bincount(index, weights=handle[keep], minlength=n_groups * N_BUCKETS)
+
+    weekday = np.tile(np.repeat(np.arange(7), 24), n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        profile = pd.DataFrame({
+            'weekday': weekday,
+            'hour': np.tile(np.arange(24), 7 * n_groups),
+            'sessions': counts.astype(np.int64),
+            'days': days_per_weekday[weekday],
+            'arrival_rate': counts / np.maximum(days_per_weekday[weekday], 1),
+            'handle_seconds': np.where(counts > 0, handle_sum / counts, np.nan)
+        })
+    if labels is not None:
+        profile.insert(2, group_column, np.repeat(np.asarray(labels, dtype=object), N_BUCKETS))
+    return profile
+
+
+def log_erlang_c(traffic, agents):
+    """Log da probabilidade de espera (Erlang C) para arrays de tráfego e atendentes
+
+    traffic (Erlangs) e agents são combinados por broadcasting. Os termos
+    A^k / k! ficam em log e a soma acumulada vira logaddexp.accumulate, de
+    modo que não há overflow para tráfegos altos. Com agents <= traffic a
+    fila não estabiliza e a probabilidade é 1 (log 0).
+    """
+    traffic = np.asarray(traffic, dtype=np.float64)
+    agents = np.asarray(agents, dtype=np.int64)
+    max_agents = int(agents.max()) if agents.size else 0
+
+    # log(A^k / k!) para k = 0..max_agents, ao longo do último eixo
+    k = np.arange(max_agents + 1)
+    log_factorial = np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, max_agents + 1)))])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_traffic = np.log(traffic)[..., None]
+        log_terms = np.where(k > 0, k * log_traffic, 0.0) - log_factorial
+    # log da soma dos termos k < N (prefixo; posição 0 = soma vazia)
+    log_prefix = np.concatenate([
+        np.full(log_terms.shape[:-1] + (1,), -np.inf),
+        np.logaddexp.accumulate(log_terms, axis=-1)[..., :-1]
+    ], axis=-1)
+
+    shape = np.broadcast_shapes(traffic.shape, agents.shape)
+    traffic_b = np.broadcast_to(traffic, shape)
+    agents_b = np.broadcast_to(agents, shape)
+    take = lambda table: np.take_along_axis(
+        np.broadcast_to(table, shape + (max_agents + 1,)), agents_b[..., None], axis=-1
+    )[..., 0]
+
+    stable = agents_b > traffic_b
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_last = take(log_terms) + np.log(agents_b) - np.log(np.where(stable, agents_b - traffic_b, 1.0))
+        log_wait = log_last - np.logaddexp(take(log_prefix), log_last)
+    return np.where(stable, np.where(traffic_b > 0, log_wait, -np.inf), 0.0)
+
+
+def staffing_metrics(traffic, agents, handle_seconds, target_seconds=DEFAULT_TARGET_SECONDS):
+    """Probabilidade de espera, nível de serviço, espera média e ocupação (Erlang C)"""
+    traffic = np.asarray(traffic, dtype=np.float64)
+    agents = np.asarray(agents, dtype=np.float64)
+    handle_seconds = np.asarray(handle_seconds, dtype=np.float64)
+    wait = np.exp(log_erlang_c(traffic, agents))
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        spare = agents - traffic
+        stable = spare > 0
+        level = np.where(stable, 1 - wait * np.exp(-spare * target_seconds / handle_seconds), 0.0)
+        average_wait = np.where(stable, wait * handle_seconds / spare, np.inf)
+        occupancy = np.where(agents > 0, traffic / agents, np.nan)
+    level = np.where(traffic > 0, level, 1.0)
+    average_wait = np.where(traffic > 0, average_wait, 0.0)
+    return {'wait_probability': wait, 'service_level': level, 'average_wait_seconds': average_wait, 'occupancy': occupancy}
+
+
+def required_agents(traffic, handle_seconds, target_level=DEFAULT_TARGET_LEVEL,
+                    target_seconds=DEFAULT_TARGET_SECONDS, max_wait_seconds=None):
+    """Menor número de atendentes que cumpre a meta em cada faixa
+
+    Todas as faixas e todos os números candidatos de atendentes são avaliados
+    de uma vez (matriz faixas x candidatos) e a resposta é o primeiro
+    candidato que atinge target_level de sessões atendidas em até
+    target_seconds (e, se definido, espera média <= max_wait_seconds).
+    Faixas sem tráfego precisam de 0 atendentes.
+    """
+    traffic = np.nan_to_num(np.asarray(traffic, dtype=np.float64))
+    handle_seconds = np.nan_to_num(np.asarray(handle_seconds, dtype=np.float64), nan=1.0)
+    target_level = min(float(target_level), 0.9999)
+    if traffic.size == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    # Candidatos: de 1 até bem acima do tráfego máximo (a meta é sempre atingível antes)
+    peak = float(traffic.max())
+    candidates = np.arange(1, int(np.ceil(peak + 8 * np.sqrt(peak) + 10)) + 1)
+    metrics = staffing_metrics(traffic[:, None], candidates[None, :], handle_seconds[:, None], target_seconds)
+    feasible = metrics['service_level'] >= target_level
+    if max_wait_seconds is not None:
+        feasible &= metrics['average_wait_seconds'] <= max_wait_seconds
+
+    agents = candidates[np.argmax(feasible, axis=1)]
+    agents = np.where(feasible.any(axis=1), agents, candidates[-1])
+    return np.where(traffic > 0, agents, 0).astype(np.int64)
+
+
+def staffing_plan(profile, target_level=DEFAULT_TARGET_LEVEL, target_seconds=DEFAULT_TARGET_SECONDS,
+                  max_wait_seconds=None):
+    """Atendentes necessários por faixa do perfil (ver arrival_profile) para a meta
+
+    Acrescenta traffic (Erlangs), agents, service_level, wait_probability,
+    average_wait_seconds e occupancy ao perfil.
+    """
+    plan = profile.copy()
+    handle = plan['handle_seconds'].to_numpy(dtype=np.float64)
+    traffic = np.nan_to_num(plan['arrival_rate'].to_numpy(dtype=np.float64) * handle / 3600)
+    agents = required_agents(traffic, handle, target_level, target_seconds, max_wait_seconds)
+
+    metrics = staffing_metrics(traffic, agents, np.nan_to_num(handle, nan=1.0), target_seconds)
+    plan['traffic'] = traffic
+    plan['agents'] = agents
+    for name, values in metrics.items():
+        plan[name] = values
+    return plan
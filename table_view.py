@@ -0,0 +1,120 @@
+import math
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+
+def format_duration_series(seconds):
+    """Formata durações em segundos como HH:MM:SS ('N/A' para vazios ou <= 0)"""
+    values = pd.to_numeric(pd.Series(seconds), errors='coerce')
+    valid = values.notna() & (values > 0)
+    total = values.where(valid, 0).astype(np.int64)
+
+    hours = (total // 3600).astype(str).str.zfill(2)
+    minutes = ((total % 3600) // 60).astype(str).str.zfill(2)
+    secs = (total % 60).astype(str).str.zfill(2)
+    return (hours + ':' + minutes + ':' + secs).where(valid, 'N/A')
+
+
+def filter_rows(df, term):
+    """Linhas cujo índice ou alguma coluna de texto contém o termo (sem diferenciar maiúsculas)"""
+    if not term:
+        return df
+
+    mask = pd.Series(df.index.astype(str), index=df.index).str.contains(term, case=False, regex=False)
+    for col in df.columns:
+        if pd.api.types.is_string_dtype(df[col]) or df[col].dtype == object:
+            mask |= df[col].astype(str).str.contains(term, case=False, regex=False)
+    return df[mask]
+
+
+def filter_columns(df, term):
+    """Colunas cujo nome contém o termo (usado em tabelas dinâmicas)"""
+    if not term:
+        return df
+    keep = pd.Index(df.columns.astype(str)).str.contains(term, case=False, regex=False)
+    return df.loc[:, keep]
+
+
+def sort_rows(df, sort_by, descending=False):
+    """Ordena pelo índice (sort_by=None) ou por uma coluna"""
+    if sort_by is None:
+        return df.sort_index(ascending=not descending)
+    return df.sort_values(sort_by, ascending=not descending, kind='stable')
+
+
+def paginated_table(df, key, page_size=25, max_columns=None, search_target='rows',
+                    formatters=None, column_config=None, default_sort=None, default_descending=False):
+    """Tabela paginada com busca e ordenação feitas no servidor
+
+    O agregado completo fica no servidor; apenas a página (e a janela de
+    colunas, se max_columns for definido) é enviada ao navegador. Os
+    formatadores vetorizados são aplicados somente às linhas visíveis, de
+    modo que a ordenação usa os valores numéricos originais.
+    """
+    if df.empty:
+        st.info("Nenhum dado para exibir")
+        return
+
+    index_label = df.index.name or "Índice"
+    sort_options = [index_label] + [str(col) for col in df.columns]
+    default_index = sort_options.index(default_sort) if default_sort in sort_options else 0
+
+    controls = st.columns([3, 2, 1, 1])
+    with controls[0]:
+        search = st.text_input(
+            "🔎 Buscar",
+            key=f"{key}_search",
+            placeholder="Filtrar colunas..." if search_target == 'columns' else "Filtrar linhas..."
+        )
+    with controls[1]:
+        sort_label = st.selectbox("Ordenar por", sort_options, index=default_index, key=f"{key}_sort")
+    with controls[2]:
+        descending = st.checkbox("Decrescente", value=default_descending, key=f"{key}_desc")
+
+    view = filter_columns(df, search) if search_target == 'columns' else filter_rows(df, search)
+    sort_by = None
+    if sort_label != index_label:
+        sort_by = next((col for col in view.columns if str(col) == sort_label), None)
+    view = sort_rows(view, sort_by, descending)
+
+    # Página atual (limitada ao total de páginas após a busca)
+    page_key = f"{key}_page"
+    total_pages = max(1, math.ceil(len(view) / page_size))
+    if st.session_state.get(page_key, 1) > total_pages:
+        st.session_state[page_key] = total_pages
+    with controls[3]:
+        page = st.number_input("Página", min_value=1, max_value=total_pages, step=1, key=page_key)
+
+    # Janela de colunas para tabelas largas
+    columns = list(view.columns)
+    column_start = 0
+    if max_columns and len(columns) > max_columns:
+        # Posição da janela limitada às colunas que restaram após a busca
+        columns_key = f"{key}_columns"
+        if st.session_state.get(columns_key, 0) > len(columns) - max_columns:
+            st.session_state[columns_key] = len(columns) - max_columns
+        column_start = st.slider(
+            "Colunas visíveis",
+            min_value=0,
+            max_value=len(columns) - max_columns,
+            step=1,
+            key=columns_key
+        )
+        columns = columns[column_start:column_start + max_columns]
+
+    row_start = (int(page) - 1) * page_size
+    page_df = view.iloc[row_start:row_start + page_size][columns]
+
+    if formatters:
+        page_df = page_df.copy()
+        for col, formatter in formatters.items():
+            if col in page_df.columns:
+                page_df[col] = formatter(page_df[col]).to_numpy()
+
+    st.dataframe(page_df, use_container_width=True, column_config=column_config)
+
+    caption = f"Linhas {row_start + 1 if len(view) else 0}–{row_start + len(page_df)} de {len(view):,}"
+    if len(columns) < len(view.columns):
+        caption += f" · colunas {column_start + 1}–{column_start + len(columns)} de {len(view.columns):,}"
+    st.caption(caption)
@@ -0,0 +1,362 @@
+import os
+import json
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from csv_engine import iter_csv
+from kernels import timestamp_ns, NS_PER_DAY
+from dashboard_data import source_fingerprint
+from file_lock import directory_lock, replace_file
+from text_index import normalize_terms, message_hashes
+
+# Diretório padrão das contagens diárias persistidas
+TERM_STATS_DIR = "processed_data/term_stats"
+
+# Colunas do export de mensagens usadas nas contagens
+TERM_STATS_COLUMNS = ['messageID', 'messageDirection', 'messageValue', 'createdAt']
+
+# Palavras sem conteúdo (já sem acentos); "nao" fica de fora por mudar o sentido
+STOPWORDS = frozenset("""
+    a o e as os um uma uns umas de da do das dos em na no nas nos ao aos
+    para pra pro pela pelo por com sem que se ou mas mais muito ja la aqui
+    eu voce vc ele ela eles elas me te lhe nos meu minha seu sua isso esse
+    essa este esta isto tem ter foi ser sao estou esta ta ai entao so tambem
+    como quando onde qual quem ate sobre bom boa dia tarde noite oi ola
+""".split())
+
+# Mistura dos hashes de dois termos em um hash de bigrama
+_PAIR_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _empty_vocabulary():
+    """Vocabulário vazio com índice uint64 (concatenar com índice int64 converteria os hashes para float)"""
+    return pd.Series(dtype=object, index=pd.Index([], dtype=np.uint64))
+
+
+def _is_term(term):
+    """Termo conta nas estatísticas: 2+ caracteres, não numérico e fora das stopwords"""
+    return len(term) > 1 and not term.isdigit() and term not in STOPWORDS
+
+
+def _pair_hash(first, second):
+    """Hash de um bigrama a partir dos hashes dos termos (ordem importa)"""
+    with np.errstate(over='ignore'):
+        return (first * _PAIR_MULTIPLIER) ^ ((second << np.uint64(1)) | (second >> np.uint64(63)))
+
+
+def _count_keys(days, hashes):
+    """Contagem exata de pares (dia, hash) por ordenação: (dias, hashes, contagens)"""
+    if hashes.size == 0:
+        return days[:0], hashes[:0], np.zeros(0, dtype=np.int64)
+    order = np.lexsort((hashes, days))
+    days, hashes = days[order], hashes[order]
+    starts = np.flatnonzero(np.r_[True, (days[1:] != days[:-1]) | (hashes[1:] != hashes[:-1])])
+    return days[starts], hashes[starts], np.diff(np.r_[starts, len(hashes)])
+
+
+def term_counts(texts, days):
+    """Contagens exatas de unigramas e bigramas por dia, com termos identificados por hash
+
+    texts: textos das mensagens; days: dia de cada texto (inteiro, dias
+    desde 1970). Os tokens são os do índice de busca (sem acentos, em
+    minúsculas); stopwords, números e letras soltas não contam e bigramas
+    são pares consecutivos de termos válidos na mesma mensagem. Cada termo
+    vira um hash de 64 bits e as contagens são acumuladas de forma esparsa
+    (só os pares dia x termo que ocorrem), sem Counter por mensagem.
+
+    Retorna {'counts': DataFrame day, ngram, hash, count; 'totals':
+    DataFrame por dia com messages, unigrams e bigrams; 'vocabulary':
+    Series hash -> termo}.
+    """
+    terms = normalize_terms(texts).reset_index(drop=True)
+    days = np.asarray(days, dtype=np.int64)
+    lengths = terms.str.len().to_numpy()
+    nonempty = np.flatnonzero(lengths > 0)
+    tokens = terms.iloc[nonempty].explode().to_numpy(dtype=object)
+    rows = np.repeat(nonempty, lengths[nonempty])
+
+    # Hash e filtro calculados uma vez por termo distinto do lote
+    codes, uniques = pd.factorize(tokens)
+    uniques = np.asarray(uniques, dtype=object)
+    unique_hashes = pd.util.hash_array(uniques) if len(uniques) else np.zeros(0, dtype=np.uint64)
+    valid = np.fromiter((_is_term(term) for term in uniques), dtype=bool, count=len(uniques))
+    hashes, keep, token_days = unique_hashes[codes], valid[codes], days[rows]
+
+    # Bigramas: termos vizinhos da mesma mensagem, ambos válidos
+    pair = (rows[1:] == rows[:-1]) & keep[:-1] & keep[1:]
+    pair_hashes = _pair_hash(hashes[:-1][pair], hashes[1:][pair])
+    pair_first = np.flatnonzero(pair)
+
+    parts = []
+    for ngram, ngram_days, ngram_hashes in ((1, token_days[keep], hashes[keep]), (2, token_days[:-1][pair], pair_hashes)):
+        day, key, count = _count_keys(ngram_days, ngram_hashes)
+        parts.append(pd.DataFrame({'day': day, 'ngram': np.full(len(key), ngram, dtype=np.uint8), 'hash': key, 'count': count}))
+
+    # Vocabulário: termos válidos e a primeira ocorrência de cada bigrama
+    order = np.argsort(pair_hashes, kind='stable')
+    distinct = np.r_[True, pair_hashes[order][1:] != pair_hashes[order][:-1]] if order.size else np.zeros(0, dtype=bool)
+    distinct_pairs, first = pair_hashes[order][distinct], order[distinct]
+    pair_terms = [f"{uniques[codes[i]]} {uniques[codes[i + 1]]}" for i in pair_first[first]]
+    vocabulary = pd.Series(
+        np.concatenate([uniques[valid], np.asarray(pair_terms, dtype=object)]),
+        index=np.concatenate([unique_hashes[valid], distinct_pairs]), dtype=object
+    )
+
+    first_day = int(days.min()) if days.size else 0
+    messages = np.bincount(days - first_day) if days.size else np.zeros(0, dtype=np.int64)
+    present = np.flatnonzero(messages)
+    totals = pd.DataFrame({'messages': messages[present]}, index=pd.Index(present + first_day, name='day'))
+    for ngram, part in zip(('unigrams', 'bigrams'), parts):
+        totals[ngram] = part.groupby('day')['count'].sum().reindex(totals.index, fill_value=0).astype(np.int64)
+    return {'counts': pd.concat(parts, ignore_index=True), 'totals': totals, 'vocabulary': vocabulary}
+
+
+def merge_term_counts(parts):
+    """Soma contagens de vários lotes (ver term_counts) em uma única tabela"""
+    parts = [part for part in parts if part is not None]
+    if not parts:
+        return None
+    counts = pd.concat([part['counts'] for part in parts], ignore_index=True)
+    counts = counts.groupby(['day', 'ngram', 'hash'], as_index=False, sort=True)['count'].sum()
+    totals = pd.concat([part['totals'] for part in parts]).groupby(level='day').sum()
+    vocabulary = pd.concat([part['vocabulary'] for part in parts])
+    return {'counts': counts, 'totals': totals, 'vocabulary': vocabulary[~vocabulary.index.duplicated()]}
+
+
+def _period(table, start_day, end_day, ngram):
+    """Contagens por termo (hash) e total de ocorrências de um intervalo de dias"""
+    counts = table['counts']
+    mask = (counts['ngram'] == ngram) & (counts['day'] >= start_day) & (counts['day'] <= end_day)
+    per_term = counts[mask].groupby('hash')['count'].sum()
+    return per_term, int(per_term.sum())
+
+
+def term_report(table, start_day=None, end_day=None, top_n=20, min_count=3):
+    """Termos mais frequentes e em alta de um período a partir das contagens diárias
+
+    O período vai de start_day a end_day (dias desde 1970; padrão: todos os
+    dias da tabela). Em alta compara a taxa por mil termos do período com a
+    do período anterior de mesmo tamanho (crescimento = razão das taxas, com
+    +1 nas contagens para termos novos), entre os termos com pelo menos
+    min_count ocorrências. Retorna {'top_unigrams', 'top_bigrams',
+    'rising_unigrams', 'rising_bigrams', 'messages', 'start', 'end'}.
+    """
+    if table is None or table['totals'].empty:
+        return None
+    days = table['totals'].index
+    start_day = int(days.min()) if start_day is None else int(start_day)
+    end_day = int(days.max()) if end_day is None else int(end_day)
+    length = end_day - start_day + 1
+    vocabulary = table['vocabulary']
+
+    report = {
+        'messages': int(table['totals'].loc[start_day:end_day, 'messages'].sum()),
+        'start': pd.Timestamp(start_day * NS_PER_DAY),
+        'end': pd.Timestamp(end_day * NS_PER_DAY)
+    }
+    for ngram, name in ((1, 'unigrams'), (2, 'bigrams')):
+        current, current_total = _period(table, start_day, end_day, ngram)
+        previous, previous_total = _period(table, start_day - length, start_day - 1, ngram)
+        top = current.sort_values(ascending=False, kind='stable').head(top_n)
+        report[f'top_{name}'] = pd.DataFrame({
+            'term': vocabulary.reindex(top.index).to_numpy(),
+            'count': top.to_numpy(),
+            'per_thousand': (top.to_numpy() / max(current_total, 1) * 1000).round(2)
+        })
+
+        candidates = current[current >= min_count]
+        before = previous.reindex(candidates.index, fill_value=0)
+        rate = candidates / max(current_total, 1) * 1000
+        previous_rate = before / max(previous_total, 1) * 1000
+        growth = ((candidates + 1) / max(current_total, 1)) / ((before + 1) / max(previous_total, 1))
+        rising = pd.DataFrame({
+            'term': vocabulary.reindex(candidates.index).to_numpy(),
+            'count': candidates.to_numpy(),
+            'previous_count': before.to_numpy(),
+            'per_thousand': rate.round(2).to_numpy(),
+            'previous_per_thousand': previous_rate.round(2).to_numpy(),
+            'growth': growth.round(2).to_numpy()
+        })
+        rising = rising[rising['growth'] > 1] if previous_total > 0 else rising.iloc[0:0]
+        report[f'rising_{name}'] = rising.sort_values(['growth', 'count'], ascending=False, kind='stable').head(top_n).reset_index(drop=True)
+    return report
+
+
+def message_days(created):
+    """Dia (inteiro, dias desde 1970, horário local) de cada data; -1 para datas ausentes"""
+    values, valid = timestamp_ns(created)
+    return np.where(valid, values // NS_PER_DAY, -1)
+
+
+class TermStats:
+    """Contagens diárias de unigramas e bigramas das mensagens recebidas, persistidas por dia
+
+    Cada dia é um arquivo .npz com os hashes dos termos, o tipo (1 = termo,
+    2 = bigrama) e as contagens, mais os totais do dia; o vocabulário
+    (hash -> termo) fica em um arquivo à parte. As atualizações somam às
+    tabelas dos dias afetados apenas as mensagens ainda não contadas (por
+    messageID), e qualquer período é a soma das tabelas dos seus dias.
+    Atualizações de processos diferentes (dashboard e daemon de ingestão)
+    são serializadas por uma trava no diretório.
+    """
+
+    MANIFEST_FILE = "manifest.json"
+    VOCABULARY_FILE = "vocabulary.npz"
+    HASHES_FILE = "message_hashes.npy"
+    DAYS_DIR = "days"
+
+    def __init__(self, store_dir=TERM_STATS_DIR):
+        self.store_dir = store_dir
+
+    def read_manifest(self):
+        """Manifesto (exports incorporados e versão); vazio se ainda não existir"""
+        manifest_path = os.path.join(self.store_dir, self.MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {'sources': {}, 'version': None}
+
+    def _write_manifest(self, manifest):
+        manifest['version'] = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        self._save(self.MANIFEST_FILE, lambda f: f.write(json.dumps(manifest, indent=2).encode('utf-8')))
+
+    def _save(self, name, write):
+        """Grava em um temporário de nome único (write recebe o arquivo aberto) e o troca atomicamente"""
+        replace_file(os.path.join(self.store_dir, name), write)
+
+    def _day_file(self, day):
+        return os.path.join(self.DAYS_DIR, f"{pd.Timestamp(int(day) * NS_PER_DAY).strftime('%Y-%m-%d')}.npz")
+
+    def days(self):
+        """Dias com contagens gravadas (inteiros, dias desde 1970)"""
+        days_dir = os.path.join(self.store_dir, self.DAYS_DIR)
+        if not os.path.isdir(days_dir):
+            return []
+        return sorted(
+            pd.Timestamp(name[:-len('.npz')]).value // NS_PER_DAY
+            for name in os.listdir(days_dir) if name.endswith('.npz')
+        )
+
+    def _read_day(self, day):
+        """Tabela de um dia no formato de term_counts (None se não existir)"""
+        path = os.path.join(self.store_dir, self._day_file(day))
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as stored:
+            counts = pd.DataFrame({
+                'day': np.full(len(stored['hash']), day, dtype=np.int64),
+                'ngram': stored['ngram'], 'hash': stored['hash'], 'count': stored['count']
+            })
+            totals = pd.DataFrame([stored['totals']], columns=['messages', 'unigrams', 'bigrams'], index=pd.Index([day], name='day'))
+        return {'counts': counts, 'totals': totals, 'vocabulary': _empty_vocabulary()}
+
+    def vocabulary(self):
+        """Termo de cada hash"""
+        path = os.path.join(self.store_dir, self.VOCABULARY_FILE)
+        if not os.path.exists(path):
+            return _empty_vocabulary()
+        with np.load(path) as stored:
+            return pd.Series(stored['terms'].astype(object), index=stored['hash'])
+
+    def add(self, messages):
+        """Soma às tabelas diárias as mensagens recebidas ainda não contadas
+
+        messages: DataFrame com TERM_STATS_COLUMNS. Retorna o número de
+        mensagens contadas.
+        """
+        if messages is None or messages.empty or 'messageValue' not in messages.columns:
+            return 0
+        with directory_lock(self.store_dir):
+            return self._add(messages)
+
+    def _add(self, messages):
+        """add com a trava do diretório já obtida (hashes contados relidos do disco)"""
+        messages = messages.reset_index(drop=True)
+        hashes = message_hashes(messages)
+        hashes_path = os.path.join(self.store_dir, self.HASHES_FILE)
+        seen = np.load(hashes_path) if os.path.exists(hashes_path) else np.zeros(0, dtype=np.uint64)
+
+        days = message_days(messages['createdAt'])
+        inbound = messages['messageDirection'].eq('inbound').to_numpy() if 'messageDirection' in messages.columns else True
+        new = (
+            inbound & messages['messageValue'].notna().to_numpy() & (days >= 0)
+            & ~np.isin(hashes, seen) & ~pd.Series(hashes).duplicated(keep='last').to_numpy()
+        )
+        if not new.any():
+            return 0
+
+        batch = term_counts(messages.loc[new, 'messageValue'], days[new])
+        for day in batch['totals'].index:
+            day_batch = {
+                'counts': batch['counts'][batch['counts']['day'] == day],
+                'totals': batch['totals'].loc[[day]],
+                'vocabulary': batch['vocabulary']
+            }
+            merged = merge_term_counts([self._read_day(day), day_batch])
+            counts, totals = merged['counts'], merged['totals'].loc[day]
+            self._save(self._day_file(day), lambda f: np.savez(
+                f, ngram=counts['ngram'].to_numpy(np.uint8), hash=counts['hash'].to_numpy(np.uint64),
+                count=counts['count'].to_numpy(np.int64), totals=totals[['messages', 'unigrams', 'bigrams']].to_numpy(np.int64)
+            ))
+
+        vocabulary = pd.concat([self.vocabulary(), batch['vocabulary']])
+        vocabulary = vocabulary[~vocabulary.index.duplicated()]
+        self._save(self.VOCABULARY_FILE, lambda f: np.savez(
+            f, hash=vocabulary.index.to_numpy(np.uint64), terms=np.asarray(vocabulary.to_numpy(), dtype=str)
+        ))
+        # Hashes gravados por último: em uma atualização interrompida as mensagens são recontadas, nunca perdidas
+        self._save(self.HASHES_FILE, lambda f: np.save(f, np.concatenate([seen, hashes[new]])))
+        return int(new.sum())
+
+    def sync(self, file_path, chunk_size=200000):
+        """Conta em lotes as mensagens novas de um export de mensagens
+
+        Exports já incorporados e inalterados (mtime e tamanho) não são
+        relidos. Retorna o número de mensagens contadas.
+        """
+        if not os.path.exists(file_path):
+            return 0
+        fingerprint = source_fingerprint(file_path)
+        if self.read_manifest()['sources'].get(file_path) == fingerprint:
+            return 0
+
+        with directory_lock(self.store_dir):
+            # Outro processo pode ter contado o export enquanto esperávamos a trava
+            manifest = self.read_manifest()
+            if manifest['sources'].get(file_path) == fingerprint:
+                return 0
+            added = 0
+            for chunk in iter_csv(file_path, usecols=lambda col: col in TERM_STATS_COLUMNS, chunksize=chunk_size):
+                if not chunk.empty and 'messageValue' in chunk.columns:
+                    added += self._add(chunk)
+            manifest['sources'][file_path] = fingerprint
+            self._write_manifest(manifest)
+        return added
+
+    def load(self, start_day=None, end_day=None):
+        """Contagens dos dias do intervalo (inclusive) no formato de term_counts"""
+        days = [day for day in self.days()
+                if (start_day is None or day >= start_day) and (end_day is None or day <= end_day)]
+        table = merge_term_counts([self._read_day(day) for day in days])
+        if table is not None:
+            table['vocabulary'] = self.vocabulary()
+        return table
+
+    def report(self, start=None, end=None, top_n=20, min_count=3):
+        """Termos mais frequentes e em alta entre as datas start e end (ver term_report)
+
+        As tabelas do período anterior de mesmo tamanho também são lidas,
+        para o cálculo dos termos em alta.
+        """
+        days = self.days()
+        if not days:
+            return None
+        start_day = pd.Timestamp(start).value // NS_PER_DAY if start is not None else days[0]
+        end_day = pd.Timestamp(end).value // NS_PER_DAY if end is not None else days[-1]
+        table = self.load(2 * start_day - end_day - 1, end_day)
+        if table is None or table['totals'].loc[start_day:end_day].empty:
+            return None
+        return term_report(table, start_day, end_day, top_n, min_count)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Teste unitário para a execução em blocos (map-reduce) das análises
+"""
+
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from data_processor import DataProcessor, DATA_FILES
+from analytics import CXAnalytics
+from chunked_analytics import ChunkedCXAnalytics
+
+def write_tables(data_dir, n_messages=3000, n_sessions=400, seed=7):
+    """Gera exports sintéticos de mensagens e sessões"""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2025-06-01').value
+    span = 30 * 24 * 3600 * 10**9
+
+    session_ids = [f's{i}' for i in range(n_sessions)]
+    contact_ids = [f'c{i}' for i in range(n_sessions // 3)]
+    pd.DataFrame({
+        'messageID': [f'm{i}' for i in range(n_messages)],
+        'sessionID': rng.choice(session_ids, n_messages),
+        'contactID': rng.choice(contact_ids + [None], n_messages),
+        'messageDirection': rng.choice(['inbound', 'outbound'], n_messages),
+        'messageKey': 'text',
+        'messageChannel': rng.choice(['whatsapp', 'web', 'email'], n_messages, p=[0.6, 0.3, 0.1]),
+        'messageValue': 'ok',
+        'createdAt': pd.to_datetime(rng.integers(start, start + span, n_messages)).strftime('%Y-%m-%d %H:%M:%S')
+    }).to_csv(os.path.join(data_dir, DATA_FILES['messages']), index=False)
+
+    duration = rng.integers(0, 5000, n_sessions).astype(float)
+    duration[rng.random(n_sessions) < 0.1] = np.nan
+    rating = rng.integers(1, 6, n_sessions).astype(float)
+    rating[rng.random(n_sessions) < 0.5] = np.nan
+    pd.DataFrame({
+        'sessionID': session_ids,
+        'contactID': rng.choice(contact_ids, n_sessions),
+        'closeMotive': rng.choice(['RESOLVED', 'INACTIVITY', 'TRANSFER'], n_sessions),
+        'sessionRatingStars': rating,
+        '__sessionDuration': duration,
+        '__sessionQueueDuration': rng.integers(0, 20, n_sessions),
+        '__sessionMessagesCount': rng.integers(1, 30, n_sessions),
+        'createdAt': pd.to_datetime(rng.integers(start, start + span, n_sessions)).strftime('%Y-%m-%d %H:%M:%S')
+    }).to_csv(os.path.join(data_dir, DATA_FILES['sessions']), index=False)
+
+def assert_same(expected, result):
+    if isinstance(expected, dict):
+        assert set(expected) == set(result)
+        for key in expected:
+            assert_same(expected[key], result[key])
+    elif isinstance(expected, pd.DataFrame):
+        pd.testing.assert_frame_equal(expected, result)
+    else:
+        assert expected == result, (expected, result)
+
+def test_chunked_matches_in_memory():
+    """Resultados em blocos são idênticos aos calculados em memória"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_tables(data_dir)
+        processor = DataProcessor(data_dir)
+        analytics = CXAnalytics(processor.load_messages(), processor.load_sessions(), ids=processor.ids)
+
+        for chunk_size in (97, 1000, 100000):
+            chunked = ChunkedCXAnalytics(DataProcessor(data_dir), chunk_size=chunk_size)
+            for analysis in ChunkedCXAnalytics.ANALYSIS_TABLES:
+                assert_same(getattr(analytics, analysis)(), getattr(chunked, analysis)())
+    print("✅ Análises em blocos iguais às análises em memória")
+
+def test_missing_file():
+    """Sem arquivo de dados as análises retornam None"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        chunked = ChunkedCXAnalytics(DataProcessor(data_dir))
+        assert chunked.peak_hours_analysis() is None
+        assert chunked.response_time_analysis() is None
+    print("✅ Arquivo ausente tratado")
+
+if __name__ == "__main__":
+    test_chunked_matches_in_memory()
+    test_missing_file()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Teste unitário para verificar que os engines de leitura de CSV são equivalentes
+"""
+
+import os
+import glob
+import tempfile
+import pandas as pd
+from data_processor import DataProcessor
+from csv_engine import read_csv, get_engine
+
+def test_engines_match_on_exports():
+    """Arrow e pandas devem produzir os mesmos dados processados"""
+    print("🧪 Comparando engines de leitura nos exports de sessões...")
+
+    for file_path in sorted(glob.glob("data/*.csv")):
+        processor = DataProcessor()
+        arrow_df = processor._process_sessions(read_csv(file_path, engine="arrow"))
+        pandas_df = processor._process_sessions(read_csv(file_path, engine="pandas"))
+        pd.testing.assert_frame_equal(arrow_df, pandas_df)
+        print(f"✅ {os.path.basename(file_path)}: {len(arrow_df):,} linhas equivalentes")
+
+def test_engines_match_with_projection():
+    """Seleção de colunas e datas com fuso devem ser tratadas igualmente"""
+    test_data = pd.DataFrame({
+        'messageID': ['m1', 'm2', 'm3'],
+        'sessionID': ['s1', 's1', None],
+        'messageValue': ['123', '', 'olá'],
+        'createdAt': ['2025-06-01 01:09:47.805000+00:00', '2025-06-01 02:00:00+00:00', None],
+        'operatorID': [None, None, None],
+        'sessionMeta': ['{}', '{}', '{}']
+    })
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "messages.csv")
+        test_data.to_csv(file_path, index=False)
+
+        usecols = lambda col: col != 'sessionMeta'
+        arrow_df = read_csv(file_path, usecols=usecols, engine="arrow")
+        pandas_df = read_csv(file_path, usecols=usecols, engine="pandas")
+        pandas_df['createdAt'] = pd.to_datetime(pandas_df['createdAt'], format='ISO8601', errors='coerce')
+
+        assert 'sessionMeta' not in arrow_df.columns
+        pd.testing.assert_frame_equal(arrow_df, pandas_df)
+    print("✅ Projeção de colunas e datas com fuso equivalentes")
+
+def test_engine_selection():
+    """O engine pode ser escolhido por parâmetro ou variável de ambiente"""
+    previous = os.environ.get("CX_CSV_ENGINE")
+    try:
+        os.environ["CX_CSV_ENGINE"] = "pandas"
+        assert get_engine() == "pandas"
+        assert get_engine("arrow") in ("arrow", "pandas")
+    finally:
+        if previous is None:
+            os.environ.pop("CX_CSV_ENGINE", None)
+        else:
+            os.environ["CX_CSV_ENGINE"] = previous
+    print("✅ Seleção de engine por ambiente")
+
+if __name__ == "__main__":
+    test_engines_match_on_exports()
+    test_engines_match_with_projection()
+    test_engine_selection()
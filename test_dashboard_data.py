@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Teste unitário para o snapshot processado e os agregados do dashboard
+"""
+
+import os
+import tempfile
+import pandas as pd
+from dashboard_data import (
+    read_sessions, build_aggregates, prewarm, snapshot_is_valid,
+    load_snapshot_data, load_snapshot_aggregates, dashboard_columns
+)
+
+def write_sessions(file_path, rows):
+    """Grava um export de sessões mínimo"""
+    pd.DataFrame(rows, columns=[
+        'sessionID', 'contactID', 'createdAt', 'pluginConnectionLabel', 'closeMotive',
+        '__sessionDuration', '__sessionQueueDuration', '__sessionMessagesCount'
+    ]).to_csv(file_path, index=False)
+
+SESSIONS = [
+    ['s1', 'c1', '2025-06-01 9:10:00', 'Ana', 'INACTIVITY', 600, 60, 10],
+    ['s2', 'c2', '2025-06-01 9:40:00', 'Ana', 'RESOLVED', 1200, None, 4],
+    ['s3', 'c1', '2025-06-02 14:00:00', 'Bruno', 'RESOLVED', None, 30, 6],
+    ['s4', 'c3', '2025-06-03 23:59:00', None, 'INACTIVITY', 300, 0, 2],
+    ['s5', 'c4', None, 'Bruno', 'RESOLVED', 100, 10, 1]
+]
+
+def test_aggregates_match_sessions():
+    """Somas e contagens agregadas devem reproduzir as médias das sessões"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "sessions.csv")
+        write_sessions(file_path, SESSIONS)
+        data = read_sessions(file_path, dashboard_columns())
+        aggregates = build_aggregates(data)
+
+    dated = data[data['createdAt'].notna()]
+    assert aggregates['sessions'].sum() == len(dated)
+    assert aggregates['inactivity'].sum() == (dated['closeMotive'] == 'INACTIVITY').sum()
+
+    mean_duration = aggregates['duration_sum'].sum() / aggregates['duration_count'].sum()
+    assert abs(mean_duration - dated['__sessionDuration'].mean()) < 1e-9
+
+    by_operator = aggregates.groupby('pluginConnectionLabel')['sessions'].sum()
+    assert by_operator.to_dict() == dated.groupby('pluginConnectionLabel').size().to_dict()
+    print("✅ Agregados consistentes com as sessões")
+
+def test_snapshot_roundtrip_and_invalidation():
+    """O snapshot deve ser reutilizado enquanto o arquivo de origem não mudar"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "sessions.csv")
+        snapshot_dir = os.path.join(tmp_dir, "snapshot")
+        columns = dashboard_columns()
+        write_sessions(file_path, SESSIONS)
+
+        assert not snapshot_is_valid(columns, snapshot_dir, file_path)
+        manifest = prewarm(columns, snapshot_dir, file_path)
+        assert manifest['rows'] == len(SESSIONS)
+        assert snapshot_is_valid(columns, snapshot_dir, file_path)
+
+        data = load_snapshot_data(columns, snapshot_dir, file_path)
+        pd.testing.assert_frame_equal(data, read_sessions(file_path, columns))
+        assert load_snapshot_aggregates(columns, snapshot_dir, file_path) is not None
+
+        # Colunas fora do snapshot exigem reconstrução
+        assert not snapshot_is_valid(columns + ('sessionRatingStars',), snapshot_dir, file_path)
+
+        # Novo export invalida o snapshot
+        write_sessions(file_path, SESSIONS[:3])
+        assert not snapshot_is_valid(columns, snapshot_dir, file_path)
+        assert load_snapshot_data(columns, snapshot_dir, file_path) is None
+        assert prewarm(columns, snapshot_dir, file_path)['rows'] == 3
+    print("✅ Snapshot reutilizado e invalidado corretamente")
+
+if __name__ == "__main__":
+    test_aggregates_match_sessions()
+    test_snapshot_roundtrip_and_invalidation()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Teste unitário para o harness de equivalência dos caminhos otimizados
+"""
+
+import tempfile
+import numpy as np
+import pandas as pd
+from equivalence_harness import (
+    EquivalenceHarness, Check, Dataset, compare, synthetic_datasets, STATUS_OK, STATUS_DIVERGENT, STATUS_ERROR
+)
+
+def test_compare_tolerances():
+    """Comparação ciente de dtype, NaN e tolerância numérica"""
+    base = pd.DataFrame({'n': [1, 2, 3], 'x': [0.1, np.nan, 0.3], 'label': ['a', None, 'c']})
+
+    # int64 vs float64 e soma em outra ordem: equivalentes
+    other = base.astype({'n': 'float64'})
+    other['x'] = [0.1 + 1e-12, np.nan, 0.3]
+    assert compare(base, other) is None
+    assert compare({'mean': np.float64(0.5), 'total': 3}, {'mean': 0.5, 'total': np.int64(3)}) is None
+    assert compare(np.nan, None) is None and compare((1, [2.0]), (1, [2.0])) is None
+
+    # NaN em posição diferente, texto vs número e tolerância excedida
+    moved = base.copy()
+    moved['x'] = [0.1, 0.2, np.nan]
+    assert "['x']" in compare(base, moved)
+    assert "tipo" in compare(base, base.astype({'n': str}))
+    assert compare(1.0, 1.001) is not None and compare(1.0, 1.001, rtol=1e-2) is None
+
+    # Estrutura: colunas, índice e chaves
+    assert "colunas" in compare(base, base[['x', 'n', 'label']])
+    assert ".index" in compare(base, base.set_axis([5, 6, 7]))
+    assert "chaves" in compare({'a': 1}, {'b': 1})
+    assert "formato" in compare(np.zeros((2, 3)), np.zeros(6))
+    print("✅ Comparação com tolerâncias de dtype e NaN")
+
+def test_harness_reports_divergence_and_speedup():
+    """Divergências e erros aparecem no relatório com o ganho de tempo"""
+    checks = [
+        Check('demo', 'igual', lambda d: pd.Series([1.0, 2.0]), lambda d: pd.Series([1, 2])),
+        Check('demo', 'diferente', lambda d: np.arange(3), lambda d: np.array([0, 1, 5])),
+        Check('demo', 'falha', lambda d: 1, lambda d: 1 / 0)
+    ]
+    harness = EquivalenceHarness(checks, repeat=1)
+    report = harness.run([Dataset('demo', None, None, None)]).set_index('check')
+
+    assert report.loc['igual', 'status'] == STATUS_OK
+    assert report.loc['diferente', 'status'] == STATUS_DIVERGENT
+    assert "posição 2" in report.loc['diferente', 'detail']
+    assert report.loc['falha', 'status'] == STATUS_ERROR
+    assert report.loc['diferente', 'speedup'] > 0
+    assert len(harness.failures()) == 2
+    print("✅ Relatório com divergências e ganho de tempo")
+
+def test_optimized_paths_match_reference():
+    """Todos os caminhos otimizados equivalem à referência em dados sintéticos"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        datasets = synthetic_datasets(work_dir, seeds=[11, 12], n_sessions=300, n_messages=1500)
+        harness = EquivalenceHarness(repeat=1)
+        report = harness.run(datasets)
+
+    assert set(report['group']) == {'DataProcessor', 'CXAnalytics', 'kernels', 'app'}
+    failures = harness.failures()
+    assert failures.empty, failures[['check', 'dataset', 'detail']].to_string()
+    print("✅ Caminhos otimizados equivalentes à referência")
+
+if __name__ == "__main__":
+    test_compare_tolerances()
+    test_harness_reports_divergence_and_speedup()
+    test_optimized_paths_match_reference()
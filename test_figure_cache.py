@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Teste unitário para o cache de figuras serializadas do plotly
+"""
+
+import time
+import json
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+from figure_cache import FigureCache, figure_key, cached_chart
+from analytics import CXAnalytics, create_advanced_charts
+
+def make_daily(days=60, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'date': pd.date_range('2025-06-01', periods=days).date,
+        'count': rng.integers(0, 500, days)
+    })
+
+def as_json(figure):
+    """Conteúdo da figura como enviado ao navegador (sem depender da ordem das chaves)"""
+    return json.loads(pio.to_json(figure, validate=False))
+
+def test_keys():
+    """Mesmos dados e especificação dão a mesma chave; qualquer mudança dá outra"""
+    daily = make_daily()
+    spec = {'kind': 'bar', 'kwargs': {'x': 'date', 'y': 'count'}}
+    assert figure_key(daily, spec) == figure_key(daily.copy(), {'kwargs': {'y': 'count', 'x': 'date'}, 'kind': 'bar'})
+    changed = daily.copy()
+    changed.loc[5, 'count'] += 1
+    assert figure_key(changed, spec) != figure_key(daily, spec)
+    assert figure_key(daily.rename(columns={'count': 'total'}), spec) != figure_key(daily, spec)
+    assert figure_key(daily, {**spec, 'layout': {'height': 400}}) != figure_key(daily, spec)
+    # Arrays e Series nos parâmetros (ex.: px.pie(values=..., names=...)) também entram no hash
+    values = pd.Series([3, 1], index=['Ana', 'Bruno'])
+    assert figure_key(None, {'values': values}) != figure_key(None, {'values': values.rename({'Bruno': 'Carla'})})
+    assert figure_key(None, {'text': np.array([['1±2']], dtype=object)}) != figure_key(None, {'text': np.array([['1±3']], dtype=object)})
+    print("✅ Chaves pelo conteúdo dos dados e pela especificação")
+
+def test_replay_and_eviction():
+    """Figuras repetidas vêm do JSON guardado, com descarte LRU e taxa de acerto"""
+    cache = FigureCache(max_entries=2)
+    daily = make_daily()
+    chart = lambda data, height=400: cached_chart('bar', data, x='date', y='count', layout={'height': height}, cache=cache)
+
+    start = time.perf_counter()
+    built = chart(daily)
+    build_time = time.perf_counter() - start
+    assert cache.stats()['hits'] == 0
+    start = time.perf_counter()
+    replayed = chart(daily.copy())
+    replay_time = time.perf_counter() - start
+    # Mesma figura vinda do cache (o tempo é só informado)
+    assert cache.stats()['hits'] == 1
+    assert as_json(replayed) == as_json(built)
+    assert replayed.layout.height == 400
+
+    # A figura devolvida é uma cópia: alterá-la não afeta o cache
+    replayed.update_layout(height=100)
+    assert chart(daily).layout.height == 400
+
+    chart(daily, height=500)
+    chart(make_daily(seed=1))  # terceira figura: descarta a usada há mais tempo (altura 400)
+    assert len(cache) == 2
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (2, 3, 1)
+    assert round(stats['hit_rate']) == 40 and stats['bytes'] > 0
+    chart(daily)
+    assert cache.stats()['misses'] == 4
+
+    # Limite em bytes: só cabe a figura mais recente
+    small = FigureCache(max_bytes=int(stats['bytes'] / 2 * 1.5))
+    cached_chart('bar', daily, x='date', y='count', cache=small)
+    cached_chart('bar', make_daily(seed=1), x='date', y='count', cache=small)
+    assert len(small) == 1 and small.stats()['evictions'] == 1
+    small.clear()
+    assert len(small) == 0 and small.stats()['bytes'] == 0
+    print(f"✅ Figura reconstruída do cache em {replay_time * 1000:.1f}ms (construção: {build_time * 1000:.1f}ms)")
+
+def test_advanced_charts_use_cache():
+    """create_advanced_charts reaproveita as figuras em chamadas com os mesmos dados"""
+    messages = pd.DataFrame({
+        'createdAt': pd.to_datetime(['2025-06-02 09:00', '2025-06-02 10:00', '2025-06-03 11:00']),
+        'messageDirection': ['inbound', 'outbound', 'inbound'],
+        'messageValue': ['boleto atrasado', 'ok', 'boleto de novo']
+    })
+    analytics = CXAnalytics(messages, pd.DataFrame())
+    cache = FigureCache()
+    first = create_advanced_charts(analytics, cache=cache)
+    assert {'activity_heatmap', 'top_terms'} <= set(first)
+    second = create_advanced_charts(analytics, cache=cache)
+    assert cache.stats()['hits'] == len(second) == len(first)
+    assert as_json(second['top_terms']) == as_json(first['top_terms'])
+    print("✅ Gráficos avançados servidos do cache")
+
+if __name__ == "__main__":
+    test_keys()
+    test_replay_and_eviction()
+    test_advanced_charts_use_cache()
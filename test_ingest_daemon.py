@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Teste unitário para a ingestão incremental de novos exports
+"""
+
+import os
+import tempfile
+import pandas as pd
+from ingest_daemon import IngestionDaemon
+from dashboard_data import build_aggregates, read_snapshot, read_manifest, AGGREGATE_KEYS
+
+COLUMNS = [
+    'sessionID', 'contactID', 'createdAt', 'pluginConnectionLabel', 'closeMotive',
+    '__sessionDuration', '__sessionQueueDuration', '__sessionMessagesCount'
+]
+
+def write_export(file_path, rows):
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(file_path, index=False)
+
+def assert_aggregates_match(aggregates, data):
+    """Agregados incrementais devem ser iguais aos recalculados do zero"""
+    expected = build_aggregates(data)
+    merged = aggregates.merge(expected, on=AGGREGATE_KEYS, how='outer', suffixes=('', '_full'))
+    assert len(merged) == len(expected) == len(aggregates)
+    for col in ['sessions', 'inactivity', 'duration_sum', 'duration_count', 'queue_count', 'messages_sum']:
+        assert ((merged[col] - merged[f'{col}_full']).abs() < 1e-9).all(), col
+
+def test_incremental_ingestion():
+    """Novos exports são incorporados por sessionID sem reprocessar os anteriores"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = os.path.join(tmp_dir, "data")
+        snapshot_dir = os.path.join(tmp_dir, "snapshot")
+        os.makedirs(data_dir)
+        base_file = os.path.join(data_dir, "export_base.csv")
+        write_export(base_file, [
+            ['s1', 'c1', '2025-06-01 9:10:00', 'Ana', 'INACTIVITY', 600, 60, 10],
+            ['s2', 'c2', '2025-06-01 9:40:00', 'Ana', 'RESOLVED', 1200, None, 4],
+            ['s3', 'c1', '2025-06-02 14:00:00', 'Bruno', 'RESOLVED', None, 30, 6]
+        ])
+        # Export antigo já presente ao iniciar: ignorado sem --backfill
+        write_export(os.path.join(data_dir, "export_old.csv"), [
+            ['s9', 'c9', '2025-05-01 8:00:00', 'Ana', 'RESOLVED', 10, 1, 1]
+        ])
+
+        daemon = IngestionDaemon(data_dir, snapshot_dir, pattern="export_*.csv", file_path=base_file)
+        assert daemon.run_once() == 0
+        data, aggregates = read_snapshot(snapshot_dir)
+        assert sorted(data['sessionID']) == ['s1', 's2', 's3']
+        assert daemon.run_once() == 0
+
+        # Novo export: s2 atualizada (agora com Bruno) e s4 nova
+        write_export(os.path.join(data_dir, "export_new.csv"), [
+            ['s2', 'c2', '2025-06-01 9:40:00', 'Bruno', 'INACTIVITY', 1500, 90, 5],
+            ['s4', 'c3', '2025-06-03 23:59:00', 'Carla', 'RESOLVED', 300, 0, 2]
+        ])
+        version = read_manifest(snapshot_dir)['version']
+        assert daemon.run_once() == 1
+        assert read_manifest(snapshot_dir)['version'] != version
+
+        data, aggregates = read_snapshot(snapshot_dir)
+        assert sorted(data['sessionID']) == ['s1', 's2', 's3', 's4']
+        updated = data.set_index('sessionID').loc['s2']
+        assert updated['pluginConnectionLabel'] == 'Bruno' and updated['__sessionDuration'] == 1500
+        assert_aggregates_match(aggregates, data)
+    print("✅ Ingestão incremental com upsert por sessionID")
+
+def test_backfill():
+    """Com backfill, exports já existentes também são incorporados"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = os.path.join(tmp_dir, "data")
+        os.makedirs(data_dir)
+        base_file = os.path.join(data_dir, "export_base.csv")
+        write_export(base_file, [['s1', 'c1', '2025-06-01 9:10:00', 'Ana', 'RESOLVED', 600, 60, 10]])
+        write_export(os.path.join(data_dir, "export_old.csv"), [
+            ['s9', 'c9', '2025-05-01 8:00:00', 'Ana', 'RESOLVED', 10, 1, 1]
+        ])
+
+        daemon = IngestionDaemon(data_dir, os.path.join(tmp_dir, "snapshot"), pattern="export_*.csv",
+                                 file_path=base_file, backfill=True)
+        assert daemon.run_once() == 1
+        data, aggregates = read_snapshot(daemon.snapshot_dir)
+        assert sorted(data['sessionID']) == ['s1', 's9']
+        assert_aggregates_match(aggregates, data)
+    print("✅ Backfill de exports existentes")
+
+if __name__ == "__main__":
+    test_incremental_ingestion()
+    test_backfill()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Teste unitário para a varredura de intervalos (simultaneidade e fila)
+"""
+
+import numpy as np
+import pandas as pd
+from intervals import session_intervals, sweep, concurrency_analysis, concurrency_timeline, NS_PER_MINUTE
+
+def make_sessions(n=300, seed=5):
+    rng = np.random.default_rng(seed)
+    created = pd.Series(pd.Timestamp('2025-06-01') + pd.to_timedelta(rng.integers(0, 6 * 3600, n), unit='s'))
+    manual = created + pd.to_timedelta(rng.integers(0, 1800, n), unit='s')
+    closed = manual + pd.to_timedelta(rng.integers(1, 3600, n), unit='s')
+    return pd.DataFrame({
+        'createdAt': created,
+        'queuedAt': (created + pd.to_timedelta(5, unit='s')).mask(rng.random(n) < 0.5),
+        'manualAt': manual.mask(rng.random(n) < 0.2),
+        'closedAt': closed.mask(rng.random(n) < 0.05),
+        'pluginConnectionLabel': pd.Series(rng.choice(['Ana - 01', 'Bruno - 02', 'Cátia - 03'], n)).mask(rng.random(n) < 0.03)
+    })
+
+def brute_force(starts, ends, groups, n_groups, origin, n_bins):
+    """Máximo simultâneo em cada minuto testando todos os instantes relevantes"""
+    matrix = np.zeros((n_bins, n_groups), dtype=np.int64)
+    peaks = np.zeros(n_groups, dtype=np.int64)
+    keep = (starts >= 0) & (groups >= 0)
+    for g in range(n_groups):
+        s, e = starts[keep & (groups == g)], ends[keep & (groups == g)]
+        for t in np.unique(np.concatenate([s, origin + np.arange(n_bins) * NS_PER_MINUTE])):
+            level = int(((s <= t) & (t < e)).sum())
+            b = (t - origin) // NS_PER_MINUTE
+            if 0 <= b < n_bins:
+                matrix[b, g] = max(matrix[b, g], level)
+            peaks[g] = max(peaks[g], level)
+    return matrix, peaks
+
+def test_sweep_matches_brute_force():
+    """Máximo por minuto e pico exato iguais à checagem ingênua"""
+    sessions = make_sessions()
+    intervals = session_intervals(sessions)
+    groups, labels = pd.factorize(sessions['pluginConnectionLabel'], sort=True)
+    origin = int(sessions['createdAt'].min().value) // NS_PER_MINUTE * NS_PER_MINUTE
+    n_bins = 10 * 60
+
+    for kind, (starts, ends) in intervals.items():
+        matrix, peaks, peak_at = sweep(starts, ends, groups, len(labels), origin, n_bins)
+        expected_matrix, expected_peaks = brute_force(starts, ends, groups, len(labels), origin, n_bins)
+        assert (matrix == expected_matrix).all(), kind
+        assert (peaks == expected_peaks).all(), kind
+        assert (matrix.max(axis=0) == peaks).all(), kind
+
+        # No instante do pico, o número de intervalos ativos é o pico
+        for g in range(len(labels)):
+            active = (starts <= peak_at[g]) & (peak_at[g] < ends) & (groups == g) & (starts >= 0)
+            assert active.sum() == peaks[g]
+    print("✅ Varredura igual à checagem ingênua")
+
+def test_intervals_and_analysis():
+    """Atendimento, fila, sessões abertas e resumo por grupo"""
+    t = lambda text: pd.Timestamp(f'2025-06-01 {text}')
+    sessions = pd.DataFrame({
+        'createdAt': [t('10:00'), t('10:05'), t('10:10'), t('10:20')],
+        'queuedAt': [t('10:01'), pd.NaT, pd.NaT, pd.NaT],
+        'manualAt': [t('10:10'), t('10:12'), pd.NaT, t('10:30')],
+        'closedAt': [t('10:40'), t('10:20'), t('10:50'), pd.NaT],
+        'pluginConnectionLabel': ['A', 'A', 'B', 'A']
+    })
+    intervals = session_intervals(sessions)
+    starts, ends = intervals['handling']
+    assert starts[2] == -1  # nunca assumida: sem atendimento
+    assert ends[3] == t('10:50').value  # aberta: termina na maior data dos dados
+    queue_starts, queue_ends = intervals['queue']
+    assert queue_starts[0] == t('10:01').value and queue_starts[1] == t('10:05').value
+    assert queue_ends[2] == t('10:50').value  # espera até o fechamento
+
+    result = concurrency_analysis(sessions)
+    summary = result['summary']
+    assert summary.loc['A', 'peak_concurrent'] == 2
+    assert summary.loc['A', 'peak_concurrent_at'] == t('10:12')
+    assert summary.loc['B', 'peak_concurrent'] == 0 and summary.loc['B', 'queue_sessions'] == 1
+    assert result['peaks']['peak_backlog'] == 2 and result['peaks']['peak_backlog_at'] == t('10:05')
+    assert result['concurrency'].loc[t('10:20'), 'A'] == 1  # sessão 2 fecha às 10:20 em ponto
+    assert result['concurrency'].loc[t('10:19'), 'A'] == 2
+
+    timeline = concurrency_timeline(result, '1h')
+    assert list(timeline.columns) == ['concurrent', 'backlog']
+    assert timeline['concurrent'].max() == 2 and timeline['backlog'].max() == 2
+    assert concurrency_analysis(sessions.iloc[0:0]) is None
+    print("✅ Intervalos de atendimento e fila")
+
+if __name__ == "__main__":
+    test_sweep_matches_brute_force()
+    test_intervals_and_analysis()
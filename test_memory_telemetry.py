@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Teste unitário para a telemetria e o orçamento de memória
+"""
+
+import os
+import types
+import numpy as np
+import pandas as pd
+import memory_telemetry
+from memory_telemetry import (
+    MemoryTelemetry, BUDGET_ENV_VAR, memory_budget, process_rss, deep_memory, column_memory, format_bytes
+)
+from pipeline import Pipeline
+
+def test_deep_memory():
+    """Memória profunda de DataFrames, arrays e contêineres, por coluna"""
+    df = pd.DataFrame({
+        'n': np.arange(1000, dtype=np.int64),
+        'text': ['mensagem longa do cliente %d' % i for i in range(1000)]
+    })
+    columns = column_memory(df)
+    assert list(columns.index) == ['text', 'n']
+    assert columns['n'] == 8000 and columns['text'] > 8000
+
+    assert deep_memory(df) == df.memory_usage(deep=True).sum()
+    assert deep_memory(np.zeros(100)) == 800
+    # Objetos repetidos contam uma vez
+    nested = {'a': df, 'b': (df, np.zeros(100))}
+    assert deep_memory(df) + 800 < deep_memory(nested) < deep_memory(df) + 2000
+
+    assert format_bytes(512) == "512 B" and format_bytes(3 * 1024 ** 2) == "3.0 MB"
+    assert process_rss() > 0
+    print("✅ Memória profunda por objeto e por coluna")
+
+def test_budget_from_env():
+    """Orçamento em MB vindo do parâmetro ou da variável de ambiente"""
+    previous = os.environ.pop(BUDGET_ENV_VAR, None)
+    try:
+        assert memory_budget() is None
+        os.environ[BUDGET_ENV_VAR] = "512"
+        assert memory_budget() == 512 * 1024 ** 2
+        assert memory_budget(1) == 1024 ** 2
+        try:
+            memory_budget(-1)
+            assert False, "orçamento negativo aceito"
+        except ValueError:
+            pass
+    finally:
+        os.environ.pop(BUDGET_ENV_VAR, None)
+        if previous is not None:
+            os.environ[BUDGET_ENV_VAR] = previous
+    print("✅ Orçamento de memória configurável")
+
+def test_eviction_order():
+    """Acima do orçamento, caches são liberados por prioridade e tamanho"""
+    telemetry = MemoryTelemetry(budget_mb=1)  # sempre abaixo do RSS do processo
+    released = []
+    telemetry.register('sessions', evict=lambda: released.append('sessions'), priority=1)
+    telemetry.register('small', evict=lambda: released.append('small'))
+    telemetry.register('large', evict=lambda: released.append('large'))
+    telemetry.track('sessions', pd.DataFrame({'x': np.zeros(1000)}))
+    telemetry.track('small', np.zeros(10), accumulate=True)
+    telemetry.track('small', np.zeros(10), accumulate=True)
+    telemetry.track('large', np.zeros(1000))
+    telemetry.track('pinned', np.zeros(5000))
+
+    report = telemetry.report().set_index('cache')
+    assert report.loc['small', 'objects'] == 2 and report.loc['small', 'bytes'] == 160
+    assert not report.loc['pinned', 'evictable']
+    assert telemetry.columns('sessions')['x'] == 8000
+
+    # RSS simulado: cada chamada libera um nível de prioridade
+    rss = [10 * 1024 ** 2]
+    original_rss = memory_telemetry.process_rss
+    memory_telemetry.process_rss = lambda: rss[0]
+    try:
+        def shrink_rss():
+            rss[0] -= 2 * 1024 ** 2
+        telemetry.register('large', evict=lambda: (released.append('large'), shrink_rss()))
+        assert telemetry.enforce() == ['large', 'small']
+        assert released == ['large', 'small']
+        assert telemetry.enforce() == ['sessions']
+        assert telemetry.total() == 5000 * 8
+
+        # Despejo que não reduz o RSS (objetos ainda referenciados): não é repetido a cada chamada
+        telemetry.track('large', np.zeros(1000))
+        telemetry.register('large', evict=lambda: released.append('large'))
+        assert telemetry.enforce() == [] and released == ['large', 'small', 'sessions']
+        rss[0] += 1024 ** 2
+        assert telemetry.enforce() == ['large']
+        telemetry.track('large', np.zeros(1000))
+        assert telemetry.enforce() == []
+        rss[0] = 512 * 1024
+        assert telemetry.enforce() == []
+    finally:
+        memory_telemetry.process_rss = original_rss
+
+    assert MemoryTelemetry().enforce() == []
+    print("✅ Despejo por prioridade acima do orçamento")
+
+def test_keyed_results():
+    """Resultados por chave: recalcular substitui, e os descartados pelo cache deixam de contar"""
+    now = [1000.0]
+    original_time = memory_telemetry.time
+    memory_telemetry.time = types.SimpleNamespace(monotonic=lambda: now[0])
+    try:
+        telemetry = MemoryTelemetry()
+        telemetry.register('section', max_items=2, ttl=60)
+        telemetry.track('section', np.zeros(100), key=('v1', 'Todos'))
+        telemetry.track('section', np.zeros(100), key=('v1', 'Todos'))
+        assert telemetry.total() == 800
+        telemetry.track('section', np.zeros(200), key=('v1', 'Ana'))
+        now[0] += 30
+        telemetry.track('section', np.zeros(300), key=('v2', 'Todos'))  # descarta o mais antigo
+        report = telemetry.report().set_index('cache')
+        assert report.loc['section', 'objects'] == 2 and report.loc['section', 'bytes'] == 4000
+
+        # Resultados além do ttl saem do total mesmo sem novas chamadas a track
+        now[0] += 45
+        assert telemetry.total() == 2400
+        now[0] += 30
+        assert telemetry.total() == 0
+    finally:
+        memory_telemetry.time = original_time
+    print("✅ Resultados por chave com limites do cache")
+
+def test_pipeline_releases_consumed_results():
+    """No pipeline, acima do orçamento só resultados já consumidos são liberados"""
+    pipeline = Pipeline(max_workers=1)
+    pipeline.add('load', lambda: np.ones(1000))
+    pipeline.add('total', lambda values: values.sum(), inputs=['load'])
+    pipeline.add('report', lambda load, total: total / len(load), inputs=['load', 'total'])
+    telemetry = MemoryTelemetry(budget_mb=1)
+    results = pipeline.run(telemetry=telemetry)
+
+    assert results['report'] == 1.0
+    assert 'load' not in results and 'total' not in results
+    assert not pipeline.errors
+    print("✅ Pipeline libera resultados consumidos")
+
+if __name__ == "__main__":
+    test_deep_memory()
+    test_budget_from_env()
+    test_eviction_order()
+    test_keyed_results()
+    test_pipeline_releases_consumed_results()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Teste unitário para a API local de métricas
+"""
+
+import os
+import io
+import json
+import tempfile
+import threading
+import urllib.request
+import urllib.error
+import pandas as pd
+from metrics_api import MetricsStore, create_server
+from dashboard_data import prewarm
+
+SESSIONS = [
+    ['s1', 'c1', '2025-06-01 9:10:00', 'Ana', 'INACTIVITY', 600, 60, 10],
+    ['s2', 'c2', '2025-06-01 9:40:00', 'Ana', 'RESOLVED', 1200, None, 4],
+    ['s3', 'c1', '2025-06-02 14:00:00', 'Bruno', 'RESOLVED', None, 30, 6],
+    ['s4', 'c3', '2025-06-03 23:59:00', 'Bruno', 'INACTIVITY', 300, 0, 2]
+]
+
+def write_sessions(file_path, rows):
+    pd.DataFrame(rows, columns=[
+        'sessionID', 'contactID', 'createdAt', 'pluginConnectionLabel', 'closeMotive',
+        '__sessionDuration', '__sessionQueueDuration', '__sessionMessagesCount'
+    ]).to_csv(file_path, index=False)
+
+def get(base_url, path, headers=None):
+    """(status, cabeçalhos, corpo) de um GET"""
+    request = urllib.request.Request(base_url + path, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+def run_server(tmp_dir):
+    file_path = os.path.join(tmp_dir, "sessions.csv")
+    snapshot_dir = os.path.join(tmp_dir, "snapshot")
+    write_sessions(file_path, SESSIONS)
+    prewarm(snapshot_dir=snapshot_dir, file_path=file_path)
+
+    server = create_server(port=0, store=MetricsStore(snapshot_dir, file_path, tmp_dir), quiet=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", file_path
+
+def test_endpoints():
+    """KPIs, tabelas e séries filtradas por período e síndico"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server, base_url, _ = run_server(tmp_dir)
+        try:
+            status, _, body = get(base_url, "/kpis")
+            kpis = json.loads(body)
+            assert status == 200
+            assert kpis['total_sessions'] == 4 and kpis['unique_contacts'] == 3
+            assert kpis['inactivity_count'] == 2 and kpis['avg_duration'] == 700
+
+            _, _, body = get(base_url, "/kpis?start=2025-06-02&operator=Bruno")
+            assert json.loads(body)['total_sessions'] == 2
+
+            _, _, body = get(base_url, "/operators")
+            operators = json.loads(body)
+            assert operators['columns'][0] == 'pluginConnectionLabel'
+            assert [row[0] for row in operators['data']] == ['Ana', 'Bruno']
+
+            _, _, body = get(base_url, "/series/daily?end=2025-06-01")
+            assert json.loads(body)['data'] == [['2025-06-01', 2]]
+
+            status, headers, body = get(base_url, "/series/hourly?format=arrow")
+            import pyarrow as pa
+            hourly = pa.ipc.open_stream(io.BytesIO(body)).read_all().to_pandas()
+            assert headers['Content-Type'] == 'application/vnd.apache.arrow.stream'
+            assert dict(zip(hourly['hour'], hourly['count'])) == {9: 2, 14: 1, 23: 1}
+
+            assert get(base_url, "/kpis?start=ontem")[0] == 400
+            assert get(base_url, "/desconhecido")[0] == 404
+        finally:
+            server.shutdown()
+            server.server_close()
+    print("✅ Endpoints de métricas")
+
+def test_etag_revalidation():
+    """If-None-Match com o ETag atual retorna 304; nova versão dos dados muda o ETag"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server, base_url, file_path = run_server(tmp_dir)
+        try:
+            _, headers, _ = get(base_url, "/kpis")
+            etag = headers['ETag']
+            status, _, body = get(base_url, "/kpis", {'If-None-Match': etag})
+            assert status == 304 and body == b''
+
+            # Outros parâmetros, outro ETag
+            _, other, _ = get(base_url, "/kpis?operator=Ana")
+            assert other['ETag'] != etag
+
+            # Arquivo de origem alterado: nova versão, resposta completa
+            write_sessions(file_path, SESSIONS[:2])
+            status, headers, body = get(base_url, "/kpis", {'If-None-Match': etag})
+            assert status == 200 and headers['ETag'] != etag
+            assert json.loads(body)['total_sessions'] == 2
+        finally:
+            server.shutdown()
+            server.server_close()
+    print("✅ Revalidação por ETag")
+
+if __name__ == "__main__":
+    test_endpoints()
+    test_etag_revalidation()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Teste unitário para o DAG de tarefas do relatório batch
+"""
+
+import os
+import time
+import tempfile
+from pipeline import Pipeline, STATUS_DONE, STATUS_SKIPPED, STATUS_FAILED, STATUS_CANCELLED
+
+def write_file(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+    return text
+
+def test_concurrent_execution():
+    """Tarefas independentes rodam em paralelo e recebem as entradas na ordem"""
+    pipeline = Pipeline(max_workers=4)
+    pipeline.add('a', lambda: time.sleep(0.3) or 2)
+    pipeline.add('b', lambda: time.sleep(0.3) or 3)
+    pipeline.add('c', lambda a, b: a - b, inputs=['a', 'b'])
+    results = pipeline.run()
+
+    assert results['c'] == -1
+    # a e b se sobrepõem no tempo; c só começa depois das duas
+    a, b, c = (pipeline.timings[name] for name in 'abc')
+    end = lambda timing: timing['start'] + timing['duration']
+    assert a['start'] < end(b) and b['start'] < end(a)
+    assert c['start'] >= max(end(a), end(b))
+    path, total = pipeline.critical_path()
+    assert path[-1] == 'c' and len(path) == 2 and total >= 0.3
+    assert all(pipeline.timings[name]['status'] == STATUS_DONE for name in 'abc')
+    print("✅ Execução concorrente respeitando dependências")
+
+def test_up_to_date_tasks_skipped():
+    """Saídas mais novas que as fontes pulam a tarefa e as entradas só dela"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source = os.path.join(tmp_dir, 'source.csv')
+        output = os.path.join(tmp_dir, 'chart.png')
+        write_file(source, 'x')
+        calls = []
+
+        def build():
+            pipeline = Pipeline()
+            pipeline.add('load', lambda: calls.append('load') or 'dados')
+            pipeline.add('chart', lambda data: write_file(output, data), inputs=['load'],
+                         sources=[source], outputs=[output])
+            return pipeline
+
+        build().run()
+        assert calls == ['load']
+
+        pipeline = build()
+        pipeline.run()
+        assert calls == ['load']
+        assert pipeline.timings['chart']['status'] == STATUS_SKIPPED
+        assert pipeline.timings['load']['status'] == STATUS_SKIPPED
+
+        build().run(force=True)
+        assert calls == ['load', 'load']
+
+        # Fonte alterada: gráfico refeito
+        os.utime(source, ns=(os.stat(output).st_mtime_ns + 10**9,) * 2)
+        build().run()
+        assert calls == ['load', 'load', 'load']
+    print("✅ Tarefas atualizadas puladas")
+
+def test_failure_cancels_dependents():
+    """Falha cancela apenas as tarefas dependentes"""
+    def fail():
+        raise ValueError("falha")
+
+    pipeline = Pipeline()
+    pipeline.add('bad', fail)
+    pipeline.add('after', lambda value: value, inputs=['bad'])
+    pipeline.add('independent', lambda: 1)
+    results = pipeline.run()
+
+    assert results == {'independent': 1}
+    assert isinstance(pipeline.errors['bad'], ValueError)
+    assert pipeline.timings['bad']['status'] == STATUS_FAILED
+    assert pipeline.timings['after']['status'] == STATUS_CANCELLED
+    print("✅ Falhas canceladas nas dependentes")
+
+if __name__ == "__main__":
+    test_concurrent_execution()
+    test_up_to_date_tasks_skipped()
+    test_failure_cancels_dependents()
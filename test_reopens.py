@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Teste unitário para a reabertura de sessões pelo mesmo contato
+"""
+
+import time
+import numpy as np
+import pandas as pd
+from analytics import CXAnalytics, session_reopens
+from id_encoding import IDDictionary
+
+def make_sessions():
+    t = lambda value: pd.Timestamp(f'2025-06-{value}')
+    return pd.DataFrame({
+        'contactID': ['a', 'a', 'a', 'b', 'b', 'c', 'c', 'd', None],
+        'createdAt': [t('01 09:00'), t('01 20:00'), t('04 10:00'),   # a: volta em 10h e depois em ~62h
+                      t('01 08:00'), t('02 12:00'),                  # b: volta em 27h
+                      t('02 09:00'), t('02 09:30'),                  # c: segunda sessão abre antes do fechamento
+                      t('10 09:00'), t('01 10:00')],                 # d: última sessão dos dados
+        'closedAt': [t('01 10:00'), t('01 20:30'), t('04 11:00'),
+                     t('01 09:00'), pd.NaT,
+                     t('02 10:00'), t('02 10:30'),
+                     t('10 09:30'), t('01 11:00')],
+        'closeMotive': ['INACTIVITY', 'INACTIVITY', 'RESOLVED', 'INACTIVITY', None, 'RESOLVED', 'RESOLVED', 'RESOLVED', 'RESOLVED'],
+        'pluginConnectionLabel': ['Ana', 'Ana', 'Bruno', 'Bruno', 'Bruno', 'Ana', 'Ana', 'Ana', 'Ana']
+    })
+
+def test_reopen_windows():
+    """Sessão seguinte do mesmo contato dentro de 24h/72h após o fechamento"""
+    sessions = make_sessions()
+    result = session_reopens(
+        pd.factorize(sessions['contactID'])[0], sessions['createdAt'], sessions['closedAt'],
+        motives=sessions['closeMotive'], groups=sessions['pluginConnectionLabel']
+    )
+    summary = result['summary']
+    # 7 sessões fechadas com contato; a de d (10/06) não tem janela observável
+    assert summary['closed_sessions'] == 7 and summary['observed_24h'] == 6 and summary['observed_72h'] == 6
+    assert summary['reopened_24h'] == 1  # a: 10h depois
+    assert summary['reopened_72h'] == 3  # + a (~62h) e b (27h); c abriu antes de fechar
+    assert summary['reopen_72h_pct'] == 50.0
+    assert summary['median_hours_to_reopen'] == 27.0
+
+    by_motive = result['by_motive']
+    assert list(by_motive.loc['INACTIVITY', ['closed_sessions', 'reopened_24h', 'reopened_72h']]) == [3, 1, 3]
+    assert by_motive.loc['RESOLVED', 'reopened_72h'] == 0
+    assert result['by_group'].loc['Ana', 'reopen_24h_pct'] == 25.0
+    print("✅ Reaberturas em 24h/72h por motivo e síndico")
+
+def test_analytics_codes_match_strings():
+    """Códigos do dicionário de IDs e fatoração das strings dão o mesmo resultado"""
+    sessions = make_sessions()
+    encoded = IDDictionary().encode_frame(sessions.copy())
+    with_codes = CXAnalytics(pd.DataFrame(), encoded, ids=IDDictionary()).session_reopen_analysis()
+    with_strings = CXAnalytics(pd.DataFrame(), sessions).session_reopen_analysis()
+    assert with_codes['summary'] == with_strings['summary']
+    assert with_codes['by_group'].equals(with_strings['by_group'])
+    assert CXAnalytics(pd.DataFrame(), sessions.drop(columns='closedAt')).session_reopen_analysis() is None
+    print("✅ Reaberturas com códigos e com strings")
+
+def test_millions_of_sessions():
+    """Milhões de sessões de uma vez, sem laços por contato (o tempo é só informado)"""
+    rng = np.random.default_rng(0)
+    n = 2_000_000
+    created = pd.Series(pd.to_datetime(pd.Timestamp('2025-01-01').value + rng.integers(0, 180 * 86400 * 10**9, n)))
+    closed = created + pd.to_timedelta(rng.integers(60, 7200, n), unit='s')
+    motives = pd.Series(rng.choice(['RESOLVED', 'INACTIVITY', 'TRANSFER'], n))
+
+    start = time.perf_counter()
+    result = session_reopens(rng.integers(0, 400_000, n), created, closed, motives=motives)
+    elapsed = time.perf_counter() - start
+    assert result['by_motive']['closed_sessions'].sum() == n
+    print(f"✅ {n:,} sessões em {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    test_reopen_windows()
+    test_analytics_codes_match_strings()
+    test_millions_of_sessions()
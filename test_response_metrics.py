@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Teste unitário para o cálculo de tempo de primeira resposta por sessão
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime, timedelta
+from response_metrics import reply_latency_metrics, summarize_reply_latency
+
+def build_test_messages():
+    """Cria mensagens de teste com sessões, direções e horários aleatórios"""
+    np.random.seed(42)
+
+    start = datetime(2025, 7, 1, 8, 0, 0)
+    test_data = []
+    for i in range(800):
+        test_data.append({
+            'messageID': f"msg-{i}",
+            'sessionID': f"session-{np.random.randint(0, 60)}",
+            'messageDirection': np.random.choice(['inbound', 'outbound'], p=[0.6, 0.4]),
+            'messageKey': np.random.choice(['text', 'event'], p=[0.9, 0.1]),
+            'createdAt': start + timedelta(seconds=int(np.random.randint(0, 5 * 86400)))
+        })
+
+    return pd.DataFrame(test_data)
+
+def naive_reply_latency(messages):
+    """Implementação de referência com laços por sessão"""
+    messages = messages[messages['messageKey'] != 'event']
+    rows = {}
+    for session_id, group in messages.groupby('sessionID'):
+        group = group.sort_values('createdAt', kind='stable')
+        directions = group['messageDirection'].tolist()
+        times = group['createdAt'].tolist()
+
+        def next_outbound(i):
+            return next((k for k in range(i, len(directions)) if directions[k] == 'outbound'), None)
+
+        gaps = []
+        unanswered = 0
+        first_response = np.nan
+        for i, direction in enumerate(directions):
+            if direction != 'inbound':
+                continue
+            j = next_outbound(i)
+            if j is None:
+                unanswered += 1
+            elif i == 0 or directions[i - 1] != 'inbound':
+                gap = (times[j] - times[i]).total_seconds()
+                if not gaps:
+                    first_response = gap
+                gaps.append(gap)
+
+        rows[session_id] = {
+            'first_response_seconds': first_response,
+            'mean_reply_gap_seconds': np.mean(gaps) if gaps else np.nan,
+            'max_reply_gap_seconds': max(gaps) if gaps else np.nan,
+            'unanswered_messages': unanswered
+        }
+
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+def test_reply_latency_matches_reference():
+    """Compara o cálculo vetorizado com a implementação de referência"""
+    print("🧪 Iniciando teste de tempo de primeira resposta...")
+
+    messages = build_test_messages()
+    result = reply_latency_metrics(messages)
+    expected = naive_reply_latency(messages)
+
+    result = result.loc[expected.index]
+    for column in ['first_response_seconds', 'mean_reply_gap_seconds', 'max_reply_gap_seconds']:
+        assert np.allclose(result[column], expected[column].astype(float), equal_nan=True), column
+    assert (result['unanswered_messages'].values == expected['unanswered_messages'].values).all()
+    print(f"✅ {len(result)} sessões conferidas com a referência")
+
+    summary = summarize_reply_latency(result)
+    assert summary['sessions'] == len(result)
+    assert summary['unanswered_messages'] == expected['unanswered_messages'].sum()
+    print("✅ Resumo agregado consistente")
+
+def test_reply_latency_empty():
+    """Sem colunas necessárias o cálculo retorna None"""
+    assert reply_latency_metrics(pd.DataFrame()) is None
+    assert reply_latency_metrics(pd.DataFrame({'sessionID': ['a']})) is None
+    print("✅ Dados vazios tratados")
+
+if __name__ == "__main__":
+    test_reply_latency_matches_reference()
+    test_reply_latency_empty()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Teste unitário para a amostra estratificada das sessões e seus intervalos de confiança
+"""
+
+import os
+import tempfile
+import multiprocessing
+import numpy as np
+import pandas as pd
+from sampling import SessionSample, select_sample, stratum_sizes, ratio_ci, distinct_ci, WEIGHT_COLUMN
+from dashboard_data import prepare_sessions, build_aggregates, session_metrics, read_snapshot, read_manifest
+from analytics import CXAnalytics, session_reopens
+from ingest_daemon import IngestionDaemon
+from id_encoding import IDDictionary
+
+def make_sessions(n=60_000, contacts=15_000, seed=0):
+    """Sessões sintéticas em 30 dias e 3 síndicos, com contatos que voltam"""
+    rng = np.random.default_rng(seed)
+    created = pd.Timestamp('2025-06-01') + pd.to_timedelta(rng.integers(0, 30 * 86400, n), unit='s')
+    data = pd.DataFrame({
+        'sessionID': [f's{i}' for i in range(n)],
+        'contactID': [f'c{i}' for i in rng.integers(0, contacts, n)],
+        'createdAt': created,
+        'closedAt': created + pd.to_timedelta(rng.integers(60, 7200, n), unit='s'),
+        'pluginConnectionLabel': rng.choice(['Ana', 'Bruno', 'Carla'], n, p=[0.6, 0.3, 0.1]),
+        'closeMotive': rng.choice(['RESOLVED', 'INACTIVITY'], n, p=[0.7, 0.3])
+    })
+    return prepare_sessions(data, ids=IDDictionary())
+
+def test_contact_level_selection():
+    """Sorteio por contato, determinístico, e atualização incremental igual ao sorteio completo"""
+    data = make_sessions()
+    mask = select_sample(data, 0.1)
+    assert (mask == select_sample(data.iloc[::-1], 0.1)[::-1]).all()
+    # Todas as sessões de um contato entram (ou ficam de fora) juntas
+    assert data.assign(mask=mask).groupby('contactID')['mask'].nunique().max() == 1
+    assert abs(mask.mean() - 0.1) < 0.02
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = SessionSample(os.path.join(tmp_dir, "sample"), rate=0.1)
+        assert store.load() is None and store.update(data, build_aggregates(data)) is None
+        old, new = data.iloc[:40_000], data.iloc[40_000:]
+        store.rebuild(old, build_aggregates(old), 'v1')
+        # s0 volta em um novo export com outro contato: a versão antiga sai da amostra
+        moved = data.iloc[[0]].assign(contactID='c-novo')
+        manifest = store.update(pd.concat([new, moved]), build_aggregates(data), 'v2')
+        assert store.snapshot_version() == 'v2' and manifest['population'] == len(data)
+
+        current = pd.concat([data.iloc[1:], moved])
+        expected = current[select_sample(current, 0.1)]
+        assert sorted(store.load()['sessionID']) == sorted(expected['sessionID'])
+        assert SessionSample(store.sample_dir, rate=0.2).load() is None
+    print("✅ Sorteio por contato e atualização incremental")
+
+def test_weights_and_intervals():
+    """Pesos somam a população de cada estrato e os intervalos cobrem os valores exatos"""
+    data = make_sessions()
+    aggregates = build_aggregates(data)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = SessionSample(tmp_dir, rate=0.1)
+        store.rebuild(data, aggregates)
+        sample = store.weighted(store.load(), aggregates)
+    weighted = sample.groupby(['date', 'pluginConnectionLabel'])[WEIGHT_COLUMN].sum()
+    assert np.allclose(weighted, stratum_sizes(aggregates).reindex(weighted.index))
+
+    # Com rate = 1 (dados completos) a razão é exata e a margem é zero
+    flags = (data['closeMotive'] == 'INACTIVITY').to_numpy()
+    estimate, margin = ratio_ci(flags, np.ones(len(flags)))
+    assert estimate[0] == flags.mean() and margin[0] == 0
+
+    exact = session_reopens(data['contactID_code'], data['createdAt'], data['closedAt'])['summary']
+    estimated = session_reopens(sample['contactID_code'], sample['createdAt'], sample['closedAt'],
+                                weights=sample[WEIGHT_COLUMN], sample_rate=0.1)['summary']
+    for hours in (24, 72):
+        assert 0 < estimated[f'reopen_{hours}h_margin'] < 5
+        assert abs(estimated[f'reopen_{hours}h_pct'] - exact[f'reopen_{hours}h_pct']) <= estimated[f'reopen_{hours}h_margin']
+
+    contacts, contacts_margin = distinct_ci(sample['contactID'].nunique(), 0.1)
+    assert abs(contacts - data['contactID'].nunique()) <= contacts_margin
+    assert distinct_ci(10, 1.0) == (10.0, 0.0)
+    print("✅ Pesos pós-estratificados e intervalos de 95%")
+
+def test_analytics_on_sample():
+    """CXAnalytics e cartões do dashboard sobre a amostra persistida"""
+    data = make_sessions()
+    aggregates = build_aggregates(data)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = SessionSample(tmp_dir, rate=0.1)
+        assert CXAnalytics.from_sample(pd.DataFrame(), store, aggregates) is None
+        store.rebuild(data, aggregates)
+        analytics = CXAnalytics.from_sample(pd.DataFrame(), store, aggregates)
+
+    reopens = analytics.session_reopen_analysis()
+    assert 'reopen_24h_margin' in reopens['by_group'].columns
+    assert abs(reopens['summary']['closed_sessions'] - len(data)) < 1
+    cohorts = analytics.cohort_retention_analysis()
+    exact_cohorts = CXAnalytics(pd.DataFrame(), data).cohort_retention_analysis()
+    assert abs(cohorts['returning_pct'] - exact_cohorts['returning_pct']) <= cohorts['returning_pct_margin']
+    assert cohorts['retention_margin'].shape == cohorts['retention'].shape
+    assert 'retention_margin' not in exact_cohorts
+
+    metrics = session_metrics(analytics.sessions, aggregates, sample_rate=0.1)
+    assert metrics['total_sessions'] == len(data)
+    assert metrics['inactivity_count'] == (data['closeMotive'] == 'INACTIVITY').sum()
+    assert abs(metrics['unique_contacts'] - data['contactID'].nunique()) <= metrics['unique_contacts_margin']
+    print("✅ Análises e cartões com a amostra")
+
+def test_ingest_daemon_keeps_sample():
+    """O daemon de ingestão sorteia as sessões novas e a amostra acompanha a versão do snapshot"""
+    columns = ['sessionID', 'contactID', 'createdAt', 'pluginConnectionLabel', 'closeMotive']
+    rows = make_sessions(n=3_000, contacts=800)[columns].assign(createdAt=lambda df: df['createdAt'].astype(str))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = os.path.join(tmp_dir, "data")
+        os.makedirs(data_dir)
+        base_file = os.path.join(data_dir, "export_base.csv")
+        rows.iloc[:2_000].to_csv(base_file, index=False)
+        daemon = IngestionDaemon(data_dir, os.path.join(tmp_dir, "snapshot"), pattern="export_*.csv",
+                                 file_path=base_file, sample_dir=os.path.join(tmp_dir, "sample"))
+        daemon.run_once()
+        rows.iloc[2_000:].to_csv(os.path.join(data_dir, "export_new.csv"), index=False)
+        assert daemon.run_once() == 1
+
+        data, _ = read_snapshot(daemon.snapshot_dir)
+        sample = daemon.sample.load()
+        assert daemon.sample.snapshot_version() == read_manifest(daemon.snapshot_dir)['version']
+        assert sorted(sample['sessionID']) == sorted(data.loc[select_sample(data, daemon.sample.rate), 'sessionID'])
+    print("✅ Amostra mantida pelo daemon de ingestão")
+
+def ensure_sample(sample_dir, calls_file):
+    """Amostra conferida em outro processo (dashboard e daemon ao mesmo tempo)"""
+    data = make_sessions(n=20_000, contacts=5_000)
+
+    def load():
+        with open(calls_file, 'a') as f:
+            f.write('load\n')
+        return data
+    SessionSample(sample_dir, rate=0.1).ensure('v1', load, build_aggregates(data))
+
+def test_concurrent_writers():
+    """Processos simultâneos sorteiam a amostra uma vez só e não atualizam amostras de outra versão"""
+    data = make_sessions(n=20_000, contacts=5_000)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sample_dir = os.path.join(tmp_dir, "sample")
+        calls_file = os.path.join(tmp_dir, "calls.txt")
+        workers = [multiprocessing.Process(target=ensure_sample, args=(sample_dir, calls_file)) for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        assert all(worker.exitcode == 0 for worker in workers)
+        with open(calls_file) as f:
+            assert f.read().count('load') == 1
+
+        store = SessionSample(sample_dir, rate=0.1)
+        assert store.snapshot_version() == 'v1' and len(store.load()) == store.read_manifest()['rows']
+        assert not [name for name in os.listdir(sample_dir) if name.endswith('.tmp')]
+        # Linhas lidas sobre a versão v0 não entram na amostra da v1
+        assert store.update(data.iloc[:10], build_aggregates(data), 'v2', base_version='v0') is None
+        assert store.snapshot_version() == 'v1'
+    print("✅ Escrita simultânea da amostra")
+
+if __name__ == "__main__":
+    test_contact_level_selection()
+    test_weights_and_intervals()
+    test_analytics_on_sample()
+    test_ingest_daemon_keeps_sample()
+    test_concurrent_writers()
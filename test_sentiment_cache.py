@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Teste unitário para o cache persistente de sentimento
+"""
+
+import os
+import tempfile
+import pandas as pd
+import analytics
+from analytics import CXAnalytics, sentiment_version
+from sentiment_cache import SentimentCache
+
+def make_messages(n_days=2):
+    rows = []
+    texts = ['tive um problema', 'obrigado, excelente', 'ok', 'erro e falha', 'amei']
+    for day in range(n_days):
+        for i, text in enumerate(texts):
+            rows.append({
+                'messageID': f'm{day}_{i}',
+                'messageDirection': 'inbound',
+                'messageValue': text,
+                'date': pd.Timestamp('2025-06-01').date() + pd.Timedelta(days=day)
+            })
+    return pd.DataFrame(rows)
+
+def test_cache_reuses_scores():
+    """Execuções seguintes classificam apenas mensagens novas"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        messages = make_messages(1)
+        expected = CXAnalytics(messages, pd.DataFrame()).message_sentiment_analysis()
+
+        cache = SentimentCache(tmp_dir)
+        result = CXAnalytics(messages, pd.DataFrame(), sentiment_cache=cache).message_sentiment_analysis()
+        pd.testing.assert_series_equal(result['overall'], expected['overall'])
+        assert len(cache) == len(messages)
+
+        # Valor adulterado no cache prova que a classificação foi reaproveitada
+        scores_path = os.path.join(tmp_dir, sentiment_version(), SentimentCache.SCORES_FILE)
+        scores = pd.read_csv(scores_path)
+        scores.loc[scores['messageID'] == 'm0_2', 'sentiment'] = 'negative'
+        scores.to_csv(scores_path, index=False)
+
+        # Novo dia: somente as mensagens novas são acrescentadas ao arquivo
+        messages = make_messages(2)
+        cache = SentimentCache(tmp_dir)
+        result = CXAnalytics(messages, pd.DataFrame(), sentiment_cache=cache).message_sentiment_analysis()
+        assert result['overall']['negative'] == 5
+        assert len(pd.read_csv(scores_path)) == len(messages)
+    print("✅ Classificações reaproveitadas por messageID")
+
+def test_cache_invalidated_by_keywords():
+    """Mudança nas listas de palavras-chave invalida o cache"""
+    original = list(analytics.POSITIVE_KEYWORDS)
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            messages = make_messages(1)
+            CXAnalytics(messages, pd.DataFrame(), sentiment_cache=SentimentCache(tmp_dir)).message_sentiment_analysis()
+            old_version = sentiment_version()
+
+            analytics.POSITIVE_KEYWORDS.append('ok')
+            assert sentiment_version() != old_version
+            result = CXAnalytics(
+                messages, pd.DataFrame(), sentiment_cache=SentimentCache(tmp_dir)
+            ).message_sentiment_analysis()
+            assert result['overall'].get('neutral', 0) == 0
+            assert os.listdir(tmp_dir) == [sentiment_version()]
+    finally:
+        analytics.POSITIVE_KEYWORDS[:] = original
+    print("✅ Cache invalidado quando as palavras-chave mudam")
+
+if __name__ == "__main__":
+    test_cache_reuses_scores()
+    test_cache_invalidated_by_keywords()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Teste unitário para o índice CSR de mensagens por sessão
+"""
+
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from id_encoding import IDDictionary, MISSING_CODE
+from session_index import SessionIndex
+from text_store import MessageTextStore
+
+def make_messages(n=2000, seed=3):
+    rng = np.random.default_rng(seed)
+    created = pd.Series(pd.to_datetime('2025-06-01') + pd.to_timedelta(rng.integers(0, 10**6, n), unit='s'))
+    created[rng.random(n) < 0.02] = pd.NaT
+    return pd.DataFrame({
+        'messageID': [f'm{i}' for i in range(n)],
+        'sessionID': pd.Series(rng.choice([f's{i}' for i in range(150)], n)).mask(rng.random(n) < 0.03),
+        'createdAt': created,
+        'messageDirection': rng.choice(['inbound', 'outbound'], n)
+    })
+
+def test_slices_match_filters():
+    """Cada sessão é uma fatia contígua, em ordem cronológica, igual ao filtro por sessionID"""
+    messages = make_messages()
+    ids = IDDictionary()
+    ids.encode('sessionID', ['sem-mensagens'])
+    index = SessionIndex(ids.encode_frame(messages.copy()), ids)
+
+    assert len(index) == ids.size('sessionID')
+    assert index.offsets[-1] == messages['sessionID'].notna().sum()
+    assert index.counts()[index.codes(['sem-mensagens'])[0]] == 0
+
+    for session_id in ['s0', 's42', 's149']:
+        expected = messages[messages['sessionID'] == session_id].sort_values('createdAt', kind='stable')
+        conversation = index.conversation(session_id)
+        assert list(conversation['messageID']) == list(expected['messageID'])
+
+    assert index.conversation('desconhecida').empty
+    assert index.codes(['desconhecida'])[0] == MISSING_CODE
+    print("✅ Conversas como fatias contíguas")
+
+def test_segment_reductions():
+    """Resumo por sessão (reduceat) igual ao groupby"""
+    messages = make_messages()
+    for ids in (None, IDDictionary()):
+        frame = ids.encode_frame(messages.copy()) if ids is not None else messages
+        index = SessionIndex(frame, ids)
+        summary = index.summary().sort_index()
+
+        grouped = messages.groupby('sessionID')
+        expected = pd.DataFrame({
+            'message_count': grouped.size(),
+            'inbound': grouped['messageDirection'].agg(lambda d: (d == 'inbound').sum()),
+            'first_message_at': grouped['createdAt'].min(),
+            'last_message_at': grouped['createdAt'].max()
+        }).sort_index()
+        assert list(summary.index) == list(expected.index)
+        for column in expected.columns:
+            assert (summary[column].to_numpy() == expected[column].to_numpy()).all(), column
+
+        # Máximo por segmento e valor vazio para sessões sem mensagens
+        lengths = index.reduce(np.arange(len(index.messages)), np.maximum, empty=-1)
+        assert (lengths[index.counts() > 0] == index.offsets[1:][index.counts() > 0] - 1).all()
+
+    subset = index.summary(index.codes(['s1', 's2', 'desconhecida']))
+    assert sorted(subset.index) == ['s1', 's2']
+    print("✅ Reduções por segmento iguais ao groupby")
+
+def test_conversation_texts_from_store():
+    """Com o armazenamento de textos, o índice guarda só text_row e a conversa traz os textos da fatia"""
+    messages = make_messages()
+    messages['messageValue'] = pd.Series([f'texto {i}' for i in range(len(messages))]).mask(lambda s: s.index % 7 == 0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = MessageTextStore.build(messages['messageValue'], os.path.join(tmp_dir, "text"))
+        frame = messages.drop(columns=['messageValue']).assign(text_row=np.arange(len(messages), dtype=np.int32))
+        index = SessionIndex(frame, text_store=store)
+        assert 'messageValue' not in index.messages.columns
+
+        for session_id in ['s0', 's42']:
+            expected = messages[messages['sessionID'] == session_id].sort_values('createdAt', kind='stable')
+            conversation = index.conversation(session_id)
+            assert conversation['messageValue'].fillna('-').tolist() == expected['messageValue'].fillna('-').tolist()
+        assert 'messageValue' in index.conversation('desconhecida').columns
+
+        # Reconstruir o armazenamento não altera os arquivos já mapeados pelo índice
+        MessageTextStore.build(messages['messageValue'].fillna('') + ' novo', store.store_dir)
+        assert index.conversation('s0')['messageValue'].dropna().str.endswith('novo').sum() == 0
+    print("✅ Textos das conversas lidos do armazenamento em disco")
+
+if __name__ == "__main__":
+    test_slices_match_filters()
+    test_segment_reductions()
+    test_conversation_texts_from_store()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Teste unitário para o dimensionamento de atendentes (Erlang C)
+"""
+
+import math
+import numpy as np
+import pandas as pd
+from staffing import log_erlang_c, staffing_metrics, required_agents, arrival_profile, staffing_plan
+
+def erlang_c_naive(traffic, agents):
+    """Erlang C direto pela fórmula com fatoriais"""
+    if agents <= traffic:
+        return 1.0
+    top = traffic ** agents / math.factorial(agents) * agents / (agents - traffic)
+    return top / (sum(traffic ** k / math.factorial(k) for k in range(agents)) + top)
+
+def test_erlang_c_log_space():
+    """Probabilidade de espera igual à fórmula direta, sem overflow para tráfego alto"""
+    traffic = np.array([0.3, 2.5, 10.0, 50.0])
+    agents = np.arange(1, 71)
+    wait = np.exp(log_erlang_c(traffic[:, None], agents[None, :]))
+    for i, load in enumerate(traffic):
+        for j, n in enumerate(agents):
+            assert abs(wait[i, j] - erlang_c_naive(load, int(n))) < 1e-9, (load, n)
+
+    # 800 Erlangs: A^N / N! estoura em float, em log não
+    assert 0 < np.exp(log_erlang_c(800.0, 830)) < 1
+    assert np.exp(log_erlang_c(0.0, 3)) == 0
+    print("✅ Erlang C em log igual à fórmula direta")
+
+def test_required_agents():
+    """Exemplo clássico: 10 Erlangs, TMA de 3 min, 80% em 20 s -> 14 atendentes"""
+    agents = required_agents(np.array([10.0, 0.0, 0.5]), np.array([180.0, 180.0, 300.0]), 0.8, 20)
+    assert list(agents) == [14, 0, 2]
+
+    metrics = staffing_metrics(10.0, np.array([13, 14]), 180.0, 20)
+    assert metrics['service_level'][0] < 0.8 <= metrics['service_level'][1]
+    assert abs(metrics['occupancy'][1] - 10 / 14) < 1e-12
+
+    # Metas mais rígidas nunca pedem menos atendentes
+    traffic = np.linspace(0.1, 30, 50)
+    handle = np.full(50, 240.0)
+    loose = required_agents(traffic, handle, 0.8, 60)
+    strict = required_agents(traffic, handle, 0.95, 20)
+    assert (strict >= loose).all() and (loose > traffic).all()
+    assert (required_agents(traffic, handle, 0.8, 60, max_wait_seconds=5) >= loose).all()
+    print("✅ Atendentes necessários para a meta")
+
+def test_arrival_profile_and_plan():
+    """Taxa por hora divide pelas ocorrências do dia da semana; plano com 168 faixas"""
+    # Duas segundas-feiras (2 e 9 de junho de 2025) e uma terça entre elas
+    sessions = pd.DataFrame({
+        'createdAt': pd.to_datetime(['2025-06-02 10:05', '2025-06-02 10:40', '2025-06-09 10:10', '2025-06-03 15:00', '2025-06-04 09:00']),
+        '__sessionManualDuration': [600, 300, 900, np.nan, 120],
+        'pluginConnectionLabel': ['A', 'B', 'A', 'A', None]
+    })
+    profile = arrival_profile(sessions)
+    assert len(profile) == 168
+    monday_10 = profile[(profile['weekday'] == 0) & (profile['hour'] == 10)].iloc[0]
+    assert monday_10['sessions'] == 3 and monday_10['days'] == 2
+    assert monday_10['arrival_rate'] == 1.5 and monday_10['handle_seconds'] == 600
+    assert profile['sessions'].sum() == 4  # sessão sem atendimento manual não conta
+
+    by_operator = arrival_profile(sessions, group_column='pluginConnectionLabel')
+    assert len(by_operator) == 2 * 168 and by_operator['sessions'].sum() == 3
+
+    plan = staffing_plan(profile, 0.8, 60)
+    assert (plan.loc[plan['sessions'] == 0, 'agents'] == 0).all()
+    assert (plan.loc[plan['sessions'] > 0, 'agents'] >= 1).all()
+    assert (plan.loc[plan['agents'] > 0, 'service_level'] >= 0.8).all()
+    print("✅ Perfil de chegadas e plano por faixa")
+
+if __name__ == "__main__":
+    test_erlang_c_log_space()
+    test_required_agents()
+    test_arrival_profile_and_plan()
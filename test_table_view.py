@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Teste unitário para a tabela paginada do dashboard (formatação, busca e ordenação)
+"""
+
+import numpy as np
+import pandas as pd
+from table_view import format_duration_series, filter_rows, filter_columns, sort_rows
+
+def make_table():
+    return pd.DataFrame({
+        'Síndico': ['Ana', 'bruno', None, 'Carla'],
+        'Sessões': [10, 250, 3, 42],
+        'Duração': [3661.0, np.nan, 0.0, 90_061.5]
+    }, index=pd.Index(['s1', 's2', 's3', 'ANA-4'], name='Sessão'))
+
+def test_format_duration_series():
+    """HH:MM:SS com horas acima de 24, 'N/A' para vazios e valores <= 0"""
+    formatted = format_duration_series([3661, np.nan, 0, -5, 90_061.9, None, 'x'])
+    assert formatted.tolist() == ['01:01:01', 'N/A', 'N/A', 'N/A', '25:01:01', 'N/A', 'N/A']
+    print("✅ Durações formatadas")
+
+def test_filters():
+    """Busca sem diferenciar maiúsculas, no índice e só nas colunas de texto"""
+    table = make_table()
+    assert filter_rows(table, '') is table and filter_columns(table, None) is table
+    assert list(filter_rows(table, 'ana').index) == ['s1', 'ANA-4']
+    assert list(filter_rows(table, 'BRUNO').index) == ['s2']
+    assert list(filter_rows(table, 'S3').index) == ['s3']
+    # Valores numéricos não entram na busca
+    assert filter_rows(table, '250').empty and filter_rows(table, '42').empty
+
+    pivot = pd.DataFrame(np.ones((2, 4)), columns=['Ana', 'Bruno', 'Carla', 1])
+    assert list(filter_columns(pivot, 'AN')) == ['Ana']
+    assert list(filter_columns(pivot, '1')) == [1]
+    assert filter_columns(pivot, 'zzz').shape == (2, 0)
+    print("✅ Busca em linhas e colunas")
+
+def test_sort_rows():
+    """Ordenação estável por coluna ou pelo índice, nos dois sentidos"""
+    table = make_table()
+    assert list(sort_rows(table, 'Sessões').index) == ['s3', 's1', 'ANA-4', 's2']
+    assert list(sort_rows(table, 'Sessões', descending=True).index) == ['s2', 'ANA-4', 's1', 's3']
+    assert list(sort_rows(table, None).index) == ['ANA-4', 's1', 's2', 's3']
+    assert list(sort_rows(table, None, descending=True).index) == ['s3', 's2', 's1', 'ANA-4']
+    # Vazios ficam no fim e empates mantêm a ordem original
+    assert list(sort_rows(table, 'Duração').index) == ['s3', 's1', 'ANA-4', 's2']
+    tied = table.assign(Sessões=1)
+    assert list(sort_rows(tied, 'Sessões', descending=True).index) == list(table.index)
+    print("✅ Ordenação no servidor")
+
+def column_window_app():
+    import numpy as np
+    import pandas as pd
+    from table_view import paginated_table
+    pivot = pd.DataFrame(np.ones((3, 30)), columns=[f'Dia {i:02d}' for i in range(1, 31)])
+    paginated_table(pivot, key='pivot', max_columns=5, search_target='columns')
+
+def test_column_window_clamped():
+    """A janela de colunas volta para dentro do limite quando a busca reduz as colunas"""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_function(column_window_app).run()
+    at.slider(key='pivot_columns').set_value(25).run()
+    # "Dia 1" deixa 10 colunas (Dia 10 a Dia 19): a janela vai até a posição 5
+    at.text_input(key='pivot_search').input('Dia 1').run()
+    assert not at.exception, [e.message for e in at.exception]
+    assert at.slider(key='pivot_columns').value == 5
+    assert at.caption[0].value.endswith('colunas 6–10 de 10')
+    print("✅ Janela de colunas limitada após a busca")
+
+if __name__ == "__main__":
+    test_format_duration_series()
+    test_filters()
+    test_sort_rows()
+    test_column_window_clamped()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Teste unitário para as contagens de termos e bigramas por dia
+"""
+
+import os
+import tempfile
+import multiprocessing
+import numpy as np
+import pandas as pd
+from term_stats import TermStats, term_counts, merge_term_counts, term_report, message_days
+from analytics import CXAnalytics
+from batch_analysis import build_html_report
+
+MESSAGES = [
+    ['m1', 'inbound', '2025-06-02 09:00:00', 'O boleto não chegou'],
+    ['m2', 'inbound', '2025-06-02 10:00:00', 'Boleto não chegou de novo!'],
+    ['m3', 'outbound', '2025-06-02 10:05:00', 'Vou verificar o boleto'],
+    ['m4', 'inbound', '2025-06-03 08:00:00', 'vazamento na garagem'],
+    ['m5', 'inbound', '2025-06-03 08:30:00', None],
+    ['m6', 'inbound', '2025-06-04 11:00:00', 'VAZAMENTO na garagem, 2 vezes'],
+    ['m7', 'inbound', '2025-06-04 12:00:00', 'vazamento de gás'],
+    ['m8', 'inbound', '2025-06-05 09:00:00', 'Vazamento na garagem e boleto']
+]
+
+def make_messages(rows=MESSAGES):
+    messages = pd.DataFrame(rows, columns=['messageID', 'messageDirection', 'createdAt', 'messageValue'])
+    messages['createdAt'] = pd.to_datetime(messages['createdAt'])
+    return messages
+
+def lookup(table, day, ngram):
+    """Contagens de um dia como {termo: contagem}"""
+    counts = table['counts']
+    counts = counts[(counts['day'] == day) & (counts['ngram'] == ngram)]
+    return dict(zip(table['vocabulary'].reindex(counts['hash']), counts['count']))
+
+def test_daily_counts():
+    """Unigramas e bigramas por dia, sem stopwords, números e acentos"""
+    messages = make_messages()
+    inbound = messages[(messages['messageDirection'] == 'inbound') & messages['messageValue'].notna()]
+    days = message_days(inbound['createdAt'])
+    first_day = pd.Timestamp('2025-06-02').value // 86_400_000_000_000
+    assert days[0] == first_day
+
+    table = term_counts(inbound['messageValue'], days)
+    assert lookup(table, first_day, 1) == {'boleto': 2, 'nao': 2, 'chegou': 2, 'novo': 1}
+    assert lookup(table, first_day, 2) == {'boleto nao': 2, 'nao chegou': 2}
+    # "na" é stopword: "vazamento na garagem" não forma bigramas
+    assert lookup(table, first_day + 2, 1) == {'vazamento': 2, 'garagem': 1, 'vezes': 1, 'gas': 1}
+    assert lookup(table, first_day + 2, 2) == {}
+    assert list(table['totals'].loc[first_day]) == [2, 7, 4]
+
+    # Lotes somados dão a mesma tabela que um lote só
+    halves = merge_term_counts([term_counts(inbound['messageValue'][:3], days[:3]), term_counts(inbound['messageValue'][3:], days[3:])])
+    assert halves['counts'].equals(table['counts'].sort_values(['day', 'ngram', 'hash'], ignore_index=True))
+    print("✅ Contagens diárias de termos e bigramas")
+
+def test_top_and_rising():
+    """Mais citados do período e em alta contra o período anterior de mesmo tamanho"""
+    messages = make_messages()
+    inbound = messages[(messages['messageDirection'] == 'inbound') & messages['messageValue'].notna()]
+    table = term_counts(inbound['messageValue'], message_days(inbound['createdAt']))
+    first_day = int(table['totals'].index.min())
+
+    overall = term_report(table, min_count=2)
+    assert overall['top_unigrams']['term'].iloc[0] == 'vazamento' and overall['top_unigrams']['count'].iloc[0] == 4
+    assert overall['messages'] == 6 and overall['rising_unigrams'].empty  # sem período anterior
+
+    # 04-05/06 contra 02-03/06: vazamento passa de 1 para 3, boleto cai de 2 para 1
+    recent = term_report(table, first_day + 2, first_day + 3, min_count=1)
+    rising = recent['rising_unigrams'].set_index('term')
+    assert rising.loc['vazamento', 'count'] == 3 and rising.loc['vazamento', 'previous_count'] == 1
+    assert 'boleto' not in rising.index and (rising['growth'] > 1).all()
+    print("✅ Termos mais citados e em alta")
+
+def test_store_incremental_updates():
+    """Tabelas diárias persistidas somam só as mensagens ainda não contadas"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "messages.csv")
+        make_messages(MESSAGES[:4]).to_csv(file_path, index=False)
+        store = TermStats(os.path.join(tmp_dir, "terms"))
+        assert store.sync(file_path) == 3  # m3 é enviada
+        assert store.sync(file_path) == 0
+
+        # Novo export com sobreposição: m1-m4 já contadas
+        make_messages().to_csv(file_path, index=False)
+        os.utime(file_path, ns=(1, 1))
+        assert store.sync(file_path) == 3
+        assert len(store.days()) == 4
+
+        # O período é a soma das tabelas diárias, igual à contagem em memória
+        messages = make_messages()
+        inbound = messages[(messages['messageDirection'] == 'inbound') & messages['messageValue'].notna()]
+        expected = term_report(term_counts(inbound['messageValue'], message_days(inbound['createdAt'])), min_count=1)
+        reopened = TermStats(os.path.join(tmp_dir, "terms"))
+        report = reopened.report(min_count=1)
+        assert report['top_unigrams'].equals(expected['top_unigrams'])
+        assert report['top_bigrams'].equals(expected['top_bigrams'])
+
+        # Período de dois dias carrega também os dois anteriores para os termos em alta
+        report = reopened.report('2025-06-04', '2025-06-05', min_count=1)
+        assert report['messages'] == 3 and 'vazamento' in set(report['rising_unigrams']['term'])
+        assert reopened.report('2026-01-01', '2026-01-31') is None
+    print("✅ Atualização incremental das tabelas diárias")
+
+def test_analytics_and_html_report():
+    """CXAnalytics e a seção de termos do relatório HTML"""
+    result = CXAnalytics(make_messages(), pd.DataFrame()).term_frequency_analysis(window_days=2)
+    assert result['top_unigrams']['term'].iloc[0] == 'vazamento'
+    assert result['daily']['messages'].sum() == 6
+    assert CXAnalytics(pd.DataFrame(), pd.DataFrame()).term_frequency_analysis() is None
+
+    html = build_html_report(terms=result)
+    assert 'Termos Mais Citados' in html and 'vazamento' in html
+    print("✅ Análise de termos no CXAnalytics e no relatório")
+
+def sync_terms(store_dir, file_path):
+    """Sincronização em outro processo (dashboard e daemon ao mesmo tempo)"""
+    TermStats(store_dir).sync(file_path, chunk_size=2_000)
+
+def test_concurrent_sync():
+    """Dois processos sincronizando as mesmas tabelas não contam uma mensagem duas vezes"""
+    rng = np.random.default_rng(0)
+    words = np.array(['boleto', 'vazamento', 'portaria', 'reuniao', 'obra'])
+    rows = [[f'm{i}', 'inbound', f'2025-06-0{i % 5 + 1} 09:00:00', ' '.join(rng.choice(words, 3))] for i in range(20_000)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "messages.csv")
+        make_messages(rows).to_csv(file_path, index=False)
+        store_dir = os.path.join(tmp_dir, "terms")
+        workers = [multiprocessing.Process(target=sync_terms, args=(store_dir, file_path)) for _ in range(2)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        assert all(worker.exitcode == 0 for worker in workers)
+
+        report = TermStats(store_dir).report(min_count=1)
+        assert report['messages'] == len(rows)
+        top = report['top_unigrams'].set_index('term')['count']
+        assert top['boleto'] == sum(row[3].split().count('boleto') for row in rows)
+    print("✅ Sincronização simultânea de dois processos")
+
+if __name__ == "__main__":
+    test_daily_counts()
+    test_top_and_rising()
+    test_store_incremental_updates()
+    test_analytics_and_html_report()
+    test_concurrent_sync()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Teste unitário para o índice invertido de busca nas mensagens
+"""
+
+import os
+import tempfile
+import threading
+import multiprocessing
+import numpy as np
+import pandas as pd
+from text_index import TextIndex, normalize_terms, parse_query
+
+MESSAGES = [
+    ['m1', 's1', '2025-06-02 09:00:00', 'Bom dia, o BOLETO não chegou'],
+    ['m2', 's1', '2025-06-02 09:05:00', 'Há um vazamento de gás na garagem'],
+    ['m3', 's2', '2025-06-03 10:00:00', 'Vazamento no 3º andar; boletos atrasados'],
+    ['m4', 's3', '2025-06-09 14:00:00', 'gás de cozinha? não, vazamento de água'],
+    ['m5', 's3', '2025-06-09 14:01:00', None],
+    ['m6', None, '2025-06-10 08:00:00', 'boleto avulso']
+]
+
+def write_messages(file_path, rows):
+    pd.DataFrame(rows, columns=['messageID', 'sessionID', 'createdAt', 'messageValue']).to_csv(file_path, index=False)
+
+def test_normalization_and_query():
+    """Tokens sem acentos e em minúsculas; consulta em alternativas de itens"""
+    assert list(normalize_terms(['Não há GÁS!', None]).iloc[0]) == ['nao', 'ha', 'gas']
+    assert list(normalize_terms(['Não há GÁS!', None]).iloc[1]) == []
+    assert parse_query('boleto OU "vazamento de gás" vaz*') == [
+        [('term', 'boleto')],
+        [('phrase', ('vazamento', 'de', 'gas')), ('prefix', 'vaz')]
+    ]
+    assert parse_query('e-mail | OR') == [[('phrase', ('e', 'mail'))]]
+    print("✅ Normalização e consulta")
+
+def test_search():
+    """E, OU, frases, prefixos e filtros de período e sessões"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "messages.csv")
+        write_messages(file_path, MESSAGES)
+        index = TextIndex(os.path.join(tmp_dir, "index"))
+        assert index.sync(file_path) == 5  # m5 não tem texto
+
+        sessions = lambda query, **filters: list(index.search_sessions(query, **filters).index)
+        assert sorted(sessions('boleto')) == ['s1']  # m6 não tem sessão
+        assert len(index.search('boleto')) == 2
+        assert sorted(sessions('bolet*')) == ['s1', 's2']
+        assert sorted(sessions('vazamento gas')) == ['s1', 's3']
+        assert sessions('"vazamento de gas"') == ['s1']  # em s3 os termos não são consecutivos
+        assert sorted(sessions('"Vazamento de GÁS" OR boletos')) == ['s1', 's2']
+        assert sessions('inexistente') == [] and sessions('') == []
+
+        # Período (o dia final inteiro) e sessões do síndico
+        assert sorted(sessions('vazamento', start='2025-06-03', end='2025-06-09')) == ['s2', 's3']
+        assert sessions('vazamento', end='2025-06-02') == ['s1']
+        assert sorted(sessions('vazamento', session_ids=['s2', 's3', 'outra'])) == ['s2', 's3']
+
+        summary = index.search_sessions('vazamento OR boleto')
+        assert summary.loc['s1', 'matches'] == 2
+        assert summary.loc['s1', 'first_match_at'] == pd.Timestamp('2025-06-02 09:00:00')
+        assert list(summary.index) == ['s3', 's2', 's1']  # mais recentes primeiro
+    print("✅ Busca por termos, frases, prefixos e filtros")
+
+def test_incremental_updates():
+    """Exports novos viram segmentos só com as mensagens ainda não indexadas"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "messages.csv")
+        write_messages(file_path, MESSAGES[:3])
+        index = TextIndex(os.path.join(tmp_dir, "index"))
+        assert index.sync(file_path) == 3
+        assert index.sync(file_path) == 0  # export inalterado não é relido
+
+        # Novo export com sobreposição: só m4 e m6 são novas
+        write_messages(file_path, MESSAGES)
+        os.utime(file_path, ns=(1, 1))
+        assert index.sync(file_path) == 2
+        assert len(index) == 5 and len(index.read_manifest()['segments']) == 2
+        assert sorted(index.search_sessions('vazamento').index) == ['s1', 's2', 's3']
+
+        # Outra instância (ex.: o dashboard) lê os mesmos segmentos do disco
+        reopened = TextIndex(os.path.join(tmp_dir, "index"))
+        assert len(reopened.search('boleto')) == 2
+    print("✅ Atualização incremental por segmentos")
+
+def test_delta_encoded_postings():
+    """Documentos de cada termo gravados como diferenças no menor dtype"""
+    rng = np.random.default_rng(3)
+    words = np.array(['agua', 'gas', 'boleto', 'portao', 'elevador', 'garagem'])
+    texts = [' '.join(rng.choice(words, rng.integers(1, 6))) for _ in range(3000)]
+    messages = pd.DataFrame({
+        'messageID': [f'm{i}' for i in range(len(texts))],
+        'sessionID': [f's{i % 700}' for i in range(len(texts))],
+        'createdAt': pd.Timestamp('2025-06-01') + pd.to_timedelta(np.arange(len(texts)), unit='min'),
+        'messageValue': texts
+    })
+    segment = TextIndex.build_segment(messages)
+    # 3000 documentos pediriam uint16; as diferenças entre documentos vizinhos cabem em uint8
+    assert segment['postings'].dtype == np.uint8 and segment['positions'].dtype == np.uint8
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = TextIndex(tmp_dir)
+        assert index.add(messages) == len(texts)
+        for word in words:
+            expected = np.flatnonzero([word in text.split() for text in texts])
+            assert (index.match(word)[0] == expected).all(), word
+    print("✅ Listas de ocorrências com codificação delta")
+
+def sync_index(index_dir, file_path):
+    """Sincronização em outro processo (dashboard e daemon ao mesmo tempo)"""
+    TextIndex(index_dir).sync(file_path, chunk_size=2_000)
+
+def test_concurrent_sync():
+    """Dois processos sincronizando o mesmo índice não duplicam nem perdem mensagens"""
+    rng = np.random.default_rng(0)
+    words = np.array(['boleto', 'vazamento', 'portaria', 'gás', 'reunião', 'obra'])
+    rows = [[f'm{i}', f's{i % 500}', '2025-06-02 09:00:00', ' '.join(rng.choice(words, 3))] for i in range(20_000)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "messages.csv")
+        write_messages(file_path, rows)
+        index_dir = os.path.join(tmp_dir, "index")
+        workers = [multiprocessing.Process(target=sync_index, args=(index_dir, file_path)) for _ in range(2)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        assert all(worker.exitcode == 0 for worker in workers)
+
+        index = TextIndex(index_dir)
+        expected = sum('boleto' in row[3] for row in rows)
+        assert len(index) == len(rows)
+        assert len(index.search('boleto')) == expected
+        assert not [name for name in os.listdir(index_dir) if name.endswith('.tmp')]
+    print("✅ Sincronização simultânea de dois processos")
+
+def test_concurrent_searches():
+    """Consultas simultâneas de threads (índice compartilhado do dashboard) veem todos os segmentos"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = TextIndex(tmp_dir)
+        for i in range(40):
+            index.add(pd.DataFrame({
+                'messageID': [f'm{i}'], 'sessionID': [f's{i}'],
+                'createdAt': [pd.Timestamp('2025-06-02 09:00') + pd.Timedelta(minutes=i)],
+                'messageValue': [f'boleto {i}']
+            }))
+        for _ in range(20):
+            index._segments = None
+            barrier = threading.Barrier(4)
+            counts = []
+
+            def search():
+                barrier.wait()
+                counts.append(len(index.search('boleto')))
+            workers = [threading.Thread(target=search) for _ in range(4)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            assert counts == [40] * 4, counts
+    print("✅ Consultas simultâneas de várias threads")
+
+if __name__ == "__main__":
+    test_normalization_and_query()
+    test_search()
+    test_incremental_updates()
+    test_delta_encoded_postings()
+    test_concurrent_sync()
+    test_concurrent_searches()
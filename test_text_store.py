@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Teste unitário para o armazenamento dos textos das mensagens em disco
+"""
+
+import os
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from text_store import MessageTextStore
+
+def test_concurrent_open():
+    """Threads lendo um armazenamento ainda fechado (tarefas do relatório batch) não veem arquivos pela metade"""
+    values = pd.Series([f'mensagem {i}' for i in range(1_000)]).mask(lambda s: s.index % 9 == 0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        MessageTextStore.build(values, os.path.join(tmp_dir, "text"))
+        rows = np.arange(len(values))
+        for _ in range(50):
+            store = MessageTextStore(os.path.join(tmp_dir, "text"))
+            barrier = threading.Barrier(4)
+            errors, batches = [], []
+
+            def read():
+                barrier.wait()
+                try:
+                    batches.append(store.get_batch(rows))
+                    store.is_null(rows)
+                except Exception as e:
+                    errors.append(e)
+            workers = [threading.Thread(target=read) for _ in range(4)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            assert not errors, errors
+            assert all(pd.Series(batch).fillna('-').tolist() == values.fillna('-').tolist() for batch in batches)
+    print("✅ Abertura simultânea por várias threads")
+
+if __name__ == "__main__":
+    test_concurrent_open()
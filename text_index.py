@@ -0,0 +1,378 @@
+import os
+import re
+import json
+import shutil
+import tempfile
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from csv_engine import iter_csv
+from kernels import timestamp_ns
+from dashboard_data import source_fingerprint
+from file_lock import directory_lock, replace_file
+
+# Diretório padrão do índice de busca nas mensagens
+TEXT_INDEX_DIR = "processed_data/text_index"
+
+# Colunas do export de mensagens usadas pelo índice
+INDEX_COLUMNS = ['messageID', 'sessionID', 'createdAt', 'messageValue']
+
+# Tokens: sequências de letras e dígitos, depois de remover os acentos.
+# Sequências maiores (URLs, códigos) são divididas em pedaços de até
+# MAX_TERM_LENGTH caracteres para manter o dicionário compacto.
+MAX_TERM_LENGTH = 40
+TOKEN_PATTERN = rf'[^\W_]{{1,{MAX_TERM_LENGTH}}}'
+COMBINING_MARKS = '[\u0300-\u036f]'
+
+# Separadores de alternativas na consulta (palavras soltas são combinadas com E)
+OR_OPERATORS = ('OR', 'OU', '|')
+
+# Chave (documento, posição) das ocorrências usada nas frases
+POSITION_STRIDE = 1 << 32
+
+_MISSING_NS = np.iinfo(np.int64).min
+
+
+def normalize_terms(values):
+    """Tokens normalizados (minúsculas, sem acentos) de cada texto
+
+    Retorna Series de listas alinhada a values; textos ausentes viram
+    listas vazias. Consultas e mensagens passam pela mesma normalização.
+    """
+    text = pd.Series(values, dtype=object).fillna('').astype(str)
+    text = text.str.normalize('NFKD').str.replace(COMBINING_MARKS, '', regex=True).str.lower()
+    return text.str.findall(TOKEN_PATTERN)
+
+
+def parse_query(query):
+    """Consulta em forma normal disjuntiva: lista de alternativas, cada uma uma lista de itens (E)
+
+    Palavras separadas por espaço precisam aparecer todas; OR, OU ou |
+    separam alternativas; "entre aspas" é uma frase (termos consecutivos) e
+    termo* busca por prefixo. Itens: ('term', termo), ('prefix', termo) ou
+    ('phrase', (termo, ...)). Ex.: boleto OR "vazamento de gás".
+    """
+    clauses = [[]]
+    for quoted, word in re.findall(r'"([^"]*)"|(\S+)', query):
+        if not quoted and word in OR_OPERATORS:
+            clauses.append([])
+            continue
+        prefix = not quoted and word.endswith('*')
+        terms = normalize_terms([quoted or word.rstrip('*')]).iloc[0]
+        if not terms:
+            continue
+        if len(terms) > 1:
+            clauses[-1].append(('phrase', tuple(terms)))
+        else:
+            clauses[-1].append(('prefix' if prefix else 'term', terms[0]))
+    return [clause for clause in clauses if clause]
+
+
+def _unique_sorted(values):
+    """Valores distintos de um array já ordenado"""
+    if values.size == 0:
+        return values
+    return values[np.r_[True, values[1:] != values[:-1]]]
+
+
+def message_hashes(messages):
+    """Hash de cada mensagem (messageID; sem ele, sessão + data + texto) para não indexar duas vezes"""
+    if 'messageID' in messages.columns:
+        return pd.util.hash_array(messages['messageID'].astype(str).to_numpy(dtype=object))
+    columns = [col for col in ('sessionID', 'createdAt', 'messageValue') if col in messages.columns]
+    return pd.util.hash_pandas_object(messages[columns].astype(str), index=False).to_numpy()
+
+
+def _compact(values):
+    """Menor dtype sem sinal que comporta os valores"""
+    return values.astype(np.min_scalar_type(int(values.max()) if values.size else 0))
+
+
+class TextIndex:
+    """Índice invertido dos textos das mensagens (busca por termos, frases e prefixos)
+
+    Cada mensagem com texto é um documento. Os termos (tokens normalizados,
+    sem acentos) ficam em um dicionário ordenado e cada termo aponta para
+    suas ocorrências (documento, posição) ordenadas: os documentos são
+    gravados com codificação delta (o primeiro absoluto, os demais como
+    diferença para o anterior) no menor dtype sem sinal que os comporta, e
+    todos os arrays são mapeados em memória e lidos sob demanda.
+
+    O índice cresce por segmentos: cada atualização grava só as mensagens
+    ainda não indexadas (por messageID) em um novo segmento, e o manifesto
+    é regravado por último, de modo que leitores nunca veem um segmento
+    parcial. Cada segmento guarda também a data e a sessão dos documentos,
+    usadas nos filtros de período e de sessões. Atualizações de processos
+    diferentes (dashboard e daemon de ingestão) são serializadas por uma
+    trava no diretório do índice.
+    """
+
+    MANIFEST_FILE = "manifest.json"
+    SEGMENT_FILES = (
+        'terms', 'term_offsets', 'postings', 'positions',
+        'created', 'session_codes', 'session_ids', 'message_hashes'
+    )
+
+    def __init__(self, index_dir=TEXT_INDEX_DIR):
+        self.index_dir = index_dir
+        self._segments = None
+
+    def read_manifest(self):
+        """Manifesto do índice (segmentos e exports incorporados); vazio se ainda não existir"""
+        manifest_path = os.path.join(self.index_dir, self.MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {'segments': [], 'sources': {}, 'version': None}
+
+    def _write_manifest(self, manifest):
+        manifest['version'] = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        replace_file(os.path.join(self.index_dir, self.MANIFEST_FILE),
+                     lambda f: f.write(json.dumps(manifest, indent=2).encode('utf-8')))
+        self._segments = None
+
+    def _open(self):
+        """Abre os arrays dos segmentos mapeados em memória na primeira consulta
+
+        A lista é montada à parte e publicada de uma vez: o índice é
+        compartilhado entre as sessões do dashboard e consultas simultâneas
+        nunca veem uma lista parcial.
+        """
+        segments = self._segments
+        if segments is not None:
+            return segments
+        segments = []
+        for entry in self.read_manifest()['segments']:
+            segment_dir = os.path.join(self.index_dir, entry['name'])
+            segments.append({
+                name: np.load(os.path.join(segment_dir, f"{name}.npy"), mmap_mode='r')
+                for name in self.SEGMENT_FILES
+            })
+        self._segments = segments
+        return segments
+
+    def __len__(self):
+        """Número de mensagens indexadas"""
+        return sum(entry['documents'] for entry in self.read_manifest()['segments'])
+
+    @staticmethod
+    def build_segment(messages):
+        """Arrays de um segmento a partir de mensagens (INDEX_COLUMNS); None se nenhuma tiver texto"""
+        terms = normalize_terms(messages['messageValue']).reset_index(drop=True)
+        counts = terms.str.len().to_numpy()
+        documents = np.flatnonzero(counts > 0)
+        if documents.size == 0:
+            return None
+        counts = counts[documents]
+
+        # Ocorrências: documento (linha entre as mensagens com texto) e posição no texto
+        tokens = terms.iloc[documents].explode().to_numpy(dtype=object)
+        rows = np.repeat(np.arange(len(documents), dtype=np.int64), counts)
+        positions = np.arange(len(tokens), dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+        term_codes, vocabulary = pd.factorize(tokens, sort=True)
+
+        order = np.lexsort((positions, rows, term_codes))
+        term_codes, rows, positions = term_codes[order], rows[order], positions[order]
+        term_offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_codes, minlength=len(vocabulary)), out=term_offsets[1:])
+
+        # Codificação delta dentro de cada termo (o primeiro documento fica absoluto)
+        deltas = rows.copy()
+        deltas[1:] -= rows[:-1]
+        deltas[term_offsets[:-1]] = rows[term_offsets[:-1]]
+
+        created, valid = timestamp_ns(pd.to_datetime(messages['createdAt'], format='ISO8601', errors='coerce'))
+        session_codes, session_ids = pd.factorize(messages['sessionID'].astype(object))
+        return {
+            'terms': np.asarray(vocabulary, dtype=str),
+            'term_offsets': term_offsets,
+            'postings': _compact(deltas),
+            'positions': _compact(positions),
+            'created': np.where(valid, created, _MISSING_NS)[documents],
+            'session_codes': session_codes[documents].astype(np.int32),
+            'session_ids': np.asarray(session_ids, dtype=str) if len(session_ids) else np.zeros(0, dtype='<U1'),
+            'message_hashes': message_hashes(messages)[documents]
+        }
+
+    def add(self, messages):
+        """Indexa as mensagens ainda não indexadas em um novo segmento
+
+        messages: DataFrame com INDEX_COLUMNS (messageID é opcional). Retorna
+        o número de mensagens indexadas.
+        """
+        if messages is None or messages.empty or 'messageValue' not in messages.columns:
+            return 0
+        with directory_lock(self.index_dir):
+            return self._add(messages)
+
+    def _add(self, messages):
+        """add com a trava do diretório já obtida"""
+        messages = messages.reset_index(drop=True)
+
+        # Mensagens já presentes (exports com sobreposição) ou repetidas no lote,
+        # relidas do disco: outro processo pode ter indexado desde a última leitura
+        hashes = message_hashes(messages)
+        self._segments = None
+        segments = self._open()
+        seen = np.concatenate([segment['message_hashes'] for segment in segments]) if segments else np.zeros(0, np.uint64)
+        new = ~np.isin(hashes, seen) & ~pd.Series(hashes).duplicated(keep='last').to_numpy()
+        segment = self.build_segment(messages[new])
+        if segment is None:
+            return 0
+
+        manifest = self.read_manifest()
+        name = f"segment_{len(manifest['segments']):06d}"
+        segment_dir = os.path.join(self.index_dir, name)
+        tmp_dir = tempfile.mkdtemp(dir=self.index_dir, prefix=name + '.', suffix='.tmp')
+        for key, values in segment.items():
+            np.save(os.path.join(tmp_dir, f"{key}.npy"), values)
+        if os.path.isdir(segment_dir):
+            # Sobra de uma atualização interrompida antes do manifesto: fora do índice
+            shutil.rmtree(segment_dir)
+        os.replace(tmp_dir, segment_dir)
+
+        manifest['segments'].append({
+            'name': name, 'documents': len(segment['created']), 'terms': len(segment['terms'])
+        })
+        self._write_manifest(manifest)
+        return len(segment['created'])
+
+    def sync(self, file_path, chunk_size=500000):
+        """Incorpora ao índice as mensagens novas de um export de mensagens
+
+        Exports já incorporados e inalterados (mtime e tamanho) não são
+        relidos; em um export novo ou alterado só as mensagens ainda não
+        indexadas entram no índice. Retorna o número de mensagens indexadas.
+        """
+        if not os.path.exists(file_path):
+            return 0
+        fingerprint = source_fingerprint(file_path)
+        if self.read_manifest()['sources'].get(file_path) == fingerprint:
+            return 0
+
+        with directory_lock(self.index_dir):
+            # Outro processo pode ter incorporado o export enquanto esperávamos a trava
+            if self.read_manifest()['sources'].get(file_path) == fingerprint:
+                self._segments = None
+                return 0
+            added = 0
+            for chunk in iter_csv(file_path, usecols=lambda col: col in INDEX_COLUMNS, chunksize=chunk_size):
+                if not chunk.empty and 'messageValue' in chunk.columns:
+                    added += self._add(chunk)
+
+            manifest = self.read_manifest()
+            manifest['sources'][file_path] = fingerprint
+            self._write_manifest(manifest)
+        return added
+
+    def _occurrences(self, segment, term, prefix=False):
+        """Documentos e posições das ocorrências de um termo (ou de todos os termos com o prefixo)"""
+        terms = segment['terms']
+        lo = int(np.searchsorted(terms, term, side='left'))
+        hi = int(np.searchsorted(terms, term + '\U0010ffff' if prefix else term, side='left' if prefix else 'right'))
+        if hi <= lo:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+
+        # Decodificação delta: soma acumulada reiniciada no início de cada termo
+        offsets = np.asarray(segment['term_offsets'][lo:hi + 1], dtype=np.int64)
+        running = np.cumsum(np.asarray(segment['postings'][offsets[0]:offsets[-1]], dtype=np.int64))
+        starts = offsets[:-1] - offsets[0]
+        base = np.where(starts > 0, running[np.maximum(starts - 1, 0)], 0)
+        rows = running - np.repeat(base, np.diff(offsets))
+        positions = np.asarray(segment['positions'][offsets[0]:offsets[-1]], dtype=np.int64)
+        return rows, positions
+
+    def _match_item(self, segment, item):
+        """Documentos (ordenados, distintos) de um item da consulta"""
+        kind, value = item
+        if kind != 'phrase':
+            rows, _ = self._occurrences(segment, value, prefix=kind == 'prefix')
+            return _unique_sorted(np.sort(rows) if kind == 'prefix' else rows)
+
+        # Frase: o termo k deve estar na posição p + k do mesmo documento
+        keys = None
+        for offset, term in enumerate(value):
+            rows, positions = self._occurrences(segment, term)
+            keep = positions >= offset
+            term_keys = rows[keep] * POSITION_STRIDE + (positions[keep] - offset)
+            keys = term_keys if keys is None else np.intersect1d(keys, term_keys, assume_unique=True)
+            if keys.size == 0:
+                break
+        return _unique_sorted(keys // POSITION_STRIDE)
+
+    def match(self, query):
+        """Documentos que atendem a consulta em cada segmento (lista de arrays ordenados)"""
+        return self._match(self._open(), query)
+
+    def _match(self, segments, query):
+        clauses = parse_query(query) if isinstance(query, str) else query
+        matches = []
+        for segment in segments:
+            documents = np.zeros(0, dtype=np.int64)
+            for clause in clauses:
+                found = None
+                for item in clause:
+                    item_documents = self._match_item(segment, item)
+                    found = item_documents if found is None else np.intersect1d(found, item_documents, assume_unique=True)
+                    if found.size == 0:
+                        break
+                documents = np.union1d(documents, found)
+            matches.append(documents)
+        return matches
+
+    def search(self, query, start=None, end=None, session_ids=None):
+        """Mensagens que atendem a consulta, com filtros de período e de sessões
+
+        start/end: datas de createdAt (o dia de end é incluído inteiro).
+        session_ids: limita às sessões informadas (ex.: as do síndico
+        selecionado). Retorna DataFrame com sessionID e createdAt de cada
+        mensagem encontrada, em ordem cronológica.
+        """
+        start_ns = pd.Timestamp(start).value if start is not None else None
+        end_ns = (pd.Timestamp(end).normalize() + pd.Timedelta(days=1)).value if end is not None else None
+        allowed_ids = np.asarray(list(session_ids), dtype=str) if session_ids is not None else None
+
+        # Uma única lista de segmentos para a busca e os filtros
+        segments = self._open()
+        frames = []
+        for segment, documents in zip(segments, self._match(segments, query)):
+            created = np.asarray(segment['created'][documents])
+            codes = np.asarray(segment['session_codes'][documents])
+            keep = np.ones(len(documents), dtype=bool)
+            if start_ns is not None:
+                keep &= (created != _MISSING_NS) & (created >= start_ns)
+            if end_ns is not None:
+                keep &= created < end_ns
+            if allowed_ids is not None:
+                allowed = np.r_[np.isin(segment['session_ids'], allowed_ids), False]
+                keep &= allowed[codes]
+            created, codes = created[keep], codes[keep]
+            # Código -1 (mensagem sem sessão) cai no None acrescentado ao fim
+            frames.append(pd.DataFrame({
+                'sessionID': np.append(np.asarray(segment['session_ids'], dtype=object), None)[codes],
+                'createdAt': pd.to_datetime(created.view('datetime64[ns]'))
+            }))
+
+        if not frames:
+            return pd.DataFrame({'sessionID': pd.Series(dtype=object), 'createdAt': pd.Series(dtype='datetime64[ns]')})
+        return pd.concat(frames, ignore_index=True).sort_values('createdAt', kind='stable').reset_index(drop=True)
+
+    def search_sessions(self, query, start=None, end=None, session_ids=None):
+        """Sessões com mensagens que atendem a consulta (ver search)
+
+        Retorna DataFrame indexado por sessionID com matches (mensagens
+        encontradas) e first_match_at/last_match_at, das mais recentes para
+        as mais antigas.
+        """
+        found = self.search(query, start, end, session_ids).dropna(subset=['sessionID'])
+        grouped = found.groupby('sessionID', sort=False)['createdAt']
+        summary = pd.DataFrame({
+            'matches': grouped.size(),
+            'first_match_at': grouped.min(),
+            'last_match_at': grouped.max()
+        })
+        return summary.sort_values('last_match_at', ascending=False, na_position='last')
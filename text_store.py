@@ -0,0 +1,118 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+from file_lock import replace_file
+
+
+class MessageTextStore:
+    """Armazenamento fora da memória dos textos das mensagens
+
+    Os textos ficam em um blob contíguo UTF-8 com um array de offsets
+    (linha i ocupa blob[offsets[i]:offsets[i + 1]]), ambos mapeados em
+    memória e lidos sob demanda por índice de linha ou em lotes.
+    """
+
+    BLOB_FILE = "message_text.bin"
+    OFFSETS_FILE = "message_offsets.npy"
+    NULLS_FILE = "message_nulls.npy"
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self._blob = None
+        self._offsets = None
+        self._nulls = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, values, store_dir, chunk_size=100000):
+        """Grava os textos no disco e retorna o armazenamento aberto"""
+        if not os.path.exists(store_dir):
+            os.makedirs(store_dir)
+
+        values = pd.Series(values).reset_index(drop=True)
+        nulls = values.isna().to_numpy()
+        offsets = np.zeros(len(values) + 1, dtype=np.int64)
+
+        def write_blob(blob):
+            # Gravar em blocos para não materializar o blob inteiro em memória
+            position = 0
+            for start in range(0, len(values), chunk_size):
+                chunk = values.iloc[start:start + chunk_size].fillna('').astype(str)
+                encoded = [text.encode('utf-8') for text in chunk]
+                lengths = np.fromiter((len(data) for data in encoded), dtype=np.int64, count=len(encoded))
+                offsets[start + 1:start + 1 + len(encoded)] = position + np.cumsum(lengths)
+                position = offsets[start + len(encoded)]
+                blob.write(b''.join(encoded))
+
+        # Arquivos novos trocados atomicamente: leitores que já mapearam os
+        # anteriores continuam lendo a versão antiga, sem arquivos truncados
+        replace_file(os.path.join(store_dir, cls.BLOB_FILE), write_blob)
+        replace_file(os.path.join(store_dir, cls.OFFSETS_FILE), lambda f: np.save(f, offsets))
+        replace_file(os.path.join(store_dir, cls.NULLS_FILE), lambda f: np.save(f, nulls))
+        return cls(store_dir)
+
+    @classmethod
+    def exists(cls, store_dir):
+        return all(
+            os.path.exists(os.path.join(store_dir, name))
+            for name in (cls.BLOB_FILE, cls.OFFSETS_FILE, cls.NULLS_FILE)
+        )
+
+    def _open(self):
+        """Abre os arquivos mapeados em memória na primeira leitura
+
+        Leitores de várias threads (tarefas do relatório batch) abrem o
+        armazenamento juntos: _offsets, que marca o armazenamento como
+        aberto, é atribuído por último e sob a trava.
+        """
+        if self._offsets is not None:
+            return
+        with self._lock:
+            if self._offsets is not None:
+                return
+            nulls = np.load(os.path.join(self.store_dir, self.NULLS_FILE), mmap_mode='r')
+            blob_path = os.path.join(self.store_dir, self.BLOB_FILE)
+            if os.path.getsize(blob_path) > 0:
+                blob = np.memmap(blob_path, dtype=np.uint8, mode='r')
+            else:
+                blob = np.zeros(0, dtype=np.uint8)
+            self._nulls = nulls
+            self._blob = blob
+            self._offsets = np.load(os.path.join(self.store_dir, self.OFFSETS_FILE), mmap_mode='r')
+
+    def __len__(self):
+        self._open()
+        return len(self._offsets) - 1
+
+    def is_null(self, rows):
+        """Máscara de textos ausentes (NaN na origem) para as linhas"""
+        self._open()
+        return np.asarray(self._nulls[np.asarray(rows)], dtype=bool)
+
+    def get(self, row):
+        """Retorna o texto de uma linha (NaN se ausente)"""
+        self._open()
+        if self._nulls[row]:
+            return np.nan
+        start, end = self._offsets[row], self._offsets[row + 1]
+        return self._blob[start:end].tobytes().decode('utf-8')
+
+    def get_batch(self, rows):
+        """Retorna os textos de várias linhas como array de objetos"""
+        self._open()
+        rows = np.asarray(rows)
+        starts = self._offsets[rows]
+        ends = self._offsets[rows + 1]
+        nulls = self._nulls[rows]
+        blob = self._blob
+        return np.array([
+            np.nan if null else blob[start:end].tobytes().decode('utf-8')
+            for start, end, null in zip(starts, ends, nulls)
+        ], dtype=object)
+
+    def iter_batches(self, rows, batch_size=50000):
+        """Itera sobre os textos das linhas em lotes"""
+        rows = np.asarray(rows)
+        for start in range(0, len(rows), batch_size):
+            yield self.get_batch(rows[start:start + batch_size])